@@ -0,0 +1,107 @@
+"""
+Mikrobenchmark dedupu POI w OverpassClient (siatka vs pętle O(n²)).
+
+Syntetyczny "gęsty" payload: tysiące przystanków (platform + stop_position
+obok siebie) i sieciówek o powtarzających się nazwach. Porównuje wynik
+i czas z referencyjną implementacją kwadratową.
+Uruchom z root projektu: backend$ python manage.py shell < global_tests/bench_poi_dedup.py
+"""
+import random
+import time
+
+from location_analysis.geo.overpass_client import OverpassClient, POI
+
+CENTER = (52.2297, 21.0122)
+CHAINS = ['Żabka', 'Biedronka', 'Lidl', 'Rossmann', 'Carrefour Express', 'Apteka Gemini', 'Pizza Hut', 'KFC']
+
+
+def reference_stop_dedup(transport_pois):
+    """Poprzednia implementacja (kwadratowa)."""
+    proper_stops = [p for p in transport_pois if p.subcategory in OverpassClient.PROPER_STOP_SUBS]
+    cleaned = []
+    for poi in transport_pois:
+        if poi.subcategory == 'stop_position':
+            dominated = any(
+                abs(poi.distance_m - ps.distance_m) < 30
+                and abs(poi.lat - ps.lat) < 0.0003
+                and abs(poi.lon - ps.lon) < 0.0003
+                for ps in proper_stops
+            )
+            if dominated:
+                continue
+        cleaned.append(poi)
+    return cleaned
+
+
+def reference_name_dedup(items):
+    """Poprzednia implementacja (kwadratowa)."""
+    deduped = []
+    for poi in items:
+        is_dup = False
+        name_lower = (poi.name or '').lower()
+        if name_lower and name_lower != 'bez nazwy':
+            for kept in deduped:
+                kept_name = (kept.name or '').lower()
+                if (name_lower == kept_name
+                    and poi.subcategory == kept.subcategory
+                    and abs((poi.distance_m or 0) - (kept.distance_m or 0)) < 20
+                    and abs(poi.lat - kept.lat) < 0.0002
+                    and abs(poi.lon - kept.lon) < 0.0002):
+                    is_dup = True
+                    break
+        if not is_dup:
+            deduped.append(poi)
+    return deduped
+
+
+def synthetic_pois(client, n, seed):
+    rng = random.Random(seed)
+    transport, shops = [], []
+    for i in range(n):
+        lat = CENTER[0] + rng.uniform(-0.018, 0.018)
+        lon = CENTER[1] + rng.uniform(-0.028, 0.028)
+        sub = rng.choice(['platform', 'bus_stop', 'tram_stop', 'stop_position', 'stop_position'])
+        transport.append(_poi(client, f'Przystanek {i % 400}', 'transport', sub, lat, lon))
+        # Sieciówki: często ten sam punkt zmapowany dwa razy (node + way)
+        jitter = rng.choice([0.0, 0.00005, 0.0005])
+        shops.append(_poi(client, rng.choice(CHAINS), 'shops', 'convenience', lat + jitter, lon))
+    return transport, shops
+
+
+def _poi(client, name, category, subcategory, lat, lon):
+    return POI(
+        lat=lat, lon=lon, name=name, category=category, subcategory=subcategory,
+        distance_m=round(client._haversine_distance(*CENTER, lat, lon)), tags={},
+    )
+
+
+def timed(fn, items, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(items)
+        best = min(best, time.perf_counter() - started)
+    return result, best * 1000
+
+
+def run_benchmark():
+    print("=== BENCHMARK DEDUP POI (siatka vs O(n²)) ===")
+    client = OverpassClient()
+    for n in (500, 2000, 5000):
+        transport, shops = synthetic_pois(client, n, seed=n)
+
+        expected, ref_stop_ms = timed(reference_stop_dedup, transport)
+        actual, stop_ms = timed(client._dedup_stop_positions, transport)
+        assert [id(p) for p in actual] == [id(p) for p in expected], "stop_position dedup differs"
+
+        expected, ref_name_ms = timed(reference_name_dedup, shops)
+        actual, name_ms = timed(client._dedup_same_name, shops)
+        assert [id(p) for p in actual] == [id(p) for p in expected], "same-name dedup differs"
+
+        print(
+            f"n={n:5d}  stop_position: {ref_stop_ms:8.1f} ms -> {stop_ms:6.1f} ms"
+            f"  | same-name: {ref_name_ms:8.1f} ms -> {name_ms:6.1f} ms  (wyniki identyczne)"
+        )
+
+
+run_benchmark()
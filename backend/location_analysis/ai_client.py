@@ -30,6 +30,14 @@ class AIClient(ABC):
         """
         ...
     
+    async def generate_json_async(self, system_prompt: str, user_prompt: str) -> dict:
+        """
+        Async variant of generate_json (ASGI pipeline).
+        Default: run the blocking implementation in a worker thread.
+        """
+        import asyncio
+        return await asyncio.to_thread(self.generate_json, system_prompt, user_prompt)
+    
     @property
     @abstractmethod
     def provider_name(self) -> str:
@@ -124,12 +132,7 @@ class OllamaClient(AIClient):
         3. If fail: extract first {...} block with regex
         4. If still fail: retry 1x with "ZWRÓĆ TYLKO JSON" appended
         """
-        # Append strict JSON instruction for local models
-        enhanced_system = (
-            system_prompt + 
-            "\n\nZwróć TYLKO JSON, bez żadnych dodatkowych znaków, komentarzy ani markdown."
-            "\nJeśli nie potrafisz spełnić formatu, zwróć dokładnie: {}"
-        )
+        enhanced_system, retry_prompt = self._strict_prompts(system_prompt, user_prompt)
         
         # Attempt 1
         raw_text = self._call_ollama(enhanced_system, user_prompt)
@@ -139,7 +142,6 @@ class OllamaClient(AIClient):
         
         # Attempt 2: retry with explicit JSON demand
         logger.warning("Ollama: first attempt failed JSON parse, retrying with strict prompt")
-        retry_prompt = user_prompt + "\n\nUWAGA: ZWRÓĆ TYLKO CZYSTY JSON. Żadnego markdown, żadnych komentarzy."
         raw_text = self._call_ollama(enhanced_system, retry_prompt)
         result = self._extract_json(raw_text)
         if result is not None:
@@ -147,10 +149,37 @@ class OllamaClient(AIClient):
         
         raise AIClientError(f"Ollama failed to produce valid JSON after 2 attempts. Last response: {raw_text[:200]}")
     
-    def _call_ollama(self, system_prompt: str, user_prompt: str) -> str:
-        """Send chat request to Ollama API."""
-        url = f"{self._base_url}/api/chat"
-        payload = {
+    async def generate_json_async(self, system_prompt: str, user_prompt: str) -> dict:
+        """Same strategy as generate_json, non-blocking HTTP via httpx."""
+        enhanced_system, retry_prompt = self._strict_prompts(system_prompt, user_prompt)
+        
+        raw_text = await self._call_ollama_async(enhanced_system, user_prompt)
+        result = self._extract_json(raw_text)
+        if result is not None:
+            return result
+        
+        logger.warning("Ollama: first attempt failed JSON parse, retrying with strict prompt")
+        raw_text = await self._call_ollama_async(enhanced_system, retry_prompt)
+        result = self._extract_json(raw_text)
+        if result is not None:
+            return result
+        
+        raise AIClientError(f"Ollama failed to produce valid JSON after 2 attempts. Last response: {raw_text[:200]}")
+    
+    @staticmethod
+    def _strict_prompts(system_prompt: str, user_prompt: str):
+        """Return (system prompt with JSON instruction, user prompt for the retry)."""
+        # Append strict JSON instruction for local models
+        enhanced_system = (
+            system_prompt + 
+            "\n\nZwróć TYLKO JSON, bez żadnych dodatkowych znaków, komentarzy ani markdown."
+            "\nJeśli nie potrafisz spełnić formatu, zwróć dokładnie: {}"
+        )
+        retry_prompt = user_prompt + "\n\nUWAGA: ZWRÓĆ TYLKO CZYSTY JSON. Żadnego markdown, żadnych komentarzy."
+        return enhanced_system, retry_prompt
+    
+    def _chat_payload(self, system_prompt: str, user_prompt: str) -> dict:
+        return {
             "model": self._model_name,
             "messages": [
                 {"role": "system", "content": system_prompt},
@@ -163,9 +192,15 @@ class OllamaClient(AIClient):
             },
             "format": "json",  # Request JSON format from Ollama
         }
+    
+    def _call_ollama(self, system_prompt: str, user_prompt: str) -> str:
+        """Send chat request to Ollama API (shared keep-alive pool)."""
+        from .http_pool import http_pool
+        url = f"{self._base_url}/api/chat"
+        payload = self._chat_payload(system_prompt, user_prompt)
         
         try:
-            response = requests.post(url, json=payload, timeout=self._timeout)
+            response = http_pool.post(url, json=payload, timeout=self._timeout)
             response.raise_for_status()
             data = response.json()
             return data.get("message", {}).get("content", "")
@@ -176,6 +211,25 @@ class OllamaClient(AIClient):
         except requests.exceptions.HTTPError as e:
             raise AIClientError(f"Ollama HTTP error: {e}")
     
+    async def _call_ollama_async(self, system_prompt: str, user_prompt: str) -> str:
+        """Async chat request to Ollama API (shared httpx client)."""
+        import httpx
+        from .async_http import get_async_client
+        url = f"{self._base_url}/api/chat"
+        payload = self._chat_payload(system_prompt, user_prompt)
+        
+        try:
+            response = await get_async_client().post(url, json=payload, timeout=self._timeout)
+            response.raise_for_status()
+            data = response.json()
+            return data.get("message", {}).get("content", "")
+        except httpx.ConnectError:
+            raise AIClientError(f"Cannot connect to Ollama at {self._base_url}. Is it running?")
+        except httpx.TimeoutException:
+            raise AIClientError(f"Ollama request timed out after {self._timeout}s")
+        except httpx.HTTPStatusError as e:
+            raise AIClientError(f"Ollama HTTP error: {e}")
+    
     def _extract_json(self, text: str) -> Optional[dict]:
         """
         Try to extract JSON from text response.
@@ -184,80 +184,131 @@ class AIInsightGenerator:
             slog.degraded(kind="DEGRADED_PROVIDER", provider="ai", reason="AI provider is OFF, using fallback", stage="ai")
             return fallback
         
-        provider_name = self.client.provider_name
-        model_name = self.client.model_name
+        try:
+            cache_key, cached, prompt = self._prepare_prompt(factsheet, slog)
+            if cached is not None:
+                return cached
+            
+            token = slog.req_start(provider=self.client.provider_name, op="generate_json", stage="ai")
+            data = self.client.generate_json(SYSTEM_PROMPT, prompt)
+            return self._accept_output(data, factsheet, fallback, cache_key, token, slog)
+            
+        except Exception as e:
+            return self._on_client_error(e, fallback, slog)
+    
+    async def generate_from_factsheet_async(
+        self,
+        factsheet: AnalysisFactSheet,
+        trace_ctx: 'AnalysisTraceContext | None' = None,
+    ) -> Optional[DecisionInsight]:
+        """Async variant of generate_from_factsheet (ASGI pipeline)."""
+        from .diagnostics import get_diag_logger, AnalysisTraceContext
+        ctx = trace_ctx or AnalysisTraceContext()
+        slog = get_diag_logger(__name__, ctx)
+
+        fallback = self._generate_fallback_tldr(factsheet)
+        
+        if not self.client:
+            slog.degraded(kind="DEGRADED_PROVIDER", provider="ai", reason="AI provider is OFF, using fallback", stage="ai")
+            return fallback
         
         try:
-            # Convert factsheet to AI-safe JSON
-            prompt_data = factsheet.to_ai_prompt_json()
+            cache_key, cached, prompt = self._prepare_prompt(factsheet, slog)
+            if cached is not None:
+                return cached
             
-            # Check cache first
-            cache_key = self._cache_key(prompt_data)
-            if cache_key in self._cache:
-                slog.info(
-                    stage="ai", provider=provider_name, op="cache_hit",
-                    meta={"model": model_name, "prompt_version": PROMPT_VERSION, "ai_cache_used": True}
-                )
-                return self._cache[cache_key]
+            token = slog.req_start(provider=self.client.provider_name, op="generate_json", stage="ai")
+            data = await self.client.generate_json_async(SYSTEM_PROMPT, prompt)
+            return self._accept_output(data, factsheet, fallback, cache_key, token, slog)
             
-            prompt = f"""
+        except Exception as e:
+            return self._on_client_error(e, fallback, slog)
+    
+    def _prepare_prompt(self, factsheet: AnalysisFactSheet, slog):
+        """Return (cache_key, cached DecisionInsight or None, user prompt)."""
+        # Convert factsheet to AI-safe JSON
+        prompt_data = factsheet.to_ai_prompt_json()
+        
+        # Check cache first
+        cache_key = self._cache_key(prompt_data)
+        if cache_key in self._cache:
+            slog.info(
+                stage="ai", provider=self.client.provider_name, op="cache_hit",
+                meta={"model": self.client.model_name, "prompt_version": PROMPT_VERSION, "ai_cache_used": True}
+            )
+            return cache_key, self._cache[cache_key], None
+        
+        prompt = f"""
 Wygeneruj insights dla tego raportu lokalizacyjnego.
 
 DANE (to jest JEDYNE źródło prawdy - nie wymyślaj innych faktów):
 {json.dumps(prompt_data, ensure_ascii=False, indent=2)}
 """
-            token = slog.req_start(provider=provider_name, op="generate_json", stage="ai")
-            data = self.client.generate_json(SYSTEM_PROMPT, prompt)
-            slog.req_end(
-                provider=provider_name, op="generate_json", stage="ai", status="ok",
-                request_token=token,
-                meta={"model": model_name, "prompt_version": PROMPT_VERSION, "ai_cache_used": False}
-            )
-            
-            # Handle empty response from local model
-            if not data:
-                slog.warning(stage="ai", provider=provider_name, op="empty_response", message="AI returned empty JSON, using fallback")
-                return fallback
-            
-            # POST-FILTER: Sanitize declarative noise/quiet claims
-            if factsheet.noise_source != "measurement":
-                data = self._sanitize_noise_claims(data)
-            
-            # VALIDATE AI output
-            validation_errors = self._validate_ai_output(data, factsheet)
-            if validation_errors:
-                slog.warning(
-                    stage="ai", provider=provider_name, op="validation", status="failed",
-                    error_class="logic", message="Using fallback",
-                    meta={"errors": validation_errors, "model": model_name}
-                )
-                return fallback
-            
-            result = DecisionInsight(
-                summary=data.get('summary', fallback.summary),
-                check_on_site=data.get('check_on_site', fallback.check_on_site)[:3],
-                why_not_higher=data.get('why_not_higher', fallback.why_not_higher),
+        return cache_key, None, prompt
+    
+    def _accept_output(
+        self,
+        data: dict,
+        factsheet: AnalysisFactSheet,
+        fallback: DecisionInsight,
+        cache_key: str,
+        token: str,
+        slog,
+    ) -> DecisionInsight:
+        """Sanitize + validate model output; cache and return it or the fallback."""
+        provider_name = self.client.provider_name
+        model_name = self.client.model_name
+        slog.req_end(
+            provider=provider_name, op="generate_json", stage="ai", status="ok",
+            request_token=token,
+            meta={"model": model_name, "prompt_version": PROMPT_VERSION, "ai_cache_used": False}
+        )
+        
+        # Handle empty response from local model
+        if not data:
+            slog.warning(stage="ai", provider=provider_name, op="empty_response", message="AI returned empty JSON, using fallback")
+            return fallback
+        
+        # POST-FILTER: Sanitize declarative noise/quiet claims
+        if factsheet.noise_source != "measurement":
+            data = self._sanitize_noise_claims(data)
+        
+        # VALIDATE AI output
+        validation_errors = self._validate_ai_output(data, factsheet)
+        if validation_errors:
+            slog.warning(
+                stage="ai", provider=provider_name, op="validation", status="failed",
+                error_class="logic", message="Using fallback",
+                meta={"errors": validation_errors, "model": model_name}
             )
-            
-            # Cache successful result
-            self._cache[cache_key] = result
-            
-            return result
-            
-        except AIClientError as e:
+            return fallback
+        
+        result = DecisionInsight(
+            summary=data.get('summary', fallback.summary),
+            check_on_site=data.get('check_on_site', fallback.check_on_site)[:3],
+            why_not_higher=data.get('why_not_higher', fallback.why_not_higher),
+        )
+        
+        # Cache successful result
+        self._cache[cache_key] = result
+        
+        return result
+    
+    def _on_client_error(self, e: Exception, fallback: DecisionInsight, slog) -> DecisionInsight:
+        provider_name = self.client.provider_name
+        if isinstance(e, AIClientError):
             slog.error(
                 stage="ai", provider=provider_name, op="generate_json",
                 message=str(e), exc="AIClientError", error_class="runtime",
                 hint=f"{provider_name} failed, using fallback"
             )
-            return fallback
-        except Exception as e:
+        else:
             slog.error(
                 stage="ai", provider=provider_name, op="generate_json",
                 message=str(e), exc=type(e).__name__, error_class="runtime",
                 hint=f"{provider_name} call failed, using deterministic fallback"
             )
-            return fallback
+        return fallback
     
     def _validate_ai_output(self, data: dict, factsheet: AnalysisFactSheet) -> list[str]:
         """
@@ -451,6 +502,14 @@ def generate_insights_from_factsheet(
     return generator.generate_from_factsheet(factsheet)
 
 
+async def generate_insights_from_factsheet_async(
+    factsheet: AnalysisFactSheet,
+) -> Optional[DecisionInsight]:
+    """Async variant of generate_insights_from_factsheet (ASGI pipeline)."""
+    generator = get_ai_insight_generator()
+    return await generator.generate_from_factsheet_async(factsheet)
+
+
 def generate_decision_insights(
     profile_name: str,
     final_score: int,
@@ -23,8 +23,9 @@ class AppConfig:
     """Centralna konfiguracja aplikacji."""
 
     # --- Overpass API ---
-    overpass_mode: str = "public"  # 'public' lub 'local'
+    overpass_mode: str = "public"  # 'public' | 'local' | 'index'
     overpass_local_url: str = "http://localhost:12345/api/interpreter"
+    osm_index_path: str = ""  # Plik lokalnego indeksu OSM (tryb 'index')
     overpass_url: str = "https://overpass-api.de/api/interpreter"
     overpass_fallback_urls: List[str] = field(default_factory=lambda: [
         "https://lz4.overpass-api.de/api/interpreter",
@@ -32,11 +33,21 @@ class AppConfig:
         "https://maps.mail.ru/osm/tools/overpass/api/interpreter",
     ])
     overpass_timeout: int = 60
+    overpass_tiles_enabled: bool = False  # Pobieranie i cache POI per kafel siatki (bbox)
+    overpass_tile_size_m: int = 500
+    overpass_stream_parse: bool = True  # Strumieniowe parsowanie odpowiedzi (płaska pamięć)
+    overpass_category_radii: bool = True  # around: per kategoria z promieni profilu
+    overpass_tag_projection: bool = False  # convert: tylko tagi czytane przez klasyfikator
+    overpass_hedge_enabled: bool = False  # Duplikat zapytania do 2. mirrora po p90 latencji
+    overpass_circuit_failures: int = 3  # Kolejne błędy endpointu -> obwód otwarty
+    overpass_circuit_cooldown_s: float = 60.0
 
     # --- Google Places API ---
     google_places_enabled: bool = True
     google_places_api_key: str = ""
     google_max_retries: int = 2
+    google_max_concurrency: int = 4   # Max zapytań enrichment/fallback w locie per analiza
+    google_max_qps: float = 10.0      # Max zapytań/s per analiza (0 = bez limitu)
 
     # --- Domyślne flagi analizy ---
     default_enrichment: bool = False
@@ -54,6 +65,7 @@ class AppConfig:
     # --- Air Quality ---
     air_quality_provider: str = "open_meteo"  # 'open_meteo' | future: 'gios'
     air_quality_enabled: bool = True
+    air_quality_cell_deg: float = 0.05  # Komórka siatki cache (~5 km; model CAMS ma ~10 km)
 
     # --- AI Provider ---
     ai_provider: str = "ollama"  # 'gemini' | 'ollama' | 'off'
@@ -67,12 +79,48 @@ class AppConfig:
     # --- Rate Limiting ---
     rate_limit_per_minute: int = 5
     rate_limit_per_hour: int = 30
+    rescore_rate_limit_per_minute: int = 10  # Zmiana profilu raportu (osobny limiter)
+    rescore_rate_limit_per_hour: int = 60
+
+    # --- Pipeline ---
+    pipeline_max_workers: int = 8  # Pula wątków dla równoległych etapów I/O (POI, jakość powietrza)
+
+    # --- Scoring partii (POST /api/analyze-batch/) ---
+    batch_max_items: int = 500
+    batch_cluster_span_m: int = 1500  # Punkty w komórce tej wielkości dzielą jedno zapytanie POI
+    batch_max_concurrent_fetches: int = 2  # Równoległe zapytania Overpass jednej partii
+
+    # --- Ponowne użycie zapisanej analizy w pobliżu ---
+    nearby_reuse_m: int = 0            # Zapisana analiza bliżej niż tyle metrów zastępuje nową (0 = wyłączone)
+    nearby_reuse_max_age: int = 86400  # Max wiek zapisanej analizy (s)
+
+    # --- Wychodzące HTTP (http_pool) ---
+    http_pool_connections: int = 16   # Ile hostów trzyma osobną pulę połączeń
+    http_pool_maxsize: int = 32       # Max połączeń keep-alive per host
+    http_connect_timeout: float = 5.0  # Timeout nawiązania połączenia (s)
+    http_read_timeout: float = 30.0    # Domyślny timeout odczytu (s), gdy wywołujący nie poda własnego
 
     # --- Cache TTLs (sekundy) ---
     cache_ttl_listing: int = 3600          # 1h
     cache_ttl_pois: int = 604800           # 7 dni
     cache_ttl_google_details: int = 604800  # 7 dni
     cache_ttl_google_nearby: int = 259200   # 3 dni
+    cache_ttl_air_quality: int = 2592000    # 30 dni (średnia roczna zmienia się powoli)
+    # Stale-while-revalidate: po soft TTL wpis jest zwracany i odświeżany w tle (0 = wyłączone)
+    cache_soft_ttl_pois: int = 432000      # 5 dni
+    cache_refresh_workers: int = 2         # Wątki odświeżania w tle
+    cache_refresh_max_pending: int = 256   # Limit kolejki odświeżeń
+    cache_soft_ttl_air_quality: int = 604800  # 7 dni
+
+    # --- Cache POI (backend) ---
+    poi_cache_backend: str = "memory"  # 'memory' | 'sqlite'
+    poi_cache_path: str = ""            # Plik SQLite współdzielony przez workery
+    poi_cache_max_entries: int = 20000
+    poi_cache_max_mb: int = 128         # Limit pamięci dla backendu 'memory'
+    # Przestrzenny cache odpowiedzi Overpass (0 = wyłączony)
+    poi_area_cache_max_entries: int = 64
+    poi_area_cache_max_mb: int = 64     # Limit pamięci (wg estimate_size)
+    poi_area_cache_margin_m: int = 150  # Zapas promienia przy pobieraniu (pokrywa sąsiednie zapytania)
 
     @property
     def overpass_endpoints(self) -> List[str]:
@@ -96,14 +144,25 @@ class AppConfig:
             "overpass": {
                 "mode": self.overpass_mode,
                 "local_url": self.overpass_local_url,
+                "index_path": self.osm_index_path,
                 "url": self.overpass_url,
                 "fallback_urls": self.overpass_fallback_urls,
                 "timeout": self.overpass_timeout,
+                "tiles_enabled": self.overpass_tiles_enabled,
+                "tile_size_m": self.overpass_tile_size_m,
+                "stream_parse": self.overpass_stream_parse,
+                "category_radii": self.overpass_category_radii,
+                "tag_projection": self.overpass_tag_projection,
+                "hedge_enabled": self.overpass_hedge_enabled,
+                "circuit_failures": self.overpass_circuit_failures,
+                "circuit_cooldown_s": self.overpass_circuit_cooldown_s,
             },
             "google_places": {
                 "enabled": self.google_places_enabled,
                 "has_api_key": bool(self.google_places_api_key),
                 "max_retries": self.google_max_retries,
+                "max_concurrency": self.google_max_concurrency,
+                "max_qps": self.google_max_qps,
             },
             "defaults": {
                 "enrichment": self.default_enrichment,
@@ -121,16 +180,50 @@ class AppConfig:
             "air_quality": {
                 "provider": self.air_quality_provider,
                 "enabled": self.air_quality_enabled,
+                "cell_deg": self.air_quality_cell_deg,
             },
             "rate_limiting": {
                 "per_minute": self.rate_limit_per_minute,
                 "per_hour": self.rate_limit_per_hour,
+                "rescore_per_minute": self.rescore_rate_limit_per_minute,
+                "rescore_per_hour": self.rescore_rate_limit_per_hour,
+            },
+            "pipeline": {
+                "max_workers": self.pipeline_max_workers,
+            },
+            "batch": {
+                "max_items": self.batch_max_items,
+                "cluster_span_m": self.batch_cluster_span_m,
+                "max_concurrent_fetches": self.batch_max_concurrent_fetches,
+            },
+            "nearby_reuse": {
+                "max_m": self.nearby_reuse_m,
+                "max_age": self.nearby_reuse_max_age,
+            },
+            "http": {
+                "pool_connections": self.http_pool_connections,
+                "pool_maxsize": self.http_pool_maxsize,
+                "connect_timeout": self.http_connect_timeout,
+                "read_timeout": self.http_read_timeout,
             },
             "cache_ttl": {
                 "listing": self.cache_ttl_listing,
                 "pois": self.cache_ttl_pois,
                 "google_details": self.cache_ttl_google_details,
                 "google_nearby": self.cache_ttl_google_nearby,
+                "air_quality": self.cache_ttl_air_quality,
+                "soft_pois": self.cache_soft_ttl_pois,
+                "refresh_workers": self.cache_refresh_workers,
+                "refresh_max_pending": self.cache_refresh_max_pending,
+                "soft_air_quality": self.cache_soft_ttl_air_quality,
+            },
+            "poi_cache": {
+                "backend": self.poi_cache_backend,
+                "max_entries": self.poi_cache_max_entries,
+                "max_mb": self.poi_cache_max_mb,
+                "area_max_entries": self.poi_area_cache_max_entries,
+                "area_max_mb": self.poi_area_cache_max_mb,
+                "area_margin_m": self.poi_area_cache_margin_m,
             },
             "ai": {
                 "provider": self.ai_provider,
@@ -194,12 +287,35 @@ def get_config() -> AppConfig:
             # Overpass
             overpass_mode=raw.get('OVERPASS_MODE', defaults.overpass_mode),
             overpass_local_url=raw.get('OVERPASS_LOCAL_URL', defaults.overpass_local_url),
+            osm_index_path=raw.get('OSM_INDEX_PATH', defaults.osm_index_path),
             overpass_url=raw.get('OVERPASS_URL', defaults.overpass_url),
             overpass_fallback_urls=_parse_list(
                 raw.get('OVERPASS_FALLBACK_URLS'),
                 defaults.overpass_fallback_urls,
             ),
             overpass_timeout=int(raw.get('OVERPASS_TIMEOUT', defaults.overpass_timeout)),
+            overpass_tiles_enabled=_parse_bool(
+                raw.get('OVERPASS_TILES_ENABLED', defaults.overpass_tiles_enabled),
+            ),
+            overpass_tile_size_m=int(raw.get('OVERPASS_TILE_SIZE_M', defaults.overpass_tile_size_m)),
+            overpass_stream_parse=_parse_bool(
+                raw.get('OVERPASS_STREAM_PARSE', defaults.overpass_stream_parse),
+                default=defaults.overpass_stream_parse,
+            ),
+            overpass_category_radii=_parse_bool(
+                raw.get('OVERPASS_CATEGORY_RADII', defaults.overpass_category_radii),
+                default=defaults.overpass_category_radii,
+            ),
+            overpass_tag_projection=_parse_bool(
+                raw.get('OVERPASS_TAG_PROJECTION', defaults.overpass_tag_projection),
+                default=defaults.overpass_tag_projection,
+            ),
+            overpass_hedge_enabled=_parse_bool(
+                raw.get('OVERPASS_HEDGE_ENABLED', defaults.overpass_hedge_enabled),
+                default=defaults.overpass_hedge_enabled,
+            ),
+            overpass_circuit_failures=int(raw.get('OVERPASS_CIRCUIT_FAILURES', defaults.overpass_circuit_failures)),
+            overpass_circuit_cooldown_s=float(raw.get('OVERPASS_CIRCUIT_COOLDOWN_S', defaults.overpass_circuit_cooldown_s)),
 
             # Google Places
             google_places_enabled=_parse_bool(
@@ -211,6 +327,8 @@ def get_config() -> AppConfig:
                 defaults.google_places_api_key,
             ),
             google_max_retries=int(raw.get('GOOGLE_MAX_RETRIES', defaults.google_max_retries)),
+            google_max_concurrency=int(raw.get('GOOGLE_MAX_CONCURRENCY', defaults.google_max_concurrency)),
+            google_max_qps=float(raw.get('GOOGLE_MAX_QPS', defaults.google_max_qps)),
 
             # Defaults analizy
             default_enrichment=_parse_bool(
@@ -252,16 +370,51 @@ def get_config() -> AppConfig:
                 raw.get('AIR_QUALITY_ENABLED', defaults.air_quality_enabled),
                 default=defaults.air_quality_enabled,
             ),
+            air_quality_cell_deg=float(raw.get('AIR_QUALITY_CELL_DEG', defaults.air_quality_cell_deg)),
 
             # Rate Limiting
             rate_limit_per_minute=int(raw.get('RATE_LIMIT_PER_MINUTE', defaults.rate_limit_per_minute)),
             rate_limit_per_hour=int(raw.get('RATE_LIMIT_PER_HOUR', defaults.rate_limit_per_hour)),
+            rescore_rate_limit_per_minute=int(raw.get('RESCORE_RATE_LIMIT_PER_MINUTE', defaults.rescore_rate_limit_per_minute)),
+            rescore_rate_limit_per_hour=int(raw.get('RESCORE_RATE_LIMIT_PER_HOUR', defaults.rescore_rate_limit_per_hour)),
+
+            # Pipeline
+            pipeline_max_workers=int(raw.get('PIPELINE_MAX_WORKERS', defaults.pipeline_max_workers)),
+
+            # Scoring partii
+            batch_max_items=int(raw.get('BATCH_MAX_ITEMS', defaults.batch_max_items)),
+            batch_cluster_span_m=int(raw.get('BATCH_CLUSTER_SPAN_M', defaults.batch_cluster_span_m)),
+            batch_max_concurrent_fetches=int(raw.get('BATCH_MAX_CONCURRENT_FETCHES', defaults.batch_max_concurrent_fetches)),
+
+            # Ponowne użycie analizy w pobliżu
+            nearby_reuse_m=int(raw.get('NEARBY_REUSE_M', defaults.nearby_reuse_m)),
+            nearby_reuse_max_age=int(raw.get('NEARBY_REUSE_MAX_AGE', defaults.nearby_reuse_max_age)),
+
+            # Wychodzące HTTP
+            http_pool_connections=int(raw.get('HTTP_POOL_CONNECTIONS', defaults.http_pool_connections)),
+            http_pool_maxsize=int(raw.get('HTTP_POOL_MAXSIZE', defaults.http_pool_maxsize)),
+            http_connect_timeout=float(raw.get('HTTP_CONNECT_TIMEOUT', defaults.http_connect_timeout)),
+            http_read_timeout=float(raw.get('HTTP_READ_TIMEOUT', defaults.http_read_timeout)),
 
             # Cache TTLs
             cache_ttl_listing=int(raw.get('CACHE_TTL_LISTING', defaults.cache_ttl_listing)),
             cache_ttl_pois=int(raw.get('CACHE_TTL_POIS', defaults.cache_ttl_pois)),
             cache_ttl_google_details=int(raw.get('CACHE_TTL_GOOGLE_DETAILS', defaults.cache_ttl_google_details)),
             cache_ttl_google_nearby=int(raw.get('CACHE_TTL_GOOGLE_NEARBY', defaults.cache_ttl_google_nearby)),
+            cache_ttl_air_quality=int(raw.get('CACHE_TTL_AIR_QUALITY', defaults.cache_ttl_air_quality)),
+            cache_soft_ttl_pois=int(raw.get('CACHE_SOFT_TTL_POIS', defaults.cache_soft_ttl_pois)),
+            cache_refresh_workers=int(raw.get('CACHE_REFRESH_WORKERS', defaults.cache_refresh_workers)),
+            cache_refresh_max_pending=int(raw.get('CACHE_REFRESH_MAX_PENDING', defaults.cache_refresh_max_pending)),
+            cache_soft_ttl_air_quality=int(raw.get('CACHE_SOFT_TTL_AIR_QUALITY', defaults.cache_soft_ttl_air_quality)),
+
+            # Cache POI (backend)
+            poi_cache_backend=raw.get('POI_CACHE_BACKEND', defaults.poi_cache_backend),
+            poi_cache_path=raw.get('POI_CACHE_PATH', defaults.poi_cache_path),
+            poi_cache_max_entries=int(raw.get('POI_CACHE_MAX_ENTRIES', defaults.poi_cache_max_entries)),
+            poi_cache_max_mb=int(raw.get('POI_CACHE_MAX_MB', defaults.poi_cache_max_mb)),
+            poi_area_cache_max_entries=int(raw.get('POI_AREA_CACHE_MAX_ENTRIES', defaults.poi_area_cache_max_entries)),
+            poi_area_cache_max_mb=int(raw.get('POI_AREA_CACHE_MAX_MB', defaults.poi_area_cache_max_mb)),
+            poi_area_cache_margin_m=int(raw.get('POI_AREA_CACHE_MARGIN_M', defaults.poi_area_cache_margin_m)),
 
             # AI Provider
             ai_provider=raw.get('AI_PROVIDER', defaults.ai_provider),
@@ -0,0 +1,43 @@
+"""
+Współdzielony asynchroniczny klient HTTP (httpx) dla ścieżki ASGI.
+
+Jeden httpx.AsyncClient na pętlę zdarzeń — klient jest związany z pętlą,
+w której powstał, więc trzymamy je w WeakKeyDictionary (pętla zamknięta
+= klient zwolniony razem z nią).
+"""
+import asyncio
+import threading
+import weakref
+
+import httpx
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+# Błędy sieciowe / protokołu, po których ponawiamy request
+RETRYABLE_ERRORS = (httpx.TimeoutException, httpx.TransportError)
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Zwraca klienta httpx dla bieżącej pętli zdarzeń."""
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        client = _clients.get(loop)
+        if client is None or client.is_closed:
+            client = _new_client()
+            _clients[loop] = client
+    return client
+
+
+def _new_client() -> httpx.AsyncClient:
+    """Limity puli i timeouty z tej samej konfiguracji co http_pool (HTTP_*)."""
+    from .app_config import get_config
+    config = get_config()
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=config.http_pool_connections * config.http_pool_maxsize,
+            max_keepalive_connections=config.http_pool_maxsize,
+        ),
+        timeout=httpx.Timeout(config.http_read_timeout, connect=config.http_connect_timeout),
+        follow_redirects=True,
+    )
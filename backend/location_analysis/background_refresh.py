@@ -0,0 +1,112 @@
+"""
+Odświeżanie cache'y w tle (stale-while-revalidate).
+
+Gdy wpis cache przekroczy soft TTL, analiza dostaje go od razu, a fetch
+z Overpass/Open-Meteo idzie do małej puli wątków. Kolejka deduplikuje po
+kluczu — gorąca lokalizacja odpytywana przez wiele analiz jest odświeżana
+raz. Kolejka ma limit; nadmiarowe zlecenia są odrzucane (wpis i tak
+zostanie pobrany na miss po hard TTL).
+
+Zadanie biegnie w cache.refresh_scope(), więc niższe warstwy (kafle,
+obszary OSM) nie oddają mu tych samych starych danych.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Set
+
+from .cache import refresh_scope
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundRefresher:
+    """Kolejka odświeżeń z deduplikacją po kluczu. Thread-safe, per proces."""
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 256):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Set[Hashable] = set()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self.queued = 0
+        self.deduped = 0
+        self.dropped = 0
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, key: Hashable, fn: Callable[[], Any]) -> bool:
+        """
+        Zleca fn() w tle, chyba że odświeżenie tego klucza już czeka
+        lub trwa.
+
+        Returns:
+            True gdy zadanie trafiło do kolejki.
+        """
+        with self._lock:
+            if key in self._pending:
+                self.deduped += 1
+                return False
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending.add(key)
+            self.queued += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="cache-refresh",
+                )
+            executor = self._executor
+        executor.submit(self._run, key, fn)
+        return True
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Czeka, aż kolejka będzie pusta (testy, zamykanie procesu)."""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending, timeout=timeout)
+
+    def stats(self) -> Dict[str, int]:
+        """Liczniki per proces."""
+        with self._lock:
+            return {
+                'queued': self.queued,
+                'deduped': self.deduped,
+                'dropped': self.dropped,
+                'completed': self.completed,
+                'failed': self.failed,
+                'pending': len(self._pending),
+            }
+
+    def _run(self, key: Hashable, fn: Callable[[], Any]) -> None:
+        ok = False
+        try:
+            with refresh_scope():
+                fn()
+            ok = True
+        except Exception as e:
+            logger.warning("Background cache refresh failed (%s): %s", key, e)
+        finally:
+            with self._idle:
+                self._pending.discard(key)
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                self._idle.notify_all()
+
+
+def _create_refresher() -> BackgroundRefresher:
+    try:
+        from .app_config import get_config
+        config = get_config()
+        return BackgroundRefresher(
+            max_workers=config.cache_refresh_workers,
+            max_pending=config.cache_refresh_max_pending,
+        )
+    except Exception:
+        return BackgroundRefresher()
+
+
+cache_refresher = _create_refresher()
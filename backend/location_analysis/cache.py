@@ -1,49 +1,408 @@
 """
-Prosty in-memory cache z TTL.
+Cache z TTL i wymiennym backendem.
+
+- MemoryBackend: in-memory LRU, per proces (domyślny)
+- SQLiteBackend: plik SQLite współdzielony przez workery, przeżywa restart
+
+Stale-while-revalidate: wpis z soft TTL po jego upływie jest nadal
+zwracany (stale hit), a wołający zleca odświeżenie w tle
+(background_refresh.cache_refresher). Hard TTL pozostaje granicą absolutną.
 """
+import sys
 import time
+import pickle
+import sqlite3
+import logging
 import threading
 import hashlib
-from typing import Optional, Any, Dict
+import itertools
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Any, Dict, Tuple
 from dataclasses import dataclass
 
+logger = logging.getLogger(__name__)
+
 
 @dataclass
 class CacheEntry:
     """Wpis w cache."""
     value: Any
     expires_at: float
+    size: int = 0
 
 
-class TTLCache:
+@dataclass
+class SoftValue:
+    """Wartość z soft TTL — po fresh_until jest stale, ale nadal zwracana."""
+    value: Any
+    fresh_until: float
+
+
+# Ustawiane na czas odświeżania w tle: stale wpisy niższych warstw
+# (cache kafli, obszarów) są wtedy traktowane jak miss
+_refresh_scope: ContextVar[bool] = ContextVar('cache_refresh_scope', default=False)
+
+
+@contextmanager
+def refresh_scope():
+    """Kontekst odświeżania w tle (patrz in_refresh_scope)."""
+    token = _refresh_scope.set(True)
+    try:
+        yield
+    finally:
+        _refresh_scope.reset(token)
+
+
+def in_refresh_scope() -> bool:
+    return _refresh_scope.get()
+
+
+def estimate_size(obj: Any, _seen: Optional[set] = None) -> int:
     """
-    Prosty cache in-memory z TTL (Time To Live).
-    Thread-safe.
+    Przybliżony rozmiar obiektu w bajtach (sys.getsizeof rekurencyjnie).
+
+    Obsługuje kontenery, dataclassy i obiekty z __dict__/__slots__
+    (np. listy POI). Współdzielone obiekty liczone raz.
     """
-    
-    def __init__(self, default_ttl: int = 3600, max_size: int = 1000):
-        """
-        Args:
-            default_ttl: Domyślny czas życia w sekundach (1 godzina)
-            max_size: Maksymalna liczba wpisów
-        """
-        self._cache: Dict[str, CacheEntry] = {}
+    if _seen is None:
+        _seen = set()
+    obj_id = id(obj)
+    if obj_id in _seen:
+        return 0
+    _seen.add(obj_id)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            size += estimate_size(k, _seen) + estimate_size(v, _seen)
+        return size
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        for item in obj:
+            size += estimate_size(item, _seen)
+        return size
+    if hasattr(obj, '__dict__'):
+        size += estimate_size(vars(obj), _seen)
+    for slot in getattr(type(obj), '__slots__', ()):
+        if hasattr(obj, slot):
+            size += estimate_size(getattr(obj, slot), _seen)
+    return size
+
+
+class CacheBackend(ABC):
+    """
+    Interfejs magazynu wpisów dla TTLCache.
+    Backend odpowiada za wygasanie i eksmisję; liczy eksmisje w `evictions`.
+    """
+
+    evictions: int = 0
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Zwraca wartość lub None jeśli nie istnieje/wygasła."""
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: Any, expires_at: float) -> None:
+        """Zapisuje wartość z bezwzględnym czasem wygaśnięcia."""
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    def size_bytes(self) -> int:
+        """Przybliżona zajętość magazynu w bajtach."""
+        return 0
+
+
+class MemoryBackend(CacheBackend):
+    """
+    Magazyn in-memory z eksmisją LRU (OrderedDict).
+    Thread-safe, wszystkie operacje O(1).
+
+    Wygasanie leniwe: wpis po TTL usuwany przy odczycie albo gdy dojdzie
+    do początku kolejki LRU. Limit liczby wpisów (`max_size`) i opcjonalny
+    limit pamięci (`max_bytes`, wg estimate_size).
+    """
+
+    def __init__(self, max_size: int = 1000, max_bytes: Optional[int] = None):
+        self._cache: "OrderedDict[str, CacheEntry]" = OrderedDict()
         self._lock = threading.RLock()
-        self._default_ttl = default_ttl
         self._max_size = max_size
-    
+        self._max_bytes = max_bytes
+        self._bytes = 0
+        self.evictions = 0
+
     def get(self, key: str) -> Optional[Any]:
-        """Pobiera wartość z cache lub None jeśli nie istnieje/wygasła."""
         with self._lock:
             entry = self._cache.get(key)
             if entry is None:
                 return None
             
             if time.time() > entry.expires_at:
-                del self._cache[key]
+                self._remove(key)
                 return None
             
+            self._cache.move_to_end(key)
             return entry.value
+
+    def set(self, key: str, value: Any, expires_at: float) -> None:
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._cache:
+                self._remove(key)
+            self._cache[key] = CacheEntry(value=value, expires_at=expires_at, size=size)
+            self._bytes += size
+            self._evict()
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            if key in self._cache:
+                self._remove(key)
+                return True
+            return False
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def _remove(self, key: str) -> None:
+        entry = self._cache.pop(key)
+        self._bytes -= entry.size
+
+    def _evict(self) -> None:
+        """Usuwa najdawniej używane wpisy, dopóki przekroczony jest limit."""
+        now = time.time()
+        while self._cache and (
+            len(self._cache) > self._max_size
+            or (self._max_bytes is not None and self._bytes > self._max_bytes and len(self._cache) > 1)
+        ):
+            _, entry = self._cache.popitem(last=False)
+            self._bytes -= entry.size
+            # Wygasłe wpisy to nie eksmisja, tylko spóźnione sprzątanie
+            if now <= entry.expires_at:
+                self.evictions += 1
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    Magazyn w pliku SQLite (WAL) — bezpieczny dla wielu procesów.
+
+    Wartości serializowane przez pickle. Jeden plik może obsługiwać wiele
+    cache'y (kolumna `namespace`). Błędy SQLite nie przerywają analizy:
+    są logowane i traktowane jak miss.
+    Licznik `evictions` jest per proces.
+
+    Limit `max_size` sprawdzany jest co ~1% limitu zapisów (COUNT(*) nie
+    idzie przy każdym INSERT), więc namespace może chwilowo przekroczyć go
+    o tyle wpisów.
+    """
+
+    def __init__(self, path: str, namespace: str = 'default', max_size: int = 10000):
+        self._path = path
+        self._namespace = namespace
+        self._max_size = max_size
+        self._local = threading.local()
+        self._writes = itertools.count(1)
+        self._check_every = max(1, max_size // 100)
+        self.evictions = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS cache_entries_expires ON cache_entries (namespace, expires_at)"
+            )
+            conn.commit()
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self._namespace, key),
+            ).fetchone()
+            if row is None:
+                return None
+            if time.time() > row[1]:
+                with conn:
+                    conn.execute(
+                        "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                        (self._namespace, key),
+                    )
+                return None
+            return pickle.loads(row[0])
+        except (sqlite3.Error, pickle.UnpicklingError) as e:
+            logger.warning("SQLite cache get failed (%s): %s", self._namespace, e)
+            return None
+
+    def set(self, key: str, value: Any, expires_at: float) -> None:
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (self._namespace, key, blob, expires_at),
+                )
+                if next(self._writes) % self._check_every == 0 and len(self) > self._max_size:
+                    self._cleanup(conn)
+        except (sqlite3.Error, pickle.PicklingError) as e:
+            logger.warning("SQLite cache set failed (%s): %s", self._namespace, e)
+
+    def delete(self, key: str) -> bool:
+        try:
+            conn = self._connection()
+            with conn:
+                cur = conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self._namespace, key),
+                )
+            return cur.rowcount > 0
+        except sqlite3.Error as e:
+            logger.warning("SQLite cache delete failed (%s): %s", self._namespace, e)
+            return False
+
+    def clear(self) -> None:
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (self._namespace,))
+        except sqlite3.Error as e:
+            logger.warning("SQLite cache clear failed (%s): %s", self._namespace, e)
+
+    def __len__(self) -> int:
+        row = self._connection().execute(
+            "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?", (self._namespace,)
+        ).fetchone()
+        return row[0]
+
+    def size_bytes(self) -> int:
+        try:
+            row = self._connection().execute(
+                "SELECT COALESCE(SUM(LENGTH(value)), 0) FROM cache_entries WHERE namespace = ?",
+                (self._namespace,),
+            ).fetchone()
+            return row[0]
+        except sqlite3.Error as e:
+            logger.warning("SQLite cache size failed (%s): %s", self._namespace, e)
+            return 0
+
+    def _cleanup(self, conn: sqlite3.Connection) -> None:
+        """Usuwa wygasłe wpisy, a potem najstarsze do 80% limitu."""
+        conn.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND expires_at < ?",
+            (self._namespace, time.time()),
+        )
+        to_remove = len(self) - int(self._max_size * 0.8)
+        if to_remove > 0:
+            conn.execute(
+                """
+                DELETE FROM cache_entries WHERE namespace = ? AND key IN (
+                    SELECT key FROM cache_entries WHERE namespace = ?
+                    ORDER BY expires_at LIMIT ?
+                )
+                """,
+                (self._namespace, self._namespace, to_remove),
+            )
+            self.evictions += to_remove
+
+
+class TTLCache:
+    """
+    Cache z TTL (Time To Live) nad wymiennym backendem.
+    Thread-safe. Liczy hits/misses/stale_hits (per proces).
+
+    Z soft_ttl < TTL wpis jest przechowywany jako SoftValue; lookup() mówi,
+    czy jest stale. W refresh_scope() stale wpis to miss.
+    """
+    
+    def __init__(
+        self,
+        default_ttl: int = 3600,
+        max_size: int = 1000,
+        backend: Optional[CacheBackend] = None,
+        max_bytes: Optional[int] = None,
+        soft_ttl: Optional[int] = None,
+    ):
+        """
+        Args:
+            default_ttl: Domyślny czas życia w sekundach (1 godzina)
+            max_size: Maksymalna liczba wpisów (dla domyślnego MemoryBackend)
+            backend: Magazyn wpisów (domyślnie MemoryBackend)
+            max_bytes: Limit pamięci w bajtach (dla domyślnego MemoryBackend)
+            soft_ttl: Po ilu sekundach wpis jest stale (None/0 = bez SWR)
+        """
+        self._backend = (
+            backend if backend is not None
+            else MemoryBackend(max_size=max_size, max_bytes=max_bytes)
+        )
+        self._default_ttl = default_ttl
+        self._soft_ttl = soft_ttl or None
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Pobiera wartość z cache lub None jeśli nie istnieje/wygasła."""
+        return self.lookup(key)[0]
+    
+    def lookup(self, key: str) -> Tuple[Optional[Any], bool]:
+        """
+        Jak get(), ale zwraca też, czy wpis jest stale (po soft TTL).
+        
+        Returns:
+            (wartość lub None, stale)
+        """
+        value = self._backend.get(key)
+        stale = False
+        if isinstance(value, SoftValue):
+            stale = time.time() > value.fresh_until
+            value = None if stale and in_refresh_scope() else value.value
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.stale_hits += stale
+        return value, value is not None and stale
     
     def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
         """
@@ -55,49 +414,34 @@ class TTLCache:
             ttl: Czas życia w sekundach (opcjonalny)
         """
         ttl = ttl or self._default_ttl
-        expires_at = time.time() + ttl
-        
-        with self._lock:
-            # Jeśli przekroczono limit, usuń najstarsze
-            if len(self._cache) >= self._max_size:
-                self._cleanup()
-            
-            self._cache[key] = CacheEntry(value=value, expires_at=expires_at)
+        now = time.time()
+        if self._soft_ttl and self._soft_ttl < ttl:
+            value = SoftValue(value=value, fresh_until=now + self._soft_ttl)
+        self._backend.set(key, value, now + ttl)
     
     def delete(self, key: str) -> bool:
         """Usuwa wpis z cache."""
-        with self._lock:
-            if key in self._cache:
-                del self._cache[key]
-                return True
-            return False
+        return self._backend.delete(key)
     
     def clear(self) -> None:
         """Czyści cały cache."""
-        with self._lock:
-            self._cache.clear()
+        self._backend.clear()
     
-    def _cleanup(self) -> None:
-        """Usuwa wygasłe wpisy i najstarsze jeśli trzeba."""
-        now = time.time()
-        
-        # Usuń wygasłe
-        expired_keys = [
-            k for k, v in self._cache.items()
-            if now > v.expires_at
-        ]
-        for k in expired_keys:
-            del self._cache[k]
-        
-        # Jeśli nadal za dużo, usuń 20% najstarszych
-        if len(self._cache) >= self._max_size:
-            sorted_keys = sorted(
-                self._cache.keys(),
-                key=lambda k: self._cache[k].expires_at
-            )
-            to_remove = len(self._cache) - int(self._max_size * 0.8)
-            for k in sorted_keys[:to_remove]:
-                del self._cache[k]
+    def counters(self) -> Dict[str, int]:
+        """Liczniki hits/misses/stale_hits/evictions (per proces), bez odpytywania backendu."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'stale_hits': self.stale_hits,
+            'evictions': self._backend.evictions,
+        }
+
+    def stats(self) -> Dict[str, int]:
+        """
+        counters() plus zajętość w bajtach. Dla SQLiteBackend to skan
+        namespace'u — tylko dla GET /api/config/, nie na ścieżce zapytania.
+        """
+        return {**self.counters(), 'bytes': self._backend.size_bytes()}
     
     @staticmethod
     def make_key(*args) -> str:
@@ -107,27 +451,95 @@ class TTLCache:
 
 
 # Globalne instancje cache — TTL z centralnej konfiguracji
+def _create_poi_cache_backend(config, namespace: str = 'pois') -> Optional[CacheBackend]:
+    """Backend dla cache'y POI wg config.poi_cache_backend ('memory' | 'sqlite')."""
+    if config.poi_cache_backend == 'sqlite' and config.poi_cache_path:
+        return SQLiteBackend(
+            config.poi_cache_path,
+            namespace=namespace,
+            max_size=config.poi_cache_max_entries,
+        )
+    return None
+
+
+MB = 1024 * 1024
+
+
 def _create_caches():
     try:
         from .app_config import get_config
         config = get_config()
         return (
-            TTLCache(default_ttl=config.cache_ttl_listing, max_size=500),
-            TTLCache(default_ttl=config.cache_ttl_pois, max_size=200),
-            TTLCache(default_ttl=config.cache_ttl_google_details, max_size=2000),
-            TTLCache(default_ttl=config.cache_ttl_google_nearby, max_size=2000),
+            TTLCache(default_ttl=config.cache_ttl_listing, max_size=500, max_bytes=32 * MB),
+            TTLCache(
+                default_ttl=config.cache_ttl_pois,
+                max_size=200,
+                backend=_create_poi_cache_backend(config),
+                max_bytes=config.poi_cache_max_mb * MB,
+                soft_ttl=config.cache_soft_ttl_pois,
+            ),
+            TTLCache(default_ttl=config.cache_ttl_google_details, max_size=2000, max_bytes=32 * MB),
+            TTLCache(default_ttl=config.cache_ttl_google_nearby, max_size=2000, max_bytes=32 * MB),
         )
     except Exception:
         return (
-            TTLCache(default_ttl=3600, max_size=500),
-            TTLCache(default_ttl=604800, max_size=200),
-            TTLCache(default_ttl=604800, max_size=2000),
-            TTLCache(default_ttl=259200, max_size=2000),
+            TTLCache(default_ttl=3600, max_size=500, max_bytes=32 * MB),
+            TTLCache(default_ttl=604800, max_size=200, max_bytes=128 * MB),
+            TTLCache(default_ttl=604800, max_size=2000, max_bytes=32 * MB),
+            TTLCache(default_ttl=259200, max_size=2000, max_bytes=32 * MB),
         )
 
 listing_cache, overpass_cache, google_details_cache, google_nearby_cache = _create_caches()
 
 
+def _create_tile_cache() -> TTLCache:
+    """Cache elementów OSM per kafel siatki (tryb OVERPASS_TILES_ENABLED)."""
+    try:
+        from .app_config import get_config
+        config = get_config()
+        return TTLCache(
+            default_ttl=config.cache_ttl_pois,
+            max_size=5000,
+            backend=_create_poi_cache_backend(config, namespace='osm_tiles'),
+            max_bytes=config.poi_cache_max_mb * MB,
+            soft_ttl=config.cache_soft_ttl_pois,
+        )
+    except Exception:
+        return TTLCache(default_ttl=604800, max_size=5000, max_bytes=128 * MB)
+
+overpass_tile_cache = _create_tile_cache()
+
+
+def _create_air_quality_cache() -> TTLCache:
+    """Cache wyników jakości powietrza per komórka siatki (AIR_QUALITY_CELL_DEG)."""
+    try:
+        from .app_config import get_config
+        config = get_config()
+        return TTLCache(
+            default_ttl=config.cache_ttl_air_quality,
+            max_size=5000,
+            backend=_create_poi_cache_backend(config, namespace='air_quality'),
+            max_bytes=16 * MB,
+            soft_ttl=config.cache_soft_ttl_air_quality,
+        )
+    except Exception:
+        return TTLCache(default_ttl=2592000, max_size=5000, max_bytes=16 * MB)
+
+air_quality_cache = _create_air_quality_cache()
+
+
+def get_cache_stats() -> Dict[str, Dict[str, int]]:
+    """Statystyki globalnych cache'y (per proces)."""
+    return {
+        'listing': listing_cache.stats(),
+        'pois': overpass_cache.stats(),
+        'google_details': google_details_cache.stats(),
+        'google_nearby': google_nearby_cache.stats(),
+        'osm_tiles': overpass_tile_cache.stats(),
+        'air_quality': air_quality_cache.stats(),
+    }
+
+
 def normalize_coords(lat: float, lon: float, precision: int = 4) -> tuple:
     """
     Normalizuje współrzędne do siatki dla lepszego cache hit rate.
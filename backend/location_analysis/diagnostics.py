@@ -8,6 +8,7 @@ import os
 import re
 import secrets
 import string
+import threading
 import time
 from dataclasses import dataclass, field
 from datetime import UTC, datetime
@@ -102,10 +103,12 @@ class ProviderStats:
     timeouts: int = 0
     rate_limited: int = 0
     max_ms: float = 0.0
+    response_bytes: int = 0
 
-    def record(self, status: str, duration_ms: float) -> None:
+    def record(self, status: str, duration_ms: float, response_bytes: int = 0) -> None:
         self.requests += 1
         self.max_ms = max(self.max_ms, max(0.0, duration_ms))
+        self.response_bytes += max(0, response_bytes)
         if status == "error":
             self.errors += 1
         elif status == "timeout":
@@ -114,16 +117,94 @@ class ProviderStats:
             self.rate_limited += 1
 
 
+@dataclass
+class CacheLookupStats:
+    hits: int = 0
+    misses: int = 0
+    process_totals: Dict[str, int] = field(default_factory=dict)
+
+    def record(self, hit: bool, process_totals: Optional[Dict[str, int]] = None) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        if process_totals:
+            self.process_totals = dict(process_totals)
+
+
+@dataclass
+class FlightStats:
+    fetched: int = 0
+    coalesced: int = 0
+    process_totals: Dict[str, int] = field(default_factory=dict)
+
+    def record(self, shared: bool, process_totals: Optional[Dict[str, int]] = None) -> None:
+        if shared:
+            self.coalesced += 1
+        else:
+            self.fetched += 1
+        if process_totals:
+            self.process_totals = dict(process_totals)
+
+
+@dataclass
+class HostStats:
+    requests: int = 0
+    reused: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+    def record(self, duration_ms: float, reused: bool) -> None:
+        self.requests += 1
+        self.reused += int(reused)
+        self.total_ms += max(0.0, duration_ms)
+        self.max_ms = max(self.max_ms, max(0.0, duration_ms))
+
+
 @dataclass
 class AnalysisSummary:
     """Accumulates request and stage stats, then emits one final log."""
 
     providers: Dict[str, ProviderStats] = field(default_factory=dict)
     stage_durations_ms: Dict[str, float] = field(default_factory=dict)
+    caches: Dict[str, CacheLookupStats] = field(default_factory=dict)
+    hosts: Dict[str, HostStats] = field(default_factory=dict)
+    flights: Dict[str, FlightStats] = field(default_factory=dict)
+    # Stages may run on worker threads (stage_scheduler)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def record_request(self, provider: str, status: str, duration_ms: float = 0.0, response_bytes: int = 0) -> None:
+        with self._lock:
+            stats = self.providers.setdefault(provider or "unknown", ProviderStats())
+            stats.record(status=status, duration_ms=duration_ms, response_bytes=response_bytes)
+
+    def record_cache(
+        self,
+        cache: str,
+        hit: bool,
+        process_totals: Optional[Dict[str, int]] = None,
+    ) -> None:
+        """Records one cache lookup; process_totals is a TTLCache.counters() snapshot."""
+        with self._lock:
+            stats = self.caches.setdefault(cache or "unknown", CacheLookupStats())
+            stats.record(hit=hit, process_totals=process_totals)
+
+    def record_flight(
+        self,
+        flight: str,
+        shared: bool,
+        process_totals: Optional[Dict[str, int]] = None,
+    ) -> None:
+        """Records one single-flight fetch; shared=True when this analysis waited on another's fetch."""
+        with self._lock:
+            stats = self.flights.setdefault(flight or "unknown", FlightStats())
+            stats.record(shared=shared, process_totals=process_totals)
 
-    def record_request(self, provider: str, status: str, duration_ms: float = 0.0) -> None:
-        stats = self.providers.setdefault(provider or "unknown", ProviderStats())
-        stats.record(status=status, duration_ms=duration_ms)
+    def record_http(self, host: str, duration_ms: float, reused: bool) -> None:
+        """Records one outbound HTTP request (http_pool): latency and connection reuse."""
+        with self._lock:
+            stats = self.hosts.setdefault(host or "unknown", HostStats())
+            stats.record(duration_ms=duration_ms, reused=reused)
 
     def record_stage(self, stage: str, duration_ms: float) -> None:
         if not stage:
@@ -139,8 +220,28 @@ class AnalysisSummary:
             meta[f"provider_{metric}_timeouts"] = stats.timeouts
             meta[f"provider_{metric}_rate_limited"] = stats.rate_limited
             meta[f"provider_{metric}_max_ms"] = round(stats.max_ms, 1)
+            if stats.response_bytes:
+                meta[f"provider_{metric}_bytes"] = stats.response_bytes
         for stage, duration in self.stage_durations_ms.items():
             meta[f"stage_{_provider_metric_name(stage)}_ms"] = round(duration, 1)
+        for cache, stats in self.caches.items():
+            metric = _provider_metric_name(cache)
+            meta[f"cache_{metric}_hits"] = stats.hits
+            meta[f"cache_{metric}_misses"] = stats.misses
+            for key, value in stats.process_totals.items():
+                meta[f"cache_{metric}_total_{_provider_metric_name(key)}"] = value
+        for flight, stats in self.flights.items():
+            metric = _provider_metric_name(flight)
+            meta[f"flight_{metric}_fetched"] = stats.fetched
+            meta[f"flight_{metric}_coalesced"] = stats.coalesced
+            for key, value in stats.process_totals.items():
+                meta[f"flight_{metric}_total_{_provider_metric_name(key)}"] = value
+        for host, stats in self.hosts.items():
+            metric = _provider_metric_name(host)
+            meta[f"http_{metric}_requests"] = stats.requests
+            meta[f"http_{metric}_reused"] = stats.reused
+            meta[f"http_{metric}_avg_ms"] = round(stats.total_ms / stats.requests, 1) if stats.requests else 0.0
+            meta[f"http_{metric}_max_ms"] = round(stats.max_ms, 1)
         return meta
 
     def emit(
@@ -175,6 +276,7 @@ class AnalysisTraceContext:
     _stage_starts: Dict[str, float] = field(default_factory=dict, repr=False)
     _request_starts: Dict[str, float] = field(default_factory=dict, repr=False)
     _request_counter: int = field(default=0, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
 
     @property
     def total_duration_ms(self) -> float:
@@ -193,8 +295,9 @@ class AnalysisTraceContext:
         return round(duration_ms, 1)
 
     def start_request(self, provider: str, op: str, stage: str = "") -> str:
-        self._request_counter += 1
-        token = f"{provider}:{op}:{stage}:{self._request_counter}"
+        with self._lock:
+            self._request_counter += 1
+            token = f"{provider}:{op}:{stage}:{self._request_counter}"
         self._request_starts[token] = time.monotonic()
         return token
 
@@ -403,17 +506,20 @@ class StructuredLogger:
         message: str = "",
         exc: str = "",
         hint: str = "",
+        response_bytes: Optional[int] = None,
         meta: Optional[Dict[str, Any]] = None,
     ) -> None:
         duration = duration_ms
         if duration is None:
             duration = self.ctx.end_request(request_token)
         duration = round(max(0.0, float(duration or 0.0)), 1)
-        self.ctx.summary.record_request(provider, status, duration)
+        self.ctx.summary.record_request(provider, status, duration, response_bytes=response_bytes or 0)
 
         request_meta = dict(meta or {})
         if retry_count is not None:
             request_meta["retry_count"] = retry_count
+        if response_bytes is not None:
+            request_meta["bytes"] = response_bytes
 
         if status in {"error", "timeout"}:
             self.error(
@@ -2,8 +2,9 @@
 Moduł klienta geograficznego - Overpass API i Google Places.
 """
 from .overpass_client import OverpassClient
+from .osm_index_client import OSMIndexClient, create_overpass_client
 from .google_places_client import GooglePlacesClient
 from .hybrid_poi_provider import HybridPOIProvider
 from .poi_analyzer import POIAnalyzer, NeighborhoodScore
 
-__all__ = ['OverpassClient', 'GooglePlacesClient', 'HybridPOIProvider', 'POIAnalyzer', 'NeighborhoodScore']
+__all__ = ['OverpassClient', 'OSMIndexClient', 'create_overpass_client', 'GooglePlacesClient', 'HybridPOIProvider', 'POIAnalyzer', 'NeighborhoodScore']
@@ -1,4 +1,5 @@
-from typing import Dict, Type
+import math
+from typing import Dict, Tuple, Type
 from .base import AirQualityProvider
 from .open_meteo import OpenMeteoAirQualityProvider
 
@@ -17,3 +18,15 @@ def get_air_quality_provider(name: str = 'open_meteo') -> AirQualityProvider:
         raise ValueError(f"Nieznany dostawca jakości powietrza: '{name}'")
     
     return provider_class()
+
+
+def air_quality_cell(lat: float, lon: float, cell_deg: float) -> Tuple[float, float]:
+    """
+    Środek komórki siatki zawierającej punkt. Jakość powietrza zmienia się
+    na kilometrach, nie metrach — wszystkie punkty komórki dzielą jeden
+    wynik (i jedno zapytanie do API).
+    """
+    return (
+        round((math.floor(lat / cell_deg) + 0.5) * cell_deg, 6),
+        round((math.floor(lon / cell_deg) + 0.5) * cell_deg, 6),
+    )
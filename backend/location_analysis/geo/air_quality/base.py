@@ -28,3 +28,11 @@ class AirQualityProvider(ABC):
         }
         """
         pass
+
+    async def get_air_quality_async(self, lat: float, lon: float) -> Optional[Dict]:
+        """
+        Asynchroniczny wariant get_air_quality (ścieżka ASGI).
+        Domyślnie uruchamia wersję synchroniczną w wątku.
+        """
+        import asyncio
+        return await asyncio.to_thread(self.get_air_quality, lat, lon)
@@ -1,5 +1,6 @@
 import logging
 import requests
+from itertools import groupby
 from typing import Optional, Dict
 
 from .base import AirQualityProvider
@@ -28,89 +29,14 @@ class OpenMeteoAirQualityProvider(AirQualityProvider):
         aby uwzględnić sezonowość (np. sezon grzewczy/smog w zimie).
         Dokumentacja: https://open-meteo.com/en/docs/air-quality-api
         """
-        params = {
-            "latitude": lat,
-            "longitude": lon,
-            "hourly": "european_aqi,pm10,pm2_5",
-            "past_days": 365
-        }
+        from ...http_pool import http_pool
+        params = self._params(lat, lon)
         
         try:
             logger.debug(f"Pobieranie jakości powietrza Open-Meteo (365 dni) dla {lat}, {lon}")
-            response = requests.get(self.BASE_URL, params=params, timeout=10)
+            response = http_pool.get(self.BASE_URL, params=params, timeout=10)
             response.raise_for_status()
-            
-            data = response.json()
-            hourly = data.get("hourly", {})
-            
-            if not hourly:
-                logger.warning("Brak sekcji 'hourly' w odpowiedzi Open-Meteo Air Quality")
-                return None
-            
-            time_list = hourly.get("time", [])
-            aqi_list = hourly.get("european_aqi", [])
-            pm10_list = hourly.get("pm10", [])
-            pm25_list = hourly.get("pm2_5", [])
-            
-            if not time_list or not aqi_list:
-                logger.debug(f"Open-Meteo nie zwróciło historycznych wartości (time lub EAQI) dla {lat}, {lon}")
-                return None
-                
-            # Ogólne średnie dla całego roku
-            valid_aqi = [v for v in aqi_list if v is not None]
-            valid_pm10 = [v for v in pm10_list if v is not None]
-            valid_pm25 = [v for v in pm25_list if v is not None]
-            
-            avg_aqi = round(sum(valid_aqi) / len(valid_aqi)) if valid_aqi else None
-            avg_pm10 = round(sum(valid_pm10) / len(valid_pm10), 1) if valid_pm10 else None
-            avg_pm25 = round(sum(valid_pm25) / len(valid_pm25), 1) if valid_pm25 else None
-            
-            if avg_aqi is None:
-                return None
-            
-            # Grupowanie po miesiącach do wykresu
-            # time to ISO stringi np. "2023-11-20T12:00"
-            monthly_data = {}
-            for i, ts in enumerate(time_list):
-                if not ts: continue
-                # Weź samo YYYY-MM
-                month_key = ts[:7]
-                
-                if month_key not in monthly_data:
-                    monthly_data[month_key] = {"aqi": [], "pm10": [], "pm25": []}
-                
-                if i < len(aqi_list) and aqi_list[i] is not None:
-                    monthly_data[month_key]["aqi"].append(aqi_list[i])
-                if i < len(pm10_list) and pm10_list[i] is not None:
-                    monthly_data[month_key]["pm10"].append(pm10_list[i])
-                if i < len(pm25_list) and pm25_list[i] is not None:
-                    monthly_data[month_key]["pm25"].append(pm25_list[i])
-            
-            monthly_history = []
-            for m_key, m_vals in monthly_data.items():
-                m_avg_aqi = round(sum(m_vals["aqi"]) / len(m_vals["aqi"])) if m_vals["aqi"] else None
-                m_avg_pm10 = round(sum(m_vals["pm10"]) / len(m_vals["pm10"]), 1) if m_vals["pm10"] else None
-                m_avg_pm25 = round(sum(m_vals["pm25"]) / len(m_vals["pm25"]), 1) if m_vals["pm25"] else None
-                
-                if m_avg_aqi is not None:
-                    monthly_history.append({
-                        "month": m_key,
-                        "aqi": m_avg_aqi,
-                        "pm10": m_avg_pm10,
-                        "pm25": m_avg_pm25
-                    })
-            
-            # Sort chronologicznie
-            monthly_history.sort(key=lambda x: x["month"])
-                
-            return {
-                "aqi": avg_aqi,
-                "pm10": avg_pm10,
-                "pm25": avg_pm25,
-                "provider": self.name,
-                "period": "last_365_days_average",
-                "monthly_history": monthly_history
-            }
+            return self._summarize(response.json(), lat, lon)
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Błąd sieci podczas łączenia z Open-Meteo Air Quality: {e}")
@@ -118,3 +44,102 @@ class OpenMeteoAirQualityProvider(AirQualityProvider):
         except Exception as e:
             logger.exception(f"Nieoczekiwany błąd przy parsowaniu Open-Meteo Air Quality: {e}")
             return None
+    
+    async def get_air_quality_async(self, lat: float, lon: float) -> Optional[Dict]:
+        """Asynchroniczny odpowiednik get_air_quality (httpx)."""
+        import httpx
+        from ...async_http import get_async_client
+        
+        try:
+            logger.debug(f"Pobieranie jakości powietrza Open-Meteo (365 dni) dla {lat}, {lon}")
+            response = await get_async_client().get(self.BASE_URL, params=self._params(lat, lon), timeout=10)
+            response.raise_for_status()
+            return self._summarize(response.json(), lat, lon)
+            
+        except httpx.HTTPError as e:
+            logger.error(f"Błąd sieci podczas łączenia z Open-Meteo Air Quality: {e}")
+            return None
+        except Exception as e:
+            logger.exception(f"Nieoczekiwany błąd przy parsowaniu Open-Meteo Air Quality: {e}")
+            return None
+    
+    @staticmethod
+    def _params(lat: float, lon: float) -> Dict:
+        return {
+            "latitude": lat,
+            "longitude": lon,
+            "hourly": "european_aqi,pm10,pm2_5",
+            "past_days": 365
+        }
+    
+    def _summarize(self, data: Dict, lat: float, lon: float) -> Optional[Dict]:
+        """Średnie roczne + historia miesięczna z odpowiedzi hourly."""
+        hourly = data.get("hourly", {})
+        
+        if not hourly:
+            logger.warning("Brak sekcji 'hourly' w odpowiedzi Open-Meteo Air Quality")
+            return None
+        
+        time_list = hourly.get("time", [])
+        aqi_list = hourly.get("european_aqi", [])
+        pm10_list = hourly.get("pm10", [])
+        pm25_list = hourly.get("pm2_5", [])
+        
+        if not time_list or not aqi_list:
+            logger.debug(f"Open-Meteo nie zwróciło historycznych wartości (time lub EAQI) dla {lat}, {lon}")
+            return None
+        
+        series = (aqi_list, pm10_list, pm25_list)
+        avg_aqi, avg_pm10, avg_pm25 = self._averages([self._sum_count(values) for values in series])
+        if avg_aqi is None:
+            return None
+        
+        # Grupowanie po miesiącach do wykresu: czas ("2023-11-20T12:00") jest
+        # posortowany, więc miesiąc to ciągły zakres indeksów. Zamiast pętli
+        # po ~8760 próbkach — groupby po kluczach YYYY-MM i sumy na wycinkach.
+        month_keys = [ts[:7] if ts else None for ts in time_list]
+        monthly_data: Dict[str, list] = {}
+        start = 0
+        for month_key, run in groupby(month_keys):
+            end = start + len(list(run))
+            if month_key is not None:
+                sums = monthly_data.setdefault(month_key, [(0, 0)] * len(series))
+                for i, values in enumerate(series):
+                    total, count = self._sum_count(values[start:end])
+                    sums[i] = (sums[i][0] + total, sums[i][1] + count)
+            start = end
+        
+        monthly_history = []
+        for m_key in sorted(monthly_data):
+            m_avg_aqi, m_avg_pm10, m_avg_pm25 = self._averages(monthly_data[m_key])
+            if m_avg_aqi is not None:
+                monthly_history.append({
+                    "month": m_key,
+                    "aqi": m_avg_aqi,
+                    "pm10": m_avg_pm10,
+                    "pm25": m_avg_pm25
+                })
+            
+        return {
+            "aqi": avg_aqi,
+            "pm10": avg_pm10,
+            "pm25": avg_pm25,
+            "provider": self.name,
+            "period": "last_365_days_average",
+            "monthly_history": monthly_history
+        }
+    
+    @staticmethod
+    def _sum_count(values: list) -> tuple:
+        valid = [v for v in values if v is not None]
+        return sum(valid), len(valid)
+    
+    @staticmethod
+    def _averages(sums: list) -> tuple:
+        """(AQI, PM10, PM2.5) z par (suma, liczba); AQI całkowite, PM z 1 miejscem."""
+        (aqi_sum, aqi_n), (pm10_sum, pm10_n), (pm25_sum, pm25_n) = sums
+        return (
+            round(aqi_sum / aqi_n) if aqi_n else None,
+            round(pm10_sum / pm10_n, 1) if pm10_n else None,
+            round(pm25_sum / pm25_n, 1) if pm25_n else None,
+        )
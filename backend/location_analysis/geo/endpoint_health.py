@@ -0,0 +1,206 @@
+"""
+Zdrowie endpointów Overpass: ranking mirrorów, circuit breaker, hedging.
+
+Zamiast rotacji round-robin po błędzie każdy endpoint ma okno ostatnich
+wyników (latencja sukcesów, błędy). Zapytanie idzie do najszybszego
+zdrowego mirrora; endpoint z serią błędów jest wyłączany (otwarty obwód)
+na czas cooldown. Statystyki są wspólne dla procesu — jedna analiza,
+która trafiła na martwy mirror, oszczędza czekania kolejnym.
+
+Hedging: gdy pierwszy mirror nie odpowiedział w czasie swojego p90,
+to samo zapytanie idzie równolegle do drugiego; wygrywa szybsza odpowiedź.
+"""
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, List, Optional, Sequence
+
+# Minimalna liczba próbek, od której liczymy p90 dla hedgingu
+MIN_HEDGE_SAMPLES = 5
+# Dolna granica opóźnienia hedgingu (nie dublujemy szybkich zapytań)
+MIN_HEDGE_DELAY_S = 0.5
+
+
+class EndpointStats:
+    """Okno ostatnich wyników jednego endpointu."""
+
+    def __init__(self, window: int):
+        self.latencies_ms: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.latencies_ms:
+            return None
+        ordered = sorted(self.latencies_ms)
+        return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+    def rank_key(self) -> tuple:
+        """
+        Im mniej, tym lepiej: najpierw endpointy z sukcesami (mediana latencji
+        karana odsetkiem błędów), potem bez danych, na końcu same błędy.
+        """
+        if self.latencies_ms:
+            return 0, self.percentile(0.5) * (1 + 4 * self.error_rate)
+        if not self.outcomes:
+            return 1, 0.0
+        return 2, self.error_rate
+
+    def to_dict(self, now: float) -> Dict[str, float]:
+        p50, p90 = self.percentile(0.5), self.percentile(0.9)
+        return {
+            'samples': len(self.outcomes),
+            'error_rate': round(self.error_rate, 3),
+            'p50_ms': round(p50, 1) if p50 is not None else None,
+            'p90_ms': round(p90, 1) if p90 is not None else None,
+            'consecutive_failures': self.consecutive_failures,
+            'circuit_open': self.open_until > now,
+        }
+
+
+class EndpointHealth:
+    """
+    Statystyki per URL endpointu. Thread-safe.
+
+    Endpointy bez danych są szeregowane za tymi ze zmierzoną latencją,
+    w kolejności z konfiguracji (pierwszy skonfigurowany = domyślny);
+    sortowanie jest stabilne.
+    """
+
+    def __init__(self, window: int = 50, failure_threshold: int = 3, cooldown_s: float = 60.0):
+        self.window = window
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_s = cooldown_s
+        self._stats: Dict[str, EndpointStats] = {}
+        self._lock = threading.Lock()
+
+    def ranked(self, endpoints: Sequence[str]) -> List[str]:
+        """
+        Endpointy od najlepszego. Z otwartym obwodem — tylko gdy wszystkie
+        mają otwarty obwód (wtedy wg najbliższego końca cooldownu).
+        """
+        now = time.monotonic()
+        with self._lock:
+            stats = {url: self._stats.get(url) for url in endpoints}
+            closed = [url for url in endpoints if stats[url] is None or stats[url].open_until <= now]
+            if not closed:
+                return sorted(endpoints, key=lambda url: stats[url].open_until)
+            return sorted(closed, key=lambda url: stats[url].rank_key() if stats[url] else (1, 0.0))
+
+    def record(self, endpoint: str, ok: bool, latency_ms: float) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, EndpointStats(self.window))
+            stats.outcomes.append(ok)
+            if ok:
+                stats.latencies_ms.append(latency_ms)
+                stats.consecutive_failures = 0
+                stats.open_until = 0.0
+            else:
+                stats.consecutive_failures += 1
+                if stats.consecutive_failures >= self.failure_threshold:
+                    stats.open_until = time.monotonic() + self.cooldown_s
+
+    def hedge_delay_s(self, endpoint: str) -> Optional[float]:
+        """p90 latencji endpointu (s) albo None, gdy za mało próbek."""
+        with self._lock:
+            stats = self._stats.get(endpoint)
+            if stats is None or len(stats.latencies_ms) < MIN_HEDGE_SAMPLES:
+                return None
+            return max(MIN_HEDGE_DELAY_S, stats.percentile(0.9) / 1000)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        now = time.monotonic()
+        with self._lock:
+            return {url: stats.to_dict(now) for url, stats in self._stats.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+_hedge_executor: Optional[ThreadPoolExecutor] = None
+_hedge_lock = threading.Lock()
+
+
+def _get_hedge_executor() -> ThreadPoolExecutor:
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _hedge_lock:
+            if _hedge_executor is None:
+                from ..app_config import get_config
+                _hedge_executor = ThreadPoolExecutor(
+                    max_workers=max(2, 2 * get_config().pipeline_max_workers),
+                    thread_name_prefix="overpass-hedge",
+                )
+    return _hedge_executor
+
+
+def run_hedged(attempt: Callable[[str, bool], object], primary: str, secondary: str, delay_s: float):
+    """
+    attempt(primary, False); jeśli nie skończy się w delay_s — równolegle
+    attempt(secondary, True). Zwraca pierwszy sukces; gdy obie próby
+    zawiodą, rzuca błąd ostatniej. Przegrana próba kończy się w tle
+    (jej wynik trafia tylko do statystyk endpointu).
+    """
+    pool = _get_hedge_executor()
+    first = pool.submit(attempt, primary, False)
+    done, _ = wait([first], timeout=delay_s)
+    if done:
+        return first.result()
+
+    pending = {first, pool.submit(attempt, secondary, True)}
+    error: Optional[BaseException] = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+async def run_hedged_async(attempt, primary: str, secondary: str, delay_s: float):
+    """Odpowiednik run_hedged dla korutyn; przegrana próba jest anulowana."""
+    import asyncio
+    first = asyncio.ensure_future(attempt(primary, False))
+    done, _ = await asyncio.wait({first}, timeout=delay_s)
+    if done:
+        return first.result()
+
+    pending = {first, asyncio.ensure_future(attempt(secondary, True))}
+    error: Optional[BaseException] = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+    finally:
+        for task in pending:
+            task.cancel()
+    raise error
+
+
+def _create_endpoint_health() -> EndpointHealth:
+    try:
+        from ..app_config import get_config
+        config = get_config()
+        return EndpointHealth(
+            failure_threshold=config.overpass_circuit_failures,
+            cooldown_s=config.overpass_circuit_cooldown_s,
+        )
+    except Exception:
+        return EndpointHealth()
+
+
+overpass_endpoint_health = _create_endpoint_health()
@@ -11,7 +11,7 @@ from dataclasses import dataclass
 from typing import Dict, List, Optional, Any, Tuple
 
 from .nature_metrics import NatureMetrics
-from .overpass_client import POI, MAX_POIS_PER_CATEGORY
+from .overpass_client import FETCH_FAILED, POI, MAX_POIS_PER_CATEGORY
 
 logger = logging.getLogger(__name__)
 
@@ -153,6 +153,7 @@ class GooglePlacesClient:
     
     NEARBY_SEARCH_URL = "https://places.googleapis.com/v1/places:searchNearby"
     PLACE_DETAILS_URL = "https://places.googleapis.com/v1/places/"
+    TEXT_SEARCH_URL = "https://places.googleapis.com/v1/places:searchText"
     
     # Pola do Nearby Search (Pro SKU — tańsze, bez rating/reviews)
     # Rating/reviews pobieramy osobno w enrichment (Text Search) — tylko dla top-k POI
@@ -173,6 +174,16 @@ class GooglePlacesClient:
         "userRatingCount",
     ])
     
+    # Pola do Text Search (enrichment) — rating/reviews razem z lokalizacją, 1 request zamiast 2
+    TEXT_SEARCH_FIELD_MASK = ",".join([
+        "places.id",
+        "places.displayName",
+        "places.location",
+        "places.types",
+        "places.rating",
+        "places.userRatingCount",
+    ])
+    
     # Typy Google do wyszukiwania per kategoria
     SEARCH_TYPES = {
         'shops': ['supermarket', 'convenience_store', 'shopping_mall', 'store'],
@@ -205,14 +216,15 @@ class GooglePlacesClient:
         trace_ctx=None,
         **kwargs,
     ) -> requests.Response:
-        """HTTP request z retry i exponential backoff dla 429/5xx."""
+        """HTTP request z retry i exponential backoff dla 429/5xx (współdzielona pula połączeń)."""
+        from ..http_pool import http_pool
         retries = max_retries if max_retries is not None else self.MAX_RETRIES
         kwargs.setdefault('timeout', 10)
         
         last_response = None
         for attempt in range(retries + 1):
             try:
-                response = requests.request(method, url, **kwargs)
+                response = http_pool.request(method, url, trace_ctx=trace_ctx, **kwargs)
                 last_response = response
                 
                 # Retry na 429 (rate limit) i 5xx (server error)
@@ -238,6 +250,48 @@ class GooglePlacesClient:
         
         return last_response
     
+    async def _request_with_retry_async(
+        self,
+        method: str,
+        url: str,
+        max_retries: int = None,
+        **kwargs,
+    ):
+        """Asynchroniczny odpowiednik _request_with_retry (httpx, asyncio.sleep)."""
+        import asyncio
+        from ..async_http import get_async_client, RETRYABLE_ERRORS
+        client = get_async_client()
+        retries = max_retries if max_retries is not None else self.MAX_RETRIES
+        kwargs.setdefault('timeout', 10)
+        
+        last_response = None
+        for attempt in range(retries + 1):
+            try:
+                response = await client.request(method, url, **kwargs)
+                last_response = response
+                
+                if response.status_code == 429 or response.status_code >= 500:
+                    if attempt < retries:
+                        wait = 0.5 * (2 ** attempt)
+                        logger.debug("Retry %d/%d for %s (status=%d), waiting %.1fs",
+                                     attempt + 1, retries, url, response.status_code, wait)
+                        await asyncio.sleep(wait)
+                        continue
+                
+                return response
+                
+            except RETRYABLE_ERRORS as e:
+                last_response = None
+                if attempt < retries:
+                    wait = 0.5 * (2 ** attempt)
+                    logger.debug("Retry %d/%d for %s (%s), waiting %.1fs",
+                                 attempt + 1, retries, url, type(e).__name__, wait)
+                    await asyncio.sleep(wait)
+                    continue
+                raise
+        
+        return last_response
+    
     def _make_headers(self, field_mask: str) -> dict:
         """Tworzy nagłówki dla Places API (New)."""
         return {
@@ -269,6 +323,54 @@ class GooglePlacesClient:
             slog.error(stage="geo", provider="google", op="get_pois_around", message="API key not configured", error_class="config")
             return self._empty_result()
         
+        searches: Dict[str, Any] = {}
+        for our_category, google_types in self.SEARCH_TYPES.items():
+            try:
+                searches[our_category] = self._search_nearby(lat, lon, radius_m, google_types, trace_ctx=ctx)
+            except Exception as e:
+                searches[our_category] = e
+        
+        return self._collect_pois(searches, lat, lon, radius_m, slog)
+    
+    async def get_pois_around_async(
+        self,
+        lat: float,
+        lon: float,
+        radius_m: int = 500,
+        trace_ctx: 'AnalysisTraceContext | None' = None,
+    ) -> Tuple[Dict[str, List[POI]], Dict[str, Any]]:
+        """Asynchroniczny odpowiednik get_pois_around — kategorie równolegle (limit google_max_concurrency)."""
+        import asyncio
+        from ..app_config import get_config
+        from ..diagnostics import get_diag_logger, AnalysisTraceContext
+        ctx = trace_ctx or AnalysisTraceContext()
+        slog = get_diag_logger(__name__, ctx)
+
+        if not self.api_key:
+            slog.error(stage="geo", provider="google", op="get_pois_around", message="API key not configured", error_class="config")
+            return self._empty_result()
+        
+        slots = asyncio.Semaphore(max(1, get_config().google_max_concurrency))
+        
+        async def search(google_types: List[str]) -> List[dict]:
+            async with slots:
+                return await self._search_nearby_async(lat, lon, radius_m, google_types, trace_ctx=ctx)
+        
+        results = await asyncio.gather(
+            *(search(google_types) for google_types in self.SEARCH_TYPES.values()),
+            return_exceptions=True,
+        )
+        return self._collect_pois(dict(zip(self.SEARCH_TYPES, results)), lat, lon, radius_m, slog)
+    
+    def _collect_pois(
+        self,
+        searches: Dict[str, Any],
+        lat: float,
+        lon: float,
+        radius_m: int,
+        slog,
+    ) -> Tuple[Dict[str, List[POI]], Dict[str, Any]]:
+        """POI i metryki z wyników Nearby Search per kategoria (lista miejsc lub wyjątek)."""
         pois_by_category: Dict[str, List[POI]] = {
             'shops': [], 'transport': [], 'education': [], 'health': [],
             'nature_place': [], 'nature_background': [], 'leisure': [],
@@ -277,10 +379,10 @@ class GooglePlacesClient:
         
         nature_metrics = NatureMetrics()
         
-        # Wykonaj wyszukiwanie per KATEGORIA (batch types!)
-        for our_category, google_types in self.SEARCH_TYPES.items():
+        for our_category, results in searches.items():
             try:
-                results = self._search_nearby(lat, lon, radius_m, google_types, trace_ctx=ctx)
+                if isinstance(results, Exception):
+                    raise results
                 
                 for place in results:
                     poi = self._create_poi_from_place(place, our_category, lat, lon)
@@ -292,7 +394,7 @@ class GooglePlacesClient:
                             nature_metrics.add_park(poi.distance_m)
                             
             except Exception as e:
-                slog.warning(stage="geo", provider="google", op="search_nearby", message=str(e), error_class="runtime", meta={"google_types": google_types})
+                slog.warning(stage="geo", provider="google", op="search_nearby", message=str(e), error_class="runtime", meta={"google_types": self.SEARCH_TYPES.get(our_category)})
         
         # Deduplikacja i limitowanie
         for cat in pois_by_category:
@@ -345,7 +447,39 @@ class GooglePlacesClient:
         ctx = trace_ctx or AnalysisTraceContext()
         slog = get_diag_logger(__name__, ctx)
 
-        body = {
+        token = slog.req_start(provider="google", op="search_nearby", stage="geo", meta={"types": place_types})
+        response = self._request_with_retry(
+            'POST', self.NEARBY_SEARCH_URL,
+            json=self._nearby_body(lat, lon, radius_m, place_types),
+            headers=self._make_headers(self.NEARBY_FIELD_MASK),
+            trace_ctx=ctx,
+        )
+        return self._nearby_results(response, token, slog)
+    
+    async def _search_nearby_async(
+        self,
+        lat: float,
+        lon: float,
+        radius_m: int,
+        place_types: List[str],
+        trace_ctx: 'AnalysisTraceContext | None' = None,
+    ) -> List[dict]:
+        """Asynchroniczny odpowiednik _search_nearby."""
+        from ..diagnostics import get_diag_logger, AnalysisTraceContext
+        ctx = trace_ctx or AnalysisTraceContext()
+        slog = get_diag_logger(__name__, ctx)
+
+        token = slog.req_start(provider="google", op="search_nearby", stage="geo", meta={"types": place_types})
+        response = await self._request_with_retry_async(
+            'POST', self.NEARBY_SEARCH_URL,
+            json=self._nearby_body(lat, lon, radius_m, place_types),
+            headers=self._make_headers(self.NEARBY_FIELD_MASK),
+        )
+        return self._nearby_results(response, token, slog)
+    
+    @staticmethod
+    def _nearby_body(lat: float, lon: float, radius_m: int, place_types: List[str]) -> dict:
+        return {
             'includedTypes': place_types,
             'maxResultCount': 20,
             'locationRestriction': {
@@ -359,16 +493,10 @@ class GooglePlacesClient:
             },
             'languageCode': 'pl',
         }
-        
-        headers = self._make_headers(self.NEARBY_FIELD_MASK)
-        
-        token = slog.req_start(provider="google", op="search_nearby", stage="geo", meta={"types": place_types})
-        
-        response = self._request_with_retry(
-            'POST', self.NEARBY_SEARCH_URL,
-            json=body, headers=headers,
-        )
-        
+    
+    @staticmethod
+    def _nearby_results(response, token: str, slog) -> List[dict]:
+        """Wyciąga listę miejsc z odpowiedzi Nearby Search (requests lub httpx)."""
         if response is None:
             slog.req_end(provider="google", op="search_nearby", stage="geo", status="error", request_token=token, http_status=0, message="All retries failed")
             return []
@@ -504,6 +632,24 @@ class GooglePlacesClient:
             logger.warning("find_place_details error for '%s': %s", name, e)
             return None
     
+    async def find_place_details_async(
+        self,
+        name: str,
+        lat: float,
+        lon: float,
+        search_radius: int = 100,
+        trace_ctx: 'AnalysisTraceContext | None' = None,
+    ) -> Optional[dict]:
+        """Asynchroniczny odpowiednik find_place_details."""
+        if not self.api_key:
+            return None
+        
+        try:
+            return await self._text_search_place_async(name, lat, lon, search_radius, trace_ctx=trace_ctx)
+        except Exception as e:
+            logger.warning("find_place_details error for '%s': %s", name, e)
+            return None
+    
     def _text_search_place(
         self, 
         keyword: str, 
@@ -522,9 +668,39 @@ class GooglePlacesClient:
         ctx = trace_ctx or AnalysisTraceContext()
         slog = get_diag_logger(__name__, ctx)
 
-        text_search_url = "https://places.googleapis.com/v1/places:searchText"
-        
-        body = {
+        token = slog.req_start(provider="google", op="find_nearby_keyword", stage="geo", meta={"keyword": keyword})
+        response = self._request_with_retry(
+            'POST', self.TEXT_SEARCH_URL,
+            json=self._text_search_body(keyword, lat, lon, radius),
+            headers=self._make_headers(self.TEXT_SEARCH_FIELD_MASK),
+            trace_ctx=ctx,
+        )
+        return self._text_search_result(response, token, slog)
+    
+    async def _text_search_place_async(
+        self,
+        keyword: str,
+        lat: float,
+        lon: float,
+        radius: int = 100,
+        trace_ctx: 'AnalysisTraceContext | None' = None,
+    ) -> Optional[dict]:
+        """Asynchroniczny odpowiednik _text_search_place."""
+        from ..diagnostics import get_diag_logger, AnalysisTraceContext
+        ctx = trace_ctx or AnalysisTraceContext()
+        slog = get_diag_logger(__name__, ctx)
+
+        token = slog.req_start(provider="google", op="find_nearby_keyword", stage="geo", meta={"keyword": keyword})
+        response = await self._request_with_retry_async(
+            'POST', self.TEXT_SEARCH_URL,
+            json=self._text_search_body(keyword, lat, lon, radius),
+            headers=self._make_headers(self.TEXT_SEARCH_FIELD_MASK),
+        )
+        return self._text_search_result(response, token, slog)
+    
+    @staticmethod
+    def _text_search_body(keyword: str, lat: float, lon: float, radius: int) -> dict:
+        return {
             'textQuery': keyword,
             'locationBias': {
                 'circle': {
@@ -538,20 +714,12 @@ class GooglePlacesClient:
             'maxResultCount': 1,
             'languageCode': 'pl',
         }
-        
-        # Pobieramy rating/reviews razem z lokalizacją — 1 request zamiast 2!
-        field_mask = 'places.id,places.displayName,places.location,places.types,places.rating,places.userRatingCount'
-        headers = self._make_headers(field_mask)
-        
-        token = slog.req_start(provider="google", op="find_nearby_keyword", stage="geo", meta={"keyword": keyword})
-        
-        response = self._request_with_retry(
-            'POST', text_search_url,
-            json=body, headers=headers,
-        )
-        
+    
+    @staticmethod
+    def _text_search_result(response, token: str, slog) -> Optional[dict]:
+        """Pierwsze miejsce z odpowiedzi Text Search (requests lub httpx) w formacie starego API."""
         if response is None or response.status_code != 200:
-            status_code = response.status_code if response else 0
+            status_code = response.status_code if response is not None else 0
             slog.req_end(provider="google", op="find_nearby_keyword", stage="geo", status="error", request_token=token, http_status=status_code)
             return None
         
@@ -601,23 +769,45 @@ class GooglePlacesClient:
         ctx = trace_ctx or AnalysisTraceContext()
         slog = get_diag_logger(__name__, ctx)
 
+        token = slog.req_start(provider="google", op="place_details", stage="geo", meta={"place_id": place_id})
         # Place Details (New): GET places/{place_id}
-        url = f"{self.PLACE_DETAILS_URL}{place_id}"
-        
-        headers = {
+        response = self._request_with_retry(
+            'GET', f"{self.PLACE_DETAILS_URL}{place_id}",
+            headers=self._details_headers(),
+            trace_ctx=ctx,
+        )
+        return self._details_result(response, token, slog)
+    
+    async def _get_place_details_async(
+        self,
+        place_id: str,
+        fields: List[str] = None,
+        trace_ctx: 'AnalysisTraceContext | None' = None,
+    ) -> Optional[dict]:
+        """Asynchroniczny odpowiednik _get_place_details."""
+        from ..diagnostics import get_diag_logger, AnalysisTraceContext
+        ctx = trace_ctx or AnalysisTraceContext()
+        slog = get_diag_logger(__name__, ctx)
+
+        token = slog.req_start(provider="google", op="place_details", stage="geo", meta={"place_id": place_id})
+        response = await self._request_with_retry_async(
+            'GET', f"{self.PLACE_DETAILS_URL}{place_id}",
+            headers=self._details_headers(),
+        )
+        return self._details_result(response, token, slog)
+    
+    def _details_headers(self) -> dict:
+        return {
             'X-Goog-Api-Key': self.api_key,
             'X-Goog-FieldMask': self.DETAILS_FIELD_MASK,
         }
-        
-        token = slog.req_start(provider="google", op="place_details", stage="geo", meta={"place_id": place_id})
-        
-        response = self._request_with_retry(
-            'GET', url, headers=headers,
-        )
-        
+    
+    @staticmethod
+    def _details_result(response, token: str, slog) -> Optional[dict]:
+        """Szczegóły miejsca z odpowiedzi Place Details (requests lub httpx) w formacie starego API."""
         if response is None or response.status_code != 200:
-            status_code = response.status_code if response else 0
-            message = response.text[:200] if response else "All retries failed"
+            status_code = response.status_code if response is not None else 0
+            message = response.text[:200] if response is not None else "All retries failed"
             slog.req_end(provider="google", op="place_details", stage="geo", status="error", request_token=token, http_status=status_code, message=message)
             return None
         
@@ -655,5 +845,5 @@ class GooglePlacesClient:
             {cat: [] for cat in ['shops', 'transport', 'education', 'health',
                                   'nature_place', 'nature_background', 'leisure',
                                   'food', 'finance', 'roads']},
-            {'nature': empty_metrics.to_dict()}
+            {'nature': empty_metrics.to_dict(), FETCH_FAILED: True}
         )
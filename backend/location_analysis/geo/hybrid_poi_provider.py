@@ -15,6 +15,8 @@ from dataclasses import dataclass
 from .overpass_client import OverpassClient, POI, MAX_POIS_PER_CATEGORY
 from .google_places_client import GooglePlacesClient, google_types_to_badges, google_types_to_secondary
 from .nature_metrics import NatureMetrics
+from .request_budget import RequestBudget, run_bounded
+from ..single_flight import google_details_flight, google_nearby_flight
 
 logger = logging.getLogger(__name__)
 
@@ -94,6 +96,16 @@ GENERIC_NEARBY_THRESHOLD_M = 120  # POI jest bardzo blisko
 GENERIC_FEW_ALTERNATIVES = 3      # Mało alternatyw w kategorii
 
 
+@dataclass
+class _EnrichmentCandidate:
+    """POI wybrany do enrichment: detale z cache albo klucz zapytania do API."""
+    poi: POI
+    config: EnrichmentConfig
+    existing_place_id: Optional[str]
+    details: Optional[dict]
+    fetch_key: Optional[tuple]
+
+
 class HybridPOIProvider:
     """
     Provider POI łączący Overpass i Google Places.
@@ -135,7 +147,7 @@ class HybridPOIProvider:
         Returns:
             tuple: (pois_by_category, metrics)
         """
-        from .poi_filter import filter_by_radius, filter_by_membership
+        from .poi_filter import filter_by_radius
         from ..diagnostics import get_diag_logger, AnalysisTraceContext
         ctx = trace_ctx or AnalysisTraceContext()
         slog = get_diag_logger(__name__, ctx)
@@ -145,16 +157,8 @@ class HybridPOIProvider:
         
         # === WARSTWA 1: Overpass jako base ===
         slog.info(stage="geo", provider="overpass", op="layer1_base", message="Overpass base fetch", meta={"radius": radius_m})
-        pois, metrics = self.overpass.get_pois_around(lat, lon, radius_m, trace_ctx=ctx)
-        
-        # Filtruj POI per-kategoria PRZED liczeniem coverage
-        if effective_radius:
-            pois = filter_by_radius(pois, effective_radius, default_radius=radius_m)
-        
-        # Policz coverage per kategoria (po filtrze!) + checkpoint
-        coverage = {cat: len(items) for cat, items in pois.items()}
-        for cat, items in pois.items():
-            slog.checkpoint(stage="geo", category=cat, count_raw=coverage.get(cat, 0), count_kept=len(items), provider="overpass")
+        pois, metrics = self.overpass.get_pois_around(lat, lon, radius_m, trace_ctx=ctx, radius_by_category=effective_radius)
+        pois, coverage = self._base_coverage(pois, effective_radius, radius_m, slog)
         
         # === WARSTWA 3: Fallback dla brakujących kategorii ===
         # (Robimy przed enrichment żeby mieć pełną listę do wzbogacenia)
@@ -173,6 +177,82 @@ class HybridPOIProvider:
             enriched_count = self._enrich_top_k(pois, lat, lon, trace_ctx=ctx)
             slog.info(stage="geo", provider="google", op="enrichment_done", meta={"enriched_count": enriched_count})
 
+        return self._finalize(pois, coverage, effective_radius, radius_m, slog), metrics
+    
+    async def get_pois_hybrid_async(
+        self,
+        lat: float,
+        lon: float,
+        radius_m: int = 500,
+        radius_by_category: Optional[Dict[str, int]] = None,
+        enable_enrichment: bool = False,
+        enable_fallback: bool = True,
+        trace_ctx: 'AnalysisTraceContext | None' = None,
+    ) -> Tuple[Dict[str, List[POI]], Dict[str, Any]]:
+        """
+        Asynchroniczny odpowiednik get_pois_hybrid (ścieżka ASGI).
+        
+        Overpass, wyszukiwania fallback i enrichment idą przez httpx na pętli
+        zdarzeń; zapytania fallback dla brakujących kategorii i zapytania
+        enrichment lecą równolegle (limit google_max_concurrency).
+        """
+        from .poi_filter import filter_by_radius
+        from ..diagnostics import get_diag_logger, AnalysisTraceContext
+        ctx = trace_ctx or AnalysisTraceContext()
+        slog = get_diag_logger(__name__, ctx)
+        
+        effective_radius = radius_by_category or {}
+        
+        slog.info(stage="geo", provider="overpass", op="layer1_base", message="Overpass base fetch", meta={"radius": radius_m})
+        pois, metrics = await self.overpass.get_pois_around_async(lat, lon, radius_m, trace_ctx=ctx, radius_by_category=effective_radius)
+        pois, coverage = self._base_coverage(pois, effective_radius, radius_m, slog)
+        
+        if enable_fallback:
+            missing_categories = self._find_missing_categories(coverage)
+            if missing_categories:
+                slog.degraded(kind="FALLBACK_USED", provider="google", reason=f"Missing categories: {missing_categories}", stage="geo", impact="supplementing with Google data")
+                await self._apply_fallback_async(pois, lat, lon, effective_radius, radius_m, missing_categories, trace_ctx=ctx)
+                if effective_radius:
+                    pois = filter_by_radius(pois, effective_radius, default_radius=radius_m)
+        
+        if enable_enrichment and self.google.api_key:
+            slog.info(stage="geo", provider="google", op="layer2_enrichment", message="Enriching top-k POIs")
+            enriched_count = await self._enrich_top_k_async(pois, lat, lon, trace_ctx=ctx)
+            slog.info(stage="geo", provider="google", op="enrichment_done", meta={"enriched_count": enriched_count})
+        
+        return self._finalize(pois, coverage, effective_radius, radius_m, slog), metrics
+    
+    def _base_coverage(
+        self,
+        pois: Dict[str, List[POI]],
+        effective_radius: Dict[str, int],
+        radius_m: int,
+        slog,
+    ) -> Tuple[Dict[str, List[POI]], Dict[str, int]]:
+        """Filtruje bazę Overpass per-kategoria i liczy coverage."""
+        from .poi_filter import filter_by_radius
+        
+        # Filtruj POI per-kategoria PRZED liczeniem coverage
+        if effective_radius:
+            pois = filter_by_radius(pois, effective_radius, default_radius=radius_m)
+        
+        # Policz coverage per kategoria (po filtrze!) + checkpoint
+        coverage = {cat: len(items) for cat, items in pois.items()}
+        for cat, items in pois.items():
+            slog.checkpoint(stage="geo", category=cat, count_raw=coverage.get(cat, 0), count_kept=len(items), provider="overpass")
+        return pois, coverage
+    
+    def _finalize(
+        self,
+        pois: Dict[str, List[POI]],
+        coverage: Dict[str, int],
+        effective_radius: Dict[str, int],
+        radius_m: int,
+        slog,
+    ) -> Dict[str, List[POI]]:
+        """Dedup, merge i końcowe filtry po wszystkich warstwach."""
+        from .poi_filter import filter_by_radius, filter_by_membership
+        
         # Final dedup po enrichment/fallback
         self._dedupe_pois(pois)
 
@@ -191,7 +271,7 @@ class HybridPOIProvider:
         for cat, items in pois.items():
             slog.checkpoint(stage="geo", category=cat, count_raw=coverage.get(cat, 0), count_kept=len(items), provider="hybrid", op="final_counts")
         
-        return pois, metrics
+        return pois
     
     def _find_missing_categories(self, coverage: Dict[str, int]) -> List[str]:
         """Znajduje kategorie z niewystarczającym coverage."""
@@ -225,48 +305,152 @@ class HybridPOIProvider:
             slog.degraded(kind="DEGRADED_PROVIDER", provider="google", reason="API key not configured, skipping fallback", stage="geo")
             return
         
-        from ..cache import google_nearby_cache, TTLCache, normalize_coords
-
+        # Cache sprawdzany sekwencyjnie, brakujące wyszukiwania równolegle (RequestBudget)
+        planned = []
         for category in categories:
             types = FALLBACK_TYPES.get(category, [])
             if not types:
                 continue
 
-            # Upewnij się że kategoria istnieje w słowniku
-            if category not in pois:
-                pois[category] = []
-
             # USE CATEGORY-SPECIFIC RADIUS!
             cat_radius = radius_by_category.get(category, default_radius)
             slog.debug(stage="geo", provider="google", op="fallback_search", meta={"category": category, "types": types, "radius": cat_radius})
+            # Batch: 1 request per kategoria z wieloma typami
+            cache_key, cached = self._cached_nearby(lat, lon, cat_radius, types, ctx)
+            planned.append((category, types, cat_radius, cache_key, cached))
+
+        misses = [p for p in planned if p[4] is None]
+        fetched = run_bounded(
+            self._search_nearby_coalesced,
+            [(cache_key, lat, lon, cat_radius, types, ctx) for _, types, cat_radius, cache_key, _ in misses],
+            RequestBudget.from_config(),
+        )
+        results_by_category = {}
+        for (category, types, _, _, _), result in zip(misses, fetched):
+            if isinstance(result, Exception):
+                slog.warning(stage="geo", provider="google", op="fallback_error", message=str(result), error_class="runtime", meta={"category": category, "types": types})
+                result = []
+            results_by_category[category] = result
+
+        # Scalanie w kolejności kategorii — wynik jak w wersji sekwencyjnej
+        for category, types, cat_radius, _, cached in planned:
+            places = cached if cached is not None else results_by_category[category]
+            try:
+                self._merge_fallback(pois, category, places, lat, lon, cat_radius)
+            except Exception as e:
+                slog.warning(stage="geo", provider="google", op="fallback_error", message=str(e), error_class="runtime", meta={"category": category, "types": types})
+                self._merge_fallback(pois, category, [], lat, lon, cat_radius)
+    
+    async def _apply_fallback_async(
+        self,
+        pois: Dict[str, List[POI]],
+        lat: float,
+        lon: float,
+        radius_by_category: Dict[str, int],
+        default_radius: int,
+        categories: List[str],
+        trace_ctx: 'AnalysisTraceContext | None' = None,
+    ) -> None:
+        """Asynchroniczny _apply_fallback — wyszukiwania kategorii równolegle."""
+        import asyncio
+        from ..diagnostics import get_diag_logger, AnalysisTraceContext
+        ctx = trace_ctx or AnalysisTraceContext()
+        slog = get_diag_logger(__name__, ctx)
+
+        if not self.google.api_key:
+            slog.degraded(kind="DEGRADED_PROVIDER", provider="google", reason="API key not configured, skipping fallback", stage="geo")
+            return
+
+        from ..app_config import get_config
+        slots = asyncio.Semaphore(max(1, get_config().google_max_concurrency))
 
+        async def search(category: str, types: List[str], cat_radius: int) -> List[dict]:
+            slog.debug(stage="geo", provider="google", op="fallback_search", meta={"category": category, "types": types, "radius": cat_radius})
             try:
-                # Batch: 1 request per kategoria z wieloma typami
-                norm_lat, norm_lon = normalize_coords(lat, lon, precision=4)
-                types_key = ','.join(sorted(types))
-                cache_key = TTLCache.make_key('google_nearby', norm_lat, norm_lon, cat_radius, types_key)
-                cached = google_nearby_cache.get(cache_key)
-                if cached is not None:
-                    results = cached
-                else:
-                    results = self.google._search_nearby(lat, lon, cat_radius, types, trace_ctx=ctx)
-                    google_nearby_cache.set(cache_key, results)
-
-                for place in results[:10]:  # Max 10 per category batch
-                    poi = self.google._create_poi_from_place(place, category, lat, lon)
-                    if poi and not self._is_duplicate(poi, pois[category]):
-                        # Skip if outside category radius
-                        if poi.distance_m > cat_radius:
-                            continue
-                        poi.tags['source'] = 'google_fallback'
-                        poi.source = 'google_fallback'
-                        pois[category].append(poi)
-                        
+                cache_key, results = self._cached_nearby(lat, lon, cat_radius, types, ctx)
+                if results is None:
+                    async def fetch():
+                        async with slots:
+                            places = await self.google._search_nearby_async(lat, lon, cat_radius, types, trace_ctx=ctx)
+                        self._store_nearby(cache_key, places)
+                        return places
+
+                    results, shared = await google_nearby_flight.do_async(cache_key, fetch)
+                    ctx.summary.record_flight('google_nearby', shared=shared, process_totals=google_nearby_flight.stats())
+                return results
             except Exception as e:
                 slog.warning(stage="geo", provider="google", op="fallback_error", message=str(e), error_class="runtime", meta={"category": category, "types": types})
-            
-            # Sortuj po dystansie
-            pois[category].sort(key=lambda p: p.distance_m)
+                return []
+
+        planned = [
+            (category, radius_by_category.get(category, default_radius))
+            for category in categories
+            if FALLBACK_TYPES.get(category)
+        ]
+        results = await asyncio.gather(*(
+            search(category, FALLBACK_TYPES[category], cat_radius)
+            for category, cat_radius in planned
+        ))
+        # Scalanie w kolejności kategorii — wynik jak w wersji sekwencyjnej
+        for (category, cat_radius), places in zip(planned, results):
+            self._merge_fallback(pois, category, places, lat, lon, cat_radius)
+    
+    def _search_nearby_coalesced(self, cache_key, lat, lon, cat_radius, types, ctx) -> List[dict]:
+        """Nearby Search przez single-flight: równoczesne analizy dzielą jedno zapytanie."""
+        def fetch():
+            places = self.google._search_nearby(lat, lon, cat_radius, types, trace_ctx=ctx)
+            self._store_nearby(cache_key, places)
+            return places
+
+        results, shared = google_nearby_flight.do(cache_key, fetch)
+        ctx.summary.record_flight('google_nearby', shared=shared, process_totals=google_nearby_flight.stats())
+        return results
+    
+    @staticmethod
+    def _cached_nearby(lat, lon, cat_radius, types, ctx) -> Tuple[str, Optional[List[dict]]]:
+        """Zwraca (klucz cache, wyniki z google_nearby_cache lub None)."""
+        from ..cache import google_nearby_cache, TTLCache, normalize_coords
+        norm_lat, norm_lon = normalize_coords(lat, lon, precision=4)
+        types_key = ','.join(sorted(types))
+        cache_key = TTLCache.make_key('google_nearby', norm_lat, norm_lon, cat_radius, types_key)
+        cached = google_nearby_cache.get(cache_key)
+        ctx.summary.record_cache(
+            'google_nearby', hit=cached is not None,
+            process_totals=google_nearby_cache.counters(),
+        )
+        return cache_key, cached
+    
+    @staticmethod
+    def _store_nearby(cache_key: str, results: List[dict]) -> None:
+        from ..cache import google_nearby_cache
+        google_nearby_cache.set(cache_key, results)
+    
+    def _merge_fallback(
+        self,
+        pois: Dict[str, List[POI]],
+        category: str,
+        results: List[dict],
+        lat: float,
+        lon: float,
+        cat_radius: int,
+    ) -> None:
+        """Dokłada wyniki Nearby Search do kategorii (bez duplikatów, w promieniu)."""
+        # Upewnij się że kategoria istnieje w słowniku
+        if category not in pois:
+            pois[category] = []
+
+        for place in results[:10]:  # Max 10 per category batch
+            poi = self.google._create_poi_from_place(place, category, lat, lon)
+            if poi and not self._is_duplicate(poi, pois[category]):
+                # Skip if outside category radius
+                if poi.distance_m > cat_radius:
+                    continue
+                poi.tags['source'] = 'google_fallback'
+                poi.source = 'google_fallback'
+                pois[category].append(poi)
+        
+        # Sortuj po dystansie
+        pois[category].sort(key=lambda p: p.distance_m)
     
     def _enrich_top_k(
         self,
@@ -280,17 +464,82 @@ class HybridPOIProvider:
         Używa Find Place + Place Details z cache 7 dni.
         Deduplikuje po place_id.
         
+        Trzy fazy: wybór kandydatów + cache (sekwencyjnie), zapytania do API
+        (równolegle w ramach RequestBudget), przypisanie wyników w kolejności
+        kandydatów — cache, negative cache i seen_place_ids działają tak samo
+        jak przy przetwarzaniu POI po kolei.
+        
         Returns:
             int: Liczba wzbogaconych POI
         """
-        from ..cache import google_details_cache, TTLCache
         from ..diagnostics import get_diag_logger, AnalysisTraceContext
         ctx = trace_ctx or AnalysisTraceContext()
         slog = get_diag_logger(__name__, ctx)
         
+        candidates = self._enrichment_candidates(pois, ctx, slog)
+        
+        # Jedno zapytanie na unikalny klucz (ten sam place_id / ta sama nazwa+miejsce)
+        fetch_keys = list(dict.fromkeys(c.fetch_key for c in candidates if c.fetch_key))
+        fetched = dict(zip(fetch_keys, run_bounded(
+            lambda key: self._fetch_enrichment(key, ctx),
+            [(key,) for key in fetch_keys],
+            RequestBudget.from_config(),
+        )))
+        return self._apply_enrichments(candidates, fetched, slog)
+    
+    async def _enrich_top_k_async(
+        self,
+        pois: Dict[str, List[POI]],
+        lat: float,
+        lon: float,
+        trace_ctx: 'AnalysisTraceContext | None' = None,
+    ) -> int:
+        """
+        Asynchroniczny _enrich_top_k — te same trzy fazy, zapytania przez
+        httpx równolegle (limit google_max_concurrency), bez wątków.
+        """
+        import asyncio
+        from ..app_config import get_config
+        from ..diagnostics import get_diag_logger, AnalysisTraceContext
+        ctx = trace_ctx or AnalysisTraceContext()
+        slog = get_diag_logger(__name__, ctx)
+        
+        candidates = self._enrichment_candidates(pois, ctx, slog)
+        slots = asyncio.Semaphore(max(1, get_config().google_max_concurrency))
+        
+        async def fetch(fetch_key: tuple):
+            async def request():
+                async with slots:
+                    return await self._request_enrichment_async(fetch_key, ctx)
+            try:
+                details, shared = await google_details_flight.do_async(fetch_key, request)
+            except Exception as e:
+                return e  # jak run_bounded: wyjątek na pozycji wyniku
+            ctx.summary.record_flight('google_details', shared=shared, process_totals=google_details_flight.stats())
+            return details
+        
+        fetch_keys = list(dict.fromkeys(c.fetch_key for c in candidates if c.fetch_key))
+        fetched = dict(zip(fetch_keys, await asyncio.gather(*(fetch(key) for key in fetch_keys))))
+        return self._apply_enrichments(candidates, fetched, slog)
+    
+    def _apply_enrichments(self, candidates: List['_EnrichmentCandidate'], fetched: Dict[tuple, Any], slog) -> int:
+        """Przypisuje wyniki w kolejności kandydatów. Zwraca liczbę wzbogaconych POI."""
         enriched_count = 0
         seen_place_ids = set()  # Deduplikacja w ramach jednej analizy
+        for candidate in candidates:
+            try:
+                if self._apply_enrichment(candidate, fetched, seen_place_ids, slog):
+                    enriched_count += 1
+            except Exception as e:
+                slog.warning(stage="geo", provider="google", op="enrichment_error", message=str(e), error_class="runtime", meta={"name": candidate.poi.name})
         
+        return enriched_count
+    
+    def _enrichment_candidates(self, pois: Dict[str, List[POI]], ctx, slog) -> List['_EnrichmentCandidate']:
+        """Top-k POI do wzbogacenia, z detalami z cache lub kluczem zapytania."""
+        from ..cache import google_details_cache
+        
+        candidates = []
         for category, items in pois.items():
             config = self.config.get(category)
             if not config or not config.enrich or config.top_k <= 0:
@@ -306,8 +555,7 @@ class HybridPOIProvider:
                     continue
                 
                 # Check negative cache — skip POIs already known to be missing in Google
-                neg_key = f"notfound:{poi.name}:{round(poi.lat,3)}:{round(poi.lon,3)}"
-                if google_details_cache.get(neg_key):
+                if google_details_cache.get(self._notfound_key(poi)):
                     slog.debug(stage="geo", provider="google", op="enrich_skip_notfound", meta={"name": poi.name})
                     continue
                 
@@ -327,133 +575,192 @@ class HybridPOIProvider:
                     else:
                         slog.debug(stage="geo", provider="google", op="enrich_try_generic", meta={"name": poi.name})
                 
-                # Używamy per-category search radius
-                search_radius = config.search_radius_m
+                # Sprawdź cache najpierw (jeśli mamy place_id)
+                existing_place_id = poi.place_id or poi.tags.get('place_id')
+                details = None
+                if existing_place_id:
+                    details = google_details_cache.get(f"details:{existing_place_id}")
+                    ctx.summary.record_cache(
+                        'google_details', hit=details is not None,
+                        process_totals=google_details_cache.counters(),
+                    )
+                    if details:
+                        slog.debug(stage="geo", provider="google", op="enrich_cache_hit", meta={"name": poi.name})
                 
-                try:
-                    # Sprawdź cache najpierw (jeśli mamy place_id)
-                    existing_place_id = poi.place_id or poi.tags.get('place_id')
-                    cache_key = f"details:{existing_place_id}" if existing_place_id else None
-                    details = None
-                    
-                    # Sprawdź czy ten place_id już był wzbogacony w tej sesji
-                    if existing_place_id and existing_place_id in seen_place_ids:
-                        slog.debug(stage="geo", provider="google", op="enrich_skip_dup", meta={"place_id": existing_place_id})
-                        continue
-                    
-                    # Sprawdź cache
-                    if cache_key:
-                        details = google_details_cache.get(cache_key)
-                        if details:
-                            slog.debug(stage="geo", provider="google", op="enrich_cache_hit", meta={"name": poi.name})
-                    
-                    # Jeśli nie w cache, pobierz z API
-                    if details is None:
+                fetch_key = None
+                if details is None:
+                    if existing_place_id:
                         # OPTYMALIZACJA: jeśli mamy place_id, użyj _get_place_details (1 req)
-                        if existing_place_id:
-                            slog.debug(stage="geo", provider="google", op="enrich_direct", meta={"name": poi.name})
-                            details = self.google._get_place_details(
-                                existing_place_id, 
-                                ['rating', 'user_ratings_total', 'geometry', 'place_id', 'types']
-                            )
-                            if details:
-                                details['place_id'] = existing_place_id  # Upewnij się że place_id jest w response
-                        else:
-                            # Brak place_id — Text Search zwraca rating/reviews w 1 req
-                            details = self.google.find_place_details(
-                                name=poi.name,
-                                lat=poi.lat,
-                                lon=poi.lon,
-                                search_radius=search_radius,
-                                trace_ctx=ctx,
-                            )
-                        
-                        # Ustal finalne place_id
-                        final_place_id = None
-                        if details:
-                            final_place_id = details.get('place_id') or existing_place_id
-                        
-                        # Zapisz w cache (pozytywny lub negatywny)
-                        if final_place_id:
-                            cache_key = f"details:{final_place_id}"
-                            google_details_cache.set(cache_key, details or {'_not_found': True})
-                            poi.tags['place_id'] = final_place_id
-                            poi.place_id = final_place_id
-                        elif not details:
-                            # Negative cache: POI nie znaleziony w Google (24h)
-                            neg_key = f"notfound:{poi.name}:{round(poi.lat,3)}:{round(poi.lon,3)}"
-                            google_details_cache.set(neg_key, {'_not_found': True}, ttl=86400)
-                    
-                    # Sprawdź czy to negative cache hit
-                    if details and details.get('_not_found'):
-                        continue
-                    
-                    if details:
-                        # Walidacja odległości: sprawdź czy Google zwrócił POI w pobliżu
-                        google_geom = details.get('geometry', {}).get('location', {})
-                        google_lat = google_geom.get('lat')
-                        google_lon = google_geom.get('lng')
-                        
-                        if google_lat and google_lon:
-                            distance_to_google = self.google._haversine_distance(
-                                poi.lat, poi.lon, google_lat, google_lon
-                            )
-                            # Używamy per-category max distance
-                            if distance_to_google > config.max_distance_m:
-                                slog.debug(stage="geo", provider="google", op="enrich_reject_distance", meta={"name": poi.name, "distance": round(distance_to_google), "max": config.max_distance_m})
-                                continue
-                        
-                        final_place_id = poi.tags.get('place_id') or details.get('place_id')
-                        if final_place_id and final_place_id in seen_place_ids:
-                            slog.debug(stage="geo", provider="google", op="enrich_skip_dup_post", meta={"place_id": final_place_id})
-                            continue
-
-                        rating = details.get('rating')
-                        reviews = details.get('user_ratings_total') or 0
-                        types = details.get('types') or poi.tags.get('types') or []
-                        
-                        # Dopisz do tags
-                        poi.tags['rating'] = rating
-                        poi.tags['reviews_count'] = reviews
-                        poi.tags['user_ratings_total'] = reviews
-                        poi.tags['enriched'] = True
-                        if types:
-                            poi.tags['types'] = types
-                        
-                        # Ustal finalne place_id i dodaj do seen (ZAWSZE po enrichment)
-                        final_place_id = poi.tags.get('place_id') or details.get('place_id')
-                        if final_place_id:
-                            poi.tags['place_id'] = final_place_id
-                            poi.place_id = final_place_id
-                            seen_place_ids.add(final_place_id)
-
-                        # Badges + secondary kategorie z Google types
-                        if types:
-                            poi.badges = list(set(poi.badges) | set(google_types_to_badges(types)))
-                            secondary = google_types_to_secondary(types)
-                            if poi.primary_category:
-                                secondary = [c for c in secondary if c != poi.primary_category]
-                            if secondary:
-                                # Max 1 secondary (primary + secondary)
-                                poi.secondary_categories = list(set(poi.secondary_categories) | set(secondary[:1]))
-
-                        # Oznacz jako "mało opinii" jeśli poniżej progu
-                        if reviews < config.min_reviews_to_show:
-                            poi.tags['low_reviews'] = True
-                        
-                        enriched_count += 1
-                        poi.tags['source'] = 'google_enriched'
-                        poi.source = 'google_enriched'
-
-                        logger.debug(
-                            "Enriched: %s dist=%dm place_id=%s rating=%s reviews=%s",
-                            poi.name, int(poi.distance_m), final_place_id, rating, reviews
-                        )
-                        
-                except Exception as e:
-                    slog.warning(stage="geo", provider="google", op="enrichment_error", message=str(e), error_class="runtime", meta={"name": poi.name})
+                        fetch_key = ('details', existing_place_id)
+                    else:
+                        # Brak place_id — Text Search zwraca rating/reviews w 1 req
+                        # (per-category search radius)
+                        fetch_key = ('find', poi.name, poi.lat, poi.lon, config.search_radius_m)
+                
+                candidates.append(_EnrichmentCandidate(
+                    poi=poi,
+                    config=config,
+                    existing_place_id=existing_place_id,
+                    details=details,
+                    fetch_key=fetch_key,
+                ))
+        return candidates
+    
+    def _fetch_enrichment(self, fetch_key: tuple, ctx) -> Optional[dict]:
+        """
+        Jedno zapytanie enrichment (wykonywane na puli wątków), przez
+        single-flight — ten sam POI wzbogacany równolegle w kilku analizach
+        kosztuje jedno zapytanie.
+        """
+        details, shared = google_details_flight.do(fetch_key, lambda: self._request_enrichment(fetch_key, ctx))
+        ctx.summary.record_flight('google_details', shared=shared, process_totals=google_details_flight.stats())
+        return details
+    
+    def _request_enrichment(self, fetch_key: tuple, ctx) -> Optional[dict]:
+        if fetch_key[0] == 'details':
+            place_id = fetch_key[1]
+            details = self.google._get_place_details(
+                place_id,
+                ['rating', 'user_ratings_total', 'geometry', 'place_id', 'types'],
+                trace_ctx=ctx,
+            )
+            if details:
+                details['place_id'] = place_id  # Upewnij się że place_id jest w response
+            return details
+        _, name, poi_lat, poi_lon, search_radius = fetch_key
+        return self.google.find_place_details(
+            name=name,
+            lat=poi_lat,
+            lon=poi_lon,
+            search_radius=search_radius,
+            trace_ctx=ctx,
+        )
+    
+    async def _request_enrichment_async(self, fetch_key: tuple, ctx) -> Optional[dict]:
+        """Asynchroniczny _request_enrichment."""
+        if fetch_key[0] == 'details':
+            place_id = fetch_key[1]
+            details = await self.google._get_place_details_async(place_id, trace_ctx=ctx)
+            if details:
+                details['place_id'] = place_id
+            return details
+        _, name, poi_lat, poi_lon, search_radius = fetch_key
+        return await self.google.find_place_details_async(
+            name=name,
+            lat=poi_lat,
+            lon=poi_lon,
+            search_radius=search_radius,
+            trace_ctx=ctx,
+        )
+    
+    def _apply_enrichment(
+        self,
+        candidate: '_EnrichmentCandidate',
+        fetched: Dict[tuple, Any],
+        seen_place_ids: set,
+        slog,
+    ) -> bool:
+        """Przypisuje detale Google do POI. Zwraca True gdy POI wzbogacono."""
+        from ..cache import google_details_cache
+        poi, config = candidate.poi, candidate.config
+        existing_place_id = candidate.existing_place_id
         
-        return enriched_count
+        # Sprawdź czy ten place_id już był wzbogacony w tej sesji
+        if existing_place_id and existing_place_id in seen_place_ids:
+            slog.debug(stage="geo", provider="google", op="enrich_skip_dup", meta={"place_id": existing_place_id})
+            return False
+        
+        details = candidate.details
+        if details is None:
+            if existing_place_id:
+                slog.debug(stage="geo", provider="google", op="enrich_direct", meta={"name": poi.name})
+            result = fetched.get(candidate.fetch_key)
+            if isinstance(result, Exception):
+                raise result
+            # Kopia: ten sam wynik może należeć do kilku kandydatów
+            details = dict(result) if result else result
+            
+            # Ustal finalne place_id
+            final_place_id = None
+            if details:
+                final_place_id = details.get('place_id') or existing_place_id
+            
+            # Zapisz w cache (pozytywny lub negatywny)
+            if final_place_id:
+                google_details_cache.set(f"details:{final_place_id}", details or {'_not_found': True})
+                poi.tags['place_id'] = final_place_id
+                poi.place_id = final_place_id
+            elif not details:
+                # Negative cache: POI nie znaleziony w Google (24h)
+                google_details_cache.set(self._notfound_key(poi), {'_not_found': True}, ttl=86400)
+        
+        # Sprawdź czy to negative cache hit
+        if not details or details.get('_not_found'):
+            return False
+        
+        # Walidacja odległości: sprawdź czy Google zwrócił POI w pobliżu
+        google_geom = details.get('geometry', {}).get('location', {})
+        google_lat = google_geom.get('lat')
+        google_lon = google_geom.get('lng')
+        
+        if google_lat and google_lon:
+            distance_to_google = self.google._haversine_distance(
+                poi.lat, poi.lon, google_lat, google_lon
+            )
+            # Używamy per-category max distance
+            if distance_to_google > config.max_distance_m:
+                slog.debug(stage="geo", provider="google", op="enrich_reject_distance", meta={"name": poi.name, "distance": round(distance_to_google), "max": config.max_distance_m})
+                return False
+        
+        final_place_id = poi.tags.get('place_id') or details.get('place_id')
+        if final_place_id and final_place_id in seen_place_ids:
+            slog.debug(stage="geo", provider="google", op="enrich_skip_dup_post", meta={"place_id": final_place_id})
+            return False
+
+        rating = details.get('rating')
+        reviews = details.get('user_ratings_total') or 0
+        types = details.get('types') or poi.tags.get('types') or []
+        
+        # Dopisz do tags
+        poi.tags['rating'] = rating
+        poi.tags['reviews_count'] = reviews
+        poi.tags['user_ratings_total'] = reviews
+        poi.tags['enriched'] = True
+        if types:
+            poi.tags['types'] = types
+        
+        # Ustal finalne place_id i dodaj do seen (ZAWSZE po enrichment)
+        if final_place_id:
+            poi.tags['place_id'] = final_place_id
+            poi.place_id = final_place_id
+            seen_place_ids.add(final_place_id)
+
+        # Badges + secondary kategorie z Google types
+        if types:
+            poi.badges = list(set(poi.badges) | set(google_types_to_badges(types)))
+            secondary = google_types_to_secondary(types)
+            if poi.primary_category:
+                secondary = [c for c in secondary if c != poi.primary_category]
+            if secondary:
+                # Max 1 secondary (primary + secondary)
+                poi.secondary_categories = list(set(poi.secondary_categories) | set(secondary[:1]))
+
+        # Oznacz jako "mało opinii" jeśli poniżej progu
+        if reviews < config.min_reviews_to_show:
+            poi.tags['low_reviews'] = True
+        
+        poi.tags['source'] = 'google_enriched'
+        poi.source = 'google_enriched'
+
+        logger.debug(
+            "Enriched: %s dist=%dm place_id=%s rating=%s reviews=%s",
+            poi.name, int(poi.distance_m), final_place_id, rating, reviews
+        )
+        return True
+    
+    @staticmethod
+    def _notfound_key(poi: POI) -> str:
+        return f"notfound:{poi.name}:{round(poi.lat,3)}:{round(poi.lon,3)}"
     
     def _is_duplicate(self, new_poi: POI, existing: List[POI]) -> bool:
         """
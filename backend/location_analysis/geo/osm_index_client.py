@@ -0,0 +1,332 @@
+"""
+Lokalny indeks przestrzenny OSM — alternatywa dla zapytań do Overpass API.
+
+Regionalny wyciąg OSM (np. Polska) jest jednorazowo konwertowany
+(`manage.py build_osm_index`) do pliku SQLite z indeksem R*Tree.
+Zapytanie o okolicę to odczyt bbox z R-tree + filtr po dystansie,
+a dalej ta sama klasyfikacja co dla odpowiedzi Overpass.
+
+Tryb wybierany przez AppConfig.overpass_mode = 'index'.
+"""
+import json
+import math
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .overpass_client import OverpassClient, POI, CLASSIFIER_TAG_KEYS, is_failed_fetch
+
+# Wersja formatu pliku indeksu (podbić przy zmianie schematu)
+INDEX_FORMAT_VERSION = 1
+
+# Metry na stopień szerokości geograficznej
+METERS_PER_DEG_LAT = 111320.0
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_index_executor() -> ThreadPoolExecutor:
+    """
+    Pula wątków dla odczytów indeksu na ścieżce ASGI (singleton per proces).
+    Osobna od domyślnego executora pętli — tam czekają inne etapy analizy.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                from ..app_config import get_config
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(1, get_config().pipeline_max_workers),
+                    thread_name_prefix="osm-index",
+                )
+    return _executor
+
+
+class OSMSpatialIndex:
+    """
+    Plik SQLite z elementami OSM (node/way-center) i indeksem R*Tree.
+
+    Przechowuje tylko elementy, które klasyfikator przypisuje do jakiejś
+    kategorii, oraz tylko tagi z CLASSIFIER_TAG_KEYS — plik jest kompaktowy.
+    Odczyt jest thread-safe (osobne połączenie read-only per wątek).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    @property
+    def available(self) -> bool:
+        """Czy plik indeksu istnieje."""
+        return bool(self.path) and os.path.isfile(self.path)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            self._local.conn = conn
+        return conn
+
+    def query_bbox(self, lat: float, lon: float, radius_m: int) -> List[dict]:
+        """
+        Zwraca elementy z bbox opisanego na okręgu (lat, lon, radius_m)
+        w formacie elementów Overpass JSON (type, id, lat, lon, tags).
+        """
+        dlat = radius_m / METERS_PER_DEG_LAT
+        dlon = radius_m / (METERS_PER_DEG_LAT * max(math.cos(math.radians(lat)), 0.01))
+
+        rows = self._connection().execute(
+            """
+            SELECT e.osm_type, e.osm_id, e.lat, e.lon, e.tags
+            FROM elements_rtree r JOIN elements e ON e.id = r.id
+            WHERE r.min_lat <= ? AND r.max_lat >= ?
+              AND r.min_lon <= ? AND r.max_lon >= ?
+            """,
+            (lat + dlat, lat - dlat, lon + dlon, lon - dlon),
+        ).fetchall()
+
+        elements = []
+        for osm_type, osm_id, elem_lat, elem_lon, tags_json in rows:
+            elements.append({
+                'type': osm_type,
+                'id': osm_id,
+                'lat': elem_lat,
+                'lon': elem_lon,
+                'tags': json.loads(tags_json),
+            })
+        return elements
+
+    def meta(self) -> Dict[str, str]:
+        """Metadane indeksu (wersja formatu, źródło, liczba elementów)."""
+        rows = self._connection().execute("SELECT key, value FROM meta").fetchall()
+        return dict(rows)
+
+    @classmethod
+    def build(
+        cls,
+        path: str,
+        elements: Iterable[dict],
+        source: str = "",
+        batch_size: int = 10000,
+    ) -> int:
+        """
+        Buduje plik indeksu z elementów w formacie Overpass JSON.
+
+        Returns:
+            Liczba zapisanych elementów.
+        """
+        classifier = OverpassClient()
+        tmp_path = f"{path}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.executescript(
+                """
+                PRAGMA journal_mode = OFF;
+                PRAGMA synchronous = OFF;
+                CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE elements (
+                    id INTEGER PRIMARY KEY,
+                    osm_type TEXT NOT NULL,
+                    osm_id INTEGER NOT NULL,
+                    lat REAL NOT NULL,
+                    lon REAL NOT NULL,
+                    tags TEXT NOT NULL
+                );
+                CREATE VIRTUAL TABLE elements_rtree USING rtree(
+                    id, min_lat, max_lat, min_lon, max_lon
+                );
+                """
+            )
+
+            count = 0
+            batch: List[Tuple] = []
+            for elem in elements:
+                row = cls._to_row(classifier, elem)
+                if row is None:
+                    continue
+                count += 1
+                batch.append((count,) + row)
+                if len(batch) >= batch_size:
+                    cls._insert_batch(conn, batch)
+                    batch = []
+            if batch:
+                cls._insert_batch(conn, batch)
+
+            conn.executemany(
+                "INSERT INTO meta (key, value) VALUES (?, ?)",
+                [
+                    ('format_version', str(INDEX_FORMAT_VERSION)),
+                    ('source', source),
+                    ('elements', str(count)),
+                ],
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+        os.replace(tmp_path, path)
+        return count
+
+    @staticmethod
+    def _to_row(classifier: OverpassClient, elem: dict) -> Optional[Tuple]:
+        tags = elem.get('tags') or {}
+        if not tags:
+            return None
+        elem_lat = elem.get('lat') or elem.get('center', {}).get('lat')
+        elem_lon = elem.get('lon') or elem.get('center', {}).get('lon')
+        if not elem_lat or not elem_lon:
+            return None
+        if not classifier._classify_tags(tags):
+            return None
+        compact_tags = {k: v for k, v in tags.items() if k in CLASSIFIER_TAG_KEYS}
+        return (
+            elem.get('type', 'node'),
+            int(elem.get('id') or 0),
+            float(elem_lat),
+            float(elem_lon),
+            json.dumps(compact_tags, ensure_ascii=False, separators=(',', ':')),
+        )
+
+    @staticmethod
+    def _insert_batch(conn: sqlite3.Connection, batch: List[Tuple]) -> None:
+        conn.executemany(
+            "INSERT INTO elements (id, osm_type, osm_id, lat, lon, tags) VALUES (?, ?, ?, ?, ?, ?)",
+            batch,
+        )
+        conn.executemany(
+            "INSERT INTO elements_rtree (id, min_lat, max_lat, min_lon, max_lon) VALUES (?, ?, ?, ?, ?)",
+            [(row[0], row[3], row[3], row[4], row[4]) for row in batch],
+        )
+
+
+class OSMIndexClient(OverpassClient):
+    """
+    Klient POI czytający z lokalnego indeksu OSM zamiast z Overpass API.
+
+    Ten sam kontrakt co OverpassClient.get_pois_around. Gdy plik indeksu
+    nie istnieje, degraduje się do zapytań Overpass (fallback sieciowy).
+    """
+
+    def __init__(self, index_path: Optional[str] = None):
+        super().__init__()
+        from ..app_config import get_config
+        self.index = OSMSpatialIndex(index_path or get_config().osm_index_path)
+
+    def get_pois_around(
+        self,
+        lat: float,
+        lon: float,
+        radius_m: int = 500,
+        trace_ctx: 'AnalysisTraceContext | None' = None,
+        radius_by_category: Optional[Dict[str, int]] = None,
+    ) -> Tuple[Dict[str, List[POI]], Dict[str, Any]]:
+        from ..diagnostics import get_diag_logger, AnalysisTraceContext
+        ctx = trace_ctx or AnalysisTraceContext()
+        slog = get_diag_logger(__name__, ctx)
+
+        if not self.index.available:
+            slog.degraded(
+                kind="DEGRADED_PROVIDER", provider="osm_index", stage="geo",
+                reason=f"OSM index not found: {self.index.path or '<unset>'}",
+                impact="falling back to Overpass API",
+            )
+            return super().get_pois_around(lat, lon, radius_m, trace_ctx=ctx, radius_by_category=radius_by_category)
+
+        token = slog.req_start(provider="osm_index", op="index_query", stage="geo", meta={"radius": radius_m})
+        try:
+            candidates = self.index.query_bbox(lat, lon, radius_m)
+        except sqlite3.Error as e:
+            slog.req_end(
+                provider="osm_index", op="index_query", stage="geo",
+                status="error", request_token=token, error_class="io",
+                message="OSM index query failed", exc=str(e),
+                hint="Rebuild the index with: manage.py build_osm_index",
+            )
+            return self._empty_result(radius_m)
+        slog.req_end(provider="osm_index", op="index_query", stage="geo", status="ok", request_token=token, meta={"candidates": len(candidates)})
+
+        # bbox -> okrąg (odpowiednik around: w Overpass) — przy liczeniu dystansów partii
+        return self._parse_elements(candidates, lat, lon, radius_m, clip_to_radius=True)
+
+    def query_radii_key(self, radius_m, radius_by_category):
+        """Indeks czyta pełny okrąg — promienie per kategoria dotyczą tylko fallbacku Overpass."""
+        if self.index.available:
+            return None
+        return super().query_radii_key(radius_m, radius_by_category)
+
+    def get_pois_for_points(self, circles, trace_ctx=None):
+        """Odczyt z indeksu jest lokalny — wspólne zapytanie niczego nie oszczędza."""
+        if self.index.available:
+            results = [self.get_pois_around(lat, lon, radius_m, trace_ctx=trace_ctx) for lat, lon, radius_m in circles]
+            return [None if is_failed_fetch(metrics) else (pois, metrics) for pois, metrics in results]
+        return super().get_pois_for_points(circles, trace_ctx=trace_ctx)
+
+    async def get_pois_around_async(
+        self,
+        lat: float,
+        lon: float,
+        radius_m: int = 500,
+        trace_ctx: 'AnalysisTraceContext | None' = None,
+        radius_by_category: Optional[Dict[str, int]] = None,
+    ) -> Tuple[Dict[str, List[POI]], Dict[str, Any]]:
+        """Odczyt z lokalnego pliku — na puli get_index_executor, żeby nie blokować pętli zdarzeń."""
+        import asyncio
+        if not self.index.available:
+            return await super().get_pois_around_async(
+                lat, lon, radius_m, trace_ctx=trace_ctx, radius_by_category=radius_by_category,
+            )
+        return await asyncio.get_running_loop().run_in_executor(
+            get_index_executor(), self.get_pois_around, lat, lon, radius_m, trace_ctx,
+        )
+
+
+def iter_overpass_json(path: str) -> Iterator[dict]:
+    """Czyta elementy z pliku w formacie Overpass JSON ({"elements": [...]})."""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    yield from data.get('elements', [])
+
+
+def iter_osm_pbf(path: str) -> Iterator[dict]:
+    """
+    Czyta node'y i way'e (jako center) z pliku .osm.pbf.
+    Wymaga opcjonalnej zależności `osmium` (pyosmium).
+    """
+    import osmium
+
+    for obj in osmium.FileProcessor(path).with_locations():
+        tags = {t.k: t.v for t in obj.tags if t.k in CLASSIFIER_TAG_KEYS}
+        if not tags:
+            continue
+        if obj.is_node():
+            if not obj.location.valid():
+                continue
+            yield {'type': 'node', 'id': obj.id, 'lat': obj.location.lat, 'lon': obj.location.lon, 'tags': tags}
+        elif obj.is_way():
+            coords = [(n.location.lat, n.location.lon) for n in obj.nodes if n.location.valid()]
+            if not coords:
+                continue
+            yield {
+                'type': 'way',
+                'id': obj.id,
+                'center': {
+                    'lat': sum(c[0] for c in coords) / len(coords),
+                    'lon': sum(c[1] for c in coords) / len(coords),
+                },
+                'tags': tags,
+            }
+
+
+def create_overpass_client() -> OverpassClient:
+    """Zwraca klienta POI OSM zgodnego z AppConfig.overpass_mode."""
+    from ..app_config import get_config
+    if get_config().overpass_mode == 'index':
+        return OSMIndexClient()
+    return OverpassClient()
+
@@ -3,12 +3,16 @@ Klient do Overpass API (OpenStreetMap).
 Wersja zoptymalizowana: Single Batch Request (jedno zapytanie zamiast 8).
 """
 import requests
+import re
 import time
 import math
 from dataclasses import dataclass, field
 from typing import Dict, List, Optional, Any, Tuple
 
+from .endpoint_health import overpass_endpoint_health, run_hedged, run_hedged_async
 from .nature_metrics import NatureMetrics
+from .overpass_stream import STREAM_CHUNK_BYTES, OverpassStreamParser
+from .spatial_cache import haversine_many
 
 
 # Typy landcover do metryk nature_background (NIE do listy POI jako osobne obiekty)
@@ -33,6 +37,39 @@ KNOWN_SHOP_TYPES = frozenset({
 })
 
 
+# Klucze tagów, od których zależy wynik _classify_tags (sygnatura do memoizacji)
+CLASSIFY_SIGNATURE_KEYS = (
+    'shop', 'amenity', 'healthcare', 'public_transport', 'highway', 'railway',
+    'leisure', 'landuse', 'natural', 'water', 'waterway', 'boundary', 'parking',
+)
+
+# Klucze tagów OSM czytane przez _classify_tags/_create_poi (i dalej w pipeline)
+CLASSIFIER_TAG_KEYS = frozenset({
+    'shop', 'amenity', 'healthcare', 'public_transport', 'highway', 'railway',
+    'leisure', 'landuse', 'natural', 'water', 'waterway', 'boundary', 'parking',
+    'name', 'brand', 'addr:street', 'addr:housenumber',
+})
+
+# Kategorie, z których liczone są NatureMetrics (parki, zieleń, woda) —
+# zawsze pobierane pełnym promieniem, żeby metryki nie zależały od profilu
+NATURE_METRIC_CATEGORIES = frozenset({'nature_place', 'nature_background'})
+
+# Tag z typem elementu OSM w trybie projekcji tagów (convert gubi node/way)
+PROJECTED_TYPE_TAG = '_osm_type'
+
+# Znacznik w metrics pustego wyniku po błędzie providera (odróżnia awarię od pustej okolicy)
+FETCH_FAILED = 'fetch_failed'
+
+
+def is_failed_fetch(metrics: Optional[Dict[str, Any]]) -> bool:
+    """Czy (pois, metrics) to pusty wynik po błędzie pobrania, a nie prawdziwe dane."""
+    return bool(metrics and metrics.get(FETCH_FAILED))
+
+
+# Promienie filtrów around: w treści zapytania
+_AROUND_RADIUS = re.compile(r'\(around:(\d+),')
+
+
 @dataclass
 class POI:
     lat: float
@@ -56,13 +93,29 @@ class OverpassClient:
     # Maksymalna liczba kategorii per POI (primary + secondary)
     MAX_CATEGORIES_PER_POI = 2
     SECONDARY_SCORE_RATIO = 0.7
-    
+
+    # Dedup przystanków: stop_position vs właściwy przystanek (~30 m)
+    PROPER_STOP_SUBS = frozenset({'bus_stop', 'tram_stop', 'station', 'platform'})
+    STOP_DEDUP_M = 30
+    STOP_DEDUP_DEG = 0.0003
+    # Dedup tej samej nazwy + subkategorii (~20 m)
+    NAME_DEDUP_M = 20
+    NAME_DEDUP_DEG = 0.0002
+
+    # Maksymalna liczba prób zapytania (po wszystkich endpointach)
+    MAX_ATTEMPTS = 4
+
     def __init__(self):
         from ..app_config import get_config
         config = get_config()
         self.ENDPOINTS = config.overpass_endpoints
         self.TIMEOUT = config.overpass_timeout
-        self._current_endpoint_idx = 0
+        self.STREAM_PARSE = config.overpass_stream_parse
+        self.CATEGORY_RADII = config.overpass_category_radii
+        self.TAG_PROJECTION = config.overpass_tag_projection
+        self.HEDGE_ENABLED = config.overpass_hedge_enabled
+        from .overpass_tiles import create_tile_fetcher
+        self._tiles = create_tile_fetcher(self)
     
     # Konfiguracja kategorii (zachowujemy strukturę dla subkategorii i nazw)
     POI_QUERIES = {
@@ -341,12 +394,24 @@ class OverpassClient:
                     break
 
         return primary, secondary
-    
-    def _get_endpoint(self) -> str:
-        return self.ENDPOINTS[self._current_endpoint_idx % len(self.ENDPOINTS)]
-    
-    def _rotate_endpoint(self):
-        self._current_endpoint_idx += 1
+
+    def _classify_batch(self, tags: dict, memo: dict) -> Tuple[Dict[str, float], Optional[str], List[str]]:
+        """
+        _classify_tags + _select_categories z memoizacją po sygnaturze tagów.
+
+        W gęstej zabudowie tysiące elementów mają te same tagi klasyfikujące
+        (amenity=restaurant, highway=bus_stop...) — klasyfikacja i sortowanie
+        kategorii liczone są raz na sygnaturę w obrębie partii.
+        """
+        signature = tuple(map(tags.get, CLASSIFY_SIGNATURE_KEYS))
+        hit = memo.get(signature)
+        if hit is None:
+            scores = self._classify_tags(tags)
+            primary, secondary = self._select_categories(scores)
+            hit = memo[signature] = (scores, primary, secondary)
+        scores, primary, secondary = hit
+        # Kopie per element: POI nie mogą współdzielić list/słowników między elementami
+        return dict(scores), primary, list(secondary)
     
     def get_pois_around(
         self,
@@ -354,9 +419,15 @@ class OverpassClient:
         lon: float,
         radius_m: int = 500,
         trace_ctx: 'AnalysisTraceContext | None' = None,
+        radius_by_category: Optional[Dict[str, int]] = None,
     ) -> Tuple[Dict[str, List[POI]], Dict[str, Any]]:
         """
         Pobiera punkty POI i metryki zieleni w okolicy (Single Batch Request).
+
+        Args:
+            radius_by_category: promienie per kategoria (profil); przy
+                OVERPASS_CATEGORY_RADII zapytanie pyta każdą kategorię jej
+                własnym promieniem zamiast radius_m
         
         Returns:
             Tuple: (pois_by_category, metrics)
@@ -367,94 +438,495 @@ class OverpassClient:
         ctx = trace_ctx or AnalysisTraceContext()
         slog = get_diag_logger(__name__, ctx)
         
-        # 1. Zbuduj wielkie Query (Union)
+        if self._tiles is not None:
+            elements = self._tiles.elements_for_circle(lat, lon, radius_m, slog, trace_ctx=ctx)
+            if elements is None:
+                return self._empty_result(radius_m)
+            return self._parse_elements(elements, lat, lon, radius_m)
+
+        query_radii = self.query_radii_key(radius_m, radius_by_category)
+        if query_radii is not None:
+            # Okręgi per kategoria nie pasują do przestrzennego cache (pełne okręgi)
+            elements = self._fetch_elements(self._build_query(lat, lon, radius_m, dict(query_radii)), slog)
+            if elements is None:
+                return self._empty_result(radius_m)
+            return self._parse_elements(elements, lat, lon, radius_m)
+
+        cached, fetch_radius = self._area_cache_lookup(lat, lon, radius_m, ctx, slog)
+        if cached is not None:
+            return self._parse_elements(cached, lat, lon, radius_m)
+
+        elements = self._fetch_elements(self._build_query(lat, lon, fetch_radius), slog)
+        return self._finish_fetch(elements, lat, lon, radius_m, fetch_radius)
+
+    async def get_pois_around_async(
+        self,
+        lat: float,
+        lon: float,
+        radius_m: int = 500,
+        trace_ctx: 'AnalysisTraceContext | None' = None,
+        radius_by_category: Optional[Dict[str, int]] = None,
+    ) -> Tuple[Dict[str, List[POI]], Dict[str, Any]]:
+        """Asynchroniczny odpowiednik get_pois_around (ścieżka ASGI)."""
+        from ..diagnostics import get_diag_logger, AnalysisTraceContext
+        ctx = trace_ctx or AnalysisTraceContext()
+        slog = get_diag_logger(__name__, ctx)
+
+        if self._tiles is not None:
+            elements = await self._tiles.elements_for_circle_async(lat, lon, radius_m, slog, trace_ctx=ctx)
+            if elements is None:
+                return self._empty_result(radius_m)
+            return self._parse_elements(elements, lat, lon, radius_m)
+
+        query_radii = self.query_radii_key(radius_m, radius_by_category)
+        if query_radii is not None:
+            elements = await self._fetch_elements_async(self._build_query(lat, lon, radius_m, dict(query_radii)), slog)
+            if elements is None:
+                return self._empty_result(radius_m)
+            return self._parse_elements(elements, lat, lon, radius_m)
+
+        cached, fetch_radius = self._area_cache_lookup(lat, lon, radius_m, ctx, slog)
+        if cached is not None:
+            return self._parse_elements(cached, lat, lon, radius_m)
+
+        elements = await self._fetch_elements_async(self._build_query(lat, lon, fetch_radius), slog)
+        return self._finish_fetch(elements, lat, lon, radius_m, fetch_radius)
+
+    def get_pois_for_points(
+        self,
+        circles: List[Tuple[float, float, int]],
+        trace_ctx: 'AnalysisTraceContext | None' = None,
+    ) -> List[Optional[Tuple[Dict[str, List[POI]], Dict[str, Any]]]]:
+        """
+        POI dla wielu pobliskich punktów (lat, lon, radius_m) jednym
+        zapytaniem: bbox obejmujący wszystkie okręgi, potem każdy okrąg
+        parsowany osobno. Wyniki w kolejności `circles`, jak z get_pois_around;
+        None dla okręgu, którego nie udało się pobrać (nie pusty wynik).
+
+        Elementy (i ich tags) są współdzielone między punktami — tylko do
+        odczytu (bez enrichmentu).
+        """
+        from ..diagnostics import get_diag_logger, AnalysisTraceContext
+        from .spatial_cache import bbox_around_circles
+        ctx = trace_ctx or AnalysisTraceContext()
+        slog = get_diag_logger(__name__, ctx)
+
+        if len(circles) == 1 or self._tiles is not None:
+            # Kafle i tak współdzielą pobrania między sąsiednimi punktami
+            results = [self.get_pois_around(lat, lon, radius_m, trace_ctx=ctx) for lat, lon, radius_m in circles]
+            return [None if is_failed_fetch(metrics) else (pois, metrics) for pois, metrics in results]
+
+        elements = self._fetch_elements(self._build_bbox_query(*bbox_around_circles(circles)), slog)
+        if elements is None:
+            return [None] * len(circles)
+        return [
+            self._parse_elements(elements, lat, lon, radius_m, clip_to_radius=True)
+            for lat, lon, radius_m in circles
+        ]
+
+    def _area_cache_lookup(self, lat: float, lon: float, radius_m: int, ctx, slog) -> Tuple[Optional[List[dict]], int]:
+        """
+        Sprawdza przestrzenny cache odpowiedzi.
+
+        Returns:
+            (elementy z cache lub None, promień do pobrania przy missie)
+        """
+        from .spatial_cache import overpass_area_cache
+        if not overpass_area_cache.enabled:
+            return None, radius_m
+
+        elements = overpass_area_cache.lookup(lat, lon, radius_m)
+        ctx.summary.record_cache('osm_area', hit=elements is not None, process_totals=overpass_area_cache.stats())
+        if elements is not None:
+            slog.debug(stage="geo", provider="overpass", op="area_cache_hit", meta={"radius": radius_m, "elements": len(elements)})
+        # Pobieramy z zapasem, żeby kolejne zapytania z okolicy trafiały w cache
+        return elements, radius_m + overpass_area_cache.margin_m
+
+    def _finish_fetch(
+        self,
+        elements: Optional[List[dict]],
+        lat: float,
+        lon: float,
+        radius_m: int,
+        fetch_radius: int,
+    ) -> Tuple[Dict[str, List[POI]], Dict[str, Any]]:
+        """Zapisuje odpowiedź w przestrzennym cache i parsuje okrąg zapytania."""
+        from .spatial_cache import overpass_area_cache, filter_elements_in_circle
+        if elements is None:
+            # Zwracamy puste wyniki (fail gracefully)
+            return self._empty_result(radius_m)
+
+        if overpass_area_cache.enabled:
+            overpass_area_cache.store(lat, lon, fetch_radius, elements)
+            elements = filter_elements_in_circle(elements, lat, lon, radius_m)
+        
+        return self._parse_elements(elements, lat, lon, radius_m)
+
+    def query_radii_key(
+        self,
+        radius_m: int,
+        radius_by_category: Optional[Dict[str, int]],
+    ) -> Optional[Tuple[Tuple[str, int], ...]]:
+        """
+        Promienie zapytania per kategoria (posortowane pary) albo None, gdy
+        zapytanie idzie jednym promieniem (funkcja wyłączona, tryb kafli,
+        brak mapy lub wszystkie promienie równe radius_m).
+        Wynik wchodzi do klucza cache POI — dane pobrane węższymi okręgami
+        nie mogą obsłużyć profilu z szerszymi.
+        """
+        if not self.CATEGORY_RADII or self._tiles is not None or not radius_by_category:
+            return None
+        radii = {
+            cat: radius_m if cat in NATURE_METRIC_CATEGORIES else min(int(radius_by_category.get(cat, radius_m)), radius_m)
+            for cat in self.POI_QUERIES
+        }
+        if all(r == radius_m for r in radii.values()):
+            return None
+        return tuple(sorted(radii.items()))
+
+    def _build_query(
+        self,
+        lat: float,
+        lon: float,
+        radius_m: int,
+        radius_by_category: Optional[Dict[str, int]] = None,
+    ) -> str:
+        """
+        Buduje jedno zapytanie Overpass (union) dla wszystkich kategorii.
+        radius_by_category: promień around: per kategoria (domyślnie radius_m).
+        """
+        radii = radius_by_category or {}
+        return self._build_union_query(
+            f'(around:{radius_m},{lat},{lon})',
+            {cat: f'(around:{r},{lat},{lon})' for cat, r in radii.items() if r != radius_m},
+        )
+
+    def _build_bbox_query(self, south: float, west: float, north: float, east: float) -> str:
+        """Jak _build_query, ale dla prostokąta (tryb kafli)."""
+        return self._build_union_query(f'({south:.6f},{west:.6f},{north:.6f},{east:.6f})')
+
+    def _build_union_query(self, area_filter: str, category_filters: Optional[Dict[str, str]] = None) -> str:
         union_parts = []
+        category_filters = category_filters or {}
         
-        for config in self.POI_QUERIES.values():
+        for category, config in self.POI_QUERIES.items():
             q = config['query']
+            cat_filter = category_filters.get(category, area_filter)
             # Używamy node i way (relation pomijamy dla wydajności, chyba że krytyczne)
-            union_parts.append(f'node{q}(around:{radius_m},{lat},{lon});')
-            union_parts.append(f'way{q}(around:{radius_m},{lat},{lon});')
+            union_parts.append(f'node{q}{cat_filter};')
+            union_parts.append(f'way{q}{cat_filter};')
             
             for alt_q in config.get('alt_queries', []):
-                union_parts.append(f'node{alt_q}(around:{radius_m},{lat},{lon});')
-                union_parts.append(f'way{alt_q}(around:{radius_m},{lat},{lon});')
+                union_parts.append(f'node{alt_q}{cat_filter};')
+                union_parts.append(f'way{alt_q}{cat_filter};')
         
-        overpass_query = f"""
+        return f"""
         [out:json][timeout:{self.TIMEOUT}];
         (
             {' '.join(union_parts)}
         );
-        out center;
+        {self._output_statement()}
         """
+
+    def _output_statement(self) -> str:
+        """
+        Instrukcja wyjścia zapytania. W trybie projekcji (OVERPASS_TAG_PROJECTION)
+        `convert` zostawia tylko tagi z CLASSIFIER_TAG_KEYS, typ elementu i środek
+        geometrii — serwer nie serializuje pełnych zestawów tagów.
+        """
+        if not self.TAG_PROJECTION:
+            return 'out center;'
+        tags = ', '.join(f'"{key}"=t["{key}"]' for key in sorted(CLASSIFIER_TAG_KEYS))
+        return f'convert poi ::id=id(), ::geom=center(geom()), "{PROJECTED_TYPE_TAG}"=type(), {tags};\n        out geom;'
+
+    @staticmethod
+    def _unproject_element(elem: dict) -> Optional[dict]:
+        """
+        Element z `convert` (type=poi, geometry: Point) -> kształt `out center`
+        (type node/way, lat/lon, tylko niepuste tagi). Inne elementy bez zmian.
+        """
+        if elem.get('type') != 'poi':
+            return elem
+        tags = {k: v for k, v in (elem.get('tags') or {}).items() if v}
+        osm_type = tags.pop(PROJECTED_TYPE_TAG, None)
+        geometry = elem.get('geometry') or {}
+        coords = geometry.get('coordinates') if isinstance(geometry, dict) else None
+        if not osm_type or not coords:
+            return None
+        return {'type': osm_type, 'id': elem.get('id'), 'lat': coords[1], 'lon': coords[0], 'tags': tags}
+
+    def _fetch_elements(self, overpass_query: str, slog) -> Optional[List[dict]]:
+        """
+        Wysyła zapytanie do Overpass z wyborem endpointu wg zdrowia mirrorów.
+
+        Próba idzie do najlepszego zdrowego endpointu (EndpointHealth); po
+        błędzie od razu do kolejnego, jeszcze nie próbowanego. Exponential
+        backoff i dłuższy timeout dopiero przy ponownym przejściu po tych
+        samych endpointach. Z OVERPASS_HEDGE_ENABLED zapytanie jest dublowane
+        do drugiego mirrora, gdy pierwszy nie odpowie w swoim p90.
         
-        # 2. Wyślij request (z Retry Logic + Exponential Backoff)
-        import random
-        elements = []
-        max_retries = 4
+        Returns:
+            Lista elementów OSM lub None gdy wszystkie próby zawiodły.
+        """
+        query_meta = self._query_meta(overpass_query)
+        tried: set = set()
+        passes = 0
         
-        for attempt in range(max_retries):
-            endpoint = self._get_endpoint()
-            token = slog.req_start(provider="overpass", op="batch_query", stage="geo", meta={"endpoint": endpoint, "attempt": attempt + 1})
+        for attempt in range(self.MAX_ATTEMPTS):
+            endpoint, hedge, repeat = self._plan_attempt(tried)
+            if repeat:
+                passes += 1
+                time.sleep(self._backoff_s(passes))
+
+            def run(url: str, hedged: bool, attempt=attempt, passes=passes) -> List[dict]:
+                return self._attempt(url, overpass_query, slog, attempt, passes, hedged, query_meta)
+
             try:
-                response = requests.post(
-                    endpoint,
-                    data={'data': overpass_query},
-                    timeout=self.TIMEOUT * (attempt + 1),
-                    headers={'Content-Type': 'application/x-www-form-urlencoded'}
-                )
+                if hedge is not None:
+                    return run_hedged(run, endpoint, *hedge)
+                return run(endpoint, False)
+            except (requests.RequestException, ValueError):
+                tried.add(endpoint)
+                if hedge is not None:
+                    tried.add(hedge[0])
+        
+        return None
+
+    async def _fetch_elements_async(self, overpass_query: str, slog) -> Optional[List[dict]]:
+        """Jak _fetch_elements, ale przez httpx z backoffem asyncio.sleep."""
+        import asyncio
+        import httpx
+        query_meta = self._query_meta(overpass_query)
+        tried: set = set()
+        passes = 0
+        
+        for attempt in range(self.MAX_ATTEMPTS):
+            endpoint, hedge, repeat = self._plan_attempt(tried)
+            if repeat:
+                passes += 1
+                await asyncio.sleep(self._backoff_s(passes))
+
+            def run(url: str, hedged: bool, attempt=attempt, passes=passes):
+                return self._attempt_async(url, overpass_query, slog, attempt, passes, hedged, query_meta)
+
+            try:
+                if hedge is not None:
+                    return await run_hedged_async(run, endpoint, *hedge)
+                return await run(endpoint, False)
+            except (httpx.HTTPError, ValueError):
+                tried.add(endpoint)
+                if hedge is not None:
+                    tried.add(hedge[0])
+        
+        return None
+
+    def _plan_attempt(self, tried: set) -> Tuple[str, Optional[Tuple[str, float]], bool]:
+        """
+        Wybiera endpoint dla kolejnej próby.
+
+        Returns:
+            (endpoint, (endpoint hedgingu, opóźnienie s) lub None,
+             repeat — czy wszystkie endpointy były już próbowane)
+        """
+        ranked = overpass_endpoint_health.ranked(self.ENDPOINTS)
+        fresh = [url for url in ranked if url not in tried]
+        repeat = not fresh
+        if repeat:
+            tried.clear()
+        candidates = fresh or ranked
+        endpoint = candidates[0]
+
+        hedge = None
+        if self.HEDGE_ENABLED and len(candidates) > 1:
+            delay = overpass_endpoint_health.hedge_delay_s(endpoint)
+            if delay is not None:
+                hedge = (candidates[1], delay)
+        return endpoint, hedge, repeat
+
+    @staticmethod
+    def _backoff_s(passes: int) -> float:
+        """Exponential backoff przed ponownym przejściem po endpointach: 2s, 4s... + jitter."""
+        import random
+        return (2 ** passes) + random.uniform(0, 0.5)
+
+    def _attempt(self, endpoint, overpass_query, slog, attempt, passes, hedged, query_meta) -> List[dict]:
+        """Jedna próba na jednym endpoincie; wynik trafia do statystyk zdrowia endpointu."""
+        from ..http_pool import http_pool
+        token = slog.req_start(provider="overpass", op="batch_query", stage="geo", meta={"endpoint": endpoint, "attempt": attempt + 1, "hedge": hedged, **query_meta})
+        started = time.monotonic()
+        try:
+            response = http_pool.post(
+                endpoint,
+                data={'data': overpass_query},
+                timeout=self.TIMEOUT * (passes + 1),
+                headers={'Content-Type': 'application/x-www-form-urlencoded'},
+                trace_ctx=slog.ctx,
+                stream=self.STREAM_PARSE,
+            )
+            with response:
                 response.raise_for_status()
-                
-                data = response.json()
-                elements = data.get('elements', [])
-                slog.req_end(provider="overpass", op="batch_query", stage="geo", status="ok", request_token=token, http_status=response.status_code, meta={"elements": len(elements)})
-                break # Sukces
-                
-            except (requests.RequestException, ValueError) as e:
-                self._rotate_endpoint()
-                
-                if attempt < max_retries - 1:
-                    # Exponential backoff: 1s, 2s, 4s + random jitter 0-500ms
-                    backoff = (2 ** attempt) + random.uniform(0, 0.5)
-                    slog.req_end(
-                        provider="overpass", op="batch_query", stage="geo",
-                        status="retry", request_token=token,
-                        error_class="http", retry_count=attempt + 1,
-                        http_status=getattr(getattr(e, 'response', None), 'status_code', None),
-                        message=f"Retrying in {backoff:.1f}s",
-                        exc=str(e),
-                    )
-                    time.sleep(backoff)
-                else:
-                    slog.req_end(
-                        provider="overpass", op="batch_query", stage="geo",
-                        status="error", request_token=token,
-                        error_class="http", retry_count=attempt + 1,
-                        message="All retry attempts exhausted",
-                        exc=str(e),
-                        hint="All Overpass endpoints failed. Check network or try again later.",
-                    )
-                    # Zwracamy puste wyniki (fail gracefully)
-                    empty_metrics = NatureMetrics()
-                    empty_metrics.calculate_density(radius_m)
-                    return {cat: [] for cat in self.POI_QUERIES}, {'nature': empty_metrics.to_dict()}
+                elements, meta = self._read_elements(response)
+        except (requests.RequestException, ValueError) as e:
+            self._attempt_failed(endpoint, e, started, slog, token, attempt)
+            raise
+        overpass_endpoint_health.record(endpoint, ok=True, latency_ms=(time.monotonic() - started) * 1000)
+        slog.req_end(provider="overpass", op="batch_query", stage="geo", status="ok", request_token=token, http_status=response.status_code, response_bytes=meta.pop("bytes"), meta=meta)
+        return elements
+
+    async def _attempt_async(self, endpoint, overpass_query, slog, attempt, passes, hedged, query_meta) -> List[dict]:
+        """Odpowiednik _attempt przez httpx (ścieżka ASGI)."""
+        import httpx
+        from ..async_http import get_async_client
+        token = slog.req_start(provider="overpass", op="batch_query", stage="geo", meta={"endpoint": endpoint, "attempt": attempt + 1, "hedge": hedged, **query_meta})
+        started = time.monotonic()
+        try:
+            async with get_async_client().stream(
+                'POST',
+                endpoint,
+                data={'data': overpass_query},
+                timeout=self.TIMEOUT * (passes + 1),
+            ) as response:
+                response.raise_for_status()
+                elements, meta = await self._read_elements_async(response)
+        except (httpx.HTTPError, ValueError) as e:
+            self._attempt_failed(endpoint, e, started, slog, token, attempt)
+            raise
+        overpass_endpoint_health.record(endpoint, ok=True, latency_ms=(time.monotonic() - started) * 1000)
+        slog.req_end(provider="overpass", op="batch_query", stage="geo", status="ok", request_token=token, http_status=response.status_code, response_bytes=meta.pop("bytes"), meta=meta)
+        return elements
+
+    def _attempt_failed(self, endpoint, exc, started, slog, token, attempt) -> None:
+        overpass_endpoint_health.record(endpoint, ok=False, latency_ms=(time.monotonic() - started) * 1000)
+        http_status = getattr(getattr(exc, 'response', None), 'status_code', None)
+        if attempt < self.MAX_ATTEMPTS - 1:
+            slog.req_end(
+                provider="overpass", op="batch_query", stage="geo",
+                status="retry", request_token=token,
+                error_class="http", retry_count=attempt + 1,
+                http_status=http_status,
+                message=f"Endpoint failed: {endpoint}",
+                exc=str(exc),
+            )
+        else:
+            slog.req_end(
+                provider="overpass", op="batch_query", stage="geo",
+                status="error", request_token=token,
+                error_class="http", retry_count=attempt + 1,
+                http_status=http_status,
+                message="All retry attempts exhausted",
+                exc=str(exc),
+                hint="All Overpass endpoints failed. Check network or try again later.",
+            )
+
+    def _query_meta(self, overpass_query: str) -> Dict[str, Any]:
+        """Kształt zapytania do req_start (porównania rozmiaru/czasu przed i po)."""
+        return {
+            "query_bytes": len(overpass_query.encode('utf-8')),
+            "tag_projection": self.TAG_PROJECTION,
+            "category_radii": len(set(_AROUND_RADIUS.findall(overpass_query))) > 1,
+        }
+
+    def _read_elements(self, response) -> Tuple[List[dict], Dict[str, int]]:
+        """
+        Elementy z odpowiedzi Overpass (requests) + meta do req_end.
+        W trybie strumieniowym elementy są filtrowane i kompaktowane w locie
+        (_compact_element), bez budowania całego payloadu w pamięci.
+        """
+        if not self.STREAM_PARSE:
+            elements = self._unproject_all(response.json().get('elements', []))
+            return elements, {"bytes": len(response.content), "elements": len(elements)}
+
+        parser = OverpassStreamParser(self._compact_element)
+        elements = []
+        for chunk in response.iter_content(STREAM_CHUNK_BYTES):
+            elements.extend(parser.feed(chunk))
+        elements.extend(parser.close())
+        return elements, parser.stats()
+
+    async def _read_elements_async(self, response) -> Tuple[List[dict], Dict[str, int]]:
+        """Odpowiednik _read_elements dla strumienia httpx."""
+        if not self.STREAM_PARSE:
+            body = await response.aread()
+            elements = self._unproject_all(response.json().get('elements', []))
+            return elements, {"bytes": len(body), "elements": len(elements)}
+
+        parser = OverpassStreamParser(self._compact_element)
+        elements = []
+        async for chunk in response.aiter_bytes(STREAM_CHUNK_BYTES):
+            elements.extend(parser.feed(chunk))
+        elements.extend(parser.close())
+        return elements, parser.stats()
 
-        # 3. Klasyfikuj i Parsuj wyniki lokalnie
+    def _unproject_all(self, elements: List[dict]) -> List[dict]:
+        if not self.TAG_PROJECTION:
+            return elements
+        return [elem for elem in map(self._unproject_element, elements) if elem is not None]
+
+    def _compact_element(self, elem: dict) -> Optional[dict]:
+        """
+        Filtr strumienia: odrzuca elementy, które _parse_elements i tak
+        pominie (bez tagów, współrzędnych lub kategorii), a pozostałym
+        zostawia tylko tagi z CLASSIFIER_TAG_KEYS (jak indeks OSM).
+        """
+        elem = self._unproject_element(elem)
+        if elem is None:
+            return None
+        tags = elem.get('tags')
+        if not tags:
+            return None
+        if not (elem.get('lat') or elem.get('center', {}).get('lat')):
+            return None
+        if not self._classify_tags(tags):
+            return None
+        return {**elem, 'tags': {k: v for k, v in tags.items() if k in CLASSIFIER_TAG_KEYS}}
+
+    def _empty_result(self, radius_m: int) -> Tuple[Dict[str, List[POI]], Dict[str, Any]]:
+        """Zwraca pustą strukturę wyników (brak danych z providera)."""
+        empty_metrics = NatureMetrics()
+        empty_metrics.calculate_density(radius_m)
+        return {cat: [] for cat in self.POI_QUERIES}, {'nature': empty_metrics.to_dict(), FETCH_FAILED: True}
+
+    def _parse_elements(
+        self,
+        elements: List[dict],
+        lat: float,
+        lon: float,
+        radius_m: int,
+        clip_to_radius: bool = False,
+    ) -> Tuple[Dict[str, List[POI]], Dict[str, Any]]:
+        """
+        Klasyfikuje elementy OSM (format Overpass JSON) i buduje wynik
+        w formacie (pois_by_category, {'nature': ...}).
+
+        Przetwarzanie partiami: najpierw współrzędne wszystkich elementów
+        i dystanse jednym przebiegiem (haversine_many), potem klasyfikacja
+        z memoizacją po sygnaturze tagów. clip_to_radius=True odrzuca
+        elementy spoza promienia przed klasyfikacją i tworzeniem POI
+        (dla źródeł zwracających bbox zamiast okręgu).
+        """
+        # 3. Współrzędne i dystanse całej partii
+        rows = []
+        for elem in elements:
+            tags = elem.get('tags', {})
+            if not tags: continue
+            elem_lat = elem.get('lat') or elem.get('center', {}).get('lat')
+            elem_lon = elem.get('lon') or elem.get('center', {}).get('lon')
+            if not elem_lat: continue
+            rows.append((elem, tags, elem_lat, elem_lon))
+        distances = haversine_many(lat, lon, [(row[2], row[3]) for row in rows])
+
+        # 4. Klasyfikuj i Parsuj wyniki lokalnie
         pois_by_category = {cat: [] for cat in self.POI_QUERIES}
         nature_metrics = NatureMetrics()
         seen_osm_uid = set()
         seen_grid_primary = set()
+        classify_memo: dict = {}
         # Dedup: node może być częścią way, a Overpass zwraca oba (out center)
         # Dodatkowo fallback po gridzie + primary_category.
         
-        for elem in elements:
-            tags = elem.get('tags', {})
-            if not tags: continue
-            
-            # Pobierz koordynaty raz
-            elem_lat = elem.get('lat') or elem.get('center', {}).get('lat')
-            elem_lon = elem.get('lon') or elem.get('center', {}).get('lon')
-            if not elem_lat: continue
+        for (elem, tags, elem_lat, elem_lon), distance in zip(rows, distances):
+            if clip_to_radius and distance > radius_m:
+                continue
 
             # Dedup po osm_uid
             elem_type = elem.get('type')
@@ -466,8 +938,7 @@ class OverpassClient:
                 seen_osm_uid.add(osm_uid)
 
             # Klasyfikacja tagów -> primary/secondary kategorie
-            scores = self._classify_tags(tags)
-            primary_category, secondary_categories = self._select_categories(scores)
+            scores, primary_category, secondary_categories = self._classify_batch(tags, classify_memo)
             if not primary_category:
                 continue
             matched_cats = [primary_category] + secondary_categories
@@ -490,9 +961,6 @@ class OverpassClient:
                 continue
             seen_grid_primary.add(grid_key)
 
-            # Oblicz dystans raz
-            distance = self._haversine_distance(lat, lon, elem_lat, elem_lon)
-            
             # Obsługa nature: rozdziel na POI vs metryki
             leisure = tags.get('leisure', '')
             landuse = tags.get('landuse', '')
@@ -551,63 +1019,97 @@ class OverpassClient:
                     secondary_categories=secondary_categories,
                     osm_uid=osm_uid,
                     category_scores=scores,
+                    distance_m=distance,
                 )
                 if poi:
                     pois_by_category[cat].append(poi)
         
-        # 4. Oblicz density proxy
+        # 5. Oblicz density proxy
         nature_metrics.calculate_density(radius_m)
         
-        # 5. Transport: proximity dedup — prefer platform/bus_stop over stop_position
+        # 6. Transport: proximity dedup — prefer platform/bus_stop over stop_position
         transport_pois = pois_by_category.get('transport', [])
         if transport_pois:
-            PROPER_STOP_SUBS = {'bus_stop', 'tram_stop', 'station', 'platform'}
-            proper_stops = [p for p in transport_pois if p.subcategory in PROPER_STOP_SUBS]
-            cleaned = []
-            for poi in transport_pois:
-                if poi.subcategory == 'stop_position':
-                    # Drop if a proper stop exists within 30m
-                    dominated = any(
-                        abs(poi.distance_m - ps.distance_m) < 30
-                        and abs(poi.lat - ps.lat) < 0.0003
-                        and abs(poi.lon - ps.lon) < 0.0003
-                        for ps in proper_stops
-                    )
-                    if dominated:
-                        continue
-                cleaned.append(poi)
-            pois_by_category['transport'] = cleaned
+            pois_by_category['transport'] = self._dedup_stop_positions(transport_pois)
         
-        # 6. General proximity dedup: same name + same subcategory within 20m → keep closest
+        # 7. General proximity dedup: same name + same subcategory within 20m → keep closest
         for cat in pois_by_category:
-            items = pois_by_category[cat]
-            if len(items) <= 1:
-                continue
-            deduped = []
-            for poi in items:
-                is_dup = False
-                name_lower = (poi.name or '').lower()
-                if name_lower and name_lower != 'bez nazwy':
-                    for kept in deduped:
-                        kept_name = (kept.name or '').lower()
-                        if (name_lower == kept_name
-                            and poi.subcategory == kept.subcategory
-                            and abs((poi.distance_m or 0) - (kept.distance_m or 0)) < 20
-                            and abs(poi.lat - kept.lat) < 0.0002
-                            and abs(poi.lon - kept.lon) < 0.0002):
-                            is_dup = True
-                            break
-                if not is_dup:
-                    deduped.append(poi)
-            pois_by_category[cat] = deduped
+            if len(pois_by_category[cat]) > 1:
+                pois_by_category[cat] = self._dedup_same_name(pois_by_category[cat])
         
-        # 7. Sortuj i limituj wynikowe listy
+        # 8. Sortuj i limituj wynikowe listy
         for cat in pois_by_category:
             pois_by_category[cat].sort(key=lambda p: p.distance_m)
             pois_by_category[cat] = pois_by_category[cat][:MAX_POIS_PER_CATEGORY]
             
         return pois_by_category, {'nature': nature_metrics.to_dict()}
 
+    @staticmethod
+    def _grid_cell(poi: POI, cell_deg: float) -> Tuple[int, int]:
+        return math.floor(poi.lat / cell_deg), math.floor(poi.lon / cell_deg)
+
+    @staticmethod
+    def _neighbor_cells(cell: Tuple[int, int]):
+        """Komórka i jej 8 sąsiadów — pary bliższe niż rozmiar komórki leżą w jednej z nich."""
+        cell_lat, cell_lon = cell
+        for d_lat in (-1, 0, 1):
+            for d_lon in (-1, 0, 1):
+                yield cell_lat + d_lat, cell_lon + d_lon
+
+    def _dedup_stop_positions(self, transport_pois: List[POI]) -> List[POI]:
+        """
+        Usuwa stop_position, gdy w promieniu ~30 m jest właściwy przystanek
+        (platform/bus_stop/tram_stop/station). Przystanki w siatce o boku
+        STOP_DEDUP_DEG — każdy stop_position porównywany tylko z sąsiednimi
+        komórkami zamiast ze wszystkimi przystankami (O(n) zamiast O(n²)).
+        """
+        grid: Dict[Tuple[int, int], List[POI]] = {}
+        for poi in transport_pois:
+            if poi.subcategory in self.PROPER_STOP_SUBS:
+                grid.setdefault(self._grid_cell(poi, self.STOP_DEDUP_DEG), []).append(poi)
+
+        cleaned = []
+        for poi in transport_pois:
+            if poi.subcategory == 'stop_position' and grid:
+                # Drop if a proper stop exists within 30m
+                dominated = any(
+                    abs(poi.distance_m - ps.distance_m) < self.STOP_DEDUP_M
+                    and abs(poi.lat - ps.lat) < self.STOP_DEDUP_DEG
+                    and abs(poi.lon - ps.lon) < self.STOP_DEDUP_DEG
+                    for cell in self._neighbor_cells(self._grid_cell(poi, self.STOP_DEDUP_DEG))
+                    for ps in grid.get(cell, ())
+                )
+                if dominated:
+                    continue
+            cleaned.append(poi)
+        return cleaned
+
+    def _dedup_same_name(self, items: List[POI]) -> List[POI]:
+        """
+        Usuwa duplikaty: ta sama nazwa (bez wielkości liter) i subkategoria
+        w promieniu ~20 m — zostaje pierwszy. Zachowane POI indeksowane po
+        (nazwa, subkategoria, komórka NAME_DEDUP_DEG), więc kandydaci to tylko
+        wpisy z sąsiednich komórek o tym samym kluczu.
+        """
+        kept_index: Dict[Tuple[str, str, int, int], List[POI]] = {}
+        deduped = []
+        for poi in items:
+            name_lower = (poi.name or '').lower()
+            if name_lower and name_lower != 'bez nazwy':
+                cell = self._grid_cell(poi, self.NAME_DEDUP_DEG)
+                is_dup = any(
+                    abs((poi.distance_m or 0) - (kept.distance_m or 0)) < self.NAME_DEDUP_M
+                    and abs(poi.lat - kept.lat) < self.NAME_DEDUP_DEG
+                    and abs(poi.lon - kept.lon) < self.NAME_DEDUP_DEG
+                    for cell_lat, cell_lon in self._neighbor_cells(cell)
+                    for kept in kept_index.get((name_lower, poi.subcategory, cell_lat, cell_lon), ())
+                )
+                if is_dup:
+                    continue
+                kept_index.setdefault((name_lower, poi.subcategory) + cell, []).append(poi)
+            deduped.append(poi)
+        return deduped
+
     def _match_categories(self, tags: dict) -> List[str]:
         """Sprawdza, do jakich kategorii pasuje dany obiekt na podstawie tagów."""
         scores = self._classify_tags(tags)
@@ -629,8 +1131,9 @@ class OverpassClient:
         secondary_categories: Optional[List[str]] = None,
         osm_uid: Optional[str] = None,
         category_scores: Optional[Dict[str, float]] = None,
+        distance_m: Optional[float] = None,
     ) -> Optional[POI]:
-        """Tworzy obiekt POI dla danej kategorii."""
+        """Tworzy obiekt POI dla danej kategorii (distance_m: dystans policzony wcześniej)."""
         config = self.POI_QUERIES.get(category, {})
         
         # Nazwa
@@ -719,7 +1222,7 @@ class OverpassClient:
             tags['osm_uid'] = osm_uid
         tags['source'] = 'osm'
 
-        distance = self._haversine_distance(ref_lat, ref_lon, lat, lon)
+        distance = distance_m if distance_m is not None else self._haversine_distance(ref_lat, ref_lon, lat, lon)
         
         return POI(
             lat=lat,
@@ -0,0 +1,122 @@
+"""
+Strumieniowy parser odpowiedzi Overpass JSON.
+
+response.json() buduje w pamięci cały payload (każdy element ze wszystkimi
+tagami) zanim cokolwiek zostanie przetworzone — przy promieniu 2 km
+w centrum Warszawy to dziesiątki MB. Parser dostaje ciało odpowiedzi
+kawałkami, dekoduje elementy tablicy "elements" pojedynczo i od razu
+przepuszcza je przez filtr (klasyfikacja / odrzucenie / kompakcja tagów).
+W buforze jest tylko nieprzetworzona końcówka — pamięć nie rośnie
+z promieniem.
+
+Push-based (feed/close), więc obsługuje i requests.iter_content,
+i httpx aiter_bytes.
+"""
+import codecs
+import json
+import re
+from typing import Callable, List, Optional
+
+# Początek tablicy elementów: {"version":..., "osm3s": {...}, "elements": [
+_ELEMENTS_START = re.compile(r'"elements"\s*:\s*\[')
+# Separatory między elementami tablicy
+_SEPARATORS = re.compile(r'[\s,]*')
+
+# Rozmiar kawałka czytanego z sieci
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+class OverpassStreamParser:
+    """
+    Inkrementalny parser tablicy "elements".
+
+    element_filter: wywoływany dla każdego elementu zaraz po zdekodowaniu;
+                    None = odrzuć, dict = zachowaj (może być skompaktowany).
+    """
+
+    def __init__(self, element_filter: Optional[Callable[[dict], Optional[dict]]] = None):
+        self.element_filter = element_filter
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self._buffer = ''
+        self._state = 'head'  # 'head' -> 'elements' -> 'tail'
+        self.bytes_read = 0
+        self.peak_buffer_chars = 0
+        self.elements_seen = 0
+        self.elements_kept = 0
+
+    def feed(self, chunk: bytes) -> List[dict]:
+        """Dokłada kawałek ciała odpowiedzi; zwraca elementy zdekodowane w całości."""
+        self.bytes_read += len(chunk)
+        return self._consume(self._utf8.decode(chunk))
+
+    def close(self) -> List[dict]:
+        """
+        Kończy strumień. ValueError, gdy odpowiedź jest ucięta w środku
+        tablicy albo nie jest poprawnym JSON-em (jak response.json()).
+        """
+        elements = self._consume(self._utf8.decode(b'', final=True))
+        if self._state == 'elements':
+            raise ValueError("Overpass response truncated inside 'elements'")
+        if self._state == 'head':
+            # Brak tablicy elementów — mały dokument, parsujemy w całości
+            data = json.loads(self._buffer)
+            for elem in data.get('elements', []):
+                accepted = self._accept(elem)
+                if accepted is not None:
+                    elements.append(accepted)
+        self._buffer = ''
+        return elements
+
+    def stats(self) -> dict:
+        """Meta do req_end."""
+        return {
+            'bytes': self.bytes_read,
+            'peak_buffer_chars': self.peak_buffer_chars,
+            'elements_seen': self.elements_seen,
+            'elements': self.elements_kept,
+        }
+
+    def _consume(self, text: str) -> List[dict]:
+        buffer = self._buffer + text
+        self.peak_buffer_chars = max(self.peak_buffer_chars, len(buffer))
+        pos = 0
+        elements: List[dict] = []
+
+        if self._state == 'head':
+            match = _ELEMENTS_START.search(buffer)
+            if match is None:
+                self._buffer = buffer
+                return elements
+            self._state = 'elements'
+            pos = match.end()
+
+        while self._state == 'elements':
+            pos = _SEPARATORS.match(buffer, pos).end()
+            if pos >= len(buffer):
+                break
+            if buffer[pos] == ']':
+                self._state = 'tail'
+                pos += 1
+                break
+            try:
+                elem, pos_after = self._json.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Element niekompletny — czekamy na kolejny kawałek
+                break
+            pos = pos_after
+            accepted = self._accept(elem)
+            if accepted is not None:
+                elements.append(accepted)
+
+        # Ogon (remark itp.) nie jest potrzebny
+        self._buffer = buffer[pos:] if self._state == 'elements' else ''
+        return elements
+
+    def _accept(self, elem: dict) -> Optional[dict]:
+        self.elements_seen += 1
+        if self.element_filter is not None:
+            elem = self.element_filter(elem)
+        if elem is not None:
+            self.elements_kept += 1
+        return elem
@@ -0,0 +1,204 @@
+"""
+Tryb kafli dla Overpass (OVERPASS_TILES_ENABLED).
+
+Świat jest podzielony na stałą siatkę kafli ~tile_size_m × tile_size_m.
+Elementy OSM są pobierane zapytaniem bbox i cache'owane per kafel
+(overpass_tile_cache). Analiza składa swój okrąg z kafli, które go
+pokrywają, i pobiera z sieci tylko brakujące — jednym zapytaniem
+o bbox brakujących kafli. Kafle pobrane dla jednej analizy są używane
+przez każdą kolejną, która je przecina; `manage.py prewarm_tiles`
+rozgrzewa całe miasta z wyprzedzeniem.
+"""
+import math
+from typing import Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
+
+from .spatial_cache import METERS_PER_DEG_LAT, element_coords, filter_elements_in_circle, haversine_m
+
+if TYPE_CHECKING:
+    from .overpass_client import OverpassClient
+    from ..cache import TTLCache
+    from ..diagnostics import AnalysisTraceContext
+
+Tile = Tuple[int, int]
+BBox = Tuple[float, float, float, float]  # (south, west, north, east)
+
+
+class TileGrid:
+    """
+    Stała siatka kafli. Wiersz `i` ma wysokość tile_size_m; szerokość
+    kafla w stopniach długości zależy od szerokości geograficznej środka
+    wiersza, więc kafle mają zbliżony rozmiar w metrach na każdej szerokości.
+    """
+
+    def __init__(self, tile_size_m: int = 500):
+        self.tile_size_m = tile_size_m
+        self._dlat = tile_size_m / METERS_PER_DEG_LAT
+
+    def _dlon(self, row: int) -> float:
+        row_lat = (row + 0.5) * self._dlat
+        return self.tile_size_m / (METERS_PER_DEG_LAT * max(math.cos(math.radians(row_lat)), 0.01))
+
+    def tile_at(self, lat: float, lon: float) -> Tile:
+        row = math.floor(lat / self._dlat)
+        return (row, math.floor(lon / self._dlon(row)))
+
+    def bbox(self, tile: Tile) -> BBox:
+        row, col = tile
+        dlon = self._dlon(row)
+        return (row * self._dlat, col * dlon, (row + 1) * self._dlat, (col + 1) * dlon)
+
+    def tiles_for_bbox(self, south: float, west: float, north: float, east: float) -> List[Tile]:
+        tiles = []
+        for row in range(math.floor(south / self._dlat), math.floor(north / self._dlat) + 1):
+            dlon = self._dlon(row)
+            for col in range(math.floor(west / dlon), math.floor(east / dlon) + 1):
+                tiles.append((row, col))
+        return tiles
+
+    def tiles_for_circle(self, lat: float, lon: float, radius_m: float) -> List[Tile]:
+        """Kafle, które przecinają okrąg (lat, lon, radius_m)."""
+        dlat = radius_m / METERS_PER_DEG_LAT
+        dlon = radius_m / (METERS_PER_DEG_LAT * max(math.cos(math.radians(lat)), 0.01))
+        tiles = []
+        for tile in self.tiles_for_bbox(lat - dlat, lon - dlon, lat + dlat, lon + dlon):
+            south, west, north, east = self.bbox(tile)
+            nearest_lat = min(max(lat, south), north)
+            nearest_lon = min(max(lon, west), east)
+            if haversine_m(lat, lon, nearest_lat, nearest_lon) <= radius_m:
+                tiles.append(tile)
+        return tiles
+
+
+def bbox_of_tiles(grid: TileGrid, tiles: Iterable[Tile]) -> BBox:
+    boxes = [grid.bbox(t) for t in tiles]
+    return (
+        min(b[0] for b in boxes),
+        min(b[1] for b in boxes),
+        max(b[2] for b in boxes),
+        max(b[3] for b in boxes),
+    )
+
+
+class OverpassTileFetcher:
+    """Składa okręgi z kafli i dociąga brakujące kafle z Overpass."""
+
+    def __init__(self, client: 'OverpassClient', grid: TileGrid, cache: 'TTLCache'):
+        self.client = client
+        self.grid = grid
+        self.cache = cache
+
+    def _key(self, tile: Tile) -> str:
+        from ..cache import TTLCache
+        return TTLCache.make_key('osm_tile', self.grid.tile_size_m, tile[0], tile[1])
+
+    def cached(self, tiles: Iterable[Tile]) -> Tuple[Dict[Tile, List[dict]], List[Tile]]:
+        """Zwraca (elementy kafli z cache, lista brakujących kafli)."""
+        found: Dict[Tile, List[dict]] = {}
+        missing: List[Tile] = []
+        for tile in tiles:
+            elements = self.cache.get(self._key(tile))
+            if elements is None:
+                missing.append(tile)
+            else:
+                found[tile] = elements
+        return found, missing
+
+    def fetch(self, tiles: List[Tile], slog) -> Optional[Dict[Tile, List[dict]]]:
+        """
+        Pobiera kafle jednym zapytaniem bbox i zapisuje je w cache.
+
+        Returns:
+            Elementy per kafel lub None gdy Overpass zawiódł.
+        """
+        query = self.client._build_bbox_query(*bbox_of_tiles(self.grid, tiles))
+        return self._store_tiles(tiles, self.client._fetch_elements(query, slog))
+
+    async def fetch_async(self, tiles: List[Tile], slog) -> Optional[Dict[Tile, List[dict]]]:
+        """Asynchroniczny odpowiednik fetch()."""
+        query = self.client._build_bbox_query(*bbox_of_tiles(self.grid, tiles))
+        return self._store_tiles(tiles, await self.client._fetch_elements_async(query, slog))
+
+    def _store_tiles(self, tiles: List[Tile], elements: Optional[List[dict]]) -> Optional[Dict[Tile, List[dict]]]:
+        """Element trafia do kafla, w którym leży jego punkt (way: center)."""
+        if elements is None:
+            return None
+
+        by_tile: Dict[Tile, List[dict]] = {tile: [] for tile in tiles}
+        for elem in elements:
+            elem_lat, elem_lon = element_coords(elem)
+            if not elem_lat or not elem_lon:
+                continue
+            tile = self.grid.tile_at(elem_lat, elem_lon)
+            if tile in by_tile:
+                by_tile[tile].append(elem)
+
+        for tile, tile_elements in by_tile.items():
+            self.cache.set(self._key(tile), tile_elements)
+        return by_tile
+
+    def elements_for_circle(
+        self,
+        lat: float,
+        lon: float,
+        radius_m: int,
+        slog,
+        trace_ctx: 'AnalysisTraceContext | None' = None,
+    ) -> Optional[List[dict]]:
+        """
+        Elementy w okręgu złożone z kafli (brakujące pobierane z sieci).
+
+        Returns:
+            Lista elementów lub None gdy nie udało się pobrać brakujących kafli.
+        """
+        tiles, found, missing = self._plan(lat, lon, radius_m, slog, trace_ctx)
+        if missing:
+            fetched = self.fetch(missing, slog)
+            if fetched is None:
+                return None
+            found.update(fetched)
+        return self._assemble(tiles, found, lat, lon, radius_m)
+
+    async def elements_for_circle_async(
+        self,
+        lat: float,
+        lon: float,
+        radius_m: int,
+        slog,
+        trace_ctx: 'AnalysisTraceContext | None' = None,
+    ) -> Optional[List[dict]]:
+        """Asynchroniczny odpowiednik elements_for_circle()."""
+        tiles, found, missing = self._plan(lat, lon, radius_m, slog, trace_ctx)
+        if missing:
+            fetched = await self.fetch_async(missing, slog)
+            if fetched is None:
+                return None
+            found.update(fetched)
+        return self._assemble(tiles, found, lat, lon, radius_m)
+
+    def _plan(self, lat, lon, radius_m, slog, trace_ctx):
+        tiles = self.grid.tiles_for_circle(lat, lon, radius_m)
+        found, missing = self.cached(tiles)
+        if trace_ctx is not None:
+            trace_ctx.summary.record_cache('osm_tiles', hit=not missing, process_totals=self.cache.counters())
+        if missing:
+            slog.debug(stage="geo", provider="overpass", op="tiles_fetch", meta={"tiles": len(tiles), "missing": len(missing)})
+        return tiles, found, missing
+
+    @staticmethod
+    def _assemble(tiles, found, lat, lon, radius_m) -> List[dict]:
+        elements = [elem for tile in tiles for elem in found[tile]]
+        # Kopie tagów: _create_poi i enrichment modyfikują tags w POI
+        return [
+            {**elem, 'tags': dict(elem.get('tags') or {})}
+            for elem in filter_elements_in_circle(elements, lat, lon, radius_m)
+        ]
+
+
+def create_tile_fetcher(client: 'OverpassClient') -> Optional[OverpassTileFetcher]:
+    """Zwraca fetcher kafli gdy tryb kafli jest włączony w AppConfig."""
+    from ..app_config import get_config
+    from ..cache import overpass_tile_cache
+    config = get_config()
+    if not config.overpass_tiles_enabled:
+        return None
+    return OverpassTileFetcher(client, TileGrid(config.overpass_tile_size_m), overpass_tile_cache)
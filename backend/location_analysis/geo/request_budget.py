@@ -0,0 +1,108 @@
+"""
+Równoległe zapytania do płatnych API (Google) z budżetem per analiza.
+
+Zapytania enrichment/fallback jednej analizy idą na wspólną, ograniczoną
+pulę wątków, a `RequestBudget` pilnuje, żeby jedna analiza nie miała
+więcej niż `max_concurrency` zapytań w locie i nie przekraczała `max_qps`.
+Wyniki wracają w kolejności wejścia, więc dalsze przetwarzanie
+(cache, dedup) może być deterministyczne i sekwencyjne.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, List, Optional, Sequence
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_google_executor() -> ThreadPoolExecutor:
+    """
+    Wspólna pula wątków dla zapytań Google (singleton per proces).
+    Osobna od puli etapów — etap geo czeka na te zapytania, więc dzielenie
+    jednej puli mogłoby ją zakleszczyć.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                from ..app_config import get_config
+                config = get_config()
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(1, config.pipeline_max_workers * config.google_max_concurrency),
+                    thread_name_prefix="google-io",
+                )
+    return _executor
+
+
+class RequestBudget:
+    """Limit zapytań w locie i QPS dla jednej analizy. Thread-safe."""
+
+    def __init__(self, max_concurrency: int = 4, max_qps: float = 10.0):
+        self.max_concurrency = max(1, max_concurrency)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._interval = 1.0 / max_qps if max_qps > 0 else 0.0
+        self._next_start = 0.0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self):
+        """Zajmuje miejsce w budżecie na czas jednego zapytania."""
+        with self._slots:
+            self._wait_for_rate()
+            yield
+
+    def _wait_for_rate(self) -> None:
+        if not self._interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self._interval
+        if start > now:
+            time.sleep(start - now)
+
+    @classmethod
+    def from_config(cls) -> 'RequestBudget':
+        from ..app_config import get_config
+        config = get_config()
+        return cls(max_concurrency=config.google_max_concurrency, max_qps=config.google_max_qps)
+
+
+def run_bounded(
+    fn: Callable[..., Any],
+    calls: Sequence[tuple],
+    budget: RequestBudget,
+    executor: Optional[ThreadPoolExecutor] = None,
+) -> List[Any]:
+    """
+    Wywołuje fn(*args) dla każdego args z `calls` równolegle w ramach budżetu.
+
+    Returns:
+        Wyniki w kolejności `calls`; wyjątek wywołania jest zwracany
+        na jego pozycji zamiast wyniku (nie przerywa pozostałych).
+    """
+    if not calls:
+        return []
+
+    def guarded(args):
+        with budget.slot():
+            return fn(*args)
+
+    if len(calls) == 1:
+        # Jedno zapytanie — bez przełączania na pulę
+        try:
+            return [guarded(calls[0])]
+        except Exception as e:
+            return [e]
+
+    pool = executor or get_google_executor()
+    futures = [pool.submit(guarded, args) for args in calls]
+    results: List[Any] = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            results.append(e)
+    return results
@@ -0,0 +1,296 @@
+"""
+Przestrzenny cache odpowiedzi Overpass.
+
+Zwykły cache POI trafia tylko przy identycznym kluczu (centrum zaokrąglone
+do ~11 m + promień). Tu przechowujemy surowe elementy OSM razem z okręgiem,
+z którego pochodzą. Zapytanie, którego okrąg w całości mieści się w okręgu
+z cache (mniejszy promień, sąsiedni blok na tym samym osiedlu), dostaje
+elementy przefiltrowane po dystansie od własnego centrum — dalej ta sama
+klasyfikacja co dla świeżej odpowiedzi, więc POI i metryki zieleni są
+liczone względem nowego centrum.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+# Metry na stopień szerokości geograficznej
+METERS_PER_DEG_LAT = 111320.0
+
+# Rozmiar komórki siatki indeksu (~1.1 km szerokości geograficznej)
+CELL_DEG = 0.01
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Odległość w metrach między dwoma punktami (wzór Haversine)."""
+    R = 6371000
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def haversine_many(lat: float, lon: float, points: List[Tuple[float, float]]) -> List[float]:
+    """
+    Odległości w metrach od (lat, lon) do wielu punktów naraz.
+
+    Ten sam wzór i kolejność działań co haversine_m (wyniki identyczne
+    co do bitu), ale wartości zależne tylko od punktu odniesienia
+    liczone są raz dla całej partii.
+    """
+    R = 6371000
+    radians, sin, cos, sqrt, atan2 = math.radians, math.sin, math.cos, math.sqrt, math.atan2
+    cos_phi1 = cos(radians(lat))
+    result = []
+    for lat2, lon2 in points:
+        dphi = radians(lat2 - lat)
+        dlambda = radians(lon2 - lon)
+        a = sin(dphi / 2) ** 2 + cos_phi1 * cos(radians(lat2)) * sin(dlambda / 2) ** 2
+        result.append(R * 2 * atan2(sqrt(a), sqrt(1 - a)))
+    return result
+
+
+def grid_cell(lat: float, lon: float, cell_deg: float = CELL_DEG) -> Tuple[int, int]:
+    """Komórka siatki stopniowej zawierająca punkt."""
+    return (math.floor(lat / cell_deg), math.floor(lon / cell_deg))
+
+
+def grid_cells_around(lat: float, lon: float, radius_m: float, cell_deg: float = CELL_DEG) -> List[Tuple[int, int]]:
+    """Komórki siatki pokrywające okrąg (lat, lon, radius_m)."""
+    dlat = radius_m / METERS_PER_DEG_LAT
+    dlon = radius_m / (METERS_PER_DEG_LAT * max(math.cos(math.radians(lat)), 0.01))
+    min_cell = grid_cell(lat - dlat, lon - dlon, cell_deg)
+    max_cell = grid_cell(lat + dlat, lon + dlon, cell_deg)
+    return [
+        (i, j)
+        for i in range(min_cell[0], max_cell[0] + 1)
+        for j in range(min_cell[1], max_cell[1] + 1)
+    ]
+
+
+def element_coords(elem: dict) -> Tuple[Optional[float], Optional[float]]:
+    """Współrzędne elementu Overpass (node: lat/lon, way: center)."""
+    elem_lat = elem.get('lat') or elem.get('center', {}).get('lat')
+    elem_lon = elem.get('lon') or elem.get('center', {}).get('lon')
+    return elem_lat, elem_lon
+
+
+def filter_elements_in_circle(
+    elements: List[dict],
+    lat: float,
+    lon: float,
+    radius_m: float,
+) -> List[dict]:
+    """Zostawia elementy, których punkt leży w okręgu (odpowiednik around: w Overpass)."""
+    result = []
+    for elem in elements:
+        elem_lat, elem_lon = element_coords(elem)
+        if not elem_lat or not elem_lon:
+            continue
+        if haversine_m(lat, lon, elem_lat, elem_lon) <= radius_m:
+            result.append(elem)
+    return result
+
+
+def bbox_around_circles(circles: Sequence[Tuple[float, float, float]]) -> Tuple[float, float, float, float]:
+    """(south, west, north, east) obejmujący okręgi (lat, lon, radius_m)."""
+    south = west = math.inf
+    north = east = -math.inf
+    for lat, lon, radius_m in circles:
+        dlat = radius_m / METERS_PER_DEG_LAT
+        dlon = radius_m / (METERS_PER_DEG_LAT * max(math.cos(math.radians(lat)), 0.01))
+        south, north = min(south, lat - dlat), max(north, lat + dlat)
+        west, east = min(west, lon - dlon), max(east, lon + dlon)
+    return south, west, north, east
+
+
+def cluster_points(points: Sequence[Tuple[float, float]], span_m: float) -> List[List[int]]:
+    """
+    Grupuje punkty w klastry o rozpiętości ~span_m (komórki siatki o boku
+    span_m). Zwraca listy indeksów punktów, w kolejności pierwszego
+    wystąpienia komórki.
+    """
+    cell_lat = span_m / METERS_PER_DEG_LAT
+    clusters: Dict[Tuple[int, int], List[int]] = {}
+    for index, (lat, lon) in enumerate(points):
+        cell_lon = span_m / (METERS_PER_DEG_LAT * max(math.cos(math.radians(lat)), 0.01))
+        cell = (math.floor(lat / cell_lat), math.floor(lon / cell_lon))
+        clusters.setdefault(cell, []).append(index)
+    return list(clusters.values())
+
+
+@dataclass
+class CoveredArea:
+    """Okrąg pobrany z Overpass wraz z elementami."""
+    lat: float
+    lon: float
+    radius_m: float
+    elements: List[dict]
+    expires_at: float
+    fresh_until: float = math.inf
+    size: int = 0
+
+    def contains(self, lat: float, lon: float, radius_m: float) -> bool:
+        """Czy okrąg (lat, lon, radius_m) mieści się w całości w tym obszarze."""
+        return haversine_m(self.lat, self.lon, lat, lon) + radius_m <= self.radius_m
+
+
+class SpatialElementCache:
+    """
+    Cache elementów OSM per pokryty okrąg, z eksmisją LRU i TTL.
+    Thread-safe, per proces. Limit liczby obszarów (`max_entries`)
+    i opcjonalny limit pamięci (`max_bytes`, wg estimate_size).
+
+    Indeks: siatka komórek CELL_DEG — obszar jest rejestrowany w każdej
+    komórce, którą przecina jego bbox. Okrąg zawierający zapytanie musi
+    pokrywać jego centrum, więc wystarczy sprawdzić komórkę centrum.
+    """
+
+    def __init__(
+        self,
+        ttl: int = 604800,
+        max_entries: int = 64,
+        margin_m: int = 0,
+        soft_ttl: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        self._ttl = ttl
+        self._soft_ttl = soft_ttl or None
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._bytes = 0
+        self.margin_m = margin_m
+        self._areas: "OrderedDict[int, CoveredArea]" = OrderedDict()
+        self._cells: Dict[Tuple[int, int], Set[int]] = {}
+        self._next_id = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Czy cache jest włączony (max_entries > 0)."""
+        return self._max_entries > 0
+
+    def lookup(self, lat: float, lon: float, radius_m: float) -> Optional[List[dict]]:
+        """
+        Zwraca elementy z okręgu (lat, lon, radius_m) jeśli jakiś obszar
+        w cache go pokrywa, w przeciwnym razie None. Przy odświeżaniu
+        w tle (refresh_scope) obszary po soft TTL są pomijane.
+        """
+        from ..cache import in_refresh_scope
+        now = time.time()
+        refreshing = in_refresh_scope()
+        with self._lock:
+            area = None
+            for area_id in list(self._cells.get(self._cell(lat, lon), ())):
+                candidate = self._areas[area_id]
+                if now > candidate.expires_at:
+                    self._remove(area_id)
+                    continue
+                if refreshing and now > candidate.fresh_until:
+                    continue
+                if candidate.contains(lat, lon, radius_m):
+                    self._areas.move_to_end(area_id)
+                    area = candidate
+                    break
+
+            if area is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            elements = area.elements
+
+        # Kopie tagów: _create_poi i enrichment modyfikują tags w POI
+        return [
+            {**elem, 'tags': dict(elem.get('tags') or {})}
+            for elem in filter_elements_in_circle(elements, lat, lon, radius_m)
+        ]
+
+    def store(self, lat: float, lon: float, radius_m: float, elements: List[dict]) -> None:
+        """Zapisuje elementy pobrane dla okręgu (lat, lon, radius_m)."""
+        from ..cache import estimate_size
+        now = time.time()
+        area = CoveredArea(
+            lat=lat,
+            lon=lon,
+            radius_m=radius_m,
+            elements=[{**elem, 'tags': dict(elem.get('tags') or {})} for elem in elements],
+            expires_at=now + self._ttl,
+            fresh_until=now + self._soft_ttl if self._soft_ttl else math.inf,
+        )
+        area.size = estimate_size(area.elements)
+        with self._lock:
+            area_id = self._next_id
+            self._next_id += 1
+            self._areas[area_id] = area
+            self._bytes += area.size
+            for cell in self._cells_for(lat, lon, radius_m):
+                self._cells.setdefault(cell, set()).add(area_id)
+
+            while len(self._areas) > self._max_entries or (
+                self._max_bytes is not None and self._bytes > self._max_bytes and len(self._areas) > 1
+            ):
+                oldest_id = next(iter(self._areas))
+                self._remove(oldest_id)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._areas.clear()
+            self._cells.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._areas)
+
+    def stats(self) -> Dict[str, int]:
+        """Liczniki hits/misses/evictions (per proces), liczba obszarów i zajętość w bajtach."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(self._areas),
+            'bytes': self._bytes,
+        }
+
+    def _remove(self, area_id: int) -> None:
+        area = self._areas.pop(area_id)
+        self._bytes -= area.size
+        for cell in self._cells_for(area.lat, area.lon, area.radius_m):
+            ids = self._cells.get(cell)
+            if ids is not None:
+                ids.discard(area_id)
+                if not ids:
+                    del self._cells[cell]
+
+    @staticmethod
+    def _cell(lat: float, lon: float) -> Tuple[int, int]:
+        return grid_cell(lat, lon)
+
+    @staticmethod
+    def _cells_for(lat: float, lon: float, radius_m: float) -> List[Tuple[int, int]]:
+        return grid_cells_around(lat, lon, radius_m)
+
+
+def _create_area_cache() -> SpatialElementCache:
+    try:
+        from ..app_config import get_config
+        config = get_config()
+        return SpatialElementCache(
+            ttl=config.cache_ttl_pois,
+            max_entries=config.poi_area_cache_max_entries,
+            margin_m=config.poi_area_cache_margin_m,
+            soft_ttl=config.cache_soft_ttl_pois,
+            max_bytes=config.poi_area_cache_max_mb * 1024 * 1024,
+        )
+    except Exception:
+        return SpatialElementCache()
+
+
+overpass_area_cache = _create_area_cache()
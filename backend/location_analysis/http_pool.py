@@ -0,0 +1,153 @@
+"""
+Współdzielona warstwa wychodzącego HTTP (requests) z pulą połączeń.
+
+Jedna requests.Session na proces: pule połączeń per host (keep-alive),
+rozmiary pul i timeout połączenia z AppConfig (HTTP_POOL_*, HTTP_*_TIMEOUT).
+Seria zapytań enrichment Google czy retry Overpass używa już otwartego
+połączenia TCP+TLS zamiast robić handshake od nowa.
+
+Każdy request jest mierzony per host (czas, czy otworzył nowe połączenie);
+z trace_ctx trafia do AnalysisSummary, bez niego tylko do liczników procesu.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, TYPE_CHECKING
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+if TYPE_CHECKING:
+    from .diagnostics import AnalysisTraceContext
+
+# Flaga per wątek: czy bieżący request otworzył nowe połączenie
+_tracker = threading.local()
+
+
+class _TrackingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        _tracker.new_connection = True
+        return super()._new_conn()
+
+
+class _TrackingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        _tracker.new_connection = True
+        return super()._new_conn()
+
+
+class _TrackingAdapter(HTTPAdapter):
+    """HTTPAdapter, którego pule zgłaszają otwarcie nowego połączenia."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TrackingHTTPConnectionPool,
+            'https': _TrackingHTTPSConnectionPool,
+        }
+
+
+@dataclass
+class HostPoolStats:
+    """Liczniki per host (per proces)."""
+    requests: int = 0
+    new_connections: int = 0
+    errors: int = 0
+    total_ms: float = 0.0
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            'requests': self.requests,
+            'new_connections': self.new_connections,
+            'reused': self.requests - self.new_connections,
+            'errors': self.errors,
+            'avg_ms': round(self.total_ms / self.requests, 1) if self.requests else 0.0,
+        }
+
+
+class HTTPPool:
+    """
+    Sesja HTTP z pulą połączeń per host, współdzielona między wątkami
+    (pule urllib3 są thread-safe; nagłówki podaje każdy wywołujący).
+
+    `timeout` wywołującego to timeout odczytu; timeout połączenia
+    jest wspólny (connect_timeout).
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 16,
+        pool_maxsize: int = 32,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+    ):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.session = requests.Session()
+        adapter = _TrackingAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._stats: Dict[str, HostPoolStats] = {}
+        self._lock = threading.Lock()
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        trace_ctx: 'AnalysisTraceContext | None' = None,
+        **kwargs,
+    ) -> requests.Response:
+        timeout = kwargs.pop('timeout', None)
+        if not isinstance(timeout, tuple):
+            timeout = (self.connect_timeout, timeout or self.read_timeout)
+
+        host = urlsplit(url).hostname or 'unknown'
+        _tracker.new_connection = False
+        started = time.monotonic()
+        failed = True
+        try:
+            response = self.session.request(method, url, timeout=timeout, **kwargs)
+            failed = False
+            return response
+        finally:
+            self._record(host, (time.monotonic() - started) * 1000, _tracker.new_connection, failed, trace_ctx)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Liczniki per host od startu procesu."""
+        with self._lock:
+            return {host: stats.to_dict() for host, stats in self._stats.items()}
+
+    def _record(self, host, duration_ms, new_connection, failed, trace_ctx) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(host, HostPoolStats())
+            stats.requests += 1
+            stats.new_connections += int(new_connection)
+            stats.errors += int(failed)
+            stats.total_ms += duration_ms
+        if trace_ctx is not None:
+            trace_ctx.summary.record_http(host, duration_ms, reused=not new_connection)
+
+
+def _create_http_pool() -> HTTPPool:
+    try:
+        from .app_config import get_config
+        config = get_config()
+        return HTTPPool(
+            pool_connections=config.http_pool_connections,
+            pool_maxsize=config.http_pool_maxsize,
+            connect_timeout=config.http_connect_timeout,
+            read_timeout=config.http_read_timeout,
+        )
+    except Exception:
+        return HTTPPool()
+
+
+http_pool = _create_http_pool()
@@ -0,0 +1,55 @@
+"""
+Buduje lokalny indeks przestrzenny OSM (tryb OVERPASS_MODE=index).
+
+Usage:
+    python manage.py build_osm_index poland.osm.pbf --output osm_index.sqlite
+    python manage.py build_osm_index dump.json --output osm_index.sqlite
+
+Wejście .osm.pbf wymaga opcjonalnego pakietu `osmium` (pyosmium).
+Wejście .json to odpowiedź Overpass w formacie `[out:json] ... out center;`.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from location_analysis.app_config import get_config
+from location_analysis.geo.osm_index_client import (
+    OSMSpatialIndex,
+    iter_osm_pbf,
+    iter_overpass_json,
+)
+
+
+class Command(BaseCommand):
+    help = "Konwertuje wyciąg OSM (.osm.pbf lub Overpass JSON) do pliku indeksu R-tree."
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="Plik .osm.pbf lub Overpass JSON")
+        parser.add_argument(
+            '--output',
+            default=None,
+            help="Ścieżka pliku indeksu (domyślnie OSM_INDEX_PATH z konfiguracji)",
+        )
+
+    def handle(self, *args, **options):
+        source = options['source']
+        output = options['output'] or get_config().osm_index_path
+        if not output:
+            raise CommandError("Podaj --output albo ustaw OSM_INDEX_PATH.")
+
+        if source.endswith('.pbf'):
+            try:
+                import osmium  # noqa: F401
+            except ImportError:
+                raise CommandError("Import .osm.pbf wymaga pakietu 'osmium' (pip install osmium).")
+            elements = iter_osm_pbf(source)
+        else:
+            elements = iter_overpass_json(source)
+
+        started = time.monotonic()
+        count = OSMSpatialIndex.build(output, elements, source=source)
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Zapisano {count} elementów do {output} ({elapsed:.1f}s)"
+        ))
@@ -0,0 +1,98 @@
+"""
+Rozgrzewa cache kafli Overpass (tryb OVERPASS_TILES_ENABLED) dla obszaru.
+
+Usage:
+    python manage.py prewarm_tiles --bbox 52.09,20.85,52.37,21.27
+    python manage.py prewarm_tiles --center 50.0614,19.9366 --radius 6000
+
+Kafle muszą trafić do cache współdzielonego z workerami aplikacji,
+dlatego komenda wymaga POI_CACHE_BACKEND=sqlite (+ POI_CACHE_PATH).
+Już zcache'owane kafle są pomijane (chyba że --force).
+"""
+import math
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from location_analysis.app_config import get_config
+from location_analysis.cache import overpass_tile_cache
+from location_analysis.diagnostics import AnalysisTraceContext, get_diag_logger
+from location_analysis.geo.overpass_client import OverpassClient
+from location_analysis.geo.overpass_tiles import OverpassTileFetcher, TileGrid
+from location_analysis.geo.spatial_cache import METERS_PER_DEG_LAT
+
+
+def _parse_floats(value: str, count: int, name: str):
+    try:
+        parts = [float(p) for p in value.split(',')]
+    except ValueError:
+        parts = []
+    if len(parts) != count:
+        raise CommandError(f"Niepoprawny format {name}: {value!r}")
+    return parts
+
+
+class Command(BaseCommand):
+    help = "Pobiera z wyprzedzeniem kafle POI z Overpass dla obszaru (bbox albo okrąg)."
+
+    def add_arguments(self, parser):
+        area = parser.add_mutually_exclusive_group(required=True)
+        area.add_argument('--bbox', help="south,west,north,east")
+        area.add_argument('--center', help="lat,lon (razem z --radius)")
+        parser.add_argument('--radius', type=int, default=5000, help="Promień w metrach dla --center")
+        parser.add_argument('--block', type=int, default=4, help="Bok bloku kafli pobieranego jednym zapytaniem")
+        parser.add_argument('--delay', type=float, default=1.0, help="Przerwa między zapytaniami (s)")
+        parser.add_argument('--force', action='store_true', help="Pobierz także kafle obecne w cache")
+
+    def handle(self, *args, **options):
+        config = get_config()
+        if config.poi_cache_backend != 'sqlite' or not config.poi_cache_path:
+            raise CommandError(
+                "Rozgrzewanie wymaga współdzielonego cache: ustaw POI_CACHE_BACKEND=sqlite i POI_CACHE_PATH."
+            )
+        if not config.overpass_tiles_enabled:
+            self.stderr.write(self.style.WARNING(
+                "OVERPASS_TILES_ENABLED=false — aplikacja nie użyje kafli, dopóki tryb nie zostanie włączony."
+            ))
+
+        if options['bbox']:
+            south, west, north, east = _parse_floats(options['bbox'], 4, '--bbox')
+        else:
+            lat, lon = _parse_floats(options['center'], 2, '--center')
+            dlat = options['radius'] / METERS_PER_DEG_LAT
+            dlon = options['radius'] / (METERS_PER_DEG_LAT * max(math.cos(math.radians(lat)), 0.01))
+            south, west, north, east = lat - dlat, lon - dlon, lat + dlat, lon + dlon
+
+        grid = TileGrid(config.overpass_tile_size_m)
+        fetcher = OverpassTileFetcher(OverpassClient(), grid, overpass_tile_cache)
+        slog = get_diag_logger(__name__, AnalysisTraceContext())
+
+        tiles = grid.tiles_for_bbox(south, west, north, east)
+        if options['force']:
+            missing = tiles
+        else:
+            _, missing = fetcher.cached(tiles)
+        self.stdout.write(f"Kafli w obszarze: {len(tiles)}, do pobrania: {len(missing)}")
+
+        # Bloki block×block kafli — jedno zapytanie bbox na blok
+        block = max(1, options['block'])
+        blocks = defaultdict(list)
+        for row, col in missing:
+            blocks[(row // block, col // block)].append((row, col))
+
+        started = time.monotonic()
+        fetched = failed = 0
+        for i, block_tiles in enumerate(blocks.values()):
+            if i and options['delay']:
+                time.sleep(options['delay'])
+            if fetcher.fetch(block_tiles, slog) is None:
+                failed += len(block_tiles)
+            else:
+                fetched += len(block_tiles)
+        elapsed = time.monotonic() - started
+
+        style = self.style.SUCCESS if not failed else self.style.WARNING
+        self.stdout.write(style(
+            f"Pobrano {fetched} kafli w {len(blocks)} zapytaniach, błędy: {failed} ({elapsed:.1f}s)"
+        ))
@@ -0,0 +1,292 @@
+"""
+Scoring offline dużego zbioru lokalizacji (CSV/Parquet) w puli procesów.
+
+Usage:
+    python manage.py score_locations listings.csv --output scores.csv
+    python manage.py score_locations listings.parquet --output scores.parquet --workers 4
+    python manage.py score_locations listings.csv --output scores.csv --resume
+
+Wejście: kolumny latitude/lat, longitude/lon/lng; opcjonalnie id, price,
+area_sqm, profile_key (domyślnie --profile). Wiersze są grupowane w klastry
+sąsiednich punktów (jak /api/analyze-batch/) — jeden klaster to jedno
+zapytanie o POI i scoring każdej pozycji w procesie roboczym.
+
+Bez AI i bez zapisu do bazy — wynik trafia wyłącznie do pliku. Wyniki są
+dopisywane do pliku kontrolnego (CSV) po każdej paczce; --resume pomija
+wiersze policzone bez błędu, a wiersze z błędem (np. awaria Overpass)
+liczy ponownie. Parquet wymaga pakietu pyarrow.
+"""
+import csv
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from django.core.management.base import BaseCommand, CommandError
+
+from location_analysis.scoring.profile_engine import CATEGORY_NAMES_PL
+from location_analysis.serializers import PROFILE_KEY_CHOICES
+
+LAT_COLUMNS = ('latitude', 'lat')
+LON_COLUMNS = ('longitude', 'lon', 'lng')
+
+OUTPUT_COLUMNS = [
+    'row', 'id', 'latitude', 'longitude', 'profile_key', 'price', 'area_sqm', 'price_per_sqm',
+    'total_score', 'verdict', 'verdict_label', 'fetch_radius',
+] + [f'score_{cat}' for cat in CATEGORY_NAMES_PL] + ['error']
+
+# Serwis analizy — jeden na proces roboczy
+_service = None
+
+
+def _init_worker():
+    """Inicjalizacja procesu roboczego (przy starcie 'spawn' Django nie jest gotowe)."""
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project_config.settings')
+        django.setup()
+
+
+def _score_chunk(items: List[Dict[str, Any]], radius: Optional[int]) -> List[tuple]:
+    """Scoring paczki sąsiednich wierszy w procesie roboczym."""
+    global _service
+    if _service is None:
+        from location_analysis.services import AnalysisService
+        _service = AnalysisService()
+    return _service._score_batch_cluster(items, list(range(len(items))), radius)
+
+
+def _require_pyarrow(path: str):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise CommandError(f"Parquet ({path}) wymaga pakietu 'pyarrow' (pip install pyarrow).")
+    return pq
+
+
+def _is_parquet(path: str) -> bool:
+    return path.lower().endswith(('.parquet', '.pq'))
+
+
+def _read_rows(path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        raise CommandError(f"Plik nie istnieje: {path}")
+    if _is_parquet(path):
+        return _require_pyarrow(path).read_table(path).to_pylist()
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        return list(csv.DictReader(f))
+
+
+def _column(row: Dict[str, Any], names: Tuple[str, ...]) -> Any:
+    for name in names:
+        if row.get(name) not in (None, ''):
+            return row[name]
+    return None
+
+
+def _optional_float(value: Any) -> Optional[float]:
+    if value in (None, ''):
+        return None
+    return float(value)
+
+
+def _to_item(row: Dict[str, Any], default_profile: str, profiles: Set[str]) -> Dict[str, Any]:
+    """Wiersz wejścia -> pozycja partii. ValueError z opisem dla błędnych danych."""
+    lat, lon = _column(row, LAT_COLUMNS), _column(row, LON_COLUMNS)
+    if lat is None or lon is None:
+        raise ValueError("Brak współrzędnych.")
+    lat, lon = float(lat), float(lon)
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError("Współrzędne poza zakresem.")
+    profile_key = row.get('profile_key') or default_profile
+    if profile_key not in profiles:
+        raise ValueError(f"Nieznany profil: {profile_key}")
+    return {
+        'latitude': lat,
+        'longitude': lon,
+        'profile_key': profile_key,
+        'price': _optional_float(row.get('price')),
+        'area_sqm': _optional_float(row.get('area_sqm')),
+    }
+
+
+def _output_row(index: int, row: Dict[str, Any], item: Optional[Dict[str, Any]],
+                result: Optional[Dict[str, Any]], error: Optional[str]) -> Dict[str, Any]:
+    out = {
+        'row': index,
+        'id': row.get('id', ''),
+        'latitude': item['latitude'] if item else _column(row, LAT_COLUMNS),
+        'longitude': item['longitude'] if item else _column(row, LON_COLUMNS),
+        'profile_key': item['profile_key'] if item else row.get('profile_key', ''),
+        'price': item['price'] if item else row.get('price', ''),
+        'area_sqm': item['area_sqm'] if item else row.get('area_sqm', ''),
+        'error': error or '',
+    }
+    if result is not None:
+        out.update({
+            'price_per_sqm': result['price_per_sqm'],
+            'total_score': result['total_score'],
+            'verdict': result['verdict']['level'],
+            'verdict_label': result['verdict']['label'],
+            'fetch_radius': result['fetch_radius'],
+        })
+        for cat, score in result['category_scores'].items():
+            out[f'score_{cat}'] = score
+    return {col: ('' if out.get(col) is None else out.get(col, '')) for col in OUTPUT_COLUMNS}
+
+
+def _done_rows(checkpoint_path: str) -> Set[int]:
+    """
+    Wiersze policzone bez błędu. Plik kontrolny jest przepisywany bez
+    wierszy z błędem — ponowna próba dopisze je od nowa, bez duplikatów.
+    """
+    if not os.path.exists(checkpoint_path):
+        return set()
+    with open(checkpoint_path, newline='', encoding='utf-8') as f:
+        records = [r for r in csv.DictReader(f) if r.get('row', '').isdigit() and not r.get('error')]
+    with open(checkpoint_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=OUTPUT_COLUMNS)
+        writer.writeheader()
+        writer.writerows({col: r.get(col, '') for col in OUTPUT_COLUMNS} for r in records)
+    return {int(r['row']) for r in records}
+
+
+class Command(BaseCommand):
+    help = "Scoring offline lokalizacji z pliku CSV/Parquet (bez AI i zapisu do bazy), w puli procesów."
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help="Plik wejściowy .csv albo .parquet")
+        parser.add_argument('--output', required=True, help="Plik wynikowy .csv albo .parquet")
+        parser.add_argument('--profile', default='family', choices=[key for key, _ in PROFILE_KEY_CHOICES],
+                            help="Profil dla wierszy bez kolumny profile_key")
+        parser.add_argument('--radius', type=int, default=None, help="Promień pobierania POI (m); domyślnie z profilu")
+        parser.add_argument('--workers', type=int, default=2,
+                            help="Liczba procesów roboczych (0 = w bieżącym procesie)")
+        parser.add_argument('--chunk', type=int, default=50, help="Maks. liczba wierszy w jednym zadaniu")
+        parser.add_argument('--resume', action='store_true', help="Pomiń wiersze obecne w pliku kontrolnym")
+
+    def handle(self, *args, **options):
+        from location_analysis.app_config import get_config
+        from location_analysis.geo.spatial_cache import cluster_points
+
+        output = options['output']
+        if _is_parquet(output):
+            _require_pyarrow(output)
+            checkpoint = output + '.partial.csv'
+        else:
+            checkpoint = output
+        if not options['resume'] and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        rows = _read_rows(options['input'])
+        done = _done_rows(checkpoint) if options['resume'] else set()
+        profiles = {key for key, _ in PROFILE_KEY_CHOICES}
+
+        write_header = not os.path.exists(checkpoint)
+        out_file = open(checkpoint, 'a', newline='', encoding='utf-8')
+        writer = csv.DictWriter(out_file, fieldnames=OUTPUT_COLUMNS)
+        if write_header:
+            writer.writeheader()
+
+        # Błędne wiersze od razu do wyniku; poprawne — do klastrów
+        todo: List[int] = []
+        items: Dict[int, Dict[str, Any]] = {}
+        invalid = 0
+        for index, row in enumerate(rows):
+            if index in done:
+                continue
+            try:
+                items[index] = _to_item(row, options['profile'], profiles)
+                todo.append(index)
+            except (TypeError, ValueError) as e:
+                writer.writerow(_output_row(index, row, None, None, str(e)))
+                invalid += 1
+
+        chunk = max(1, options['chunk'])
+        span_m = get_config().batch_cluster_span_m
+        tasks: List[List[int]] = []
+        for cluster in cluster_points([(items[i]['latitude'], items[i]['longitude']) for i in todo], span_m):
+            indexes = [todo[i] for i in cluster]
+            tasks.extend(indexes[start:start + chunk] for start in range(0, len(indexes), chunk))
+
+        self.stdout.write(
+            f"Wierszy: {len(rows)}, już policzonych: {len(done)}, błędnych: {invalid}, "
+            f"do scoringu: {len(todo)} w {len(tasks)} zadaniach"
+        )
+
+        started = time.monotonic()
+        scored = failed = 0
+        try:
+            for indexes, outcomes in self._run(tasks, items, options):
+                for local, result, error in outcomes:
+                    index = indexes[local]
+                    writer.writerow(_output_row(index, rows[index], items[index], result, error))
+                    if error:
+                        failed += 1
+                    else:
+                        scored += 1
+                out_file.flush()
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"  {scored + failed}/{len(todo)} ({(scored + failed) / max(elapsed, 1e-6):.1f} wierszy/s)"
+                )
+        finally:
+            out_file.close()
+
+        if checkpoint != output:
+            self._write_parquet(checkpoint, output)
+            os.remove(checkpoint)
+
+        elapsed = time.monotonic() - started
+        rate = (scored + failed) / elapsed if elapsed > 0 else 0.0
+        style = self.style.SUCCESS if not failed and not invalid else self.style.WARNING
+        self.stdout.write(style(
+            f"Policzono {scored} wierszy, błędy: {failed + invalid} ({elapsed:.1f}s, {rate:.1f} wierszy/s) -> {output}"
+        ))
+
+    def _run(self, tasks: List[List[int]], items: Dict[int, Dict[str, Any]], options):
+        """Zwraca (indeksy wierszy, wyniki) w kolejności ukończenia zadań."""
+        radius = options['radius']
+        if options['workers'] <= 0:
+            for indexes in tasks:
+                yield indexes, _score_chunk([items[i] for i in indexes], radius)
+            return
+
+        from django.db import connections
+        # Procesy potomne nie mogą dzielić połączeń z rodzicem
+        connections.close_all()
+        workers = options['workers']
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            queue = list(reversed(tasks))
+            pending = {}
+            while queue or pending:
+                # Ograniczone okno — nie serializujemy całego wejścia naraz
+                while queue and len(pending) < 2 * workers:
+                    indexes = queue.pop()
+                    pending[pool.submit(_score_chunk, [items[i] for i in indexes], radius)] = indexes
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    indexes = pending.pop(future)
+                    try:
+                        yield indexes, future.result()
+                    except Exception as e:
+                        yield indexes, [(local, None, str(e)) for local in range(len(indexes))]
+
+    @staticmethod
+    def _write_parquet(checkpoint: str, output: str):
+        pq = _require_pyarrow(output)
+        import pyarrow as pa
+
+        with open(checkpoint, newline='', encoding='utf-8') as f:
+            records = sorted(csv.DictReader(f), key=lambda r: int(r['row']))
+        numeric = {'row', 'latitude', 'longitude', 'price', 'area_sqm', 'price_per_sqm', 'total_score', 'fetch_radius'}
+        numeric.update(col for col in OUTPUT_COLUMNS if col.startswith('score_'))
+        columns = {}
+        for col in OUTPUT_COLUMNS:
+            values = [r.get(col, '') for r in records]
+            if col in numeric:
+                columns[col] = [float(v) if v not in ('', None) else None for v in values]
+            else:
+                columns[col] = values
+        pq.write_table(pa.table(columns), output)
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.10 on 2026-10-17 04:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location_analysis', '0006_locationanalysis_rescore_count_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='locationanalysis',
+            name='rescore_limit',
+        ),
+        migrations.AddField(
+            model_name='locationanalysis',
+            name='profile_results',
+            field=models.JSONField(blank=True, default=dict, help_text='Wyniki per profil: {profile_key: {profile_config_version, scoring, verdict, ai_insights}}'),
+        ),
+    ]
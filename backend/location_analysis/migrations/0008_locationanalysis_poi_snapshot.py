@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-17 04:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location_analysis', '0007_profile_results_drop_rescore_limit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='locationanalysis',
+            name='poi_snapshot',
+            field=models.JSONField(blank=True, default=dict, help_text='Kolumnowy snapshot wejścia scoringu (POI, quiet_score, nature) do dokładnego rescoringu'),
+        ),
+    ]
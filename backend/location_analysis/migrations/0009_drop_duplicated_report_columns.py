@@ -0,0 +1,46 @@
+# Generated by Django 5.2.10 on 2026-10-17 04:51
+
+from django.db import migrations
+
+
+def slim_report_data(apps, schema_editor):
+    """Usuwa z report_data części trzymane w osobnych kolumnach (jak report_storage.split_report)."""
+    LocationAnalysis = apps.get_model('location_analysis', 'LocationAnalysis')
+    rows = LocationAnalysis.objects.only('id', 'report_data', 'neighborhood_data', 'checklist')
+    for analysis in rows.iterator(chunk_size=200):
+        report = dict(analysis.report_data or {})
+        if not report:
+            continue
+        report.pop('listing', None)
+        report.pop('public_id', None)
+        checklist = report.pop('checklist', None)
+        neighborhood = dict(report.get('neighborhood') or {})
+        details = neighborhood.pop('details', None)
+        report['neighborhood'] = neighborhood
+        if report == analysis.report_data:
+            continue
+        analysis.report_data = report
+        if details and not analysis.neighborhood_data:
+            analysis.neighborhood_data = details
+        if checklist and not analysis.checklist:
+            analysis.checklist = checklist
+        analysis.save(update_fields=['report_data', 'neighborhood_data', 'checklist'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location_analysis', '0008_locationanalysis_poi_snapshot'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='locationanalysis',
+            name='category_scores',
+        ),
+        migrations.RemoveField(
+            model_name='locationanalysis',
+            name='scoring_debug',
+        ),
+        migrations.RunPython(slim_report_data, migrations.RunPython.noop),
+    ]
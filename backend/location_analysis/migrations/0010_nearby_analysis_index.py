@@ -0,0 +1,52 @@
+# Generated by Django 5.2.10 on 2026-10-17 05:20
+
+import math
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+# Jak models.GEO_CELL_DEG — migracja nie importuje kodu aplikacji
+GEO_CELL_DEG = 0.001
+
+
+def fill_geo_cells(apps, schema_editor):
+    """geo_cell dla istniejących analiz; updated_at = created_at."""
+    LocationAnalysis = apps.get_model('location_analysis', 'LocationAnalysis')
+    LocationAnalysis.objects.update(updated_at=F('created_at'))
+    rows = LocationAnalysis.objects.filter(latitude__isnull=False, longitude__isnull=False)
+    batch = []
+    for analysis in rows.only('id', 'latitude', 'longitude').iterator(chunk_size=500):
+        analysis.geo_cell = f"{math.floor(analysis.latitude / GEO_CELL_DEG)}:{math.floor(analysis.longitude / GEO_CELL_DEG)}"
+        batch.append(analysis)
+        if len(batch) >= 500:
+            LocationAnalysis.objects.bulk_update(batch, ['geo_cell'])
+            batch = []
+    if batch:
+        LocationAnalysis.objects.bulk_update(batch, ['geo_cell'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location_analysis', '0009_drop_duplicated_report_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='locationanalysis',
+            name='geo_cell',
+            field=models.CharField(blank=True, default='', help_text='Komórka siatki ~110 m (lat:lon) — wyszukiwanie analiz w pobliżu', max_length=24),
+        ),
+        migrations.AddField(
+            model_name='locationanalysis',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_geo_cells, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='locationanalysis',
+            index=models.Index(fields=['geo_cell', 'updated_at'], name='analysis_geo_cell_recent'),
+        ),
+    ]
@@ -4,6 +4,56 @@ Model przechowujący wyniki analizy lokalizacji.
 from django.db import models
 import hashlib
 import secrets
+from datetime import timedelta
+from typing import List, Optional
+
+# Rozmiar komórki siatki geo_cell (~110 m szerokości geograficznej)
+GEO_CELL_DEG = 0.001
+
+
+class LocationAnalysisQuerySet(models.QuerySet):
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """bulk_create nie woła save() — public_id i geo_cell nadawane tutaj."""
+        objs = list(objs)
+        for obj in objs:
+            obj.assign_generated_fields()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def find_recent_near(
+        self,
+        lat: float,
+        lon: float,
+        max_m: float,
+        profile_key: Optional[str] = None,
+        max_age: Optional[int] = None,
+    ) -> List['LocationAnalysis']:
+        """
+        Analizy w promieniu max_m od punktu, najbliższe pierwsze.
+
+        Kandydaci z indeksu (geo_cell, updated_at) — komórki pokrywające
+        okrąg — potem dokładny dystans Haversine. profile_key to profil,
+        dla którego policzono analizę (scoring_data), nie aktywny po rescore.
+        max_age w sekundach od ostatniego zapisu analizy. Każdy wynik ma
+        atrybut distance_m.
+        """
+        from django.utils import timezone
+        from .geo.spatial_cache import grid_cells_around, haversine_m
+
+        cells = [f"{i}:{j}" for i, j in grid_cells_around(lat, lon, max_m, GEO_CELL_DEG)]
+        candidates = self.filter(geo_cell__in=cells)
+        if profile_key:
+            candidates = candidates.filter(scoring_data__profile_key=profile_key)
+        if max_age is not None:
+            candidates = candidates.filter(updated_at__gte=timezone.now() - timedelta(seconds=max_age))
+
+        nearby = []
+        for analysis in candidates.order_by('-updated_at'):
+            analysis.distance_m = haversine_m(lat, lon, analysis.latitude, analysis.longitude)
+            if analysis.distance_m <= max_m:
+                nearby.append(analysis)
+        nearby.sort(key=lambda analysis: analysis.distance_m)
+        return nearby
 
 
 class LocationAnalysis(models.Model):
@@ -14,6 +64,8 @@ class LocationAnalysis(models.Model):
     # Publiczny identyfikator - hash do URL (auto-generowany)
     public_id = models.CharField(max_length=32, unique=True, db_index=True, blank=True)
     
+    objects = LocationAnalysisQuerySet.as_manager()
+    
     # Identyfikacja - URL opcjonalny (location-first model)
     url = models.URLField(max_length=2048, blank=True, db_index=True)
     url_hash = models.CharField(max_length=64, unique=True, db_index=True)
@@ -33,6 +85,12 @@ class LocationAnalysis(models.Model):
     latitude = models.FloatField(null=True, blank=True, db_index=True)
     longitude = models.FloatField(null=True, blank=True, db_index=True)
     has_precise_location = models.BooleanField(default=False)
+    geo_cell = models.CharField(
+        max_length=24,
+        blank=True,
+        default='',
+        help_text="Komórka siatki ~110 m (lat:lon) — wyszukiwanie analiz w pobliżu"
+    )
     
     # Wyniki analizy okolicy
     neighborhood_data = models.JSONField(default=dict, blank=True)
@@ -78,16 +136,6 @@ class LocationAnalysis(models.Model):
         blank=True,
         help_text="Wynik scoringu z dynamicznymi wagami"
     )
-    category_scores = models.JSONField(
-        default=dict,
-        blank=True,
-        help_text="Scores per kategoria z pełnym breakdown (nature_place, nature_background, etc.)"
-    )
-    scoring_debug = models.JSONField(
-        default=dict,
-        blank=True,
-        help_text="Debug info: wkłady, promienie, krzywe spadku (tylko dev)"
-    )
     verdict_data = models.JSONField(
         default=dict, 
         blank=True,
@@ -109,15 +157,26 @@ class LocationAnalysis(models.Model):
         default=0,
         help_text="Ile razy zmieniono profil na tym raporcie"
     )
-    rescore_limit = models.IntegerField(
-        default=3,
-        help_text="Maksymalna liczba zmian profilu per raport"
+    profile_results = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Wyniki per profil: {profile_key: {profile_config_version, scoring, verdict, ai_insights}}"
+    )
+    poi_snapshot = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Kolumnowy snapshot wejścia scoringu (POI, quiet_score, nature) do dokładnego rescoringu"
     )
     
     created_at = models.DateTimeField(auto_now_add=True)
+    # Ostatni pełny zapis analizy (update_or_create nadpisuje wiersz tej samej lokalizacji)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['geo_cell', 'updated_at'], name='analysis_geo_cell_recent'),
+        ]
         verbose_name = 'Analiza Lokalizacji'
         verbose_name_plural = 'Analizy Lokalizacji'
     
@@ -141,24 +200,35 @@ class LocationAnalysis(models.Model):
     
     @classmethod
     def generate_public_id(cls) -> str:
-        """Generate unique public ID for shareable URLs."""
-        return secrets.token_urlsafe(16)[:24]  # 24 chars - short but unique
+        """
+        Generate public ID for shareable URLs (24 chars, URL-safe).
+
+        The ID is the only access control for a shared report, so it is
+        purely random: 144 bits, no timestamp. Collisions are negligible,
+        so no existence pre-check is needed — the unique constraint is the backstop.
+        """
+        return secrets.token_urlsafe(18)
     
     @classmethod
     def generate_url_hash(cls, url: str) -> str:
         """Legacy method for URL-based hash."""
         return cls.generate_hash(url=url)
     
-    def save(self, *args, **kwargs):
-        """Override save to auto-generate public_id if not set."""
+    @classmethod
+    def geo_cell_key(cls, lat: float, lon: float) -> str:
+        """Grid cell key for the nearby-analysis index."""
+        from .geo.spatial_cache import grid_cell
+        i, j = grid_cell(lat, lon, GEO_CELL_DEG)
+        return f"{i}:{j}"
+    
+    def assign_generated_fields(self):
+        """Fill public_id (if not set) and geo_cell from coordinates."""
         if not self.public_id:
-            # Generate unique public_id
-            for _ in range(10):  # Max 10 attempts
-                new_id = self.generate_public_id()
-                if not LocationAnalysis.objects.filter(public_id=new_id).exists():
-                    self.public_id = new_id
-                    break
-            else:
-                # Fallback to longer token
-                self.public_id = secrets.token_urlsafe(24)[:32]
+            self.public_id = self.generate_public_id()
+        if self.latitude is not None and self.longitude is not None:
+            self.geo_cell = self.geo_cell_key(self.latitude, self.longitude)
+    
+    def save(self, *args, **kwargs):
+        """Override save to auto-generate public_id and geo_cell."""
+        self.assign_generated_fields()
         super().save(*args, **kwargs)
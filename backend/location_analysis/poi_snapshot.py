@@ -0,0 +1,107 @@
+"""
+Kompaktowy snapshot POI zapisywany z analizą (LocationAnalysis.poi_snapshot).
+
+report_data.neighborhood.poi_stats to dane dla UI: top 10 pozycji per
+kategoria, bez dróg, flag (_nameless, low_reviews) i współrzędnych —
+rescoring na nich jest przybliżony. Snapshot trzyma dokładnie to, co
+dostał ProfileScoringEngine.calculate: wszystkie pary (kategoria, POI)
+po filtrze promienia, łącznie z członkostwem w kilku kategoriach i drogami,
+oraz wejścia skalarne (quiet_score, nature_metrics, bazowy score okolicy).
+
+Układ kolumnowy (tablice zamiast listy słowników), kategorie i podkategorie
+jako indeksy do tabel — bez powtarzania kluczy JSON dla każdego POI.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from .geo.overpass_client import POI
+
+SNAPSHOT_VERSION = 1
+
+# Flagi POI (bity kolumny 'flags')
+FLAG_NAMELESS = 1
+FLAG_LOW_REVIEWS = 2
+
+
+@dataclass
+class ScoringInputs:
+    """Wejście ProfileScoringEngine.calculate odtworzone ze snapshotu."""
+    pois_by_category: Dict[str, List[Any]]
+    quiet_score: float
+    nature_metrics: Optional[Dict[str, Any]]
+    base_neighborhood_score: Optional[float]
+
+
+def build_poi_snapshot(
+    pois_by_category: Dict[str, List[Any]],
+    quiet_score: float,
+    nature_metrics: Optional[Dict[str, Any]] = None,
+    base_neighborhood_score: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Snapshot wejścia scoringu (JSON-owalny)."""
+    categories = list(pois_by_category)
+    subcategories: Dict[str, int] = {}
+    columns: Dict[str, list] = {
+        key: [] for key in ('cat', 'name', 'sub', 'dist', 'lat', 'lon', 'rating', 'ratings_total', 'reviews_count', 'flags')
+    }
+    for cat_index, category in enumerate(categories):
+        for poi in pois_by_category[category]:
+            tags = poi.tags or {}
+            columns['cat'].append(cat_index)
+            columns['name'].append(poi.name)
+            columns['sub'].append(subcategories.setdefault(poi.subcategory or '', len(subcategories)))
+            columns['dist'].append(poi.distance_m)
+            columns['lat'].append(poi.lat)
+            columns['lon'].append(poi.lon)
+            columns['rating'].append(tags.get('rating'))
+            columns['ratings_total'].append(tags.get('user_ratings_total'))
+            columns['reviews_count'].append(tags.get('reviews_count'))
+            columns['flags'].append(
+                (FLAG_NAMELESS if tags.get('_nameless') else 0)
+                | (FLAG_LOW_REVIEWS if tags.get('low_reviews') else 0)
+            )
+    return {
+        'v': SNAPSHOT_VERSION,
+        'quiet_score': quiet_score,
+        'nature_metrics': nature_metrics,
+        'base_neighborhood_score': base_neighborhood_score,
+        'categories': categories,
+        'subcategories': list(subcategories),
+        **columns,
+    }
+
+
+def load_poi_snapshot(snapshot: Optional[Dict[str, Any]]) -> Optional[ScoringInputs]:
+    """Odtwarza wejście scoringu; None gdy snapshotu brak lub ma inną wersję."""
+    if not snapshot or snapshot.get('v') != SNAPSHOT_VERSION:
+        return None
+    categories = snapshot['categories']
+    subcategories = snapshot['subcategories']
+    pois_by_category: Dict[str, List[Any]] = {category: [] for category in categories}
+    rows = zip(
+        snapshot['cat'], snapshot['name'], snapshot['sub'], snapshot['dist'], snapshot['lat'], snapshot['lon'],
+        snapshot['rating'], snapshot['ratings_total'], snapshot['reviews_count'], snapshot['flags'],
+    )
+    for cat_index, name, sub, dist, lat, lon, rating, ratings_total, reviews_count, flags in rows:
+        category = categories[cat_index]
+        tags = {}
+        if rating is not None:
+            tags['rating'] = rating
+        if ratings_total is not None:
+            tags['user_ratings_total'] = ratings_total
+        if reviews_count is not None:
+            tags['reviews_count'] = reviews_count
+        if flags & FLAG_NAMELESS:
+            tags['_nameless'] = True
+        if flags & FLAG_LOW_REVIEWS:
+            tags['low_reviews'] = True
+        pois_by_category[category].append(POI(
+            lat=lat, lon=lon, name=name, category=category, subcategory=subcategories[sub],
+            distance_m=dist, tags=tags, source='snapshot', primary_category=category,
+        ))
+    return ScoringInputs(
+        pois_by_category=pois_by_category,
+        quiet_score=snapshot['quiet_score'],
+        nature_metrics=snapshot['nature_metrics'],
+        base_neighborhood_score=snapshot['base_neighborhood_score'],
+    )
@@ -11,6 +11,7 @@ from urllib.parse import urlparse
 import requests
 from bs4 import BeautifulSoup
 
+from ..http_pool import http_pool
 from .base import BaseProvider, ListingData
 
 logger = logging.getLogger(__name__)
@@ -36,7 +37,7 @@ class OlxProvider(BaseProvider):
         listing.source = "fetched"  # Mark as fetched from URL
         
         try:
-            response = requests.get(
+            response = http_pool.get(
                 url,
                 headers=self.get_headers(),
                 timeout=self.REQUEST_TIMEOUT,
@@ -3,7 +3,7 @@ Rate limiting dla endpointów.
 """
 import time
 import threading
-from typing import Dict, Tuple
+from typing import Dict, Optional, Tuple
 from functools import wraps
 
 from rest_framework.response import Response
@@ -117,6 +117,40 @@ def _create_rate_limiter() -> RateLimiter:
 rate_limiter = _create_rate_limiter()
 
 
+def _create_rescore_rate_limiter() -> RateLimiter:
+    """Osobny limiter zmiany profilu — przełączenia nie zjadają limitu analiz."""
+    try:
+        from .app_config import get_config
+        config = get_config()
+        return RateLimiter(
+            requests_per_minute=config.rescore_rate_limit_per_minute,
+            requests_per_hour=config.rescore_rate_limit_per_hour,
+        )
+    except Exception:
+        return RateLimiter(requests_per_minute=10, requests_per_hour=60)
+
+rescore_rate_limiter = _create_rescore_rate_limiter()
+
+
+def check_rate_limit(request, limiter: RateLimiter = None) -> Optional[str]:
+    """
+    Sprawdza limit dla klienta requestu.
+    
+    Returns:
+        Komunikat błędu gdy limit przekroczony, w przeciwnym razie None.
+    """
+    limiter = limiter or rate_limiter
+    
+    # Bypass rate limit for test runner (only in DEBUG mode)
+    from django.conf import settings
+    if settings.DEBUG and request.META.get('HTTP_X_TEST_RUN') == '1':
+        return None
+
+    client_ip = limiter.get_client_ip(request)
+    is_allowed, error_message = limiter.is_allowed(client_ip)
+    return None if is_allowed else error_message
+
+
 def rate_limit(limiter: RateLimiter = None):
     """
     Dekorator do rate-limitowania widoków DRF.
@@ -126,20 +160,11 @@ def rate_limit(limiter: RateLimiter = None):
         def my_view(request):
             ...
     """
-    limiter = limiter or rate_limiter
-    
     def decorator(view_func):
         @wraps(view_func)
         def wrapped(self, request, *args, **kwargs):
-            # Bypass rate limit for test runner (only in DEBUG mode)
-            from django.conf import settings
-            if settings.DEBUG and request.META.get('HTTP_X_TEST_RUN') == '1':
-                return view_func(self, request, *args, **kwargs)
-
-            client_ip = limiter.get_client_ip(request)
-            is_allowed, error_message = limiter.is_allowed(client_ip)
-            
-            if not is_allowed:
+            error_message = check_rate_limit(request, limiter)
+            if error_message:
                 return Response(
                     {'error': error_message},
                     status=status.HTTP_429_TOO_MANY_REQUESTS
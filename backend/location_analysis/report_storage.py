@@ -0,0 +1,44 @@
+"""
+Układ zapisu raportu w LocationAnalysis — każdy artefakt zapisany raz.
+
+- report_data: raport bez neighborhood.details, checklisty, aliasu 'listing'
+  (kopia 'property') i public_id
+- neighborhood_data: neighborhood.details
+- checklist: checklista
+- scoring_data / verdict_data / ai_insights_data: wynik profilu z analizy
+- profile_results: wyniki pozostałych profili (rescore)
+
+assemble_report składa z tych części odpowiedź API. Wiersze zapisane
+wcześniej (pełny report_data) przechodzą bez zmian — brakujące części
+są tylko uzupełniane.
+"""
+from typing import Any, Dict
+
+
+def split_report(report_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """AnalysisReport.to_dict() -> pola modelu (report_data, neighborhood_data, checklist)."""
+    report_data = dict(report_dict)
+    report_data.pop('listing', None)
+    report_data.pop('public_id', None)
+    checklist = report_data.pop('checklist', [])
+    neighborhood = dict(report_data.get('neighborhood') or {})
+    details = neighborhood.pop('details', {})
+    report_data['neighborhood'] = neighborhood
+    return {
+        'report_data': report_data,
+        'neighborhood_data': details,
+        'checklist': checklist,
+    }
+
+
+def assemble_report(analysis) -> Dict[str, Any]:
+    """Raport w kształcie AnalysisReport.to_dict() (+ public_id) z pól LocationAnalysis."""
+    report = dict(analysis.report_data or {})
+    neighborhood = dict(report.get('neighborhood') or {})
+    neighborhood.setdefault('details', analysis.neighborhood_data or {})
+    report['neighborhood'] = neighborhood
+    report.setdefault('checklist', analysis.checklist or [])
+    if 'property' in report:
+        report.setdefault('listing', report['property'])
+    report['public_id'] = analysis.public_id
+    return report
@@ -1,28 +1,45 @@
 """
 Rescore Service — przeliczenie raportu na inny profil bez ponownego pobierania POI.
 
-Odtwarza pois_by_category z zapisanych danych w report_data.neighborhood.poi_stats,
+Odtwarza wejście scoringu z LocationAnalysis.poi_snapshot (dokładnie jak
+w analizie; starsze raporty: przybliżenie z report_data.neighborhood.poi_stats),
 przelicza scoring + verdict + AI insights dla nowego profilu.
+
+Wyniki są materializowane per profil w LocationAnalysis.profile_results
+(profil z analizy czytany z kolumn scoring_data/verdict_data/ai_insights_data,
+nie jest tam powielany): pierwsza zmiana profilu liczy scoring + werdykt wszystkich profili naraz
+(score_all_profiles), AI powstaje raz per profil przy pierwszym przełączeniu
+na niego. Kolejne przełączenia to odczyt z profile_results — bez AI
+i bez przepisywania kolumn raportu (zapis tylko profile_key i licznika).
+
+Nieudane AI zostawia we wpisie ai_failed_at/ai_attempts; ponowna próba
+dopiero po wykładniczym odstępie (ai_retry_delay), nie przy każdym przełączeniu.
+Scoring i AI liczone są bez blokady; zapis to krótki merge z wierszem
+pobranym przez select_for_update() w transaction.atomic() — równoległe
+przełączenia nie gubią sobie wpisów.
 """
 import logging
+import time
 from dataclasses import dataclass, field
 from typing import Dict, List, Any, Optional
 
+from django.db import transaction
+
 from .models import LocationAnalysis
-from .scoring.profiles import get_profile, ProfileConfig
-from .scoring.profile_engine import create_scoring_engine, ScoringResult
+from .scoring.profiles import get_all_profiles, get_profile, ProfileConfig
+from .scoring.profile_engine import create_scoring_engine, score_all_profiles, ScoringResult
 from .scoring.profile_verdict import ProfileVerdictGenerator
 from .analysis_factsheet import build_factsheet_from_scoring
 from .ai_insights import generate_insights_from_factsheet
 from .providers import PropertyData
 from .diagnostics import AnalysisTraceContext, get_diag_logger
+from .poi_snapshot import ScoringInputs, load_poi_snapshot
 
 logger = logging.getLogger(__name__)
 
-
-class RescoreLimitExceeded(Exception):
-    """Raised when rescore limit is reached."""
-    pass
+# Odstęp ponownej próby AI po błędzie: 5 min, podwajany per próba, maks. 6 h
+AI_RETRY_BASE_S = 300
+AI_RETRY_MAX_S = 6 * 3600
 
 
 class RescoreDataMissing(Exception):
@@ -30,6 +47,51 @@ class RescoreDataMissing(Exception):
     pass
 
 
+def ai_insights_to_dict(ai_insights) -> Dict[str, Any]:
+    """AI insights w postaci zapisywanej w bazie (pusty dict, gdy brak)."""
+    if not ai_insights:
+        return {}
+    return {
+        'summary': ai_insights.summary,
+        'quick_facts': getattr(ai_insights, 'quick_facts', []),
+        'attention_points': ai_insights.attention_points,  # Legacy alias
+        'verification_checklist': ai_insights.verification_checklist,
+        'recommendation_line': getattr(ai_insights, 'recommendation_line', ''),
+        'target_audience': getattr(ai_insights, 'target_audience', ''),
+        'disclaimer': getattr(ai_insights, 'disclaimer', ''),  # Data quality warnings
+    }
+
+
+def profile_result_entry(
+    scoring_result: ScoringResult,
+    verdict,
+    ai_insights_data: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Wpis LocationAnalysis.profile_results dla jednego profilu."""
+    entry = {
+        'profile_config_version': scoring_result.profile_config_version,
+        'scoring': scoring_result.to_dict(),
+        'verdict': verdict.to_dict(),
+    }
+    if ai_insights_data is not None:
+        entry['ai_insights'] = ai_insights_data
+    return entry
+
+
+def ai_retry_delay(attempts: int) -> float:
+    """Odstęp (s) przed kolejną próbą AI po `attempts` nieudanych."""
+    return min(AI_RETRY_BASE_S * 2 ** max(attempts - 1, 0), AI_RETRY_MAX_S)
+
+
+def ai_retry_due(entry: Dict[str, Any], now: Optional[float] = None) -> bool:
+    """Czy wpis bez AI insights może już ponowić generowanie."""
+    failed_at = entry.get('ai_failed_at')
+    if failed_at is None:
+        return True
+    now = time.time() if now is None else now
+    return now - failed_at >= ai_retry_delay(entry.get('ai_attempts', 1))
+
+
 @dataclass
 class FakePOI:
     """Lekki POI wystarczający do rescoringu (bez pełnych tagów OSM)."""
@@ -60,29 +122,27 @@ class RescoreService:
         new_profile_key: str,
     ) -> Dict[str, Any]:
         """
-        Przelicza scoring + verdict + AI insights dla nowego profilu.
+        Przełącza raport na nowy profil (scoring + verdict + AI insights).
 
         Returns:
             dict z kluczami: scoring, verdict, ai_insights, profile,
-                             rescore_count, rescore_limit
+                             generation_params, rescore_count
         Raises:
-            RescoreLimitExceeded: gdy limit zmian profilu został osiągnięty
             RescoreDataMissing: gdy brakuje danych POI w raporcie
         """
         ctx = AnalysisTraceContext()
         slog = get_diag_logger(__name__, ctx)
 
-        # 1. Sprawdź limit
-        if analysis.rescore_count >= analysis.rescore_limit:
-            raise RescoreLimitExceeded(
-                f"Limit zmian profilu osiągnięty ({analysis.rescore_limit}/{analysis.rescore_limit})"
-            )
-
-        # 2. Sprawdź, czy dany profil nie jest taki sam jak obecny
+        # 1. Sprawdź, czy dany profil nie jest taki sam jak obecny
         current_profile_key = analysis.profile_key or 'family'
         if new_profile_key == current_profile_key:
             raise ValueError(f"Raport już używa profilu '{new_profile_key}'")
 
+        profile = get_profile(new_profile_key)
+        results = dict(analysis.profile_results or {})
+        known = {**self._analysed_entry(analysis), **results}
+        entry = self._cached_entry(known, new_profile_key, profile)
+
         slog.info(
             stage="rescore", op="start",
             message="Profile rescore",
@@ -91,114 +151,92 @@ class RescoreService:
                 "from_profile": current_profile_key,
                 "to_profile": new_profile_key,
                 "rescore_count": analysis.rescore_count,
+                "cached": entry is not None and 'ai_insights' in entry,
             }
         )
 
-        # 3. Odtwórz pois_by_category z report_data
-        pois_by_category = self._reconstruct_pois(analysis)
-
-        # 4. Odtwórz quiet_score i nature_metrics
-        quiet_score = self._extract_quiet_score(analysis)
-        nature_metrics = self._extract_nature_metrics(analysis)
-        base_neighborhood_score = analysis.neighborhood_score or 50.0
-
-        # 5. Pobierz nowy profil
-        profile = get_profile(new_profile_key)
-
-        # 6. Profile scoring
-        ctx.start_stage("profile_scoring")
-        profile_engine = create_scoring_engine(new_profile_key)
-        scoring_result = profile_engine.calculate(
-            pois_by_category=pois_by_category,
-            quiet_score=quiet_score,
-            nature_metrics=nature_metrics,
-            base_neighborhood_score=base_neighborhood_score,
-        )
-        ctx.end_stage("profile_scoring")
-
-        # 7. Verdict
-        ctx.start_stage("verdict")
-        verdict_generator = ProfileVerdictGenerator()
-        verdict = verdict_generator.generate(scoring_result, profile)
-        ctx.end_stage("verdict")
-
-        slog.info(
-            stage="rescore", op="scored",
-            meta={
-                "new_score": round(scoring_result.total_score, 1),
-                "verdict": verdict.level.value,
-                "profile": new_profile_key,
-            }
-        )
-
-        # 8. AI Insights
-        ai_insights = None
-        ctx.start_stage("ai")
-        try:
-            listing = self._build_listing_stub(analysis)
-            factsheet = build_factsheet_from_scoring(
-                profile=profile,
-                scoring_result=scoring_result,
-                verdict=verdict,
-                quiet_score=quiet_score,
-                pois_by_category=pois_by_category,
-                listing=listing,
+        updates: Dict[str, Dict[str, Any]] = {}
+        if entry is None or ('ai_insights' not in entry and ai_retry_due(entry)):
+            # 2. Odtwórz dane wejściowe scoringu (snapshot POI albo report_data)
+            inputs = self._scoring_inputs(analysis)
+
+            if entry is None:
+                ctx.start_stage("profile_scoring")
+                updates.update(self._score_profiles(inputs, known))
+                ctx.end_stage("profile_scoring")
+                entry = updates[new_profile_key]
+
+            # 3. AI insights — raz per profil; błąd zapisany we wpisie (backoff)
+            if 'ai_insights' not in entry:
+                ai_insights_data = self._generate_ai_insights(analysis, profile, inputs, ctx, slog)
+                entry = dict(entry)
+                if ai_insights_data is not None:
+                    entry['ai_insights'] = ai_insights_data
+                    entry.pop('ai_failed_at', None)
+                    entry.pop('ai_attempts', None)
+                else:
+                    entry['ai_failed_at'] = time.time()
+                    entry['ai_attempts'] = entry.get('ai_attempts', 0) + 1
+                updates[new_profile_key] = entry
+
+        # 4. Zapis pod blokadą wiersza — merge z aktualnym profile_results
+        with transaction.atomic():
+            locked = (
+                LocationAnalysis.objects.select_for_update()
+                .only('id', 'profile_key', 'profile_results', 'rescore_count')
+                .get(pk=analysis.pk)
             )
-            ai_insights = generate_insights_from_factsheet(factsheet)
-            ai_dur = ctx.end_stage("ai")
-            slog.info(stage="rescore", op="ai_done", duration_ms=ai_dur)
-        except Exception as e:
-            ctx.end_stage("ai")
-            slog.warning(stage="rescore", op="ai_failed", message=str(e), error_class="runtime")
-
-        # 9. Zapisz do DB
-        scoring_data = scoring_result.to_dict()
-        verdict_data = verdict.to_dict()
-        ai_insights_data = {}
-        if ai_insights:
-            ai_insights_data = {
-                'summary': ai_insights.summary,
-                'quick_facts': ai_insights.quick_facts if hasattr(ai_insights, 'quick_facts') else [],
-                'attention_points': ai_insights.attention_points,
-                'verification_checklist': ai_insights.verification_checklist,
-                'recommendation_line': ai_insights.recommendation_line if hasattr(ai_insights, 'recommendation_line') else '',
-                'target_audience': ai_insights.target_audience if hasattr(ai_insights, 'target_audience') else '',
-                'disclaimer': ai_insights.disclaimer if hasattr(ai_insights, 'disclaimer') else '',
+            results = dict(locked.profile_results or {})
+            stored = {
+                key: value for key, value in updates.items()
+                if self._should_store(results, key, new_profile_key)
             }
-
-        analysis.profile_key = new_profile_key
-        analysis.scoring_data = scoring_data
-        analysis.verdict_data = verdict_data
-        analysis.ai_insights_data = ai_insights_data
-        analysis.persona_adjusted_score = scoring_result.total_score
-        analysis.rescore_count += 1
-
-        # Aktualizuj category_scores
-        category_scores = {
-            cat: result.to_dict()
-            for cat, result in scoring_result.category_results.items()
-        }
-        analysis.category_scores = category_scores
-
-        analysis.save(update_fields=[
-            'profile_key', 'scoring_data', 'verdict_data',
-            'ai_insights_data', 'persona_adjusted_score',
-            'rescore_count', 'category_scores',
-        ])
+            update_fields = ['profile_key', 'rescore_count']
+            if stored:
+                results.update(stored)
+                locked.profile_results = results
+                update_fields.append('profile_results')
+            locked.profile_key = new_profile_key
+            locked.rescore_count += 1
+            locked.save(update_fields=update_fields)
+
+        analysis.profile_results = locked.profile_results
+        analysis.profile_key = locked.profile_key
+        analysis.rescore_count = locked.rescore_count
+        entry = self._cached_entry({**known, **results}, new_profile_key, profile) or entry
 
         slog.info(
             stage="rescore", op="complete",
             meta={
                 "public_id": analysis.public_id,
                 "rescore_count": analysis.rescore_count,
+                "new_score": entry['scoring'].get('total_score'),
+                "verdict": entry['verdict'].get('level'),
             }
         )
 
-        # 10. Zwróć partial response
-        response = {
-            'scoring': scoring_data,
-            'verdict': verdict_data,
-            'ai_insights': ai_insights_data,
+        return {
+            **self._profile_payload(profile, entry),
+            'rescore_count': analysis.rescore_count,
+        }
+
+    def active_profile_payload(self, analysis: LocationAnalysis) -> Optional[Dict[str, Any]]:
+        """
+        Wynik aktywnego profilu dla GET raportu, gdy profil zmieniono po analizie
+        (kolumny raportu opisują profil z analizy). None, gdy nie zmieniano.
+        """
+        analysed_key = (analysis.scoring_data or {}).get('profile_key')
+        entry = (analysis.profile_results or {}).get(analysis.profile_key)
+        if not entry or analysis.profile_key == analysed_key:
+            return None
+        return self._profile_payload(get_profile(analysis.profile_key), entry)
+
+    @staticmethod
+    def _profile_payload(profile: ProfileConfig, entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'scoring': entry['scoring'],
+            'verdict': entry['verdict'],
+            'ai_insights': entry.get('ai_insights', {}),
             'profile': profile.to_dict(),
             'generation_params': {
                 'profile': {
@@ -209,10 +247,114 @@ class RescoreService:
                 },
                 'radii': dict(profile.radius_m),
             },
-            'rescore_count': analysis.rescore_count,
-            'rescore_limit': analysis.rescore_limit,
         }
-        return response
+
+    @staticmethod
+    def _analysed_entry(analysis: LocationAnalysis) -> Dict[str, Dict[str, Any]]:
+        """Wpis profilu z analizy zbudowany z kolumn raportu ({} dla raportów bez scoringu)."""
+        scoring_data = analysis.scoring_data or {}
+        if not scoring_data.get('profile_key') or not analysis.verdict_data:
+            return {}
+        return {scoring_data['profile_key']: {
+            'profile_config_version': scoring_data.get('profile_config_version'),
+            'scoring': scoring_data,
+            'verdict': analysis.verdict_data,
+            'ai_insights': analysis.ai_insights_data or {},
+        }}
+
+    @staticmethod
+    def _cached_entry(results: Dict[str, Any], profile_key: str, profile: ProfileConfig) -> Optional[Dict[str, Any]]:
+        """Wpis profile_results, o ile policzony bieżącą wersją konfiguracji profilu."""
+        entry = results.get(profile_key)
+        if not entry or entry.get('profile_config_version') != profile.version:
+            return None
+        return entry
+
+    @classmethod
+    def _should_store(
+        cls,
+        results: Dict[str, Any],
+        profile_key: str,
+        active_key: str,
+    ) -> bool:
+        """
+        Czy nadpisać wpis profile_results (świeżo odczytany pod blokadą).
+        Aktualnego wpisu z AI nie nadpisujemy; wpis bez AI — tylko wynikiem
+        próby dla profilu, na który przełączamy (nowsze AI albo stan backoffu).
+        """
+        current = cls._cached_entry(results, profile_key, get_profile(profile_key))
+        if current is None:
+            return True
+        if 'ai_insights' in current:
+            return False
+        return profile_key == active_key
+
+    def _score_profiles(self, inputs: ScoringInputs, results: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Scoring + werdykt wszystkich profili bez aktualnego wpisu (jedno przejście)."""
+        profile_keys = [
+            p.key for p in get_all_profiles()
+            if self._cached_entry(results, p.key, p) is None
+        ]
+        scored = score_all_profiles(
+            pois_by_category=inputs.pois_by_category,
+            quiet_score=inputs.quiet_score,
+            nature_metrics=inputs.nature_metrics,
+            base_neighborhood_score=inputs.base_neighborhood_score,
+            profile_keys=profile_keys,
+        )
+        verdict_generator = ProfileVerdictGenerator()
+        return {
+            key: profile_result_entry(scoring_result, verdict_generator.generate(scoring_result, get_profile(key)))
+            for key, scoring_result in scored.items()
+        }
+
+    def _generate_ai_insights(
+        self,
+        analysis: LocationAnalysis,
+        profile: ProfileConfig,
+        inputs: ScoringInputs,
+        ctx: AnalysisTraceContext,
+        slog,
+    ) -> Optional[Dict[str, Any]]:
+        """AI insights dla wpisu profilu; None gdy generowanie się nie udało."""
+        ctx.start_stage("ai")
+        try:
+            # Factsheet potrzebuje pełnych obiektów wyniku — przeliczenie jednego profilu
+            scoring_result = create_scoring_engine(profile.key).calculate(
+                pois_by_category=inputs.pois_by_category,
+                quiet_score=inputs.quiet_score,
+                nature_metrics=inputs.nature_metrics,
+                base_neighborhood_score=inputs.base_neighborhood_score,
+            )
+            verdict = ProfileVerdictGenerator().generate(scoring_result, profile)
+            factsheet = build_factsheet_from_scoring(
+                profile=profile,
+                scoring_result=scoring_result,
+                verdict=verdict,
+                quiet_score=inputs.quiet_score,
+                pois_by_category=inputs.pois_by_category,
+                listing=self._build_listing_stub(analysis),
+            )
+            ai_insights = generate_insights_from_factsheet(factsheet)
+            ai_dur = ctx.end_stage("ai")
+            slog.info(stage="rescore", op="ai_done", duration_ms=ai_dur)
+        except Exception as e:
+            ctx.end_stage("ai")
+            slog.warning(stage="rescore", op="ai_failed", message=str(e), error_class="runtime")
+            return None
+        return ai_insights_to_dict(ai_insights)
+
+    def _scoring_inputs(self, analysis: LocationAnalysis) -> ScoringInputs:
+        """Wejście scoringu: snapshot POI, a dla raportów sprzed snapshotu — report_data."""
+        inputs = load_poi_snapshot(analysis.poi_snapshot)
+        if inputs is not None:
+            return inputs
+        return ScoringInputs(
+            pois_by_category=self._reconstruct_pois(analysis),
+            quiet_score=self._extract_quiet_score(analysis),
+            nature_metrics=self._extract_nature_metrics(analysis),
+            base_neighborhood_score=analysis.neighborhood_score or 50.0,
+        )
 
     def _reconstruct_pois(self, analysis: LocationAnalysis) -> Dict[str, List[FakePOI]]:
         """
@@ -260,11 +402,8 @@ class RescoreService:
         return scoring_data.get('quiet_score', 50.0)
 
     def _extract_nature_metrics(self, analysis: LocationAnalysis) -> Optional[Dict]:
-        """Wyciąga nature_metrics z report_data."""
-        report_data = analysis.report_data or {}
-        neighborhood = report_data.get('neighborhood', {})
-        details = neighborhood.get('details', {})
-        return details.get('nature_metrics')
+        """Wyciąga nature_metrics z neighborhood_data (neighborhood.details raportu)."""
+        return (analysis.neighborhood_data or {}).get('nature_metrics')
 
     def _build_listing_stub(self, analysis: LocationAnalysis) -> PropertyData:
         """Buduje minimalny PropertyData z bazy dla factsheet."""
@@ -12,7 +12,7 @@ from .profiles import (
     DecayMode,
     distance_score,
 )
-from .profile_engine import ProfileScoringEngine, create_scoring_engine
+from .profile_engine import PreparedPOIs, ProfileScoringEngine, create_scoring_engine, score_all_profiles
 
 __all__ = [
     'ScoringEngine',
@@ -30,4 +30,6 @@ __all__ = [
     'distance_score',
     'ProfileScoringEngine',
     'create_scoring_engine',
+    'PreparedPOIs',
+    'score_all_profiles',
 ]
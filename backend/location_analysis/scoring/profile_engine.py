@@ -9,13 +9,15 @@ Oblicza CategoryUtilityScore na podstawie:
 Ten moduł zastępuje stary ScoringEngine.
 """
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Tuple, Any
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple, Any
 import math
 import logging
 
 from .profiles import (
     ProfileConfig, 
     get_profile, 
+    get_all_profiles,
     distance_score, 
     Category,
     DecayMode,
@@ -132,6 +134,14 @@ class ScoringResult:
             'debug': self.debug,
         }
 
+    def to_summary_dict(self) -> dict:
+        """Skrócony wynik (porównanie profili)."""
+        return {
+            'total_score': round(self.total_score, 1),
+            'verdict': self.verdict,
+            'critical_caps_applied': self.critical_caps_applied,
+        }
+
 
 # Nazwy kategorii po polsku
 CATEGORY_NAMES_PL = {
@@ -149,6 +159,147 @@ CATEGORY_NAMES_PL = {
 }
 
 
+class PreparedPOIs:
+    """
+    Część scoringu niezależna od profilu, liczona raz dla jednego zestawu POI.
+
+    Profile różnią się wagami, promieniami i krzywymi spadku — sortowanie POI
+    po odległości, mnożniki jakości i surowe odległości dróg są wspólne.
+    Przekazywane do ProfileScoringEngine.calculate (score_all_profiles),
+    żeby kolejne profile nie liczyły tego od nowa.
+    """
+
+    def __init__(self, pois_by_category: Dict[str, List[Any]]):
+        self.pois_by_category = pois_by_category
+        self._entries: Dict[str, List[Tuple[Any, float, bool]]] = {}
+        self._distance_scores: Dict[Tuple[float, int, DecayMode], float] = {}
+        self._roads: Optional[Tuple[float, Dict[str, Any]]] = None
+
+    def entries(self, category: str) -> List[Tuple[Any, float, bool]]:
+        """[(poi, mnożnik jakości, bez nazwy)] posortowane po odległości."""
+        entries = self._entries.get(category)
+        if entries is None:
+            pois = sorted(self.pois_by_category.get(category, []), key=lambda p: p.distance_m)
+            entries = [(poi, quality_multiplier(poi), bool(poi.tags.get('_nameless'))) for poi in pois]
+            self._entries[category] = entries
+        return entries
+
+    def distance_score(self, distance_m: float, radius: int, mode: DecayMode) -> float:
+        key = (distance_m, radius, mode)
+        score = self._distance_scores.get(key)
+        if score is None:
+            score = self._distance_scores[key] = distance_score(distance_m, radius, mode)
+        return score
+
+    def roads(self) -> Tuple[float, Dict[str, Any]]:
+        """Kara drogowa przed skalowaniem profilu + debug."""
+        if self._roads is None:
+            self._roads = _roads_base_penalty(self.pois_by_category.get('roads', []))
+        return self._roads
+
+
+def quality_multiplier(poi) -> float:
+    """
+    Oblicza mnożnik jakości na podstawie rating/reviews.
+    
+    Formula:
+    - Base: 1.0
+    - Rating contribution: 0.90 + 0.20 * (rating/5.0) → range 0.90-1.10
+    - Reviews confidence: clamp(reviews/200, 0, 1)
+    - Final: lerp(1.0, rating_mult, reviews_confidence)
+    """
+    rating = poi.tags.get('rating')
+    reviews = (
+        poi.tags.get('user_ratings_total')
+        or poi.tags.get('reviews_count')
+    )
+    
+    if not rating:
+        return 1.0
+    
+    # Rating component: 0.90 - 1.10 (premia jakość)
+    rating_mult = 0.90 + 0.20 * (float(rating) / 5.0)
+    
+    # Reviews confidence: 0-1
+    reviews_confidence = min(1.0, (reviews or 0) / 200) if reviews else 0.3
+
+    # Jeżeli mało opinii, nie przyznawaj bonusu jakości
+    if poi.tags.get('low_reviews'):
+        rating_mult = min(rating_mult, 1.0)
+    
+    # Interpolate between 1.0 and rating_mult based on confidence
+    return 1.0 + (rating_mult - 1.0) * reviews_confidence
+
+
+def _roads_base_penalty(roads: List[Any]) -> Tuple[float, Dict[str, Any]]:
+    """Kara za infrastrukturę drogową i szyny (bez skalowania profilem)."""
+    if not roads:
+        return 0.0, {'count': 0}
+
+    def nearest(subcats: List[str]) -> Optional[float]:
+        dists = [p.distance_m for p in roads if p.subcategory in subcats and p.distance_m is not None]
+        return min(dists) if dists else None
+
+    nearest_heavy = nearest(['motorway', 'trunk'])
+    nearest_primary = nearest(['primary'])
+    nearest_secondary = nearest(['secondary'])
+    nearest_rails = nearest(['tram', 'rail'])
+
+    penalty = 0.0
+    if nearest_heavy is not None:
+        if nearest_heavy <= 300:
+            penalty += 20
+        elif nearest_heavy <= 600:
+            penalty += 12
+        elif nearest_heavy <= 1000:
+            penalty += 6
+
+    if nearest_primary is not None:
+        if nearest_primary <= 100:
+            penalty += 12
+        elif nearest_primary <= 250:
+            penalty += 8
+        elif nearest_primary <= 500:
+            penalty += 4
+
+    if nearest_secondary is not None:
+        if nearest_secondary <= 150:
+            penalty += 6
+        elif nearest_secondary <= 300:
+            penalty += 3
+
+    if nearest_rails is not None:
+        if nearest_rails <= 80:
+            penalty += 8
+        elif nearest_rails <= 150:
+            penalty += 4
+
+    # Road density — only count significant (noisy) roads, not tertiary/residential
+    # Mierzymy lokalne zagęszczenie dróg (max 1500m), żeby uniknąć karania przedmieść
+    # za główną infrastrukturę znajdującą się 3km dalej.
+    SIGNIFICANT_ROAD_TYPES = {'motorway', 'trunk', 'primary', 'secondary', 'tram', 'rail'}
+    significant_count = sum(
+        1 for r in roads 
+        if r.subcategory in SIGNIFICANT_ROAD_TYPES 
+        and r.distance_m is not None 
+        and r.distance_m <= 1500
+    )
+    road_count = len(roads)  # total for debug
+    if significant_count >= 10:
+        penalty += 5
+    elif significant_count >= 5:
+        penalty += 3
+
+    debug = {
+        'count': road_count,
+        'nearest_heavy_m': nearest_heavy,
+        'nearest_primary_m': nearest_primary,
+        'nearest_secondary_m': nearest_secondary,
+        'nearest_rails_m': nearest_rails,
+    }
+    return penalty, debug
+
+
 class ProfileScoringEngine:
     """
     Silnik scoringu oparty na profilach konfiguracyjnych.
@@ -214,6 +365,7 @@ class ProfileScoringEngine:
         quiet_score: float,
         nature_metrics: Optional[Dict] = None,
         base_neighborhood_score: Optional[float] = None,
+        prepared: Optional[PreparedPOIs] = None,
     ) -> ScoringResult:
         """
         Oblicza pełny scoring na podstawie POI i profilu.
@@ -223,10 +375,13 @@ class ProfileScoringEngine:
             quiet_score: Quiet Score (0-100)
             nature_metrics: Metryki natury (opcjonalne)
             base_neighborhood_score: Bazowy score okolicy (0-100) do korekty profilu
+            prepared: Wspólne obliczenia dla tych samych POI (score_all_profiles)
         
         Returns:
             ScoringResult z pełnym breakdown
         """
+        if prepared is None:
+            prepared = PreparedPOIs(pois_by_category)
         category_results = {}
         category_scores = {}
         debug_categories: Dict[str, Any] = {}
@@ -237,16 +392,17 @@ class ProfileScoringEngine:
             if weight == 0 and category not in [Category.NATURE_BACKGROUND.value]:
                 continue
             
-            pois = pois_by_category.get(category, [])
+            entries = prepared.entries(category)
             radius = self.profile.get_radius(category)
             
-            # Filtruj POI poza promieniem (twardy cutoff)
-            pois_in_radius = [p for p in pois if p.distance_m <= radius]
+            # Filtruj POI poza promieniem (twardy cutoff); lista jest posortowana
+            entries_in_radius = entries[:bisect_right(entries, radius, key=lambda e: e[0].distance_m)]
             
             result = self._calculate_category_score(
                 category=category,
-                pois=pois_in_radius,
+                entries=entries_in_radius,
                 radius=radius,
+                prepared=prepared,
                 nature_metrics=nature_metrics if category == Category.NATURE_BACKGROUND.value else None,
             )
             
@@ -267,8 +423,8 @@ class ProfileScoringEngine:
             category_scores[category] = result.score
 
             debug_categories[category] = {
-                'count_raw': len(pois),
-                'count_in_radius': len(pois_in_radius),
+                'count_raw': len(entries),
+                'count_in_radius': len(entries_in_radius),
                 'radius_used_m': radius,
                 'utility_sum': round(result.utility_sum, 2),
                 'utility_score': round(result.utility_score, 2),
@@ -326,7 +482,7 @@ class ProfileScoringEngine:
                     )
         
         # Roads penalty (infrastruktura drogowa jako minus)
-        roads_penalty, roads_debug = self._calculate_roads_penalty(pois_by_category.get('roads', []))
+        roads_penalty, roads_debug = self._calculate_roads_penalty(prepared)
 
         # Aplikuj kary
         total_score = base_score - noise_penalty - roads_penalty
@@ -429,13 +585,18 @@ class ProfileScoringEngine:
     def _calculate_category_score(
         self,
         category: str,
-        pois: List[Any],
+        entries: List[Tuple[Any, float, bool]],
         radius: int,
+        prepared: PreparedPOIs,
         nature_metrics: Optional[Dict] = None,
     ) -> CategoryScoreResult:
-        """Oblicza score dla pojedynczej kategorii."""
+        """
+        Oblicza score dla pojedynczej kategorii.
+        
+        entries: POI w promieniu z PreparedPOIs.entries (posortowane po odległości).
+        """
         
-        if not pois and not nature_metrics:
+        if not entries and not nature_metrics:
             return CategoryScoreResult(
                 category=category,
                 score=0,
@@ -451,23 +612,20 @@ class ProfileScoringEngine:
         
         # Dla nature_background możemy też użyć metryk
         if category == Category.NATURE_BACKGROUND.value and nature_metrics:
-            return self._calculate_nature_background_score(radius, nature_metrics, pois)
+            return self._calculate_nature_background_score(radius, nature_metrics)
         
-        # Sortuj po odległości i weź top N
-        sorted_pois = sorted(pois, key=lambda p: p.distance_m)[:self.MAX_POIS_FOR_SCORE]
+        # Top N najbliższych (entries są już posortowane)
+        top_entries = entries[:self.MAX_POIS_FOR_SCORE]
         
         contributions = []
         utility_sum = 0.0
         
-        for poi in sorted_pois:
+        for poi, quality_mult, nameless in top_entries:
             # Distance score z krzywej spadku
-            dist_score = distance_score(poi.distance_m, radius, decay_mode)
-            
-            # Quality multiplier (rating/reviews)
-            quality_mult = self._calculate_quality_multiplier(poi)
+            dist_score = prepared.distance_score(poi.distance_m, radius, decay_mode)
             
             # Nameless penalty
-            nameless_mult = self.NAMELESS_WEIGHT if poi.tags.get('_nameless') else 1.0
+            nameless_mult = self.NAMELESS_WEIGHT if nameless else 1.0
             
             # Wkład POI
             contribution = dist_score * quality_mult * nameless_mult
@@ -491,14 +649,14 @@ class ProfileScoringEngine:
         # Coverage bonus (tylko dla daily categories)
         coverage_bonus = 0.0
         if category in self.DAILY_CATEGORIES:
-            sensible_pois = [p for p in sorted_pois if p.distance_m <= radius * 0.8]
-            if len(sensible_pois) >= 6:
+            sensible_count = sum(1 for poi, _, _ in top_entries if poi.distance_m <= radius * 0.8)
+            if sensible_count >= 6:
                 coverage_bonus = self.COVERAGE_BONUS_6
-            elif len(sensible_pois) >= 3:
+            elif sensible_count >= 3:
                 coverage_bonus = self.COVERAGE_BONUS_3
         
         score_before_distance = min(100, utility_score + coverage_bonus)
-        nearest_distance = sorted_pois[0].distance_m if sorted_pois else None
+        nearest_distance = top_entries[0][0].distance_m if top_entries else None
         distance_factor = self._distance_factor(nearest_distance, radius, decay_mode)
         final_score = min(100, score_before_distance * distance_factor)
         
@@ -509,7 +667,7 @@ class ProfileScoringEngine:
             utility_sum=utility_sum,
             coverage_bonus=coverage_bonus,
             nearest_distance_m=nearest_distance,
-            poi_count=len(pois),
+            poi_count=len(entries),
             radius_used=radius,
             contributions=contributions,
         )
@@ -518,7 +676,6 @@ class ProfileScoringEngine:
         self,
         radius: int,
         nature_metrics: Dict,
-        pois: List[Any],
     ) -> CategoryScoreResult:
         """
         Oblicza score dla nature_background na podstawie metryk + POI wody.
@@ -581,38 +738,8 @@ class ProfileScoringEngine:
         )
     
     def _calculate_quality_multiplier(self, poi) -> float:
-        """
-        Oblicza mnożnik jakości na podstawie rating/reviews.
-        
-        Formula:
-        - Base: 1.0
-        - Rating contribution: 0.90 + 0.20 * (rating/5.0) → range 0.90-1.10
-        - Reviews confidence: clamp(reviews/200, 0, 1)
-        - Final: lerp(1.0, rating_mult, reviews_confidence)
-        """
-        rating = poi.tags.get('rating')
-        reviews = (
-            poi.tags.get('user_ratings_total')
-            or poi.tags.get('reviews_count')
-        )
-        
-        if not rating:
-            return 1.0
-        
-        # Rating component: 0.90 - 1.10 (premia jakość)
-        rating_mult = 0.90 + 0.20 * (float(rating) / 5.0)
-        
-        # Reviews confidence: 0-1
-        reviews_confidence = min(1.0, (reviews or 0) / 200) if reviews else 0.3
-
-        # Jeżeli mało opinii, nie przyznawaj bonusu jakości
-        if poi.tags.get('low_reviews'):
-            rating_mult = min(rating_mult, 1.0)
-        
-        # Interpolate between 1.0 and rating_mult based on confidence
-        final_mult = 1.0 + (rating_mult - 1.0) * reviews_confidence
-        
-        return final_mult
+        """Mnożnik jakości (rating/reviews) — patrz quality_multiplier."""
+        return quality_multiplier(poi)
 
     def _distance_factor(self, nearest_distance_m: Optional[float], radius: int, decay_mode: DecayMode) -> float:
         """Skaluje score kategorii na podstawie najbliższego POI."""
@@ -629,79 +756,18 @@ class ProfileScoringEngine:
             return 0.0
         return min(100.0, 100 * (1 - math.exp(-k * value)))
 
-    def _calculate_roads_penalty(self, roads: List[Any]) -> Tuple[float, Dict[str, Any]]:
-        """Kara za infrastrukturę drogową i szyny."""
-        if not roads:
+    def _calculate_roads_penalty(self, prepared: PreparedPOIs) -> Tuple[float, Dict[str, Any]]:
+        """Kara za infrastrukturę drogową i szyny, skalowana wagą ciszy profilu."""
+        penalty, debug = prepared.roads()
+        if not debug['count']:
             return 0.0, {'count': 0}
 
-        def nearest(subcats: List[str]) -> Optional[float]:
-            dists = [p.distance_m for p in roads if p.subcategory in subcats and p.distance_m is not None]
-            return min(dists) if dists else None
-
-        nearest_heavy = nearest(['motorway', 'trunk'])
-        nearest_primary = nearest(['primary'])
-        nearest_secondary = nearest(['secondary'])
-        nearest_rails = nearest(['tram', 'rail'])
-
-        penalty = 0.0
-        if nearest_heavy is not None:
-            if nearest_heavy <= 300:
-                penalty += 20
-            elif nearest_heavy <= 600:
-                penalty += 12
-            elif nearest_heavy <= 1000:
-                penalty += 6
-
-        if nearest_primary is not None:
-            if nearest_primary <= 100:
-                penalty += 12
-            elif nearest_primary <= 250:
-                penalty += 8
-            elif nearest_primary <= 500:
-                penalty += 4
-
-        if nearest_secondary is not None:
-            if nearest_secondary <= 150:
-                penalty += 6
-            elif nearest_secondary <= 300:
-                penalty += 3
-
-        if nearest_rails is not None:
-            if nearest_rails <= 80:
-                penalty += 8
-            elif nearest_rails <= 150:
-                penalty += 4
-
-        # Road density — only count significant (noisy) roads, not tertiary/residential
-        # Mierzymy lokalne zagęszczenie dróg (max 1500m), żeby uniknąć karania przedmieść
-        # za główną infrastrukturę znajdującą się 3km dalej.
-        SIGNIFICANT_ROAD_TYPES = {'motorway', 'trunk', 'primary', 'secondary', 'tram', 'rail'}
-        significant_count = sum(
-            1 for r in roads 
-            if r.subcategory in SIGNIFICANT_ROAD_TYPES 
-            and r.distance_m is not None 
-            and r.distance_m <= 1500
-        )
-        road_count = len(roads)  # total for debug
-        if significant_count >= 10:
-            penalty += 5
-        elif significant_count >= 5:
-            penalty += 3
-
         # Skalowanie karą ciszy profilu
         noise_weight = abs(self.profile.get_weight(Category.NOISE.value))
         scale = 0.5 + min(1.5, noise_weight / 0.05)
         penalty = min(30.0, penalty * scale)
 
-        debug = {
-            'count': road_count,
-            'nearest_heavy_m': nearest_heavy,
-            'nearest_primary_m': nearest_primary,
-            'nearest_secondary_m': nearest_secondary,
-            'nearest_rails_m': nearest_rails,
-            'scale': round(scale, 2),
-        }
-        return penalty, debug
+        return penalty, {**debug, 'scale': round(scale, 2)}
     
     def _extract_highlights(
         self,
@@ -801,3 +867,40 @@ def create_scoring_engine(
         profile = replace(profile, radius_m=effective_radius_m)
     
     return ProfileScoringEngine(profile)
+
+
+def score_all_profiles(
+    pois_by_category: Dict[str, List[Any]],
+    quiet_score: float,
+    nature_metrics: Optional[Dict] = None,
+    base_neighborhood_score: Optional[float] = None,
+    profile_keys: Optional[Iterable[str]] = None,
+    prepared: Optional[PreparedPOIs] = None,
+) -> Dict[str, ScoringResult]:
+    """
+    Scoring tych samych POI dla wielu profili naraz.
+    
+    Sortowanie, mnożniki jakości, krzywe spadku i odległości dróg są liczone
+    raz (PreparedPOIs) i współdzielone między profilami.
+    
+    Args:
+        profile_keys: Klucze profili (domyślnie wszystkie z rejestru)
+        prepared: Istniejące PreparedPOIs dla pois_by_category
+    
+    Returns:
+        {profile_key: ScoringResult}
+    """
+    if prepared is None:
+        prepared = PreparedPOIs(pois_by_category)
+    if profile_keys is None:
+        profile_keys = [profile.key for profile in get_all_profiles()]
+    return {
+        key: create_scoring_engine(key).calculate(
+            pois_by_category=pois_by_category,
+            quiet_score=quiet_score,
+            nature_metrics=nature_metrics,
+            base_neighborhood_score=base_neighborhood_score,
+            prepared=prepared,
+        )
+        for key in profile_keys
+    }
@@ -26,6 +26,18 @@ class AnalyzeListingRequestSerializer(serializers.Serializer):
     )
 
 
+PROFILE_KEY_CHOICES = [
+    ('urban', 'City Life'),
+    ('family', 'Rodzina z dziećmi'),
+    ('quiet_green', 'Spokojnie i zielono'),
+    ('remote_work', 'Home Office'),
+    ('active_sport', 'Aktywny sportowo'),
+    ('car_first', 'Pod auto / przedmieścia'),
+    ('investor', 'Inwestor'),
+    ('custom', 'Skompunuj sam'),
+]
+
+
 class AnalyzeLocationRequestSerializer(serializers.Serializer):
     """Walidacja requesta analizy lokalizacji (location-first model)."""
     latitude = serializers.FloatField(
@@ -72,16 +84,7 @@ class AnalyzeLocationRequestSerializer(serializers.Serializer):
     )
     # Nowy parametr: profile_key
     profile_key = serializers.ChoiceField(
-        choices=[
-            ('urban', 'City Life'),
-            ('family', 'Rodzina z dziećmi'),
-            ('quiet_green', 'Spokojnie i zielono'),
-            ('remote_work', 'Home Office'),
-            ('active_sport', 'Aktywny sportowo'),
-            ('car_first', 'Pod auto / przedmieścia'),
-            ('investor', 'Inwestor'),
-            ('custom', 'Skompunuj sam'),
-        ],
+        choices=PROFILE_KEY_CHOICES,
         required=False,
         default='family',
         help_text="Klucz profilu scoringu"
@@ -124,6 +127,37 @@ class AnalyzeLocationRequestSerializer(serializers.Serializer):
     )
 
 
+class BatchItemSerializer(serializers.Serializer):
+    """Jedna pozycja partii: punkt i profil scoringu."""
+    latitude = serializers.FloatField(required=True, min_value=-90, max_value=90)
+    longitude = serializers.FloatField(required=True, min_value=-180, max_value=180)
+    profile_key = serializers.ChoiceField(choices=PROFILE_KEY_CHOICES, required=False, default='family')
+    price = serializers.FloatField(required=False, allow_null=True, min_value=0)
+    area_sqm = serializers.FloatField(required=False, allow_null=True, min_value=1)
+    radius_overrides = serializers.DictField(
+        child=serializers.IntegerField(min_value=100, max_value=5000),
+        required=False,
+        default=dict,
+    )
+
+
+class AnalyzeBatchRequestSerializer(serializers.Serializer):
+    """Walidacja requesta scoringu partii lokalizacji."""
+    items = BatchItemSerializer(many=True, allow_empty=False)
+    radius = serializers.IntegerField(
+        required=False,
+        min_value=100,
+        max_value=2000,
+        help_text="Minimalny promień pobierania POI w metrach"
+    )
+
+    def validate_items(self, items):
+        from .app_config import get_config
+        max_items = get_config().batch_max_items
+        if len(items) > max_items:
+            raise serializers.ValidationError(f"Maksymalnie {max_items} pozycji w jednym żądaniu.")
+        return items
+
 
 class PropertyDataSerializer(serializers.Serializer):
     """Dane o nieruchomości."""
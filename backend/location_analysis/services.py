@@ -2,27 +2,106 @@
 Główny serwis analizy lokalizacji.
 Orchestruje cały proces: parsowanie → geo → raport.
 """
+import json
 import logging
-from typing import Optional, Dict, Any
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List
 
 from .providers import get_provider_for_url, ProviderRegistry, PropertyData
-from .geo import OverpassClient, GooglePlacesClient, HybridPOIProvider, POIAnalyzer
+from .geo import GooglePlacesClient, HybridPOIProvider, POIAnalyzer, create_overpass_client
+from .geo.overpass_client import is_failed_fetch
 from .report_builder import ReportBuilder, AnalysisReport
-from .cache import listing_cache, overpass_cache, TTLCache, normalize_coords
+from .cache import listing_cache, overpass_cache, air_quality_cache, TTLCache, normalize_coords
 from .models import LocationAnalysis
 from .personas import get_persona_by_string, PersonaType
 from .scoring.profile_verdict import ProfileVerdictGenerator
-from .scoring.profiles import get_profile, get_profiles_summary
-from .scoring.profile_engine import create_scoring_engine
+from .scoring.profiles import get_all_profiles, get_profile
+from .scoring.profile_engine import PreparedPOIs, create_scoring_engine, score_all_profiles
+from .rescore_service import ai_insights_to_dict
+from .poi_snapshot import SNAPSHOT_VERSION, build_poi_snapshot, load_poi_snapshot
+from .report_storage import assemble_report, split_report
 from .ai_insights import generate_decision_insights, generate_insights_from_factsheet
 from .analysis_factsheet import build_factsheet_from_scoring
 from .data_quality import build_data_quality_report
 from .diagnostics import AnalysisTraceContext, get_diag_logger
-from .geo.air_quality import get_air_quality_provider
+from .geo.air_quality import air_quality_cell, get_air_quality_provider
+from .stage_scheduler import StageScheduler
+from .single_flight import air_quality_flight, poi_fetch_flight
+from .background_refresh import cache_refresher
 
 logger = logging.getLogger(__name__)
 
 
+def _same_amount(stored, requested) -> bool:
+    """Porównanie kwot/metrażu z bazy (Decimal, 2 miejsca) i z requestu."""
+    if stored is None or requested is None:
+        return stored is None and requested is None
+    return round(float(stored), 2) == round(float(requested), 2)
+
+
+def _profiles_covered(run: '_LocationRun') -> List[str]:
+    """
+    Profile (poza bieżącym), których promienie mieszczą się w pobranych POI.
+
+    run.pois są przycięte do promieni bieżącego profilu (a zapytanie Overpass
+    zawężone per kategoria), więc profil z szerszym promieniem w którejś
+    kategorii dostałby zaniżony wynik — takie profile pomijamy.
+    """
+    return [
+        profile.key
+        for profile in get_all_profiles()
+        if profile.key != run.profile.key and all(
+            radius <= run.effective_radius_m.get(category, run.fetch_radius)
+            for category, radius in profile.radius_m.items()
+        )
+    ]
+
+
+def _profile_scores(run: '_LocationRun', current, **scoring_args) -> Dict[str, Any]:
+    """
+    Skrócony wynik profili dla przełącznika w UI: bieżący (current)
+    i pozostałe pokryte przez pobrane POI (_profiles_covered).
+    """
+    others = score_all_profiles(profile_keys=_profiles_covered(run), **scoring_args)
+    return {
+        key: result.to_summary_dict()
+        for key, result in {run.profile.key: current, **others}.items()
+    }
+
+
+@dataclass
+class _LocationRun:
+    """Stan jednej analizy lokalizacji (wspólny dla wersji sync i async)."""
+    ctx: AnalysisTraceContext
+    slog: Any
+    config: Any
+    lat: float
+    lon: float
+    poi_provider: str
+    enable_enrichment: bool
+    enable_fallback: bool
+    reference_url: Optional[str]
+    user_profile: str
+    profile_key: str
+    profile: Any
+    persona: Any
+    radius_overrides: Optional[Dict[str, int]]
+    effective_radius_m: Dict[str, int]
+    fetch_radius: int
+    listing: PropertyData
+    # Wyniki kolejnych etapów
+    pois: Optional[Dict[str, Any]] = None
+    metrics: Optional[Dict[str, Any]] = None
+    poi_cache_used: bool = False
+    data_quality: Any = None
+    neighborhood_score: Any = None
+    poi_stats: Optional[Dict[str, Any]] = None
+    profile_scoring_result: Any = None
+    profile_scores: Optional[Dict[str, Any]] = None
+    verdict: Any = None
+    ai_insights: Any = None
+
+
 class AnalysisService:
     """
     Główny serwis do analizy lokalizacji nieruchomości.
@@ -32,7 +111,7 @@ class AnalysisService:
     NEIGHBORHOOD_RADIUS = 500
     
     def __init__(self):
-        self.overpass_client = OverpassClient()
+        self.overpass_client = create_overpass_client()
         self.google_places_client = GooglePlacesClient()
         self.hybrid_provider = HybridPOIProvider(
             overpass_client=self.overpass_client,
@@ -85,6 +164,7 @@ class AnalysisService:
                  yield json.dumps({'status': 'complete', 'result': cached_report}) + '\n'
                  return
 
+        stages = None
         try:
             # 1. Parsuj
             ctx.start_stage("parsing")
@@ -100,18 +180,17 @@ class AnalysisService:
             poi_stats = None
             pois = None
             
+            # Etapy I/O zależne tylko od koordynatów startują równolegle
+            stages = StageScheduler(ctx)
+            if listing.has_precise_location and listing.latitude and listing.longitude:
+                stages.submit('geo', self._get_pois, listing.latitude, listing.longitude, radius, use_cache, trace_ctx=ctx)
+                stages.submit('air_quality', self._fetch_air_quality, listing.latitude, listing.longitude, slog)
+
             if listing.has_precise_location and listing.latitude and listing.longitude:
                 try:
-                    ctx.start_stage("geo")
                     yield json.dumps({'status': 'map', 'message': f'Analiza mapy (promień {radius}m)...'}) + '\n'
-                    pois, metrics = self._get_pois(
-                        listing.latitude,
-                        listing.longitude,
-                        radius,
-                        use_cache
-                    )
-                    dur = ctx.end_stage("geo")
-                    slog.info(stage="geo", op="get_pois", duration_ms=dur)
+                    pois, metrics, _ = stages.result('geo')
+                    slog.info(stage="geo", op="get_pois", duration_ms=stages.duration_ms('geo'))
                     
                     ctx.start_stage("scoring")
                     yield json.dumps({'status': 'calculating', 'message': 'Obliczanie wyników...'}) + '\n'
@@ -135,7 +214,7 @@ class AnalysisService:
                 neighborhood_score=neighborhood_score,
                 poi_stats=poi_stats,
                 all_pois=pois,
-                air_quality=self._fetch_air_quality(listing.latitude, listing.longitude, slog) if listing.has_precise_location and listing.latitude else None,
+                air_quality=stages.result('air_quality'),
             )
             ctx.end_stage("report")
             
@@ -154,6 +233,10 @@ class AnalysisService:
             slog.error(stage="pipeline", op="analyze_stream", message=str(e), exc=type(e).__name__, error_class="runtime", hint="Check traceback in Django logs")
             ctx.summary.emit(slog, ctx, status="error")
             yield json.dumps({'status': 'error', 'error': str(e)}) + '\n'
+        finally:
+            # Klient rozłączył się w trakcie — etapy, które nie wystartowały, nie zajmują puli
+            if stages is not None:
+                stages.cancel_pending()
     
     # Alias for backwards compatibility
     def analyze_listing_stream(self, url: str, radius: int = 500, use_cache: bool = True):
@@ -188,279 +271,689 @@ class AnalysisService:
             user_profile: [LEGACY] Stary parametr - mapowany na profile_key jeśli profile_key nie podany
             radius_overrides: Opcjonalne nadpisanie promieni per kategoria (np. {'shops': 800})
         """
-        import json
-        from .app_config import get_config
-        config = get_config()
-        
-        # Defaults z centralnej konfiguracji (jeśli nie podane per-request)
-        if radius is None:
-            radius = config.default_radius
-        if poi_provider is None:
-            poi_provider = config.default_poi_provider
-        if enable_enrichment is None:
-            enable_enrichment = config.default_enrichment
-        if enable_fallback is None:
-            enable_fallback = config.default_fallback
-        
         ctx = AnalysisTraceContext()
         slog = get_diag_logger(__name__, ctx)
+        stages = None
         
         try:
-            # Mapowanie legacy user_profile -> profile_key
-            effective_profile_key = profile_key or user_profile
-            
-            slog.info(
-                stage="init", op="analyze_location_stream",
-                message="Start location analysis",
-                meta={"lat": lat, "lon": lon, "radius": radius, "profile": effective_profile_key, "poi_provider": poi_provider},
-            )
-            
-            # Pobierz nowy profil konfiguracyjny
-            profile = get_profile(effective_profile_key)
-            
-            # Apply user overrides to profile radii
-            effective_radius_m = dict(profile.radius_m)  # Copy defaults
-            if radius_overrides:
-                for category, override_radius in radius_overrides.items():
-                    if category in effective_radius_m:
-                        effective_radius_m[category] = override_radius
-                        slog.debug(stage="init", op="radius_override", meta={"category": category, "new": override_radius, "was": profile.radius_m.get(category)})
-
-            # Ustal promien pobierania POI = max promien per kategoria (including overrides)
-            profile_radius_max = max(effective_radius_m.values()) if effective_radius_m else radius
-            fetch_radius = max(radius, profile_radius_max)
-            
-            # Legacy: pobierz też starą personę dla kompatybilności wstecznej
-            # Mapujemy nowe profile_key na stare persony gdzie to możliwe
-            legacy_persona_key = self._map_profile_to_persona(effective_profile_key)
-            persona = get_persona_by_string(legacy_persona_key)
-            
-            yield json.dumps({
-                'status': 'starting', 
-                'message': f'Rozpoczynam analizę lokalizacji dla profilu: {profile.emoji} {profile.name}...'
-            }) + '\n'
-            
-            # Twórz PropertyData z podanych danych (source='user')
-            listing = PropertyData(
-                url=reference_url or f"location://{lat},{lon}",
-                title=address,
-                price=price,  # Może być None
-                area_sqm=area_sqm,  # Może być None
-                latitude=lat,
-                longitude=lon,
-                has_precise_location=True,
-                location=address,
+            run = self._start_location_run(
+                ctx, slog, lat, lon, price, area_sqm, address, radius, reference_url,
+                user_profile, poi_provider, profile_key, radius_overrides,
+                enable_enrichment, enable_fallback,
             )
-            # Oznacz źródło danych jako 'user' (nie provider)
-            listing.source = 'user'
+
+            # Świeża analiza tej samej lokalizacji kilka metrów obok — bez liczenia od nowa
+            reused = self._find_reusable_analysis(run)
+            if reused is not None:
+                yield json.dumps({'status': 'complete', 'result': self._reused_result(run, reused)}) + '\n'
+                return
+
+            # Koordynaty znane od razu: POI i jakość powietrza pobierane równolegle,
+            # w tym czasie strumień dalej wysyła statusy
+            stages = StageScheduler(ctx)
+            stages.submit('geo', self._get_pois, **self._geo_kwargs(run))
+            if run.config.report_air_quality:
+                stages.submit('air_quality', self._fetch_air_quality, lat, lon, slog)
             
-            # Oblicz price_per_sqm tylko jeśli oba są podane
-            if price and area_sqm:
-                listing.price_per_sqm = round(price / area_sqm, 2)
-            
-            # Analiza okolicy
-            neighborhood_score = None
-            poi_stats = None
-            pois = None
-            profile_scoring_result = None
-            verdict = None
-            ai_insights = None
-            poi_cache_used = False
-            data_quality = None
+            yield self._event('starting', f'Rozpoczynam analizę lokalizacji dla profilu: {run.profile.emoji} {run.profile.name}...')
             
             try:
-                ctx.start_stage("geo")
-                provider_label = 'Google Places' if poi_provider == 'google' else ('Hybrid' if poi_provider == 'hybrid' else 'Overpass')
-                yield json.dumps({'status': 'map', 'message': f'Analiza mapy ({provider_label}, promień {fetch_radius}m)...'}) + '\n'
-                pois, metrics, poi_cache_used = self._get_pois(
-                    lat, lon, fetch_radius, 
-                    use_cache=True, 
-                    provider=poi_provider,
-                    radius_by_category=effective_radius_m,  # Pass per-category radius!
-                    trace_ctx=ctx,
-                    enable_enrichment=enable_enrichment,
-                    enable_fallback=enable_fallback,
-                )
-                geo_dur = ctx.end_stage("geo")
-                slog.info(stage="geo", op="get_pois", provider=poi_provider, duration_ms=geo_dur, meta={"cache_used": poi_cache_used})
-
-                # Debug: zrzut wykrytych POI (top 10 per kategoria)
-                if logging.getLogger(__name__).isEnabledFor(logging.DEBUG):
-                    for cat, items in (pois or {}).items():
-                        if items:
-                            slog.debug(stage="geo", op="poi_dump", meta={"category": cat, "count": len(items), "top3": [p.name for p in items[:3]]})
-                
-                # Build grid cells map for nature_background
-                nature_m = metrics.get('nature', {}) if metrics else {}
-                grid_cells_map = {}
-                green_elems = nature_m.get('total_green_elements', 0)
-                if green_elems > 0:
-                    grid_cells_map['nature_background'] = green_elems
-                
-                # Build DataQualityReport for debugging and UI
-                data_quality = build_data_quality_report(
-                    pois_by_category=pois,
-                    radii=effective_radius_m,
-                    overpass_status="ok",  # TODO: track from hybrid provider
-                    overpass_had_retry=False,  # TODO: track from hybrid provider
-                    fallback_started=[],  # TODO: track from hybrid provider
-                    fallback_contributed=[],  # TODO: track from hybrid provider
-                    cache_used=poi_cache_used,
-                    profile_weights=profile.weights,
-                    grid_cells_by_category=grid_cells_map,
-                )
-                
-                ctx.start_stage("scoring")
-                yield json.dumps({'status': 'calculating', 'message': 'Obliczanie scoringu bazowego...'}) + '\n'
+                yield self._event('map', self._map_message(run))
+                pois, metrics, poi_cache_used = stages.result('geo')
+                self._accept_pois(run, pois, metrics, poi_cache_used, stages.duration_ms('geo'))
                 
-                # 1. Standardowa analiza POI (surowe score'y) - dla kompatybilności
-                neighborhood_score = self.poi_analyzer.analyze(pois, metrics)
-                poi_stats = self.poi_analyzer.get_statistics(pois)
-                scoring_dur = ctx.end_stage("scoring")
-                slog.info(stage="scoring", op="base_scoring", duration_ms=scoring_dur)
+                yield self._event('calculating', 'Obliczanie scoringu bazowego...')
+                self._base_scoring(run)
                 
-                yield json.dumps({
-                    'status': 'profile', 
-                    'message': f'Przeliczanie dla profilu: {profile.emoji} {profile.name}...'
-                }) + '\n'
-                
-                # 2. NOWY: Profile-based scoring z krzywymi spadku
-                ctx.start_stage("profile_scoring")
-                profile_engine = create_scoring_engine(effective_profile_key, radius_overrides)
-                profile_scoring_result = profile_engine.calculate(
-                    pois_by_category=pois,
-                    quiet_score=neighborhood_score.quiet_score or 50.0,
-                    nature_metrics=metrics.get('nature'),
-                    base_neighborhood_score=neighborhood_score.total_score,
-                )
-                # Attach quiet score breakdown for QA visibility
-                profile_scoring_result.quiet_debug = getattr(neighborhood_score, 'quiet_debug', {}) or {}
-                ctx.end_stage("profile_scoring")
-                
-                # 3. Generuj werdykt decyzyjny (używamy nowego profilu)
-                ctx.start_stage("verdict")
-                verdict_generator = ProfileVerdictGenerator()
-                verdict = verdict_generator.generate(profile_scoring_result, profile)
-                verdict_dur = ctx.end_stage("verdict")
-                
-                slog.info(
-                    stage="verdict", op="profile_verdict", duration_ms=verdict_dur,
-                    meta={"score": round(profile_scoring_result.total_score, 1), "verdict": verdict.level.value, "profile": effective_profile_key},
-                )
+                yield self._event('profile', f'Przeliczanie dla profilu: {run.profile.emoji} {run.profile.name}...')
+                self._profile_scoring(run)
                 
                 # 4. NOWE: Generuj AI insights (Single Source of Truth architecture)
-                if config.report_ai_insights:
+                if run.config.report_ai_insights:
                     ctx.start_stage("ai")
-                    yield json.dumps({'status': 'ai', 'message': 'Generowanie opisów AI...'}) + '\n'
+                    yield self._event('ai', 'Generowanie opisów AI...')
                     try:
-                        # Build canonical factsheet - the ONLY input AI receives
-                        quiet = neighborhood_score.quiet_score or 50.0
-                        factsheet = build_factsheet_from_scoring(
-                            profile=profile,
-                            scoring_result=profile_scoring_result,
-                            verdict=verdict,
-                            quiet_score=quiet,
-                            pois_by_category=pois,
-                            listing=listing,
-                        )
-                        
                         # Generate AI insights from factsheet (not raw data)
-                        ai_insights = generate_insights_from_factsheet(factsheet)
-                        ai_dur = ctx.end_stage("ai")
-                        
-                        if ai_insights:
-                            slog.info(stage="ai", op="insights_generated", duration_ms=ai_dur, meta={"summary_len": len(ai_insights.summary)})
+                        ai_insights = generate_insights_from_factsheet(self._build_factsheet(run))
+                        self._accept_ai_insights(run, ai_insights)
                     except Exception as ai_error:
-                        ctx.end_stage("ai")
-                        slog.warning(stage="ai", op="insights_failed", message=str(ai_error), error_class="runtime")
-                        ai_insights = None
+                        self._ai_failed(run, ai_error)
                 else:
                     slog.info(stage="ai", op="skipped", message="AI insights disabled in config")
                 
             except Exception as e:
                 slog.error(stage="geo", op="neighborhood", message=str(e), exc=type(e).__name__, error_class="runtime", hint="POI fetch or scoring failed")
-                listing.errors.append("Nie udało się przeanalizować okolicy.")
+                run.listing.errors.append("Nie udało się przeanalizować okolicy.")
             
             # Buduj raport
-            ctx.start_stage("report")
-            yield json.dumps({'status': 'generating', 'message': 'Generowanie raportu końcowego...'}) + '\n'
-            report = self.report_builder.build(
-                property_input=listing,
-                neighborhood_score=neighborhood_score,
-                poi_stats=poi_stats,
-                all_pois=pois,
-                air_quality=self._fetch_air_quality(lat, lon, slog) if config.report_air_quality else None,
-            )
-            ctx.end_stage("report")
-            
-            # Dodaj parametry generowania raportu
-            from datetime import datetime
-            report.generation_params = {
-                'generated_at': datetime.now().isoformat(),
-                'scoring_version': '2.1',
-                'profile_version': getattr(profile, 'version', 1),
-                'profile': {
-                    'key': effective_profile_key,
-                    'name': profile.name,
-                    'emoji': profile.emoji,
-                },
-                'radii': effective_radius_m,
-                'fetch_radius': fetch_radius,
-                'poi_provider': poi_provider,
-                'overpass_mode': config.overpass_mode,
-                'poi_cache_used': poi_cache_used,  # DEV: czy dane POI były z cache
-                'coords': {'lat': lat, 'lon': lon},
-                # Data Quality Report for DEV mode
-                'data_quality': data_quality.to_dict() if data_quality else None,
-            }
+            yield self._event('generating', 'Generowanie raportu końcowego...')
+            result = self._finish_location_run(run, stages.result('air_quality'))
+            yield json.dumps({'status': 'complete', 'result': result}) + '\n'
             
-            # Zapisz do bazy i pobierz public_id
-            ctx.start_stage("save")
-            saved_analysis = self._save_location_to_db(
-                lat=lat,
-                lon=lon,
-                listing=listing,
-                report=report,
-                radius=fetch_radius,
-                reference_url=reference_url,
-                user_profile=user_profile,
-                profile_key=effective_profile_key,
-                profile_scoring_result=profile_scoring_result,
-                verdict=verdict,
-                ai_insights=ai_insights,
+        except Exception as e:
+            slog.error(stage="pipeline", op="analyze_location_stream", message=str(e), exc=type(e).__name__, error_class="runtime", hint="Check traceback in Django logs")
+            ctx.summary.emit(slog, ctx, status="error")
+            yield json.dumps({'status': 'error', 'error': str(e)}) + '\n'
+        finally:
+            # Klient rozłączył się w trakcie — etapy, które nie wystartowały, nie zajmują puli
+            if stages is not None:
+                stages.cancel_pending()
+    
+    async def analyze_location_stream_async(
+        self,
+        lat: float,
+        lon: float,
+        price: Optional[float],
+        area_sqm: Optional[float],
+        address: str,
+        radius: int = None,
+        reference_url: str = None,
+        user_profile: str = 'family',
+        poi_provider: str = None,
+        profile_key: str = None,
+        radius_overrides: Dict[str, int] = None,
+        enable_enrichment: bool = None,
+        enable_fallback: bool = None,
+    ):
+        """
+        Asynchroniczny odpowiednik analyze_location_stream (ścieżka ASGI).
+        
+        Ten sam przebieg i te same eventy NDJSON, ale I/O (Overpass, Google,
+        Open-Meteo, Ollama) idzie przez httpx na pętli zdarzeń zamiast
+        blokować wątek — jeden worker obsługuje wiele analiz naraz.
+        Zapis do bazy idzie przez sync_to_async.
+        """
+        import asyncio
+        from asgiref.sync import sync_to_async
+        from .ai_insights import generate_insights_from_factsheet_async
+        
+        ctx = AnalysisTraceContext()
+        slog = get_diag_logger(__name__, ctx)
+        geo_task = air_task = None
+        
+        try:
+            run = self._start_location_run(
+                ctx, slog, lat, lon, price, area_sqm, address, radius, reference_url,
+                user_profile, poi_provider, profile_key, radius_overrides,
+                enable_enrichment, enable_fallback,
             )
+
+            reused = await sync_to_async(self._find_reusable_analysis)(run)
+            if reused is not None:
+                yield json.dumps({'status': 'complete', 'result': self._reused_result(run, reused)}) + '\n'
+                return
+
+            geo_task = asyncio.create_task(self._timed_stage(ctx, 'geo', self._get_pois_async(**self._geo_kwargs(run))))
+            if run.config.report_air_quality:
+                air_task = asyncio.create_task(self._timed_stage(ctx, 'air_quality', self._fetch_air_quality_async(lat, lon, slog)))
             
-            ctx.end_stage("save")
-            result = report.to_dict()
-            
-            # Dodaj public_id do wyniku
-            if saved_analysis:
-                result['public_id'] = saved_analysis.public_id
-            
-            # Dodaj dane profilu i scoringu do wyniku
-            result['profile'] = profile.to_dict()
-            result['persona'] = persona.to_dict()  # Legacy
-            
-            if profile_scoring_result:
-                result['scoring'] = profile_scoring_result.to_dict()
-            if verdict:
-                result['verdict'] = verdict.to_dict()
+            yield self._event('starting', f'Rozpoczynam analizę lokalizacji dla profilu: {run.profile.emoji} {run.profile.name}...')
             
-            # Dodaj AI insights do wyniku
-            if ai_insights:
-                result['ai_insights'] = {
-                    'summary': ai_insights.summary,
-                    'attention_points': ai_insights.attention_points,
-                    'verification_checklist': ai_insights.verification_checklist,
-                }
+            try:
+                yield self._event('map', self._map_message(run))
+                (pois, metrics, poi_cache_used), geo_dur = await geo_task
+                self._accept_pois(run, pois, metrics, poi_cache_used, geo_dur)
+                
+                yield self._event('calculating', 'Obliczanie scoringu bazowego...')
+                self._base_scoring(run)
+                
+                yield self._event('profile', f'Przeliczanie dla profilu: {run.profile.emoji} {run.profile.name}...')
+                self._profile_scoring(run)
+                
+                if run.config.report_ai_insights:
+                    ctx.start_stage("ai")
+                    yield self._event('ai', 'Generowanie opisów AI...')
+                    try:
+                        ai_insights = await generate_insights_from_factsheet_async(self._build_factsheet(run))
+                        self._accept_ai_insights(run, ai_insights)
+                    except Exception as ai_error:
+                        self._ai_failed(run, ai_error)
+                else:
+                    slog.info(stage="ai", op="skipped", message="AI insights disabled in config")
+                
+            except Exception as e:
+                slog.error(stage="geo", op="neighborhood", message=str(e), exc=type(e).__name__, error_class="runtime", hint="POI fetch or scoring failed")
+                run.listing.errors.append("Nie udało się przeanalizować okolicy.")
             
-            ctx.summary.emit(slog, ctx, status="ok", extra_meta={"profile": effective_profile_key, "public_id": getattr(saved_analysis, 'public_id', None)})
+            yield self._event('generating', 'Generowanie raportu końcowego...')
+            air_quality = (await air_task)[0] if air_task else None
+            result = await sync_to_async(self._finish_location_run)(run, air_quality)
             yield json.dumps({'status': 'complete', 'result': result}) + '\n'
             
         except Exception as e:
             slog.error(stage="pipeline", op="analyze_location_stream", message=str(e), exc=type(e).__name__, error_class="runtime", hint="Check traceback in Django logs")
             ctx.summary.emit(slog, ctx, status="error")
             yield json.dumps({'status': 'error', 'error': str(e)}) + '\n'
+        finally:
+            # Klient rozłączył się w trakcie — nie zostawiaj osieroconych zapytań
+            for task in (geo_task, air_task):
+                if task is not None and not task.done():
+                    task.cancel()
+    
+    @staticmethod
+    async def _timed_stage(ctx: AnalysisTraceContext, stage: str, coro):
+        """Czeka na etap i zapisuje jego czas w ctx.summary; zwraca (wynik, ms)."""
+        import time
+        started = time.monotonic()
+        try:
+            return await coro, round((time.monotonic() - started) * 1000, 1)
+        finally:
+            ctx.summary.record_stage(stage, (time.monotonic() - started) * 1000)
+    
+    def analyze_batch_stream(self, items: List[Dict[str, Any]], radius: Optional[int] = None):
+        """
+        Generator NDJSON scoringu wielu lokalizacji (partnerzy, do BATCH_MAX_ITEMS).
+
+        Pobliskie punkty (komórki BATCH_CLUSTER_SPAN_M) dzielą jedno zapytanie
+        Overpass — bbox obejmujący okręgi wszystkich punktów klastra. Klastry
+        są liczone równolegle (BATCH_MAX_CONCURRENT_FETCHES), a wyniki pozycji
+        klastra wysyłane zaraz po policzeniu. Klastry idą na osobną pulę
+        (get_batch_executor), więc partia nie zajmuje wątków analiz
+        interaktywnych. Tylko POI z OSM i scoring profilu
+        (ProfileScoringEngine + werdykt): bez AI, raportu i zapisu do bazy.
+
+        Args:
+            items: [{'latitude', 'longitude', 'profile_key', 'radius_overrides'?, 'price'?, 'area_sqm'?}]
+            radius: Minimalny promień pobierania (domyślnie config.default_radius)
+
+        Yields:
+            'starting', potem per pozycja {'status': 'item', 'index', 'result'}
+            lub {'status': 'item_error', 'index', 'error'}, na końcu 'complete'.
+        """
+        from concurrent.futures import FIRST_COMPLETED, wait
+        from .app_config import get_config
+        from .geo.spatial_cache import cluster_points
+        from .stage_scheduler import get_batch_executor
+        config = get_config()
+        ctx = AnalysisTraceContext()
+        slog = get_diag_logger(__name__, ctx)
+        
+        clusters = cluster_points([(item['latitude'], item['longitude']) for item in items], config.batch_cluster_span_m)
+        slog.info(stage="init", op="analyze_batch", message="Start batch scoring", meta={"items": len(items), "clusters": len(clusters)})
+        yield self._event('starting', f'Scoring {len(items)} lokalizacji ({len(clusters)} zapytań o POI)...')
+        
+        queue = list(clusters)
+        pending = set()
+        scored = failed = 0
+        try:
+            while queue or pending:
+                while queue and len(pending) < max(1, config.batch_max_concurrent_fetches):
+                    indexes = queue.pop(0)
+                    pending.add(get_batch_executor().submit(self._score_batch_cluster, items, indexes, radius))
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    for index, result, error in future.result():
+                        if error is None:
+                            scored += 1
+                            yield json.dumps({'status': 'item', 'index': index, 'result': result}) + '\n'
+                        else:
+                            failed += 1
+                            yield json.dumps({'status': 'item_error', 'index': index, 'error': error}) + '\n'
+        finally:
+            # Klient przerwał strumień — nie liczymy klastrów, które jeszcze nie wystartowały
+            for future in pending:
+                future.cancel()
+        
+        ctx.summary.emit(slog, ctx, status="ok")
+        yield json.dumps({'status': 'complete', 'summary': {'items': len(items), 'scored': scored, 'failed': failed, 'clusters': len(clusters)}}) + '\n'
+    
+    def _score_batch_cluster(self, items: List[Dict[str, Any]], indexes: List[int], radius: Optional[int]) -> List[tuple]:
+        """
+        Jeden klaster partii: wspólne pobranie POI i scoring każdej pozycji.
+        Zwraca [(index, wynik, None) | (index, None, błąd)].
+        """
+        ctx = AnalysisTraceContext()
+        slog = get_diag_logger(__name__, ctx)
+        runs = []
+        outcomes = []
+        for index in indexes:
+            item = items[index]
+            try:
+                runs.append((index, self._start_location_run(
+                    ctx, slog, item['latitude'], item['longitude'], item.get('price'), item.get('area_sqm'), '', radius, None,
+                    item['profile_key'], 'overpass', item['profile_key'], item.get('radius_overrides') or None,
+                    False, False,
+                )))
+            except Exception as e:
+                outcomes.append((index, None, str(e)))
+        if not runs:
+            return outcomes
+        
+        try:
+            fetched = self.overpass_client.get_pois_for_points(
+                [(run.lat, run.lon, run.fetch_radius) for _, run in runs], trace_ctx=ctx,
+            )
+        except Exception as e:
+            slog.error(stage="geo", op="batch_cluster", message=str(e), exc=type(e).__name__, error_class="runtime")
+            return outcomes + [(index, None, "Nie udało się pobrać POI.") for index, _ in runs]
+        
+        from .geo.poi_filter import filter_by_radius
+        for (index, run), poi_result in zip(runs, fetched):
+            if poi_result is None:
+                # Awaria Overpass to błąd pozycji, nie wynik 0 pkt
+                outcomes.append((index, None, "Nie udało się pobrać POI."))
+                continue
+            pois, metrics = poi_result
+            try:
+                run.pois = filter_by_radius(pois, run.effective_radius_m, default_radius=run.fetch_radius)
+                run.metrics = metrics
+                self._base_scoring(run)
+                self._profile_scoring(run, all_profiles=False)
+                outcomes.append((index, self._batch_result(run), None))
+            except Exception as e:
+                slog.error(stage="scoring", op="batch_item", message=str(e), exc=type(e).__name__, error_class="runtime")
+                outcomes.append((index, None, str(e)))
+        return outcomes
+    
+    @staticmethod
+    def _batch_result(run: '_LocationRun') -> Dict[str, Any]:
+        """Zwięzły wynik pozycji partii (bez POI i debug)."""
+        scoring = run.profile_scoring_result
+        return {
+            'lat': run.lat,
+            'lon': run.lon,
+            'profile_key': run.profile_key,
+            'total_score': round(scoring.total_score, 1),
+            'verdict': {'level': run.verdict.level.value, 'label': run.verdict.label},
+            'price_per_sqm': float(run.listing.price_per_sqm) if run.listing.price_per_sqm else None,
+            'category_scores': {cat: round(result.score, 1) for cat, result in scoring.category_results.items()},
+            'poi_counts': {cat: len(items) for cat, items in run.pois.items()},
+            'fetch_radius': run.fetch_radius,
+        }
+    
+    @staticmethod
+    def _event(status: str, message: str) -> str:
+        return json.dumps({'status': status, 'message': message}) + '\n'
+    
+    @staticmethod
+    def _map_message(run: '_LocationRun') -> str:
+        provider_label = 'Google Places' if run.poi_provider == 'google' else ('Hybrid' if run.poi_provider == 'hybrid' else 'Overpass')
+        return f'Analiza mapy ({provider_label}, promień {run.fetch_radius}m)...'
+    
+    def _start_location_run(
+        self,
+        ctx: AnalysisTraceContext,
+        slog,
+        lat: float,
+        lon: float,
+        price: Optional[float],
+        area_sqm: Optional[float],
+        address: str,
+        radius: Optional[int],
+        reference_url: Optional[str],
+        user_profile: str,
+        poi_provider: Optional[str],
+        profile_key: Optional[str],
+        radius_overrides: Optional[Dict[str, int]],
+        enable_enrichment: Optional[bool],
+        enable_fallback: Optional[bool],
+    ) -> '_LocationRun':
+        """Ustala profil, promienie i dane wejściowe analizy lokalizacji."""
+        from .app_config import get_config
+        config = get_config()
+        
+        # Defaults z centralnej konfiguracji (jeśli nie podane per-request)
+        if radius is None:
+            radius = config.default_radius
+        if poi_provider is None:
+            poi_provider = config.default_poi_provider
+        if enable_enrichment is None:
+            enable_enrichment = config.default_enrichment
+        if enable_fallback is None:
+            enable_fallback = config.default_fallback
+        
+        # Mapowanie legacy user_profile -> profile_key
+        effective_profile_key = profile_key or user_profile
+        
+        slog.info(
+            stage="init", op="analyze_location_stream",
+            message="Start location analysis",
+            meta={"lat": lat, "lon": lon, "radius": radius, "profile": effective_profile_key, "poi_provider": poi_provider},
+        )
+        
+        # Pobierz nowy profil konfiguracyjny
+        profile = get_profile(effective_profile_key)
+        
+        # Apply user overrides to profile radii
+        effective_radius_m = dict(profile.radius_m)  # Copy defaults
+        if radius_overrides:
+            for category, override_radius in radius_overrides.items():
+                if category in effective_radius_m:
+                    effective_radius_m[category] = override_radius
+                    slog.debug(stage="init", op="radius_override", meta={"category": category, "new": override_radius, "was": profile.radius_m.get(category)})
+
+        # Ustal promien pobierania POI = max promien per kategoria (including overrides)
+        profile_radius_max = max(effective_radius_m.values()) if effective_radius_m else radius
+        fetch_radius = max(radius, profile_radius_max)
+        
+        # Legacy: pobierz też starą personę dla kompatybilności wstecznej
+        # Mapujemy nowe profile_key na stare persony gdzie to możliwe
+        legacy_persona_key = self._map_profile_to_persona(effective_profile_key)
+        persona = get_persona_by_string(legacy_persona_key)
+        
+        # Twórz PropertyData z podanych danych (source='user')
+        listing = PropertyData(
+            url=reference_url or f"location://{lat},{lon}",
+            title=address,
+            price=price,  # Może być None
+            area_sqm=area_sqm,  # Może być None
+            latitude=lat,
+            longitude=lon,
+            has_precise_location=True,
+            location=address,
+        )
+        # Oznacz źródło danych jako 'user' (nie provider)
+        listing.source = 'user'
+        
+        # Oblicz price_per_sqm tylko jeśli oba są podane
+        if price and area_sqm:
+            listing.price_per_sqm = round(price / area_sqm, 2)
+        
+        return _LocationRun(
+            ctx=ctx,
+            slog=slog,
+            config=config,
+            lat=lat,
+            lon=lon,
+            poi_provider=poi_provider,
+            enable_enrichment=enable_enrichment,
+            enable_fallback=enable_fallback,
+            reference_url=reference_url,
+            user_profile=user_profile,
+            profile_key=effective_profile_key,
+            profile=profile,
+            persona=persona,
+            radius_overrides=radius_overrides,
+            effective_radius_m=effective_radius_m,
+            fetch_radius=fetch_radius,
+            listing=listing,
+        )
+    
+    @staticmethod
+    def _geo_kwargs(run: '_LocationRun') -> Dict[str, Any]:
+        return dict(
+            lat=run.lat,
+            lon=run.lon,
+            radius=run.fetch_radius,
+            use_cache=True,
+            provider=run.poi_provider,
+            radius_by_category=run.effective_radius_m,  # Pass per-category radius!
+            trace_ctx=run.ctx,
+            enable_enrichment=run.enable_enrichment,
+            enable_fallback=run.enable_fallback,
+        )
+    
+    def _accept_pois(self, run: '_LocationRun', pois, metrics, poi_cache_used: bool, geo_dur: float) -> None:
+        """Zapisuje wynik etapu geo i buduje DataQualityReport."""
+        slog = run.slog
+        run.pois, run.metrics, run.poi_cache_used = pois, metrics, poi_cache_used
+        slog.info(stage="geo", op="get_pois", provider=run.poi_provider, duration_ms=geo_dur, meta={"cache_used": poi_cache_used})
+
+        # Debug: zrzut wykrytych POI (top 10 per kategoria)
+        if logging.getLogger(__name__).isEnabledFor(logging.DEBUG):
+            for cat, items in (pois or {}).items():
+                if items:
+                    slog.debug(stage="geo", op="poi_dump", meta={"category": cat, "count": len(items), "top3": [p.name for p in items[:3]]})
+        
+        # Build grid cells map for nature_background
+        nature_m = metrics.get('nature', {}) if metrics else {}
+        grid_cells_map = {}
+        green_elems = nature_m.get('total_green_elements', 0)
+        if green_elems > 0:
+            grid_cells_map['nature_background'] = green_elems
+        
+        # Build DataQualityReport for debugging and UI
+        run.data_quality = build_data_quality_report(
+            pois_by_category=pois,
+            radii=run.effective_radius_m,
+            overpass_status="ok",  # TODO: track from hybrid provider
+            overpass_had_retry=False,  # TODO: track from hybrid provider
+            fallback_started=[],  # TODO: track from hybrid provider
+            fallback_contributed=[],  # TODO: track from hybrid provider
+            cache_used=poi_cache_used,
+            profile_weights=run.profile.weights,
+            grid_cells_by_category=grid_cells_map,
+        )
+    
+    def _base_scoring(self, run: '_LocationRun') -> None:
+        # 1. Standardowa analiza POI (surowe score'y) - dla kompatybilności
+        run.ctx.start_stage("scoring")
+        run.neighborhood_score = self.poi_analyzer.analyze(run.pois, run.metrics)
+        run.poi_stats = self.poi_analyzer.get_statistics(run.pois)
+        scoring_dur = run.ctx.end_stage("scoring")
+        run.slog.info(stage="scoring", op="base_scoring", duration_ms=scoring_dur)
+    
+    def _profile_scoring(self, run: '_LocationRun', all_profiles: bool = True) -> None:
+        ctx = run.ctx
+        
+        # 2. NOWY: Profile-based scoring z krzywymi spadku
+        ctx.start_stage("profile_scoring")
+        profile_engine = create_scoring_engine(run.profile_key, run.radius_overrides)
+        prepared = PreparedPOIs(run.pois)
+        scoring_args = dict(
+            pois_by_category=run.pois,
+            quiet_score=run.neighborhood_score.quiet_score or 50.0,
+            nature_metrics=run.metrics.get('nature'),
+            base_neighborhood_score=run.neighborhood_score.total_score,
+            prepared=prepared,
+        )
+        run.profile_scoring_result = profile_engine.calculate(**scoring_args)
+        # Attach quiet score breakdown for QA visibility
+        run.profile_scoring_result.quiet_debug = getattr(run.neighborhood_score, 'quiet_debug', {}) or {}
+        
+        if all_profiles:
+            # Pozostałe profile liczone na tych samych PreparedPOIs
+            run.profile_scores = _profile_scores(run, run.profile_scoring_result, **scoring_args)
+        ctx.end_stage("profile_scoring")
+        
+        # 3. Generuj werdykt decyzyjny (używamy nowego profilu)
+        ctx.start_stage("verdict")
+        verdict_generator = ProfileVerdictGenerator()
+        run.verdict = verdict_generator.generate(run.profile_scoring_result, run.profile)
+        verdict_dur = ctx.end_stage("verdict")
+        
+        run.slog.info(
+            stage="verdict", op="profile_verdict", duration_ms=verdict_dur,
+            meta={"score": round(run.profile_scoring_result.total_score, 1), "verdict": run.verdict.level.value, "profile": run.profile_key},
+        )
+    
+    @staticmethod
+    def _build_factsheet(run: '_LocationRun'):
+        """Canonical factsheet - the ONLY input AI receives."""
+        return build_factsheet_from_scoring(
+            profile=run.profile,
+            scoring_result=run.profile_scoring_result,
+            verdict=run.verdict,
+            quiet_score=run.neighborhood_score.quiet_score or 50.0,
+            pois_by_category=run.pois,
+            listing=run.listing,
+        )
+    
+    @staticmethod
+    def _accept_ai_insights(run: '_LocationRun', ai_insights) -> None:
+        run.ai_insights = ai_insights
+        ai_dur = run.ctx.end_stage("ai")
+        if ai_insights:
+            run.slog.info(stage="ai", op="insights_generated", duration_ms=ai_dur, meta={"summary_len": len(ai_insights.summary)})
+    
+    @staticmethod
+    def _ai_failed(run: '_LocationRun', ai_error: Exception) -> None:
+        run.ctx.end_stage("ai")
+        run.slog.warning(stage="ai", op="insights_failed", message=str(ai_error), error_class="runtime")
+        run.ai_insights = None
+    
+    def _find_reusable_analysis(self, run: '_LocationRun') -> Optional[LocationAnalysis]:
+        """
+        Zapisana analiza w promieniu nearby_reuse_m, nie starsza niż
+        nearby_reuse_max_age, policzona dla tych samych parametrów.
+        None, gdy brak albo reuse wyłączony.
+        """
+        config = run.config
+        if config.nearby_reuse_m <= 0:
+            return None
+        try:
+            candidates = LocationAnalysis.objects.find_recent_near(
+                run.lat, run.lon, config.nearby_reuse_m,
+                profile_key=run.profile_key,
+                max_age=config.nearby_reuse_max_age,
+            )
+        except Exception as e:
+            run.slog.warning(stage="init", op="nearby_reuse_failed", message=str(e), error_class="runtime")
+            return None
+        for analysis in candidates:
+            if self._same_analysis_inputs(run, analysis):
+                run.slog.info(
+                    stage="init", op="nearby_reuse",
+                    meta={"public_id": analysis.public_id, "distance_m": round(analysis.distance_m, 1)},
+                )
+                return analysis
+        return None
+    
+    @staticmethod
+    def _same_analysis_inputs(run: '_LocationRun', analysis: LocationAnalysis) -> bool:
+        """Czy zapisana analiza odpowiada parametrom nowej (poza kilkumetrowym przesunięciem)."""
+        params = (analysis.report_data or {}).get('generation_params') or {}
+        listing = run.listing
+        if run.reference_url:
+            same_url = analysis.url == run.reference_url
+        else:
+            same_url = analysis.url.startswith('location://')
+        return (
+            same_url
+            and not analysis.parsing_errors
+            and bool(analysis.scoring_data)
+            # Snapshot POI potrzebny do odtworzenia profile_scores
+            and (analysis.poi_snapshot or {}).get('v') == SNAPSHOT_VERSION
+            and analysis.profile_config_version == getattr(run.profile, 'version', 1)
+            and analysis.analysis_radius == run.fetch_radius
+            and params.get('radii') == run.effective_radius_m
+            and params.get('poi_provider') == run.poi_provider
+            and params.get('enable_enrichment') == run.enable_enrichment
+            and params.get('enable_fallback') == run.enable_fallback
+            and params.get('report_air_quality') == run.config.report_air_quality
+            and analysis.address == (listing.location or '')
+            and _same_amount(analysis.price, listing.price)
+            and _same_amount(analysis.area_sqm, listing.area_sqm)
+        )
+    
+    @staticmethod
+    def _reused_result(run: '_LocationRun', analysis: LocationAnalysis) -> Dict[str, Any]:
+        """
+        Wynik eventu 'complete' z zapisanej analizy (jak GET /api/report/).
+        profile_scores liczone ze snapshotu POI — ten sam kształt co świeża analiza.
+        """
+        result = assemble_report(analysis)
+        result['profile'] = run.profile.to_dict()
+        result['persona'] = run.persona.to_dict()  # Legacy
+        result['scoring'] = analysis.scoring_data
+        if analysis.verdict_data:
+            result['verdict'] = analysis.verdict_data
+        if analysis.ai_insights_data:
+            result['ai_insights'] = analysis.ai_insights_data
+        inputs = load_poi_snapshot(analysis.poi_snapshot)
+        scoring_args = dict(
+            pois_by_category=inputs.pois_by_category,
+            quiet_score=inputs.quiet_score,
+            nature_metrics=inputs.nature_metrics,
+            base_neighborhood_score=inputs.base_neighborhood_score,
+            prepared=PreparedPOIs(inputs.pois_by_category),
+        )
+        current = create_scoring_engine(run.profile_key, run.radius_overrides).calculate(**scoring_args)
+        result['profile_scores'] = _profile_scores(run, current, **scoring_args)
+        result['nearby_reuse'] = {'distance_m': round(analysis.distance_m, 1)}
+        run.ctx.summary.emit(run.slog, run.ctx, status="ok", extra_meta={
+            "profile": run.profile_key, "public_id": analysis.public_id, "nearby_reuse": True,
+        })
+        return result
+    
+    def _finish_location_run(self, run: '_LocationRun', air_quality: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Buduje raport, zapisuje analizę do bazy i zwraca wynik dla eventu 'complete'."""
+        ctx, slog = run.ctx, run.slog
+        
+        ctx.start_stage("report")
+        report = self.report_builder.build(
+            property_input=run.listing,
+            neighborhood_score=run.neighborhood_score,
+            poi_stats=run.poi_stats,
+            all_pois=run.pois,
+            air_quality=air_quality,
+        )
+        ctx.end_stage("report")
+        
+        # Dodaj parametry generowania raportu
+        from datetime import datetime
+        report.generation_params = {
+            'generated_at': datetime.now().isoformat(),
+            'scoring_version': '2.1',
+            'profile_version': getattr(run.profile, 'version', 1),
+            'profile': {
+                'key': run.profile_key,
+                'name': run.profile.name,
+                'emoji': run.profile.emoji,
+            },
+            'radii': run.effective_radius_m,
+            'fetch_radius': run.fetch_radius,
+            'poi_provider': run.poi_provider,
+            'enable_enrichment': run.enable_enrichment,
+            'enable_fallback': run.enable_fallback,
+            'report_air_quality': run.config.report_air_quality,
+            'overpass_mode': run.config.overpass_mode,
+            'poi_cache_used': run.poi_cache_used,  # DEV: czy dane POI były z cache
+            'coords': {'lat': run.lat, 'lon': run.lon},
+            # Data Quality Report for DEV mode
+            'data_quality': run.data_quality.to_dict() if run.data_quality else None,
+        }
+        
+        # Zapisz do bazy i pobierz public_id
+        ctx.start_stage("save")
+        saved_analysis = self._save_location_to_db(
+            lat=run.lat,
+            lon=run.lon,
+            listing=run.listing,
+            report=report,
+            radius=run.fetch_radius,
+            reference_url=run.reference_url,
+            user_profile=run.user_profile,
+            profile_key=run.profile_key,
+            profile_scoring_result=run.profile_scoring_result,
+            verdict=run.verdict,
+            ai_insights=run.ai_insights,
+            poi_snapshot=build_poi_snapshot(
+                run.pois,
+                quiet_score=run.neighborhood_score.quiet_score or 50.0,
+                nature_metrics=run.metrics.get('nature'),
+                base_neighborhood_score=run.neighborhood_score.total_score,
+            ) if run.pois is not None else {},
+        )
+        
+        ctx.end_stage("save")
+        result = report.to_dict()
+        
+        # Dodaj public_id do wyniku
+        if saved_analysis:
+            result['public_id'] = saved_analysis.public_id
+        
+        # Dodaj dane profilu i scoringu do wyniku
+        result['profile'] = run.profile.to_dict()
+        result['persona'] = run.persona.to_dict()  # Legacy
+        
+        if run.profile_scoring_result:
+            result['scoring'] = run.profile_scoring_result.to_dict()
+        if run.profile_scores:
+            result['profile_scores'] = run.profile_scores
+        if run.verdict:
+            result['verdict'] = run.verdict.to_dict()
+        
+        # Dodaj AI insights do wyniku
+        if run.ai_insights:
+            result['ai_insights'] = {
+                'summary': run.ai_insights.summary,
+                'attention_points': run.ai_insights.attention_points,
+                'verification_checklist': run.ai_insights.verification_checklist,
+            }
+        
+        ctx.summary.emit(slog, ctx, status="ok", extra_meta={"profile": run.profile_key, "public_id": getattr(saved_analysis, 'public_id', None)})
+        return result
     
     def _parse_listing(self, url: str, use_cache: bool) -> PropertyData:
         """Parsuje ogłoszenie (z cache jeśli dostępne)."""
@@ -511,47 +1004,185 @@ class AnalysisService:
         Returns:
             tuple: (pois_by_category, metrics)
         """
-        # Normalizuj koordynaty dla lepszego cache hit rate (~11m grid)
-        norm_lat, norm_lon = normalize_coords(lat, lon, precision=4)
+        fetch_args = (lat, lon, radius, provider, radius_by_category, enable_enrichment, enable_fallback)
+        cache_key, cached = self._cached_pois(lat, lon, radius, use_cache, provider, radius_by_category, trace_ctx, fetch_args)
+        if cached is not None:
+            return cached
         
-        # Cache key uses fetch_radius (max radius), NOT per-profile radii
-        # This ensures different profiles reuse cached geo data for same location
-        cache_key = TTLCache.make_key('pois', norm_lat, norm_lon, radius, provider)
+        def fetch():
+            pois, metrics = self._fetch_pois(*fetch_args, trace_ctx=trace_ctx)
+            if use_cache and not is_failed_fetch(metrics):
+                overpass_cache.set(cache_key, (pois, metrics))  # TTL: config.cache_ttl_pois
+            return pois, metrics
         
-        if use_cache:
-            cached = overpass_cache.get(cache_key)
-            if cached:
-                logger.debug("POI cache hit (%s): (%s, %s) r=%s", provider, norm_lat, norm_lon, radius)
-                # Apply per-category radius filter on cached data
-                pois, metrics = cached[0], cached[1]
+        if not use_cache:
+            pois, metrics = fetch()
+            return pois, metrics, False  # cache_used=False
+        
+        # Równoczesne analizy tego samego miejsca czekają na jeden fetch
+        (pois, metrics), shared = poi_fetch_flight.do(cache_key, fetch)
+        return self._flight_result(pois, metrics, shared, radius, radius_by_category, trace_ctx)
+    
+    async def _get_pois_async(
+        self,
+        lat: float,
+        lon: float,
+        radius: int,
+        use_cache: bool,
+        provider: str = 'hybrid',
+        radius_by_category: Dict[str, int] = None,
+        trace_ctx: 'AnalysisTraceContext | None' = None,
+        enable_enrichment: bool = False,
+        enable_fallback: bool = True,
+    ) -> tuple:
+        """Asynchroniczny odpowiednik _get_pois (ścieżka ASGI)."""
+        fetch_args = (lat, lon, radius, provider, radius_by_category, enable_enrichment, enable_fallback)
+        cache_key, cached = self._cached_pois(lat, lon, radius, use_cache, provider, radius_by_category, trace_ctx, fetch_args)
+        if cached is not None:
+            return cached
+        
+        async def fetch():
+            if provider == 'hybrid':
+                pois, metrics = await self.hybrid_provider.get_pois_hybrid_async(
+                    lat, lon, radius,
+                    radius_by_category=radius_by_category,
+                    enable_enrichment=enable_enrichment,
+                    enable_fallback=enable_fallback,
+                    trace_ctx=trace_ctx,
+                )
+            elif provider == 'google':
+                pois, metrics = await self.google_places_client.get_pois_around_async(
+                    lat, lon, radius, trace_ctx=trace_ctx,
+                )
+            else:
+                pois, metrics = await self.overpass_client.get_pois_around_async(
+                    lat, lon, radius, trace_ctx=trace_ctx, radius_by_category=radius_by_category,
+                )
                 if radius_by_category:
                     from .geo.poi_filter import filter_by_radius
                     pois = filter_by_radius(pois, radius_by_category, default_radius=radius)
-                return pois, metrics, True  # pois, metrics, cache_used=True
+            
+            if use_cache and not is_failed_fetch(metrics):
+                overpass_cache.set(cache_key, (pois, metrics))
+            return pois, metrics
         
-        # Wybór klienta
+        if not use_cache:
+            pois, metrics = await fetch()
+            return pois, metrics, False
+        
+        (pois, metrics), shared = await poi_fetch_flight.do_async(cache_key, fetch)
+        return self._flight_result(pois, metrics, shared, radius, radius_by_category, trace_ctx)
+    
+    def _fetch_pois(
+        self,
+        lat: float,
+        lon: float,
+        radius: int,
+        provider: str,
+        radius_by_category: Optional[Dict[str, int]],
+        enable_enrichment: bool,
+        enable_fallback: bool,
+        trace_ctx: 'AnalysisTraceContext | None' = None,
+    ) -> tuple:
+        """Pobiera POI z wybranego providera (bez cache). Zwraca (pois, metrics)."""
         if provider == 'hybrid':
-            pois, metrics = self.hybrid_provider.get_pois_hybrid(
+            return self.hybrid_provider.get_pois_hybrid(
                 lat, lon, radius,
                 radius_by_category=radius_by_category,  # Pass per-category radius!
                 enable_enrichment=enable_enrichment,
                 enable_fallback=enable_fallback,
                 trace_ctx=trace_ctx,
             )
-        elif provider == 'google':
-            pois, metrics = self.google_places_client.get_pois_around(lat, lon, radius, trace_ctx=trace_ctx)
-        else:
-            pois, metrics = self.overpass_client.get_pois_around(lat, lon, radius, trace_ctx=trace_ctx)
-            # Apply filter for non-hybrid providers too
-            if radius_by_category:
-                from .geo.poi_filter import filter_by_radius
-                pois = filter_by_radius(pois, radius_by_category, default_radius=radius)
+        if provider == 'google':
+            return self.google_places_client.get_pois_around(lat, lon, radius, trace_ctx=trace_ctx)
+        
+        pois, metrics = self.overpass_client.get_pois_around(
+            lat, lon, radius, trace_ctx=trace_ctx, radius_by_category=radius_by_category,
+        )
+        # Apply filter for non-hybrid providers too
+        if radius_by_category:
+            from .geo.poi_filter import filter_by_radius
+            pois = filter_by_radius(pois, radius_by_category, default_radius=radius)
+        return pois, metrics
+    
+    def _refresh_pois(self, cache_key: str, fetch_args: tuple) -> None:
+        """
+        Zleca odświeżenie stale wpisu POI w tle (stale-while-revalidate).
+        Fetch idzie przez poi_fetch_flight — miss po hard TTL w trakcie
+        odświeżania czeka na ten sam wynik. Po błędzie providera stary
+        wpis zostaje (jak przy jakości powietrza).
+        """
+        def fetch():
+            pois, metrics = self._fetch_pois(*fetch_args)
+            if is_failed_fetch(metrics):
+                logger.warning("POI refresh failed, keeping stale entry: %s", cache_key)
+            else:
+                overpass_cache.set(cache_key, (pois, metrics))
+            return pois, metrics
+        
+        cache_refresher.submit(cache_key, lambda: poi_fetch_flight.do(cache_key, fetch))
+    
+    @staticmethod
+    def _flight_result(pois, metrics, shared, radius, radius_by_category, trace_ctx) -> tuple:
+        """
+        Wynik single-flight. Oczekujący dostaje dane lidera jak z cache
+        (cache_used=True) i filtruje je własnymi promieniami per kategoria.
+        """
+        if trace_ctx is not None:
+            trace_ctx.summary.record_flight('pois', shared=shared, process_totals=poi_fetch_flight.stats())
+        if not shared:
+            return pois, metrics, False  # cache_used=False
+        if radius_by_category:
+            from .geo.poi_filter import filter_by_radius
+            pois = filter_by_radius(pois, radius_by_category, default_radius=radius)
+        return pois, metrics, True
+    
+    def _cached_pois(
+        self,
+        lat: float,
+        lon: float,
+        radius: int,
+        use_cache: bool,
+        provider: str,
+        radius_by_category: Optional[Dict[str, int]],
+        trace_ctx: 'AnalysisTraceContext | None',
+        fetch_args: tuple,
+    ) -> tuple:
+        """
+        Zwraca (klucz cache, (pois, metrics, True) z cache lub None).
+        Wpis po soft TTL jest zwracany, a fetch_args (argumenty _fetch_pois)
+        trafiają do odświeżenia w tle.
+        """
+        # Normalizuj koordynaty dla lepszego cache hit rate (~11m grid)
+        norm_lat, norm_lon = normalize_coords(lat, lon, precision=4)
+        
+        # Cache key uses fetch_radius (max radius), NOT per-profile radii
+        # This ensures different profiles reuse cached geo data for same location.
+        # Wyjątek: zapytanie Overpass z promieniami per kategoria (OVERPASS_CATEGORY_RADII)
+        # pobiera węższe okręgi, więc promienie muszą być częścią klucza.
+        key_parts = ['pois', norm_lat, norm_lon, radius, provider]
+        if provider != 'google':
+            query_radii = self.overpass_client.query_radii_key(radius, radius_by_category)
+            if query_radii is not None:
+                key_parts.append(query_radii)
+        cache_key = TTLCache.make_key(*key_parts)
         
-        result = (pois, metrics)
         if use_cache:
-            overpass_cache.set(cache_key, result, ttl=604800)  # 7 dni
+            cached, stale = overpass_cache.lookup(cache_key)
+            if trace_ctx is not None:
+                trace_ctx.summary.record_cache('pois', hit=bool(cached), process_totals=overpass_cache.counters())
+            if cached:
+                logger.debug("POI cache hit (%s%s): (%s, %s) r=%s", provider, ', stale' if stale else '', norm_lat, norm_lon, radius)
+                if stale:
+                    self._refresh_pois(cache_key, fetch_args)
+                # Apply per-category radius filter on cached data
+                pois, metrics = cached[0], cached[1]
+                if radius_by_category:
+                    from .geo.poi_filter import filter_by_radius
+                    pois = filter_by_radius(pois, radius_by_category, default_radius=radius)
+                return cache_key, (pois, metrics, True)  # pois, metrics, cache_used=True
         
-        return pois, metrics, False  # cache_used=False
+        return cache_key, None
     
     def _save_to_db(
         self,
@@ -580,9 +1211,7 @@ class AnalysisService:
                     'longitude': listing.longitude,
                     'has_precise_location': listing.has_precise_location,
                     'neighborhood_score': report.neighborhood_score,
-                    'neighborhood_data': report.neighborhood_details,
-                    'report_data': report.to_dict(),
-                    'checklist': report.checklist,
+                    **split_report(report.to_dict()),
                     'source_provider': get_provider_for_url(url).name if get_provider_for_url(url) else '',
                     'parsing_errors': listing.errors,
                 }
@@ -607,6 +1236,7 @@ class AnalysisService:
         profile_scoring_result = None,
         verdict = None,
         ai_insights = None,
+        poi_snapshot: Optional[Dict[str, Any]] = None,
     ) -> Optional[LocationAnalysis]:
         """Zapisuje wynik analizy lokalizacji do bazy danych."""
         try:
@@ -614,26 +1244,9 @@ class AnalysisService:
             url_hash = LocationAnalysis.generate_hash(lat=lat, lon=lon)
             url = reference_url or f"location://{lat},{lon}"
 
-            # Dodaj public_id do report_data
-            report_dict = report.to_dict()
-
             # Przygotuj dane scoringu
             scoring_data = profile_scoring_result.to_dict() if profile_scoring_result else {}
             verdict_data = verdict.to_dict() if verdict else {}
-            
-            # Wyciągnij category_scores z nowego scoringu
-            category_scores = {}
-            if profile_scoring_result:
-                category_scores = {
-                    cat: result.to_dict()
-                    for cat, result in profile_scoring_result.category_results.items()
-                }
-            
-            # Debug info
-            scoring_debug = {
-                'profile_scoring': scoring_data,
-            }
-            
             persona_adjusted_score = profile_scoring_result.total_score if profile_scoring_result else None
             profile_config_version = profile_scoring_result.profile_config_version if profile_scoring_result else 1
             
@@ -654,9 +1267,8 @@ class AnalysisService:
                     'longitude': lon,
                     'has_precise_location': True,
                     'neighborhood_score': report.neighborhood_score,
-                    'neighborhood_data': report.neighborhood_details,
-                    'report_data': report_dict,
-                    'checklist': report.checklist,
+                    # Każdy artefakt raz — odpowiedź API składa report_storage.assemble_report
+                    **split_report(report.to_dict()),
                     'source_provider': 'location',
                     'analysis_radius': radius,
                     'parsing_errors': listing.errors,
@@ -665,28 +1277,15 @@ class AnalysisService:
                     'profile_config_version': profile_config_version,
                     'user_profile': user_profile,  # Legacy
                     'scoring_data': scoring_data,
-                    'category_scores': category_scores,
-                    'scoring_debug': scoring_debug,
                     'verdict_data': verdict_data,
                     'persona_adjusted_score': persona_adjusted_score,
-                    'ai_insights_data': {
-                        'summary': ai_insights.summary if ai_insights else '',
-                        'quick_facts': ai_insights.quick_facts if ai_insights else [],
-                        'attention_points': ai_insights.attention_points if ai_insights else [],  # Legacy alias
-                        'verification_checklist': ai_insights.verification_checklist if ai_insights else [],
-                        'recommendation_line': ai_insights.recommendation_line if ai_insights else '',
-                        'target_audience': ai_insights.target_audience if ai_insights else '',
-                        'disclaimer': ai_insights.disclaimer if ai_insights else '',  # Data quality warnings
-                    } if ai_insights else {},
+                    'ai_insights_data': ai_insights_to_dict(ai_insights),
+                    # Profil analizy żyje w scoring_data/verdict_data; nowa analiza unieważnia resztę
+                    'profile_results': {},
+                    'poi_snapshot': poi_snapshot or {},
                 }
             )
             
-            # Dodaj public_id do report_data po zapisie
-            if result.public_id:
-                report_dict['public_id'] = result.public_id
-                result.report_data = report_dict
-                result.save(update_fields=['report_data'])
-            
             logger.debug("Saved analysis: %s [profile: %s]", result.public_id, profile_key or user_profile)
             return result
             
@@ -715,7 +1314,9 @@ class AnalysisService:
     
     def _fetch_air_quality(self, lat: float, lon: float, slog=None) -> Optional[Dict[str, Any]]:
         """
-        Pobiera dane o jakości powietrza z providera.
+        Pobiera dane o jakości powietrza — z cache per komórka siatki
+        (AIR_QUALITY_CELL_DEG) albo z providera dla środka komórki.
+        Wpis po soft TTL jest zwracany i odświeżany w tle.
         Zwraca None jeśli cokolwiek nie działa (graceful degradation).
         """
         try:
@@ -724,19 +1325,76 @@ class AnalysisService:
             if not aq_config.air_quality_enabled:
                 return None
             provider = get_air_quality_provider(aq_config.air_quality_provider)
-            result = provider.get_air_quality(lat, lon)
-            if result and slog:
-                slog.info(
-                    stage="geo", provider="open_meteo", op="air_quality",
-                    message="Air quality data fetched",
-                    meta={"aqi": result.get("aqi"), "period": result.get("period")}
-                )
+            cache_key, cell, result = self._cached_air_quality(provider, lat, lon, aq_config, slog)
+            if result is None:
+                result, _ = air_quality_flight.do(cache_key, lambda: self._load_air_quality(provider, cache_key, cell))
+                self._log_air_quality(result, slog, cache_hit=False)
+            return result
+        except Exception as e:
+            if slog:
+                slog.warning(stage="geo", op="air_quality", message=f"Air quality fetch failed: {e}")
+            return None
+
+    async def _fetch_air_quality_async(self, lat: float, lon: float, slog=None) -> Optional[Dict[str, Any]]:
+        """Asynchroniczny odpowiednik _fetch_air_quality."""
+        try:
+            from .app_config import get_config
+            aq_config = get_config()
+            if not aq_config.air_quality_enabled:
+                return None
+            provider = get_air_quality_provider(aq_config.air_quality_provider)
+            cache_key, cell, result = self._cached_air_quality(provider, lat, lon, aq_config, slog)
+            if result is None:
+                async def fetch():
+                    result = await provider.get_air_quality_async(*cell)
+                    if result is not None:
+                        air_quality_cache.set(cache_key, result)
+                    return result
+
+                result, _ = await air_quality_flight.do_async(cache_key, fetch)
+                self._log_air_quality(result, slog, cache_hit=False)
             return result
         except Exception as e:
             if slog:
                 slog.warning(stage="geo", op="air_quality", message=f"Air quality fetch failed: {e}")
             return None
 
+    def _cached_air_quality(self, provider, lat: float, lon: float, aq_config, slog) -> tuple:
+        """
+        Zwraca (klucz cache, środek komórki, wynik z cache lub None).
+        Stale wpis trafia do odświeżenia w tle.
+        """
+        cell = air_quality_cell(lat, lon, aq_config.air_quality_cell_deg)
+        cache_key = TTLCache.make_key('air_quality', provider.name, *cell)
+        result, stale = air_quality_cache.lookup(cache_key)
+        if slog is not None:
+            slog.ctx.summary.record_cache('air_quality', hit=result is not None, process_totals=air_quality_cache.counters())
+        if result is not None:
+            if stale:
+                cache_refresher.submit(
+                    cache_key,
+                    lambda: air_quality_flight.do(cache_key, lambda: self._load_air_quality(provider, cache_key, cell)),
+                )
+            self._log_air_quality(result, slog, cache_hit=True)
+        return cache_key, cell, result
+
+    @staticmethod
+    def _load_air_quality(provider, cache_key: str, cell: tuple) -> Optional[Dict[str, Any]]:
+        """Fetch z providera dla środka komórki; sukces trafia do cache (błędy nie)."""
+        result = provider.get_air_quality(*cell)
+        if result is not None:
+            air_quality_cache.set(cache_key, result)
+        return result
+
+    @staticmethod
+    def _log_air_quality(result: Optional[Dict[str, Any]], slog, cache_hit: bool) -> None:
+        if result and slog:
+            slog.info(
+                stage="geo", provider=result.get("provider"), op="air_quality",
+                message="Air quality data fetched",
+                meta={"aqi": result.get("aqi"), "period": result.get("period"), "cache_hit": cache_hit}
+            )
+
 
 # Singleton
 analysis_service = AnalysisService()
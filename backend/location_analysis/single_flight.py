@@ -0,0 +1,163 @@
+"""
+Single-flight: scalanie identycznych zapytań w locie.
+
+Gdy kilka analiz jednocześnie nie trafi w cache dla tego samego klucza
+(popularne ogłoszenie, te same koordynaty), tylko pierwsza ("lider")
+wykonuje fetch; pozostałe czekają na jego wynik zamiast wysyłać własne
+zapytanie do Overpass/Google. Wyjątek lidera (Exception) dostaje każdy
+oczekujący. Anulowanie lidera (CancelledError po rozłączeniu klienta,
+KeyboardInterrupt itp.) nie jest współdzielone — jeden z oczekujących
+przejmuje fetch.
+
+Działa między wątkami (WSGI, pula etapów) i korutynami (ścieżka ASGI).
+Oczekujący w wątku czeka na threading.Event, oczekujący korutyna na
+asyncio.Future rozwiązywany przez call_soon_threadsafe — nie zajmuje
+wątku domyślnego executora, z którego może korzystać sam lider.
+"""
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'waiters', 'abandoned', 'async_waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        # (pętla, Future) oczekujących korutyn — rozwiązywane w _finish
+        self.async_waiters: List[Tuple[Any, Any]] = []
+        self.result: Any = None
+        self.error: Exception = None
+        self.waiters = 0
+        # Lider przerwany (nie błąd fetchu) — oczekujący ponawiają
+        self.abandoned = False
+
+
+class SingleFlight:
+    """Grupa scalanych wywołań (jedna per rodzaj zasobu). Thread-safe."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.waiters = 0
+        self.max_waiters = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Wykonuje fn() raz dla wszystkich równoczesnych wywołań z tym kluczem.
+
+        Returns:
+            (wynik, shared) — shared=True gdy wynik pochodzi z cudzego fetchu.
+        """
+        while True:
+            call, leader, _ = self._join(key)
+            if not leader:
+                call.done.wait()
+                if call.abandoned:
+                    continue
+                return self._outcome(call), True
+
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+            except BaseException:
+                call.abandoned = True
+                raise
+            finally:
+                self._finish(key, call)
+            return self._outcome(call), False
+
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Asynchroniczny odpowiednik do(); fn zwraca korutynę."""
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        while True:
+            call, leader, waiter = self._join(key, loop)
+            if not leader:
+                await waiter
+                if call.abandoned:
+                    continue
+                return self._outcome(call), True
+
+            try:
+                call.result = await fn()
+            except Exception as e:
+                call.error = e
+            except BaseException:
+                call.abandoned = True
+                raise
+            finally:
+                self._finish(key, call)
+            return self._outcome(call), False
+
+    def stats(self) -> Dict[str, int]:
+        """Liczniki per proces."""
+        with self._lock:
+            return {
+                'leaders': self.leaders,
+                'waiters': self.waiters,
+                'max_waiters': self.max_waiters,
+                'in_flight': len(self._calls),
+            }
+
+    def _join(self, key: Hashable, loop=None) -> Tuple[_Call, bool, Optional[Any]]:
+        """(call, leader, future) — future tylko dla oczekującej korutyny (loop podany)."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.waiters += 1
+                waiter = None
+                if loop is not None:
+                    waiter = loop.create_future()
+                    call.async_waiters.append((loop, waiter))
+                return call, False, waiter
+            call = self._calls[key] = _Call()
+            self.leaders += 1
+            return call, True, None
+
+    def _finish(self, key: Hashable, call: _Call) -> None:
+        with self._lock:
+            self._calls.pop(key, None)
+            self.max_waiters = max(self.max_waiters, call.waiters)
+            async_waiters, call.async_waiters = call.async_waiters, []
+        call.done.set()
+        for loop, waiter in async_waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                pass  # pętla oczekującego już zamknięta
+        if call.waiters:
+            logger.debug("single-flight %s: %d waiter(s) shared one fetch", self.name, call.waiters)
+
+    @staticmethod
+    def _outcome(call: _Call) -> Any:
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+
+def _wake(waiter) -> None:
+    if not waiter.done():  # oczekujący mógł zostać anulowany
+        waiter.set_result(None)
+
+
+# Grupy dla cache'y POI, Google i jakości powietrza (klucze = klucze odpowiednich TTLCache)
+poi_fetch_flight = SingleFlight('pois')
+google_nearby_flight = SingleFlight('google_nearby')
+google_details_flight = SingleFlight('google_details')
+air_quality_flight = SingleFlight('air_quality')
+
+
+def get_single_flight_stats() -> Dict[str, Dict[str, int]]:
+    """Liczniki single-flight bieżącego procesu (GET /api/config/)."""
+    return {
+        flight.name: flight.stats()
+        for flight in (poi_fetch_flight, google_nearby_flight, google_details_flight, air_quality_flight)
+    }
@@ -0,0 +1,98 @@
+"""
+Współbieżne uruchamianie niezależnych etapów I/O analizy.
+
+Gdy znane są koordynaty, pobieranie POI i jakości powietrza startuje
+od razu na wspólnej, ograniczonej puli wątków (AppConfig.pipeline_max_workers),
+a generator NDJSON dalej wysyła statusy. Czas analizy to max() etapów I/O,
+a nie ich suma. Wynik etapu odbiera się przez `result()` dopiero tam,
+gdzie jest potrzebny.
+"""
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from .diagnostics import AnalysisTraceContext
+
+_executor: Optional[ThreadPoolExecutor] = None
+_batch_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Wspólna pula wątków dla etapów analiz (singleton per proces)."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                from .app_config import get_config
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(1, get_config().pipeline_max_workers),
+                    thread_name_prefix="analysis-stage",
+                )
+    return _executor
+
+
+def get_batch_executor() -> ThreadPoolExecutor:
+    """
+    Osobna pula dla klastrów scoringu wsadowego (AppConfig.batch_max_concurrent_fetches).
+
+    Duża partia nie zajmuje wątków puli etapów analiz interaktywnych.
+    """
+    global _batch_executor
+    if _batch_executor is None:
+        with _executor_lock:
+            if _batch_executor is None:
+                from .app_config import get_config
+                _batch_executor = ThreadPoolExecutor(
+                    max_workers=max(1, get_config().batch_max_concurrent_fetches),
+                    thread_name_prefix="batch-cluster",
+                )
+    return _batch_executor
+
+
+class StageScheduler:
+    """
+    Etapy jednej analizy uruchomione w tle.
+
+    Czas wykonania etapu trafia do ctx.summary (stage_<nazwa>_ms).
+    Wyjątek z etapu jest rzucany ponownie z `result()`.
+    """
+
+    def __init__(self, ctx: AnalysisTraceContext, executor: Optional[ThreadPoolExecutor] = None):
+        self.ctx = ctx
+        self._executor = executor or get_executor()
+        self._futures: Dict[str, Future] = {}
+        self._durations: Dict[str, float] = {}
+
+    def submit(self, stage: str, fn: Callable[..., Any], *args, **kwargs) -> None:
+        """Uruchamia etap w tle."""
+        def run():
+            started = time.monotonic()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                duration_ms = (time.monotonic() - started) * 1000
+                self._durations[stage] = round(duration_ms, 1)
+                self.ctx.summary.record_stage(stage, duration_ms)
+
+        self._futures[stage] = self._executor.submit(run)
+
+    def submitted(self, stage: str) -> bool:
+        return stage in self._futures
+
+    def result(self, stage: str, default: Any = None) -> Any:
+        """Czeka na wynik etapu; `default` gdy etap nie był uruchomiony."""
+        future = self._futures.get(stage)
+        if future is None:
+            return default
+        return future.result()
+
+    def duration_ms(self, stage: str) -> float:
+        """Czas wykonania zakończonego etapu (0.0 jeśli jeszcze trwa)."""
+        return self._durations.get(stage, 0.0)
+
+    def cancel_pending(self) -> None:
+        """Anuluje etapy, które jeszcze nie wystartowały (np. po przerwaniu streamu)."""
+        for future in self._futures.values():
+            future.cancel()
@@ -10,7 +10,7 @@ from location_analysis.geo.air_quality.base import AirQualityProvider
 class TestAirQualityProviders:
     """Testy dla modułu Air Quality."""
     
-    @patch('requests.get')
+    @patch('location_analysis.http_pool.http_pool.get')
     def test_open_meteo_success(self, mock_get):
         """Test poprawnego pobrania i uśrednienia danych z Open-Meteo z ostatnich 365 dni."""
         # Przygotuj mock response
@@ -50,7 +50,7 @@ class TestAirQualityProviders:
         assert "past_days" in kwargs["params"]
         assert kwargs["params"]["past_days"] == 365
         
-    @patch('requests.get')
+    @patch('location_analysis.http_pool.http_pool.get')
     def test_open_meteo_missing_data(self, mock_get):
         """Test braku danych AQI w responsie (np. awaria stacji wirtualnej lub zła struktura)."""
         mock_response = Mock()
@@ -70,7 +70,7 @@ class TestAirQualityProviders:
         # Powinno zwrócić None gdy brakuje kluczowego wskaźnika
         assert result is None
         
-    @patch('requests.get')
+    @patch('location_analysis.http_pool.http_pool.get')
     def test_open_meteo_network_error(self, mock_get):
         """Test bezpiecznego ubijania w przypadku błędu sieciowego."""
         import requests
@@ -92,3 +92,22 @@ class TestAirQualityProviders:
         # Nieistniejący provider rzuca wyjątek
         with pytest.raises(ValueError):
             get_air_quality_provider('unknown_provider')
+
+    def test_monthly_history_across_months(self):
+        """Średnie miesięczne pomijają braki i są posortowane chronologicznie."""
+        data = {
+            "hourly": {
+                "time": ["2023-11-30T22:00", "2023-11-30T23:00", "2023-12-01T00:00", "2023-12-01T01:00"],
+                "european_aqi": [20, None, 41, 50],
+                "pm10": [10.0, 12.0, None, 30.0],
+                "pm2_5": [None, None, 9.5, 10.5],
+            }
+        }
+        result = OpenMeteoAirQualityProvider()._summarize(data, 52.2297, 21.0122)
+
+        assert (result["aqi"], result["pm10"], result["pm25"]) == (37, 17.3, 10.0)
+        assert result["monthly_history"] == [
+            {"month": "2023-11", "aqi": 20, "pm10": 11.0, "pm25": None},
+            {"month": "2023-12", "aqi": 46, "pm10": 30.0, "pm25": 10.0},
+        ]
+
@@ -0,0 +1,149 @@
+"""
+Testy asynchronicznej ścieżki analizy (ASGI).
+"""
+import asyncio
+import copy
+import json
+import unittest
+from unittest.mock import patch
+
+from location_analysis.cache import google_nearby_cache
+from location_analysis.geo.google_places_client import GooglePlacesClient
+from location_analysis.geo.hybrid_poi_provider import HybridPOIProvider
+from location_analysis.geo.overpass_client import OverpassClient
+from location_analysis.geo.spatial_cache import overpass_area_cache
+from location_analysis.services import AnalysisService
+from location_analysis.tests.test_osm_index import CENTER, ELEMENTS
+
+
+class TestOverpassAsync(unittest.TestCase):
+
+    def setUp(self):
+        overpass_area_cache.clear()
+
+    def tearDown(self):
+        overpass_area_cache.clear()
+
+    def test_async_matches_sync(self):
+        client = OverpassClient()
+        with patch.object(OverpassClient, '_fetch_elements', return_value=copy.deepcopy(ELEMENTS)):
+            sync_pois, _ = client.get_pois_around(*CENTER, 500)
+        overpass_area_cache.clear()
+
+        async def fetch(query, slog):
+            return copy.deepcopy(ELEMENTS)
+
+        with patch.object(OverpassClient, '_fetch_elements_async', side_effect=fetch):
+            async_pois, _ = asyncio.run(client.get_pois_around_async(*CENTER, 500))
+
+        self.assertEqual(
+            {cat: [p.name for p in items] for cat, items in sync_pois.items()},
+            {cat: [p.name for p in items] for cat, items in async_pois.items()},
+        )
+
+
+class TestHybridFallbackAsync(unittest.TestCase):
+
+    def setUp(self):
+        google_nearby_cache.clear()
+
+    def tearDown(self):
+        google_nearby_cache.clear()
+
+    def test_fallback_searches_run_concurrently(self):
+        google = GooglePlacesClient(api_key='test-key')
+        provider = HybridPOIProvider(overpass_client=OverpassClient(), google_client=google)
+        in_flight = {'now': 0, 'max': 0}
+
+        async def search(lat, lon, radius_m, place_types, trace_ctx=None):
+            in_flight['now'] += 1
+            in_flight['max'] = max(in_flight['max'], in_flight['now'])
+            await asyncio.sleep(0.01)
+            in_flight['now'] -= 1
+            return []
+
+        pois = {}
+        with patch.object(GooglePlacesClient, '_search_nearby_async', side_effect=search):
+            asyncio.run(provider._apply_fallback_async(
+                pois, *CENTER, {}, 500, ['shops', 'health', 'food'],
+            ))
+
+        self.assertEqual(in_flight['max'], 3)
+        self.assertEqual(set(pois), {'shops', 'health', 'food'})
+
+
+class TestGoogleModeAsync(unittest.TestCase):
+
+    def test_categories_searched_concurrently_and_match_sync(self):
+        google = GooglePlacesClient(api_key='test-key')
+        place = {'id': 'p1', 'displayName': {'text': 'Sklep'}, 'location': {'latitude': CENTER[0] + 0.001, 'longitude': CENTER[1]}, 'types': ['supermarket']}
+        in_flight = {'now': 0, 'max': 0}
+
+        async def search(lat, lon, radius_m, place_types, trace_ctx=None):
+            in_flight['now'] += 1
+            in_flight['max'] = max(in_flight['max'], in_flight['now'])
+            await asyncio.sleep(0.01)
+            in_flight['now'] -= 1
+            if 'school' in place_types:
+                raise ConnectionError('google down')
+            return [place] if 'supermarket' in place_types else []
+
+        def search_sync(lat, lon, radius_m, place_types, trace_ctx=None):
+            if 'school' in place_types:
+                raise ConnectionError('google down')
+            return [place] if 'supermarket' in place_types else []
+
+        with patch.object(GooglePlacesClient, '_search_nearby_async', side_effect=search):
+            async_pois, async_metrics = asyncio.run(google.get_pois_around_async(*CENTER, 500))
+        with patch.object(GooglePlacesClient, '_search_nearby', side_effect=search_sync):
+            sync_pois, sync_metrics = google.get_pois_around(*CENTER, 500)
+
+        self.assertGreater(in_flight['max'], 1)
+        self.assertEqual([p.name for p in async_pois['shops']], ['Sklep'])
+        self.assertEqual(
+            {cat: [p.name for p in items] for cat, items in async_pois.items()},
+            {cat: [p.name for p in items] for cat, items in sync_pois.items()},
+        )
+        self.assertEqual(async_metrics, sync_metrics)
+
+
+class TestAnalyzeLocationStreamAsync(unittest.TestCase):
+
+    def _collect(self, service):
+        async def consume():
+            return [json.loads(line) async for line in service.analyze_location_stream_async(
+                lat=CENTER[0], lon=CENTER[1], price=None, area_sqm=None,
+                address='Warszawa', poi_provider='overpass',
+            )]
+        return asyncio.run(consume())
+
+    def test_stream_events_match_sync_version(self):
+        service = AnalysisService()
+
+        async def get_pois_async(**kwargs):
+            return {}, {}, False
+
+        async def no_air_quality(lat, lon, slog=None):
+            return None
+
+        with patch.object(service, '_get_pois_async', side_effect=get_pois_async), \
+             patch.object(service, '_get_pois', return_value=({}, {}, False)), \
+             patch.object(service, '_fetch_air_quality_async', side_effect=no_air_quality), \
+             patch.object(service, '_fetch_air_quality', return_value=None), \
+             patch.object(service, '_save_location_to_db', return_value=None):
+            async_events = self._collect(service)
+            sync_events = [json.loads(line) for line in service.analyze_location_stream(
+                lat=CENTER[0], lon=CENTER[1], price=None, area_sqm=None,
+                address='Warszawa', poi_provider='overpass',
+            )]
+
+        self.assertEqual([e['status'] for e in async_events], [e['status'] for e in sync_events])
+        self.assertEqual(async_events[-1]['status'], 'complete')
+        self.assertIn('scoring', async_events[-1]['result'])
+        profile_scores = async_events[-1]['result']['profile_scores']
+        self.assertEqual(profile_scores, sync_events[-1]['result']['profile_scores'])
+        self.assertEqual(profile_scores['family']['total_score'], async_events[-1]['result']['scoring']['total_score'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+Testy scoringu partii lokalizacji (POST /api/analyze-batch/).
+"""
+import json
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+
+from unittest.mock import patch
+
+from location_analysis.app_config import AppConfig
+from location_analysis.geo.spatial_cache import bbox_around_circles, cluster_points
+from location_analysis.serializers import AnalyzeBatchRequestSerializer
+from location_analysis.services import AnalysisService
+from location_analysis.tests.test_osm_index import CENTER
+from location_analysis.tests.test_overpass_stream import _OverpassHandler
+
+FAR = (52.4064, 16.9252)  # Poznań — osobny klaster
+
+
+class _CountingHandler(_OverpassHandler):
+    queries = []
+
+    def do_POST(self):
+        type(self).queries.append(self.headers['Content-Length'])
+        super().do_POST()
+
+
+class TestClustering(unittest.TestCase):
+
+    def test_nearby_points_share_cluster(self):
+        points = [CENTER, (CENTER[0] + 0.002, CENTER[1] + 0.002), FAR, (CENTER[0] - 0.001, CENTER[1])]
+        clusters = cluster_points(points, 1500)
+        self.assertEqual(sorted(map(sorted, clusters)), [[0, 1, 3], [2]])
+
+        south, west, north, east = bbox_around_circles([(*CENTER, 1000), (CENTER[0] + 0.002, CENTER[1], 500)])
+        self.assertAlmostEqual(north - south, 2 * 1000 / 111320, places=6)
+        self.assertTrue(west < CENTER[1] < east)
+
+
+class TestBatchStream(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _CountingHandler)
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}/api/interpreter'
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_one_query_per_cluster_and_result_per_item(self):
+        service = AnalysisService()
+        service.overpass_client.ENDPOINTS = [self.url]
+        service.overpass_client._tiles = None
+        _CountingHandler.queries.clear()
+
+        items = [
+            {'latitude': CENTER[0], 'longitude': CENTER[1], 'profile_key': 'urban'},
+            {'latitude': CENTER[0] + 0.001, 'longitude': CENTER[1], 'profile_key': 'family'},
+            {'latitude': FAR[0], 'longitude': FAR[1], 'profile_key': 'urban'},
+            {'latitude': CENTER[0], 'longitude': CENTER[1] + 0.001, 'profile_key': 'quiet_green', 'radius_overrides': {'shops': 300}},
+        ]
+        events = [json.loads(line) for line in service.analyze_batch_stream(items)]
+
+        self.assertEqual(len(_CountingHandler.queries), 2)
+        self.assertEqual(events[0]['status'], 'starting')
+        self.assertEqual(events[-1], {'status': 'complete', 'summary': {'items': 4, 'scored': 4, 'failed': 0, 'clusters': 2}})
+        results = {e['index']: e['result'] for e in events if e['status'] == 'item'}
+        self.assertEqual(sorted(results), [0, 1, 2, 3])
+        self.assertGreater(results[0]['poi_counts']['shops'], 0)
+        self.assertEqual(results[0]['profile_key'], 'urban')
+        self.assertIn(results[3]['verdict']['level'], ('recommended', 'conditional', 'not_recommended'))
+
+    def test_failed_fetch_is_item_error_not_zero_score(self):
+        service = AnalysisService()
+        service.overpass_client._tiles = None
+        items = [
+            {'latitude': CENTER[0], 'longitude': CENTER[1], 'profile_key': 'urban'},
+            {'latitude': CENTER[0] + 0.001, 'longitude': CENTER[1], 'profile_key': 'family'},
+        ]
+        with patch.object(service.overpass_client, '_fetch_elements', return_value=None):
+            events = [json.loads(line) for line in service.analyze_batch_stream(items)]
+
+        errors = [e for e in events if e['status'] == 'item_error']
+        self.assertEqual(sorted(e['index'] for e in errors), [0, 1])
+        self.assertEqual({e['error'] for e in errors}, {"Nie udało się pobrać POI."})
+        self.assertEqual(events[-1]['summary']['failed'], 2)
+
+
+class TestBatchRequestSerializer(unittest.TestCase):
+
+    def test_validation(self):
+        self.assertFalse(AnalyzeBatchRequestSerializer(data={'items': []}).is_valid())
+        serializer = AnalyzeBatchRequestSerializer(data={'items': [{'latitude': 95, 'longitude': 21.0}]})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('items', serializer.errors)
+
+        serializer = AnalyzeBatchRequestSerializer(data={'items': [{'latitude': 52.2, 'longitude': 21.0}] * 3})
+        self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.validated_data['items'][0]['profile_key'], 'family')
+        with patch('location_analysis.app_config.get_config', return_value=AppConfig(batch_max_items=2)):
+            self.assertFalse(AnalyzeBatchRequestSerializer(data={'items': [{'latitude': 52.2, 'longitude': 21.0}] * 3}).is_valid())
+
+
+if __name__ == '__main__':
+    unittest.main()
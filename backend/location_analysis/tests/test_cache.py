@@ -0,0 +1,114 @@
+"""
+Testy cache z TTL i backendów (memory / SQLite).
+"""
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from location_analysis.cache import TTLCache, MemoryBackend, SQLiteBackend
+
+
+class TestMemoryBackend(unittest.TestCase):
+
+    def test_get_set_and_stats(self):
+        cache = TTLCache(default_ttl=60, max_size=10)
+        self.assertIsNone(cache.get('a'))
+        cache.set('a', [1, 2, 3])
+        self.assertEqual(cache.get('a'), [1, 2, 3])
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (1, 1, 0))
+        self.assertGreater(stats['bytes'], 0)
+
+    def test_expired_entry_is_miss(self):
+        cache = TTLCache(default_ttl=60, backend=MemoryBackend())
+        cache._backend.set('a', 'value', time.time() - 1)
+        self.assertIsNone(cache.get('a'))
+
+    def test_eviction_counted(self):
+        cache = TTLCache(default_ttl=60, max_size=5)
+        for i in range(6):
+            cache.set(f'k{i}', i)
+        self.assertGreater(cache.stats()['evictions'], 0)
+
+    def test_lru_evicts_least_recently_used(self):
+        """Odczytywany wpis przeżywa, mimo że wygasa najwcześniej."""
+        backend = MemoryBackend(max_size=3)
+        now = time.time()
+        backend.set('popular', 0, now + 10)
+        backend.set('b', 1, now + 100)
+        backend.set('c', 2, now + 100)
+        backend.get('popular')
+        backend.set('d', 3, now + 100)
+        self.assertEqual(backend.get('popular'), 0)
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual(backend.evictions, 1)
+
+    def test_memory_ceiling(self):
+        backend = MemoryBackend(max_size=1000, max_bytes=20_000)
+        for i in range(50):
+            backend.set(f'k{i}', [f'{i}:{j}' * 50 for j in range(10)], time.time() + 60)
+        self.assertLessEqual(backend.size_bytes(), 20_000)
+        self.assertLess(len(backend), 50)
+        self.assertIsNotNone(backend.get('k49'))
+
+    def test_bytes_released_on_delete_and_overwrite(self):
+        backend = MemoryBackend()
+        backend.set('a', 'x' * 1000, time.time() + 60)
+        size = backend.size_bytes()
+        backend.set('a', 'x' * 1000, time.time() + 60)
+        self.assertEqual(backend.size_bytes(), size)
+        backend.delete('a')
+        self.assertEqual(backend.size_bytes(), 0)
+
+
+class TestSQLiteBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'cache.sqlite')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_shared_between_instances(self):
+        """Wpis zapisany przez jeden 'worker' jest hitem dla drugiego."""
+        writer = TTLCache(default_ttl=60, backend=SQLiteBackend(self.path, namespace='pois'))
+        reader = TTLCache(default_ttl=60, backend=SQLiteBackend(self.path, namespace='pois'))
+
+        writer.set('key', ({'shops': []}, {'nature': {'total_green_elements': 3}}))
+        self.assertEqual(reader.get('key'), ({'shops': []}, {'nature': {'total_green_elements': 3}}))
+        self.assertEqual(reader.stats()['hits'], 1)
+
+    def test_namespaces_are_isolated(self):
+        pois = SQLiteBackend(self.path, namespace='pois')
+        other = SQLiteBackend(self.path, namespace='other')
+        pois.set('key', 1, time.time() + 60)
+        self.assertIsNone(other.get('key'))
+
+    def test_expired_entry_is_removed(self):
+        backend = SQLiteBackend(self.path)
+        backend.set('key', 1, time.time() - 1)
+        self.assertIsNone(backend.get('key'))
+        self.assertEqual(len(backend), 0)
+
+    def test_eviction_keeps_size_bounded(self):
+        backend = SQLiteBackend(self.path, max_size=10)
+        for i in range(15):
+            backend.set(f'k{i}', i, time.time() + 60 + i)
+        self.assertLessEqual(len(backend), 10)
+        self.assertGreater(backend.evictions, 0)
+        # Najpóźniej wygasające wpisy zostają
+        self.assertEqual(backend.get('k14'), 14)
+
+    def test_request_path_does_not_scan_table(self):
+        """set() nie liczy COUNT(*) przy każdym zapisie; counters() nie odpytuje SQLite."""
+        cache = TTLCache(default_ttl=60, backend=SQLiteBackend(self.path, max_size=1000))
+        with patch.object(SQLiteBackend, '__len__', side_effect=AssertionError('COUNT(*)')), \
+             patch.object(SQLiteBackend, 'size_bytes', side_effect=AssertionError('SUM(LENGTH)')):
+            for i in range(9):
+                cache.set(f'k{i}', i)
+            cache.get('k0')
+            self.assertEqual(cache.counters(), {'hits': 1, 'misses': 0, 'stale_hits': 0, 'evictions': 0})
+        self.assertGreater(cache.stats()['bytes'], 0)
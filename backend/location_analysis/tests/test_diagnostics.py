@@ -165,6 +165,17 @@ class TestAnalysisSummary(unittest.TestCase):
         self.assertAlmostEqual(meta["provider_google_max_ms"], 5000.0)
         self.assertAlmostEqual(meta["stage_geo_ms"], 600.0)
 
+    def test_to_meta_cache_stats(self):
+        summary = AnalysisSummary()
+        summary.record_cache("pois", hit=False)
+        summary.record_cache("pois", hit=True, process_totals={"hits": 7, "misses": 3, "evictions": 1})
+
+        meta = summary.to_meta()
+        self.assertEqual(meta["cache_pois_hits"], 1)
+        self.assertEqual(meta["cache_pois_misses"], 1)
+        self.assertEqual(meta["cache_pois_total_hits"], 7)
+        self.assertEqual(meta["cache_pois_total_evictions"], 1)
+
     def test_emit_summary_log(self):
         ctx = AnalysisTraceContext(trace_id="sumtest001")
         slog = StructuredLogger("test.summary", ctx)
@@ -0,0 +1,87 @@
+"""
+Testy wyboru endpointu Overpass: ranking, circuit breaker, hedging.
+"""
+import threading
+import time
+import unittest
+from http.server import ThreadingHTTPServer
+from unittest.mock import patch
+
+from location_analysis.diagnostics import AnalysisTraceContext, get_diag_logger
+from location_analysis.geo.endpoint_health import EndpointHealth, overpass_endpoint_health, run_hedged
+from location_analysis.geo.overpass_client import OverpassClient
+from location_analysis.tests.test_overpass_stream import _OverpassHandler
+
+FAST, SLOW, DEAD = 'https://fast/api', 'https://slow/api', 'https://dead/api'
+
+
+class TestEndpointHealth(unittest.TestCase):
+
+    def test_ranking_prefers_fast_and_skips_open_circuit(self):
+        health = EndpointHealth(failure_threshold=2, cooldown_s=60)
+        for _ in range(5):
+            health.record(SLOW, ok=True, latency_ms=900)
+            health.record(FAST, ok=True, latency_ms=150)
+        # Bez danych — za zmierzonymi, w kolejności z konfiguracji
+        self.assertEqual(health.ranked([DEAD, SLOW, FAST]), [FAST, SLOW, DEAD])
+
+        health.record(DEAD, ok=False, latency_ms=10)
+        self.assertIn(DEAD, health.ranked([DEAD, SLOW, FAST]))
+        health.record(DEAD, ok=False, latency_ms=10)
+        self.assertEqual(health.ranked([DEAD, SLOW, FAST]), [FAST, SLOW])
+        self.assertTrue(health.stats()[DEAD]['circuit_open'])
+        # Wszystkie otwarte — nie zostajemy bez endpointu
+        self.assertEqual(health.ranked([DEAD]), [DEAD])
+
+        self.assertEqual(health.hedge_delay_s(SLOW), 0.9)
+        self.assertIsNone(health.hedge_delay_s(DEAD))
+
+    def test_hedged_request_returns_faster_mirror(self):
+        release = threading.Event()
+
+        def attempt(url, hedged):
+            if url == SLOW:
+                release.wait(5)
+            return url, hedged
+
+        started = time.monotonic()
+        self.assertEqual(run_hedged(attempt, SLOW, FAST, 0.05), (FAST, True))
+        self.assertLess(time.monotonic() - started, 1)
+        release.set()
+
+
+class TestFailover(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _OverpassHandler)
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}/api/interpreter'
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        overpass_endpoint_health.reset()
+
+    def tearDown(self):
+        overpass_endpoint_health.reset()
+
+    def test_dead_mirror_skipped_without_backoff(self):
+        client = OverpassClient()
+        # Port 9 (discard) — połączenie odrzucone od razu
+        client.ENDPOINTS = ['http://127.0.0.1:9/api/interpreter', self.url]
+        slog = get_diag_logger(__name__, AnalysisTraceContext())
+
+        with patch('location_analysis.geo.overpass_client.time.sleep') as sleep:
+            self.assertTrue(client._fetch_elements('[out:json];', slog))
+            sleep.assert_not_called()
+
+        # Kolejne zapytanie od razu do działającego mirrora
+        self.assertEqual(overpass_endpoint_health.ranked(client.ENDPOINTS)[0], self.url)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+Testy współdzielonej puli połączeń HTTP.
+"""
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from location_analysis.diagnostics import AnalysisTraceContext
+from location_analysis.http_pool import HTTPPool
+
+
+class _OkHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def do_GET(self):
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHTTPPool(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _OkHandler)
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}/'
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_connection_reused_across_requests(self):
+        pool = HTTPPool(connect_timeout=2, read_timeout=2)
+        for _ in range(3):
+            self.assertEqual(pool.get(self.url).json(), {'ok': True})
+
+        stats = pool.stats()['127.0.0.1']
+        self.assertEqual(stats['requests'], 3)
+        self.assertEqual(stats['new_connections'], 1)
+        self.assertEqual(stats['reused'], 2)
+
+    def test_host_metrics_recorded_in_summary(self):
+        pool = HTTPPool(connect_timeout=2, read_timeout=2)
+        ctx = AnalysisTraceContext()
+        pool.get(self.url, trace_ctx=ctx)
+        pool.get(self.url, trace_ctx=ctx)
+
+        meta = ctx.summary.to_meta()
+        self.assertEqual(meta['http_127_0_0_1_requests'], 2)
+        self.assertEqual(meta['http_127_0_0_1_reused'], 1)
+        self.assertIn('http_127_0_0_1_avg_ms', meta)
+
+    def test_failed_request_counted(self):
+        pool = HTTPPool(connect_timeout=0.5, read_timeout=0.5)
+        with self.assertRaises(Exception):
+            pool.get('http://127.0.0.1:1/')
+        self.assertEqual(pool.stats()['127.0.0.1']['errors'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
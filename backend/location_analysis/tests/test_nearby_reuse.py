@@ -0,0 +1,88 @@
+"""
+Testy wyszukiwania analiz w pobliżu (find_recent_near) i ponownego użycia
+zapisanego wyniku w AnalysisService.
+"""
+import json
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.utils import timezone
+
+from location_analysis.models import LocationAnalysis
+from location_analysis.services import AnalysisService
+from location_analysis.tests.test_integration import make_mock_pois
+
+LAT, LON = 52.2297, 21.0122
+# ~3 m na północ
+LAT_3M = LAT + 0.000027
+
+
+class TestFindRecentNear(TestCase):
+
+    def _analysis(self, url_hash, lat, lon, profile_key='family'):
+        return LocationAnalysis.objects.create(
+            url_hash=url_hash, latitude=lat, longitude=lon, scoring_data={'profile_key': profile_key},
+        )
+
+    def test_filters_by_distance_profile_and_age(self):
+        near = self._analysis('near', LAT_3M, LON)
+        self._analysis('far', LAT + 0.0004, LON)  # ~45 m
+        self._analysis('other-profile', LAT, LON, profile_key='urban')
+        # Sąsiednia komórka siatki (granica 0.001° między punktami)
+        across = self._analysis('across', 52.2300001, LON)
+        old = self._analysis('old', LAT, LON + 0.00002)
+        LocationAnalysis.objects.filter(pk=old.pk).update(updated_at=timezone.now() - timedelta(days=2))
+
+        found = LocationAnalysis.objects.find_recent_near(LAT, LON, 40, profile_key='family', max_age=86400)
+        self.assertEqual([a.pk for a in found], [near.pk, across.pk])
+        self.assertAlmostEqual(found[0].distance_m, 3.0, delta=0.1)
+        self.assertNotEqual(near.geo_cell, across.geo_cell)
+
+        self.assertEqual(len(LocationAnalysis.objects.find_recent_near(LAT, LON, 40)), 4)
+
+
+@patch('location_analysis.services.AnalysisService._fetch_air_quality', return_value=None)
+@patch('location_analysis.services.AnalysisService._get_pois', return_value=make_mock_pois())
+class TestNearbyReuse(TestCase):
+
+    def setUp(self):
+        from location_analysis.app_config import get_config
+        # Reuse domyślnie wyłączony (NEARBY_REUSE_M=0)
+        patcher = patch.object(get_config(), 'nearby_reuse_m', 25)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _analyze(self, lat, **kwargs):
+        params = {'price': 500000, 'area_sqm': 50, 'address': 'Test', 'profile_key': 'family', **kwargs}
+        lines = list(AnalysisService().analyze_location_stream(lat=lat, lon=LON, **params))
+        return json.loads(lines[-1])['result']
+
+    def test_fresh_analysis_nearby_is_reused(self, get_pois, _air_quality):
+        first = self._analyze(LAT)
+        second = self._analyze(LAT_3M)
+
+        self.assertEqual(get_pois.call_count, 1)
+        self.assertEqual(second['public_id'], first['public_id'])
+        self.assertEqual(second['scoring'], first['scoring'])
+        self.assertEqual(second['verdict'], first['verdict'])
+        self.assertEqual(second['profile_scores'], first['profile_scores'])
+        self.assertEqual(set(second) - set(first), {'nearby_reuse'})
+        self.assertEqual(LocationAnalysis.objects.count(), 1)
+
+    def test_different_inputs_are_recomputed(self, get_pois, _air_quality):
+        self._analyze(LAT)
+        self._analyze(LAT_3M, price=450000)
+        self._analyze(LAT_3M, profile_key='urban')
+        self._analyze(LAT_3M, radius_overrides={'shops': 900})
+        self._analyze(LAT_3M, enable_enrichment=True)
+        self._analyze(LAT_3M, enable_fallback=False)
+        self.assertEqual(get_pois.call_count, 6)
+
+    def test_reuse_can_be_disabled(self, get_pois, _air_quality):
+        from location_analysis.app_config import AppConfig, get_config
+        self.assertEqual(AppConfig().nearby_reuse_m, 0)
+        with patch.object(get_config(), 'nearby_reuse_m', 0):
+            self._analyze(LAT)
+            self._analyze(LAT_3M)
+        self.assertEqual(get_pois.call_count, 2)
@@ -0,0 +1,75 @@
+"""
+Testy lokalnego indeksu OSM (tryb OVERPASS_MODE=index).
+"""
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from location_analysis.geo.overpass_client import OverpassClient
+from location_analysis.geo.osm_index_client import OSMIndexClient, OSMSpatialIndex
+
+
+CENTER = (52.2297, 21.0122)
+
+ELEMENTS = [
+    {'type': 'node', 'id': 1, 'lat': 52.2300, 'lon': 21.0125,
+     'tags': {'shop': 'supermarket', 'name': 'Biedronka', 'opening_hours': '24/7'}},
+    {'type': 'node', 'id': 2, 'lat': 52.2310, 'lon': 21.0100,
+     'tags': {'highway': 'bus_stop', 'name': 'Centrum'}},
+    {'type': 'way', 'id': 3, 'center': {'lat': 52.2280, 'lon': 21.0150},
+     'tags': {'leisure': 'park', 'name': 'Park Świętokrzyski'}},
+    {'type': 'node', 'id': 4, 'lat': 52.2295, 'lon': 21.0130,
+     'tags': {'amenity': 'pharmacy'}},
+    # Poza promieniem 500 m
+    {'type': 'node', 'id': 5, 'lat': 52.2500, 'lon': 21.0500,
+     'tags': {'amenity': 'cafe', 'name': 'Daleko'}},
+    # Bez kategorii - nie trafia do indeksu
+    {'type': 'node', 'id': 6, 'lat': 52.2298, 'lon': 21.0121,
+     'tags': {'building': 'yes'}},
+]
+
+
+class TestOSMSpatialIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'osm_index.sqlite')
+        self.count = OSMSpatialIndex.build(self.path, ELEMENTS, source='test')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_build_skips_unclassified_elements(self):
+        self.assertEqual(self.count, 5)
+        self.assertEqual(OSMSpatialIndex(self.path).meta()['elements'], '5')
+
+    def test_build_keeps_only_classifier_tags(self):
+        elements = OSMSpatialIndex(self.path).query_bbox(*CENTER, 500)
+        shop = next(e for e in elements if e['id'] == 1)
+        self.assertNotIn('opening_hours', shop['tags'])
+        self.assertEqual(shop['tags']['name'], 'Biedronka')
+
+    def test_client_matches_overpass_parsing(self):
+        """Wynik z indeksu == wynik parsowania tej samej odpowiedzi Overpass."""
+        client = OSMIndexClient(index_path=self.path)
+        pois, metrics = client.get_pois_around(*CENTER, radius_m=500)
+
+        in_radius = [e for e in ELEMENTS if e['id'] != 5]
+        expected_pois, expected_metrics = OverpassClient()._parse_elements(in_radius, *CENTER, 500)
+
+        def summary(result):
+            return {
+                cat: [(p.name, p.subcategory, p.distance_m, p.osm_uid) for p in items]
+                for cat, items in result.items()
+            }
+
+        self.assertEqual(summary(pois), summary(expected_pois))
+        self.assertEqual(metrics, expected_metrics)
+
+    def test_missing_index_falls_back_to_overpass(self):
+        client = OSMIndexClient(index_path=os.path.join(self.tmpdir.name, 'missing.sqlite'))
+        with patch.object(OverpassClient, '_fetch_elements', return_value=[]) as mock_fetch:
+            pois, _ = client.get_pois_around(*CENTER, radius_m=500)
+        mock_fetch.assert_called_once()
+        self.assertTrue(all(not items for items in pois.values()))
@@ -0,0 +1,157 @@
+"""
+Testy strumieniowego parsowania odpowiedzi Overpass.
+"""
+import copy
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from location_analysis.diagnostics import AnalysisTraceContext, get_diag_logger
+from location_analysis.geo.overpass_client import OverpassClient
+from location_analysis.geo.overpass_stream import OverpassStreamParser
+from location_analysis.tests.test_osm_index import CENTER, ELEMENTS
+
+
+def _payload(elements):
+    return json.dumps({
+        'version': 0.6,
+        'generator': 'Overpass API',
+        'osm3s': {'copyright': 'The data included in this document is from www.openstreetmap.org.'},
+        'elements': elements,
+    }, ensure_ascii=False).encode('utf-8')
+
+
+# Gęsty payload: elementy z polskimi nazwami i tagami spoza klasyfikatora
+DENSE = [
+    {**elem, 'id': i * 100 + elem['id'], 'tags': {**elem['tags'], 'name': f'Żółta {i}', 'opening_hours': 'Mo-Su 06:00-23:00'}}
+    for i in range(50)
+    for elem in ELEMENTS
+] + [{'type': 'node', 'id': 99999, 'lat': 52.2301, 'lon': 21.0121, 'tags': {'bench': 'yes'}}]
+
+
+class _OverpassHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        body = _payload(DENSE)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestOverpassStreamParser(unittest.TestCase):
+
+    def test_small_chunks_split_multibyte_characters(self):
+        body = _payload(DENSE)
+        parser = OverpassStreamParser()
+        elements = []
+        for start in range(0, len(body), 7):
+            elements.extend(parser.feed(body[start:start + 7]))
+        elements.extend(parser.close())
+
+        self.assertEqual(elements, DENSE)
+        self.assertEqual(parser.stats()['bytes'], len(body))
+        self.assertEqual(parser.stats()['elements_seen'], len(DENSE))
+        # W buforze co najwyżej jeden element + kawałek, nie cały payload
+        self.assertLess(parser.peak_buffer_chars, 400)
+
+    def test_truncated_and_empty_responses(self):
+        parser = OverpassStreamParser()
+        parser.feed(_payload(ELEMENTS)[:-40])
+        with self.assertRaises(ValueError):
+            parser.close()
+
+        parser = OverpassStreamParser()
+        parser.feed(b'{"version": 0.6, "remark": "runtime error"}')
+        self.assertEqual(parser.close(), [])
+
+
+class TestStreamingFetch(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _OverpassHandler)
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}/api/interpreter'
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_streamed_elements_give_same_pois(self):
+        client = OverpassClient()
+        client.ENDPOINTS = [self.url]
+        client.STREAM_PARSE = True
+        slog = get_diag_logger(__name__, AnalysisTraceContext())
+
+        with patch.object(slog, 'req_end', wraps=slog.req_end) as req_end:
+            elements = client._fetch_elements('[out:json];', slog)
+
+        meta = req_end.call_args.kwargs['meta']
+        self.assertEqual(meta['elements_seen'], len(DENSE))
+        self.assertEqual(meta['elements'], len(elements))
+        self.assertLess(meta['elements'], len(DENSE))  # ławka bez kategorii odrzucona
+        self.assertLess(meta['peak_buffer_chars'], req_end.call_args.kwargs['response_bytes'])
+        self.assertTrue(all('opening_hours' not in e['tags'] for e in elements))
+
+        streamed, streamed_metrics = client._parse_elements(elements, *CENTER, 1000)
+        full, full_metrics = client._parse_elements(copy.deepcopy(DENSE), *CENTER, 1000)
+        self.assertEqual(
+            {cat: [(p.name, p.subcategory, p.distance_m) for p in items] for cat, items in streamed.items()},
+            {cat: [(p.name, p.subcategory, p.distance_m) for p in items] for cat, items in full.items()},
+        )
+        self.assertEqual(streamed_metrics, full_metrics)
+
+
+class TestQueryShape(unittest.TestCase):
+
+    RADII = {'shops': 400, 'food': 600, 'nature_place': 900, 'transport': 1200}
+
+    def test_per_category_radii_in_query_and_cache_key(self):
+        client = OverpassClient()
+        client.CATEGORY_RADII = True
+        client._tiles = None
+
+        radii = dict(client.query_radii_key(1000, self.RADII))
+        self.assertEqual((radii['shops'], radii['food'], radii['transport']), (400, 600, 1000))
+        # Zieleń zawsze pełnym promieniem (NatureMetrics)
+        self.assertEqual((radii['nature_place'], radii['nature_background']), (1000, 1000))
+
+        query = client._build_query(*CENTER, 1000, radii)
+        self.assertIn(f'node["shop"](around:400,{CENTER[0]},{CENTER[1]});', query)
+        self.assertIn(f'way["landuse"~"forest|meadow|grass|recreation_ground"](around:1000,{CENTER[0]},{CENTER[1]});', query)
+        self.assertTrue(client._query_meta(query)['category_radii'])
+
+        self.assertIsNone(client.query_radii_key(1000, {'shops': 1000}))
+        client.CATEGORY_RADII = False
+        self.assertIsNone(client.query_radii_key(1000, self.RADII))
+
+    def test_projected_elements_normalized(self):
+        client = OverpassClient()
+        client.TAG_PROJECTION = True
+        self.assertIn('convert poi', client._output_statement())
+
+        projected = {
+            'type': 'poi', 'id': 7,
+            'geometry': {'type': 'Point', 'coordinates': [21.0125, 52.2300]},
+            'tags': {'_osm_type': 'way', 'shop': 'bakery', 'name': 'Piekarnia', 'amenity': '', 'brand': ''},
+        }
+        self.assertEqual(
+            client._compact_element(projected),
+            {'type': 'way', 'id': 7, 'lat': 52.2300, 'lon': 21.0125, 'tags': {'shop': 'bakery', 'name': 'Piekarnia'}},
+        )
+        pois, _ = client._parse_elements([client._compact_element(projected)], *CENTER, 500)
+        self.assertEqual(pois['shops'][0].osm_uid, 'way:7')
+
+
+if __name__ == '__main__':
+    unittest.main()
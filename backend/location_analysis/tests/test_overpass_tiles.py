@@ -0,0 +1,58 @@
+"""
+Testy trybu kafli Overpass (OVERPASS_TILES_ENABLED).
+"""
+import unittest
+from unittest.mock import patch
+
+from location_analysis.cache import TTLCache
+from location_analysis.diagnostics import AnalysisTraceContext, get_diag_logger
+from location_analysis.geo.overpass_client import OverpassClient
+from location_analysis.geo.overpass_tiles import OverpassTileFetcher, TileGrid
+from location_analysis.tests.test_osm_index import CENTER, ELEMENTS
+
+
+class TestTileGrid(unittest.TestCase):
+
+    def test_tile_contains_point(self):
+        grid = TileGrid(500)
+        south, west, north, east = grid.bbox(grid.tile_at(*CENTER))
+        self.assertTrue(south <= CENTER[0] < north)
+        self.assertTrue(west <= CENTER[1] < east)
+
+    def test_circle_cover(self):
+        grid = TileGrid(500)
+        tiles = grid.tiles_for_circle(*CENTER, 600)
+        self.assertIn(grid.tile_at(*CENTER), tiles)
+        # Okrąg 1.2 km średnicy przy kaflach 500 m: od 3x3 do 4x4 kafli
+        self.assertTrue(9 <= len(tiles) <= 16)
+
+
+class TestOverpassTileFetcher(unittest.TestCase):
+
+    def setUp(self):
+        self.client = OverpassClient()
+        self.fetcher = OverpassTileFetcher(self.client, TileGrid(500), TTLCache(default_ttl=60))
+        self.slog = get_diag_logger(__name__, AnalysisTraceContext())
+
+    def test_circle_assembled_from_tiles(self):
+        with patch.object(OverpassClient, '_fetch_elements', return_value=ELEMENTS) as mock_fetch:
+            elements = self.fetcher.elements_for_circle(*CENTER, 500, self.slog)
+            again = self.fetcher.elements_for_circle(*CENTER, 300, self.slog)
+
+        # Drugi, mniejszy okrąg w całości z cache
+        mock_fetch.assert_called_once()
+        self.assertNotIn('around', mock_fetch.call_args[0][0])
+        self.assertEqual(sorted(e['id'] for e in elements), [1, 2, 3, 4, 6])
+        self.assertEqual(sorted(e['id'] for e in again), [1, 2, 3, 4, 6])
+
+    def test_only_missing_tiles_fetched(self):
+        with patch.object(OverpassClient, '_fetch_elements', return_value=ELEMENTS):
+            self.fetcher.elements_for_circle(*CENTER, 500, self.slog)
+        tiles = self.fetcher.grid.tiles_for_circle(52.2350, 21.0122, 500)
+        _, missing = self.fetcher.cached(tiles)
+        self.assertTrue(0 < len(missing) < len(tiles))
+
+    def test_failed_fetch_returns_none(self):
+        with patch.object(OverpassClient, '_fetch_elements', return_value=None):
+            self.assertIsNone(self.fetcher.elements_for_circle(*CENTER, 500, self.slog))
+        self.assertEqual(len(self.fetcher.cache._backend), 0)
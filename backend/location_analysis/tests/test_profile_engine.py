@@ -0,0 +1,70 @@
+"""
+Testy scoringu wielu profili naraz (score_all_profiles / PreparedPOIs).
+"""
+import unittest
+from unittest.mock import patch
+
+from location_analysis.geo.overpass_client import POI
+from location_analysis.scoring import profile_engine
+from location_analysis.scoring.profile_engine import PreparedPOIs, create_scoring_engine, score_all_profiles
+from location_analysis.scoring.profiles import get_all_profiles
+
+
+def _poi(category, name, distance_m, subcategory='', **tags):
+    return POI(lat=0.0, lon=0.0, name=name, category=category, subcategory=subcategory, distance_m=distance_m, tags=tags)
+
+
+POIS = {
+    'shops': [_poi('shops', f'Sklep {d}', d, rating=4.5, user_ratings_total=120) for d in (900, 120, 450, 60, 300)],
+    'transport': [_poi('transport', f'Przystanek {d}', d, 'bus_stop', _nameless=d > 500) for d in (200, 650, 80, 1400)],
+    'education': [_poi('education', 'Szkoła', 700), _poi('education', 'Przedszkole', 350, rating=3.9, low_reviews=True)],
+    'health': [_poi('health', 'Apteka', 250)],
+    'nature_place': [_poi('nature_place', 'Park', 400)],
+    'food': [_poi('food', f'Bar {d}', d) for d in (150, 1100)],
+    'roads': [_poi('roads', 'Aleja', 180, 'primary'), _poi('roads', 'Tramwaj', 120, 'tram')],
+}
+NATURE = {'green_density_proxy': 9, 'nearest_distances': {'park': 400}, 'nearest_water_m': 800, 'total_green_elements': 9}
+
+
+class TestScoreAllProfiles(unittest.TestCase):
+
+    def test_same_results_as_separate_engines(self):
+        results = score_all_profiles(POIS, 55.0, NATURE, 60.0)
+        self.assertEqual(set(results), {p.key for p in get_all_profiles()})
+        for key, result in results.items():
+            expected = create_scoring_engine(key).calculate(POIS, 55.0, NATURE, 60.0)
+            self.assertEqual(result.to_dict(), expected.to_dict(), key)
+            self.assertEqual(result.debug, expected.debug, key)
+
+    def test_quality_multipliers_computed_once(self):
+        prepared = PreparedPOIs(POIS)
+        with patch.object(profile_engine, 'quality_multiplier', wraps=profile_engine.quality_multiplier) as quality:
+            results = score_all_profiles(POIS, 55.0, NATURE, 60.0, profile_keys=['family', 'urban'], prepared=prepared)
+        scored = {cat for r in results.values() for cat, c in r.category_results.items() if c.contributions}
+        self.assertEqual(quality.call_count, sum(len(POIS[cat]) for cat in scored))
+        self.assertEqual(results['urban'].to_summary_dict()['total_score'], round(results['urban'].total_score, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+class TestProfilesCovered(unittest.TestCase):
+
+    def _run(self, profile_key, radius_overrides=None):
+        from types import SimpleNamespace
+        profile = create_scoring_engine(profile_key, radius_overrides).profile
+        radii = dict(profile.radius_m)
+        return SimpleNamespace(profile=profile, effective_radius_m=radii, fetch_radius=max(radii.values()))
+
+    def test_only_profiles_within_fetched_radii(self):
+        from location_analysis.services import _profiles_covered
+        # family: wszystkie promienie urban mieszczą się, quiet_green (park 2000 m) nie
+        covered = _profiles_covered(self._run('family'))
+        self.assertIn('urban', covered)
+        self.assertNotIn('quiet_green', covered)
+        self.assertNotIn('family', covered)
+        # Szerszy profil pokrywa węższe, ale nie quiet_green (park 2000 m > 1500 m)
+        covered = _profiles_covered(self._run('car_first'))
+        self.assertTrue({'urban', 'family', 'investor'} <= set(covered))
+        self.assertNotIn('quiet_green', covered)
@@ -0,0 +1,38 @@
+"""
+Testy nadawania public_id (bez zapytań sprawdzających przed INSERT).
+"""
+import base64
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from location_analysis.models import LocationAnalysis
+
+
+class TestPublicId(TestCase):
+
+    def test_save_assigns_id_with_single_insert(self):
+        analysis = LocationAnalysis(url_hash='public-id-save')
+        with CaptureQueriesContext(connection) as ctx:
+            analysis.save()
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(len(analysis.public_id), 24)
+
+        analysis.save()
+        self.assertEqual(LocationAnalysis.objects.get(pk=analysis.pk).public_id, analysis.public_id)
+
+    def test_bulk_create_assigns_distinct_ids(self):
+        created = LocationAnalysis.objects.bulk_create(
+            [LocationAnalysis(url_hash=f'public-id-bulk-{i}') for i in range(50)]
+            + [LocationAnalysis(url_hash='public-id-given', public_id='given')]
+        )
+        ids = [analysis.public_id for analysis in created]
+        self.assertEqual(len(set(ids)), 51)
+        self.assertEqual(ids[-1], 'given')
+        self.assertEqual(LocationAnalysis.objects.filter(public_id__in=ids).count(), 51)
+
+    def test_id_is_fully_random(self):
+        """Bez prefiksu czasu: cały identyfikator to 144 losowe bity."""
+        public_id = LocationAnalysis.generate_public_id()
+        self.assertEqual(len(base64.urlsafe_b64decode(public_id)), 18)
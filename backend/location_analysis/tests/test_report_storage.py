@@ -0,0 +1,58 @@
+"""
+Testy układu zapisu raportu (report_storage): każdy artefakt raz w wierszu,
+odpowiedź GET /api/report/ składana z części.
+"""
+import json
+from unittest.mock import patch
+
+from django.test import Client, TestCase
+
+from location_analysis.models import LocationAnalysis
+from location_analysis.report_storage import assemble_report
+from location_analysis.services import AnalysisService
+from location_analysis.tests.test_integration import make_mock_pois
+
+REPORT_KEYS = (
+    'success', 'errors', 'warnings', 'tldr', 'property', 'property_completeness', 'listing',
+    'neighborhood', 'checklist', 'limitations', 'public_id', 'scoring', 'verdict',
+)
+
+
+class TestReportStorage(TestCase):
+
+    @patch('location_analysis.services.AnalysisService._fetch_air_quality', return_value=None)
+    @patch('location_analysis.services.AnalysisService._get_pois', return_value=make_mock_pois())
+    def test_saved_row_reassembles_streamed_report(self, _get_pois, _air_quality):
+        events = [json.loads(line) for line in AnalysisService().analyze_location_stream(
+            lat=52.2297, lon=21.0122, price=500000, area_sqm=50, address='Test', profile_key='family',
+        )]
+        streamed = events[-1]['result']
+        analysis = LocationAnalysis.objects.get(public_id=streamed['public_id'])
+
+        # Bez kopii: aliasu listing, checklisty, neighborhood.details i public_id
+        self.assertNotIn('listing', analysis.report_data)
+        self.assertNotIn('checklist', analysis.report_data)
+        self.assertNotIn('public_id', analysis.report_data)
+        self.assertNotIn('details', analysis.report_data['neighborhood'])
+        self.assertEqual(analysis.profile_results, {})
+
+        response = Client().get(f'/api/report/{analysis.public_id}/')
+        self.assertEqual(response.status_code, 200)
+        served = response.json()
+        for key in REPORT_KEYS:
+            self.assertEqual(served[key], streamed[key], key)
+        self.assertEqual(served['ai_insights']['summary'], streamed['ai_insights']['summary'])
+
+    def test_legacy_row_is_served_unchanged(self):
+        report = {
+            'property': {'title': 'A'},
+            'listing': {'title': 'A'},
+            'neighborhood': {'score': 50.0, 'details': {'nature_metrics': {'parks': 1}}},
+            'checklist': ['Pytanie'],
+            'public_id': 'legacy',
+        }
+        analysis = LocationAnalysis(
+            public_id='legacy', report_data=report,
+            neighborhood_data={'nature_metrics': {'parks': 1}}, checklist=['Pytanie'],
+        )
+        self.assertEqual(assemble_report(analysis), report)
@@ -0,0 +1,143 @@
+"""
+Testy równoległego enrichment/fallback Google z budżetem per analiza.
+"""
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from location_analysis.cache import google_details_cache
+from location_analysis.geo.google_places_client import GooglePlacesClient
+from location_analysis.geo.hybrid_poi_provider import EnrichmentConfig, HybridPOIProvider
+from location_analysis.geo.overpass_client import POI, OverpassClient
+from location_analysis.geo.request_budget import RequestBudget, run_bounded
+
+
+def _poi(name, lat, place_id=None):
+    return POI(
+        lat=lat, lon=21.0122, name=name, category='food', subcategory='cafe',
+        distance_m=50.0, tags={}, primary_category='food', place_id=place_id,
+    )
+
+
+class TestRunBounded(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=8)
+
+    def tearDown(self):
+        self.executor.shutdown(wait=True)
+
+    def test_concurrency_capped_and_order_kept(self):
+        in_flight = {'now': 0, 'max': 0}
+        lock = threading.Lock()
+
+        def call(i):
+            with lock:
+                in_flight['now'] += 1
+                in_flight['max'] = max(in_flight['max'], in_flight['now'])
+            time.sleep(0.02)
+            with lock:
+                in_flight['now'] -= 1
+            if i == 3:
+                raise ValueError('boom')
+            return i
+
+        results = run_bounded(call, [(i,) for i in range(6)], RequestBudget(max_concurrency=2, max_qps=0), self.executor)
+
+        self.assertEqual(in_flight['max'], 2)
+        self.assertEqual(results[:3], [0, 1, 2])
+        self.assertIsInstance(results[3], ValueError)
+        self.assertEqual(results[4:], [4, 5])
+
+    def test_qps_spacing(self):
+        started = time.monotonic()
+        run_bounded(lambda i: i, [(i,) for i in range(4)], RequestBudget(max_concurrency=4, max_qps=20), self.executor)
+        # 4 starty co >= 50 ms
+        self.assertGreaterEqual(time.monotonic() - started, 0.14)
+
+
+class TestParallelEnrichment(unittest.TestCase):
+
+    def setUp(self):
+        google_details_cache.clear()
+        self.google = GooglePlacesClient(api_key='test-key')
+        self.provider = HybridPOIProvider(
+            overpass_client=OverpassClient(),
+            google_client=self.google,
+            enrichment_config={'food': EnrichmentConfig(top_k=5, enrich=True)},
+        )
+
+    def tearDown(self):
+        google_details_cache.clear()
+
+    def test_shared_place_id_fetched_once_and_deduplicated(self):
+        calls = []
+
+        def details(place_id, fields=None, trace_ctx=None):
+            calls.append(place_id)
+            time.sleep(0.01)
+            return {'rating': 4.5, 'user_ratings_total': 120, 'types': ['cafe']}
+
+        def find(name, lat, lon, search_radius=100, fields=None, trace_ctx=None):
+            calls.append(name)
+            if name == 'Nieznana':
+                return None
+            return {'place_id': f'pid-{name}', 'rating': 4.0, 'user_ratings_total': 30}
+
+        pois = {'food': [
+            _poi('Kawiarnia A', 52.2297, place_id='pid-1'),
+            _poi('Kawiarnia A bis', 52.2298, place_id='pid-1'),
+            _poi('Piekarnia', 52.2299),
+            _poi('Nieznana', 52.2300),
+        ]}
+        with patch.object(GooglePlacesClient, '_get_place_details', side_effect=details), \
+             patch.object(GooglePlacesClient, 'find_place_details', side_effect=find):
+            enriched = self.provider._enrich_top_k(pois, 52.2297, 21.0122)
+
+        self.assertEqual(enriched, 2)
+        self.assertEqual(sorted(calls), ['Nieznana', 'Piekarnia', 'pid-1'])
+        first, duplicate, bakery, unknown = pois['food']
+        self.assertTrue(first.tags.get('enriched'))
+        self.assertNotIn('enriched', duplicate.tags)  # seen_place_ids jak w wersji sekwencyjnej
+        self.assertEqual(bakery.place_id, 'pid-Piekarnia')
+        self.assertIsNotNone(google_details_cache.get(HybridPOIProvider._notfound_key(unknown)))
+
+    def test_async_enrichment_matches_sync_without_threads(self):
+        calls = []
+
+        async def details(place_id, fields=None, trace_ctx=None):
+            calls.append(place_id)
+            await asyncio.sleep(0.01)
+            return {'rating': 4.5, 'user_ratings_total': 120, 'types': ['cafe']}
+
+        async def find(name, lat, lon, search_radius=100, trace_ctx=None):
+            calls.append(name)
+            if name == 'Nieznana':
+                return None
+            return {'place_id': f'pid-{name}', 'rating': 4.0, 'user_ratings_total': 30}
+
+        pois = {'food': [
+            _poi('Kawiarnia A', 52.2297, place_id='pid-1'),
+            _poi('Kawiarnia A bis', 52.2298, place_id='pid-1'),
+            _poi('Piekarnia', 52.2299),
+            _poi('Nieznana', 52.2300),
+        ]}
+        with patch.object(GooglePlacesClient, '_get_place_details_async', side_effect=details), \
+             patch.object(GooglePlacesClient, 'find_place_details_async', side_effect=find), \
+             patch('asyncio.to_thread', side_effect=AssertionError('enrichment must not use threads')):
+            enriched = asyncio.run(self.provider._enrich_top_k_async(pois, 52.2297, 21.0122))
+
+        self.assertEqual(enriched, 2)
+        self.assertEqual(sorted(calls), ['Nieznana', 'Piekarnia', 'pid-1'])
+        first, duplicate, bakery, unknown = pois['food']
+        self.assertTrue(first.tags.get('enriched'))
+        self.assertNotIn('enriched', duplicate.tags)
+        self.assertEqual(bakery.place_id, 'pid-Piekarnia')
+        self.assertIsNotNone(google_details_cache.get(HybridPOIProvider._notfound_key(unknown)))
+
+
+if __name__ == '__main__':
+    unittest.main()
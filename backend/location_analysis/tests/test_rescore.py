@@ -0,0 +1,223 @@
+"""
+Testy zmiany profilu raportu (RescoreService, LocationAnalysis.profile_results).
+"""
+import copy
+import json
+from unittest.mock import patch
+
+from django.test import Client, TestCase
+
+from location_analysis.ai_insights import DecisionInsight
+from location_analysis.geo.overpass_client import OverpassClient, POI
+from location_analysis.models import LocationAnalysis
+from location_analysis.poi_snapshot import build_poi_snapshot, load_poi_snapshot
+from location_analysis.rate_limiter import rescore_rate_limiter
+from location_analysis.rescore_service import AI_RETRY_BASE_S, AI_RETRY_MAX_S, RescoreService, ai_retry_delay
+from location_analysis.scoring.profile_engine import create_scoring_engine
+from location_analysis.scoring.profile_verdict import ProfileVerdictGenerator
+from location_analysis.scoring.profiles import get_all_profiles, get_profile
+from location_analysis.tests.test_osm_index import CENTER, ELEMENTS
+
+
+def _items(*distances, **extra):
+    return {'items': [{'name': f'POI {d}', 'distance_m': d, 'subcategory': '', **extra} for d in distances]}
+
+
+POI_STATS = {
+    'shops': _items(80, 250, 600, rating=4.4, reviews=90),
+    'transport': _items(120, 450),
+    'education': _items(300, 900),
+    'health': _items(350),
+    'nature_place': _items(500),
+    'food': _items(150, 220, 800),
+}
+
+
+class TestRescoreProfileResults(TestCase):
+
+    def setUp(self):
+        scoring = create_scoring_engine('family').calculate(
+            RescoreService()._reconstruct_pois(LocationAnalysis(report_data={'neighborhood': {'poi_stats': POI_STATS}})),
+            quiet_score=60.0,
+        )
+        verdict = ProfileVerdictGenerator().generate(scoring, get_profile('family'))
+        self.analysis = LocationAnalysis.objects.create(
+            url_hash='rescore-test',
+            latitude=52.2297, longitude=21.0122,
+            neighborhood_score=55.0,
+            profile_key='family',
+            report_data={
+                'neighborhood': {'poi_stats': POI_STATS, 'details': {}},
+                'generation_params': {'profile': {'key': 'family'}, 'fetch_radius': 1000},
+            },
+            scoring_data=scoring.to_dict(),
+            verdict_data=verdict.to_dict(),
+            ai_insights_data={'summary': 'Rodzina'},
+        )
+        self.service = RescoreService()
+
+    def _rescore(self, profile_key):
+        analysis = LocationAnalysis.objects.get(pk=self.analysis.pk)
+        return self.service.rescore(analysis, profile_key)
+
+    @patch('location_analysis.rescore_service.generate_insights_from_factsheet')
+    def test_switches_are_lookups_after_first_materialization(self, generate):
+        generate.side_effect = lambda factsheet: DecisionInsight(summary=factsheet.profile_key)
+
+        first = self._rescore('urban')
+        self.assertEqual(first['ai_insights']['summary'], 'urban')
+        self.assertEqual(first['profile']['key'], 'urban')
+        self.assertEqual(generate.call_count, 1)
+
+        analysis = LocationAnalysis.objects.get(pk=self.analysis.pk)
+        # Profil analizy zostaje w kolumnach raportu — bez kopii w profile_results
+        self.assertEqual(set(analysis.profile_results), {p.key for p in get_all_profiles()} - {'family'})
+        self.assertEqual(analysis.ai_insights_data, {'summary': 'Rodzina'})
+        self.assertEqual(self._rescore('family')['ai_insights'], {'summary': 'Rodzina'})
+
+        # Powroty i kolejne przełączenia bez AI i bez limitu
+        for key in ('urban', 'family', 'urban'):
+            result = self._rescore(key)
+        self.assertEqual(generate.call_count, 1)
+        self.assertEqual(result['scoring'], first['scoring'])
+        self.assertEqual(result['rescore_count'], 5)
+
+        self._rescore('family')
+        self.assertEqual(self._rescore('quiet_green')['ai_insights']['summary'], 'quiet_green')
+        self.assertEqual(generate.call_count, 2)
+
+    @patch('location_analysis.rescore_service.generate_insights_from_factsheet')
+    def test_report_shows_active_profile(self, generate):
+        generate.return_value = DecisionInsight(summary='miasto')
+        analysis = LocationAnalysis.objects.get(pk=self.analysis.pk)
+        self.assertIsNone(self.service.active_profile_payload(analysis))
+
+        switched = self._rescore('urban')
+        payload = self.service.active_profile_payload(LocationAnalysis.objects.get(pk=self.analysis.pk))
+        self.assertEqual(payload['scoring'], switched['scoring'])
+        self.assertEqual(payload['ai_insights']['summary'], 'miasto')
+        self.assertEqual(payload['generation_params']['profile']['key'], 'urban')
+
+    @patch('location_analysis.rescore_service.generate_insights_from_factsheet')
+    def test_failed_ai_backs_off_between_switches(self, generate):
+        generate.side_effect = RuntimeError('LLM niedostępny')
+        self.assertEqual(self._rescore('urban')['ai_insights'], {})
+        entry = LocationAnalysis.objects.get(pk=self.analysis.pk).profile_results['urban']
+        self.assertEqual(entry['ai_attempts'], 1)
+        self.assertNotIn('ai_insights', entry)
+
+        # Przełączenia w oknie backoffu nie ponawiają AI
+        self._rescore('family')
+        self._rescore('urban')
+        self.assertEqual(generate.call_count, 1)
+
+        self._rescore('family')
+        generate.side_effect = None
+        generate.return_value = DecisionInsight(summary='miasto')
+        with patch('location_analysis.rescore_service.time.time', return_value=entry['ai_failed_at'] + AI_RETRY_BASE_S):
+            self.assertEqual(self._rescore('urban')['ai_insights']['summary'], 'miasto')
+        self.assertEqual(generate.call_count, 2)
+        entry = LocationAnalysis.objects.get(pk=self.analysis.pk).profile_results['urban']
+        self.assertNotIn('ai_attempts', entry)
+        self.assertNotIn('ai_failed_at', entry)
+
+    def test_retry_delay_grows_to_cap(self):
+        self.assertEqual(ai_retry_delay(1), AI_RETRY_BASE_S)
+        self.assertEqual(ai_retry_delay(2), 2 * AI_RETRY_BASE_S)
+        self.assertEqual(ai_retry_delay(50), AI_RETRY_MAX_S)
+
+    @patch('location_analysis.rescore_service.generate_insights_from_factsheet')
+    def test_stale_instance_does_not_drop_concurrent_entries(self, generate):
+        generate.side_effect = lambda factsheet: DecisionInsight(summary=factsheet.profile_key)
+        stale = LocationAnalysis.objects.get(pk=self.analysis.pk)
+        self._rescore('urban')
+
+        # Drugie żądanie z obiektem sprzed zapisu — merge pod blokadą wiersza
+        self.service.rescore(stale, 'quiet_green')
+        results = LocationAnalysis.objects.get(pk=self.analysis.pk).profile_results
+        self.assertEqual(results['urban']['ai_insights']['summary'], 'urban')
+        self.assertEqual(results['quiet_green']['ai_insights']['summary'], 'quiet_green')
+        self.assertEqual(LocationAnalysis.objects.get(pk=self.analysis.pk).rescore_count, 2)
+
+    @patch('location_analysis.rescore_service.generate_insights_from_factsheet', return_value=None)
+    def test_rescore_endpoint_is_rate_limited(self, _generate):
+        rescore_rate_limiter._requests.clear()
+        self.addCleanup(rescore_rate_limiter._requests.clear)
+        url = f'/api/report/{self.analysis.public_id}/rescore/'
+        client = Client()
+        with patch.object(rescore_rate_limiter, '_minute_limit', 2):
+            statuses = [
+                client.post(url, data=json.dumps({'profile_key': key}), content_type='application/json').status_code
+                for key in ('urban', 'family', 'urban')
+            ]
+        self.assertEqual(statuses, [200, 200, 429])
+
+    def test_stale_profile_version_is_recomputed(self):
+        results = {'urban': {'profile_config_version': -1, 'scoring': {}, 'verdict': {}, 'ai_insights': {}}}
+        self.assertIsNone(self.service._cached_entry(results, 'urban', get_profile('urban')))
+
+
+class TestPoiSnapshot(TestCase):
+
+    def _pois(self):
+        pois, metrics = OverpassClient()._parse_elements(copy.deepcopy(ELEMENTS), *CENTER, 1000)
+        shops = pois['shops']
+        shops[0].tags.update({'rating': 4.6, 'user_ratings_total': 310})
+        shops[-1].tags.update({'rating': 3.1, 'reviews_count': 4, 'low_reviews': True, '_nameless': True})
+        # Ten sam obiekt w dwóch kategoriach (członkostwo wtórne)
+        pois['food'] = pois.get('food', []) + [shops[0]]
+        pois['roads'] = [
+            POI(lat=52.231, lon=21.013, name='Aleja', category='roads', subcategory='primary', distance_m=140.0, tags={}),
+            POI(lat=52.228, lon=21.010, name='', category='roads', subcategory=None, distance_m=90.5, tags={}),
+        ]
+        nature = {'green_density_proxy': 4, 'nearest_distances': {'park': 420.0}, 'nearest_water_m': None, 'total_green_elements': 4}
+        return pois, nature
+
+    def test_roundtrip_reproduces_every_profile_exactly(self):
+        pois, nature = self._pois()
+        snapshot = json.loads(json.dumps(build_poi_snapshot(pois, 63.37, nature, 58.123)))
+        inputs = load_poi_snapshot(snapshot)
+
+        self.assertEqual(inputs.quiet_score, 63.37)
+        self.assertEqual({cat: len(items) for cat, items in inputs.pois_by_category.items()},
+                         {cat: len(items) for cat, items in pois.items()})
+        for profile in get_all_profiles():
+            expected = create_scoring_engine(profile.key).calculate(pois, 63.37, nature, 58.123)
+            restored = create_scoring_engine(profile.key).calculate(
+                inputs.pois_by_category, inputs.quiet_score, inputs.nature_metrics, inputs.base_neighborhood_score,
+            )
+            self.assertEqual(restored.to_dict(), expected.to_dict(), profile.key)
+            self.assertEqual(restored.debug, expected.debug, profile.key)
+
+        self.assertIsNone(load_poi_snapshot({**snapshot, 'v': 0}))
+        self.assertIsNone(load_poi_snapshot({}))
+
+    @patch('location_analysis.rescore_service.generate_insights_from_factsheet', return_value=None)
+    def test_rescore_uses_snapshot_without_poi_stats(self, generate):
+        pois, nature = self._pois()
+        analysis = LocationAnalysis.objects.create(
+            url_hash='snapshot-test', profile_key='family', report_data={},
+            poi_snapshot=build_poi_snapshot(pois, 63.37, nature, 58.123),
+        )
+        result = RescoreService().rescore(analysis, 'urban')
+        expected = create_scoring_engine('urban').calculate(pois, 63.37, nature, 58.123)
+        self.assertEqual(result['scoring'], expected.to_dict())
+
+    @patch('location_analysis.services.AnalysisService._fetch_air_quality', return_value=None)
+    @patch('location_analysis.services.AnalysisService._get_pois')
+    def test_analysis_persists_snapshot_matching_saved_scores(self, get_pois, _air_quality):
+        from location_analysis.services import AnalysisService
+        from location_analysis.tests.test_integration import make_mock_pois
+        get_pois.return_value = make_mock_pois()
+
+        events = [json.loads(line) for line in AnalysisService().analyze_location_stream(
+            lat=52.2297, lon=21.0122, price=None, area_sqm=None, address='Test', profile_key='urban',
+        )]
+        analysis = LocationAnalysis.objects.get(public_id=events[-1]['result']['public_id'])
+        inputs = load_poi_snapshot(analysis.poi_snapshot)
+        restored = create_scoring_engine('urban').calculate(
+            inputs.pois_by_category, inputs.quiet_score, inputs.nature_metrics, inputs.base_neighborhood_score,
+        )
+        # quiet_debug to breakdown z analizy okolicy, dołączany po scoringu
+        saved = {k: v for k, v in analysis.scoring_data.items() if k != 'quiet_debug'}
+        self.assertEqual({k: v for k, v in restored.to_dict().items() if k != 'quiet_debug'}, saved)
@@ -0,0 +1,87 @@
+"""
+Testy komendy score_locations (scoring offline z pliku).
+"""
+import copy
+import csv
+import os
+import tempfile
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+
+from location_analysis.geo.overpass_client import OverpassClient
+from location_analysis.tests.test_osm_index import CENTER, ELEMENTS
+
+
+def _fake_pois_for_points(self, circles, trace_ctx=None):
+    return [self._parse_elements(copy.deepcopy(ELEMENTS), lat, lon, radius, clip_to_radius=True)
+            for lat, lon, radius in circles]
+
+
+class TestScoreLocationsCommand(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.input = os.path.join(self.tmp.name, 'listings.csv')
+        self.output = os.path.join(self.tmp.name, 'scores.csv')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write_input(self, rows):
+        with open(self.input, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=['id', 'lat', 'lon', 'price', 'area_sqm', 'profile_key'])
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def _run(self, *args, fetch=_fake_pois_for_points):
+        stdout = StringIO()
+        with patch.object(OverpassClient, 'get_pois_for_points', fetch):
+            call_command('score_locations', self.input, '--output', self.output, '--workers', '0', *args, stdout=stdout)
+        with open(self.output, newline='', encoding='utf-8') as f:
+            return list(csv.DictReader(f)), stdout.getvalue()
+
+    def test_scores_rows_and_resumes(self):
+        rows = [
+            {'id': 'a', 'lat': CENTER[0], 'lon': CENTER[1], 'price': 800000, 'area_sqm': 50},
+            {'id': 'b', 'lat': CENTER[0] + 0.002, 'lon': CENTER[1], 'profile_key': 'urban'},
+            {'id': 'c', 'lat': '', 'lon': CENTER[1]},
+        ]
+        self._write_input(rows)
+        out, stdout = self._run()
+
+        by_id = {r['id']: r for r in out}
+        self.assertEqual(set(by_id), {'a', 'b', 'c'})
+        self.assertEqual(by_id['a']['error'], '')
+        self.assertEqual(float(by_id['a']['price_per_sqm']), 16000.0)
+        self.assertEqual(by_id['b']['profile_key'], 'urban')
+        self.assertNotEqual(by_id['b']['total_score'], '')
+        self.assertNotEqual(by_id['a']['score_shops'], '')
+        self.assertEqual(by_id['c']['error'], 'Brak współrzędnych.')
+        self.assertIn('wierszy/s', stdout)
+
+        # Wznowienie: policzone wiersze pomijane, błędne ponawiane, nowy dopisany
+        self._write_input(rows + [{'id': 'd', 'lat': CENTER[0], 'lon': CENTER[1] + 0.002}])
+        out, stdout = self._run('--resume')
+        self.assertEqual(sorted(r['id'] for r in out), ['a', 'b', 'c', 'd'])
+        self.assertIn('już policzonych: 2', stdout)
+
+    def test_failed_fetch_is_error_and_retried_on_resume(self):
+        self._write_input([
+            {'id': 'a', 'lat': CENTER[0], 'lon': CENTER[1]},
+            {'id': 'b', 'lat': CENTER[0] + 0.002, 'lon': CENTER[1]},
+        ])
+        out, _ = self._run(fetch=lambda self, circles, trace_ctx=None: [None] * len(circles))
+        self.assertEqual({r['error'] for r in out}, {'Nie udało się pobrać POI.'})
+        self.assertEqual({r['total_score'] for r in out}, {''})
+
+        out, stdout = self._run('--resume')
+        self.assertIn('już policzonych: 0', stdout)
+        self.assertEqual(sorted(r['id'] for r in out), ['a', 'b'])
+        self.assertEqual({r['error'] for r in out}, {''})
+
+
+if __name__ == '__main__':
+    unittest.main()
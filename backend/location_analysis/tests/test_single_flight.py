@@ -0,0 +1,183 @@
+"""
+Testy scalania równoczesnych zapytań (single-flight).
+"""
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from location_analysis.cache import overpass_cache
+from location_analysis.diagnostics import AnalysisTraceContext
+from location_analysis.services import AnalysisService
+from location_analysis.single_flight import SingleFlight, poi_fetch_flight
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_concurrent_calls_share_one_fetch(self):
+        flight = SingleFlight('test')
+        calls = []
+        gate = threading.Event()
+
+        def fetch():
+            calls.append(1)
+            gate.wait(1)
+            return {'elements': 3}
+
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            futures = [pool.submit(flight.do, 'key', fetch) for _ in range(5)]
+            while flight.stats()['waiters'] < 4:
+                time.sleep(0.005)
+            gate.set()
+            results = [f.result() for f in futures]
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(result == {'elements': 3} for result, _ in results))
+        self.assertEqual(sorted(shared for _, shared in results), [False, True, True, True, True])
+        self.assertEqual(flight.stats(), {'leaders': 1, 'waiters': 4, 'max_waiters': 4, 'in_flight': 0})
+
+    def test_leader_error_reaches_waiters(self):
+        flight = SingleFlight('test')
+        gate = threading.Event()
+
+        def fetch():
+            gate.wait(1)
+            raise ConnectionError('overpass down')
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            futures = [pool.submit(flight.do, 'key', fetch) for _ in range(2)]
+            while flight.stats()['waiters'] < 1:
+                time.sleep(0.005)
+            gate.set()
+            for future in futures:
+                with self.assertRaises(ConnectionError):
+                    future.result()
+
+        # Po błędzie kolejne wywołanie robi nowy fetch
+        self.assertEqual(flight.do('key', lambda: 'ok'), ('ok', False))
+
+    def test_cancelled_leader_hands_fetch_to_waiter(self):
+        flight = SingleFlight('test')
+        started, gate = threading.Event(), threading.Event()
+
+        def cancelled_fetch():
+            started.set()
+            gate.wait(1)
+            raise asyncio.CancelledError()  # np. klient async rozłączył się w trakcie
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            leader = pool.submit(flight.do, 'key', cancelled_fetch)
+            started.wait(1)
+            waiter = pool.submit(flight.do, 'key', lambda: 'own fetch')
+            while flight.stats()['waiters'] < 1:
+                time.sleep(0.005)
+            gate.set()
+            with self.assertRaises(asyncio.CancelledError):
+                leader.result(timeout=2)
+            # Oczekujący nie dostaje CancelledError, tylko przejmuje fetch
+            self.assertEqual(waiter.result(timeout=2), ('own fetch', False))
+        self.assertEqual(flight.stats()['in_flight'], 0)
+
+    def test_async_waiter_shares_thread_leader(self):
+        flight = SingleFlight('test')
+        gate = threading.Event()
+
+        async def never_called():
+            raise AssertionError('waiter must not fetch')
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            leader = pool.submit(flight.do, 'key', lambda: gate.wait(1) and 'shared')
+            while flight.stats()['in_flight'] < 1:
+                time.sleep(0.005)
+
+            async def wait():
+                task = asyncio.ensure_future(flight.do_async('key', never_called))
+                await asyncio.sleep(0.01)
+                gate.set()
+                return await task
+
+            self.assertEqual(asyncio.run(wait()), ('shared', True))
+            self.assertEqual(leader.result(), ('shared', False))
+
+    def test_async_waiters_do_not_hold_executor_threads(self):
+        """Lider sam korzysta z to_thread, a oczekujących jest więcej niż wątków executora."""
+        flight = SingleFlight('test')
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.02)  # oczekujący zdążą dołączyć
+            return await asyncio.to_thread(lambda: 'shared')
+
+        async def run():
+            asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=4))
+            return await asyncio.wait_for(
+                asyncio.gather(*(flight.do_async('key', fetch) for _ in range(6))), timeout=2,
+            )
+
+        results = asyncio.run(run())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(results), [('shared', False)] + [('shared', True)] * 5)
+
+    def test_cancelled_async_waiter_leaves_flight_intact(self):
+        flight = SingleFlight('test')
+
+        async def run():
+            gate = asyncio.Event()
+
+            async def fetch():
+                await gate.wait()
+                return 'shared'
+
+            leader = asyncio.ensure_future(flight.do_async('key', fetch))
+            waiters = [asyncio.ensure_future(flight.do_async('key', fetch)) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            waiters[0].cancel()
+            gate.set()
+            return await leader, await waiters[1], waiters[0].cancelled()
+
+        self.assertEqual(asyncio.run(run()), (('shared', False), ('shared', True), True))
+        self.assertEqual(flight.stats()['in_flight'], 0)
+
+
+class TestGetPoisCoalescing(unittest.TestCase):
+
+    def setUp(self):
+        overpass_cache.clear()
+
+    def tearDown(self):
+        overpass_cache.clear()
+
+    def test_identical_concurrent_analyses_fetch_once(self):
+        service = AnalysisService()
+        calls = []
+        gate = threading.Event()
+
+        def get_pois_around(lat, lon, radius, trace_ctx=None, radius_by_category=None):
+            calls.append((lat, lon))
+            gate.wait(1)
+            return {'shops': []}, {'nature': {}}
+
+        waiters_before = poi_fetch_flight.stats()['waiters']
+        contexts = [AnalysisTraceContext() for _ in range(4)]
+        with patch.object(service.overpass_client, 'get_pois_around', side_effect=get_pois_around), \
+             ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [
+                pool.submit(service._get_pois, 52.2297, 21.0122, 1000, True, provider='overpass', trace_ctx=ctx)
+                for ctx in contexts
+            ]
+            while poi_fetch_flight.stats()['waiters'] - waiters_before < 3:
+                time.sleep(0.005)
+            gate.set()
+            results = [f.result() for f in futures]
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(cache_used for _, _, cache_used in results), [False, True, True, True])
+        coalesced = sum(ctx.summary.to_meta().get('flight_pois_coalesced', 0) for ctx in contexts)
+        self.assertEqual(coalesced, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
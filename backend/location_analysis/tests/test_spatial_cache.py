@@ -0,0 +1,125 @@
+"""
+Testy przestrzennego cache odpowiedzi Overpass.
+"""
+import unittest
+from unittest.mock import patch
+
+from location_analysis.geo.overpass_client import OverpassClient
+from location_analysis.geo.spatial_cache import (
+    SpatialElementCache, haversine_m, haversine_many, overpass_area_cache,
+)
+from location_analysis.tests.test_osm_index import CENTER, ELEMENTS
+
+
+# ~15 m na północ od CENTER (ten sam blok na osiedlu)
+NEARBY = (52.22984, 21.0122)
+
+
+class TestSpatialElementCache(unittest.TestCase):
+
+    def test_contained_circle_is_hit(self):
+        cache = SpatialElementCache(ttl=60)
+        cache.store(*CENTER, 1000, ELEMENTS)
+
+        elements = cache.lookup(*NEARBY, 500)
+        self.assertIsNotNone(elements)
+        # Element 5 (~3 km) odfiltrowany po dystansie od nowego centrum
+        self.assertNotIn(5, [e['id'] for e in elements])
+        self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_uncovered_circle_is_miss(self):
+        cache = SpatialElementCache(ttl=60)
+        cache.store(*CENTER, 500, ELEMENTS)
+        self.assertIsNone(cache.lookup(*CENTER, 800))
+        self.assertIsNone(cache.lookup(52.2400, 21.0122, 300))
+        self.assertEqual(cache.stats()['misses'], 2)
+
+    def test_lru_eviction(self):
+        cache = SpatialElementCache(ttl=60, max_entries=1)
+        cache.store(*CENTER, 500, ELEMENTS)
+        cache.store(52.2500, 21.0500, 500, ELEMENTS)
+        self.assertIsNone(cache.lookup(*CENTER, 300))
+        self.assertEqual(cache.evictions, 1)
+
+    def test_memory_ceiling(self):
+        cache = SpatialElementCache(ttl=60, max_bytes=1)
+        cache.store(*CENTER, 500, ELEMENTS)
+        cache.store(52.2500, 21.0500, 500, ELEMENTS)
+        # Zawsze zostaje najnowszy obszar, nawet ponad limit
+        self.assertEqual(len(cache), 1)
+        self.assertIsNotNone(cache.lookup(52.2500, 21.0500, 300))
+        self.assertEqual(cache.evictions, 1)
+        self.assertGreater(cache.stats()['bytes'], 0)
+        cache.clear()
+        self.assertEqual(cache.stats()['bytes'], 0)
+
+    def test_cached_tags_not_mutated_by_parsing(self):
+        cache = SpatialElementCache(ttl=60)
+        cache.store(*CENTER, 1000, [
+            {'type': 'node', 'id': 10, 'lat': 52.2300, 'lon': 21.0125, 'tags': {'shop': 'bakery'}},
+        ])
+        OverpassClient()._parse_elements(cache.lookup(*CENTER, 500), *CENTER, 500)
+        again = cache.lookup(*CENTER, 500)
+        self.assertTrue(all('source' not in e['tags'] for e in again))
+
+
+class TestBatchParsing(unittest.TestCase):
+
+    def test_batch_distances_match_haversine(self):
+        points = [(e.get('lat'), e.get('lon')) for e in ELEMENTS if e.get('lat')]
+        self.assertEqual(
+            haversine_many(*CENTER, points),
+            [haversine_m(*CENTER, p_lat, p_lon) for p_lat, p_lon in points],
+        )
+
+    def test_memoized_classification_not_shared_between_pois(self):
+        elements = [
+            {'type': 'node', 'id': i, 'lat': 52.2300 + i * 1e-3, 'lon': 21.0125,
+             'tags': {'amenity': 'cafe', 'name': f'Kawiarnia {i}'}}
+            for i in range(2)
+        ]
+        pois, _ = OverpassClient()._parse_elements(elements, *CENTER, 500)
+        first, second = pois['food']
+        self.assertEqual(first.category_scores, {'food': 1.0})
+        self.assertIsNot(first.category_scores, second.category_scores)
+        self.assertEqual(second.distance_m, round(haversine_m(*CENTER, second.lat, second.lon)))
+
+    def test_proximity_dedup_across_grid_cells(self):
+        client = OverpassClient()
+        # Granica komórek siatki między dwoma punktami oddalonymi o ~5 m
+        boundary = 52.2300 // client.NAME_DEDUP_DEG * client.NAME_DEDUP_DEG
+        elements = [
+            {'type': 'node', 'id': 1, 'lat': boundary - 0.00002, 'lon': 21.0125, 'tags': {'shop': 'convenience', 'name': 'Żabka'}},
+            {'type': 'node', 'id': 2, 'lat': boundary + 0.00002, 'lon': 21.0125, 'tags': {'shop': 'convenience', 'name': 'ŻABKA'}},
+            {'type': 'node', 'id': 3, 'lat': boundary + 0.0010, 'lon': 21.0125, 'tags': {'shop': 'convenience', 'name': 'Żabka'}},
+            {'type': 'node', 'id': 4, 'lat': 52.2310, 'lon': 21.0100, 'tags': {'highway': 'bus_stop', 'name': 'Plac'}},
+            {'type': 'node', 'id': 5, 'lat': 52.23101, 'lon': 21.01001, 'tags': {'public_transport': 'stop_position', 'name': 'Plac'}},
+            {'type': 'node', 'id': 6, 'lat': 52.2330, 'lon': 21.0100, 'tags': {'public_transport': 'stop_position', 'name': 'Daleki'}},
+        ]
+        pois, _ = client._parse_elements(elements, *CENTER, 1000)
+        self.assertEqual(sorted(p.osm_uid for p in pois['shops']), ['node:1', 'node:3'])
+        self.assertEqual(sorted(p.osm_uid for p in pois['transport']), ['node:4', 'node:6'])
+
+
+class TestOverpassClientAreaCache(unittest.TestCase):
+
+    def setUp(self):
+        overpass_area_cache.clear()
+
+    def tearDown(self):
+        overpass_area_cache.clear()
+
+    def test_nearby_request_served_without_network(self):
+        client = OverpassClient()
+        with patch.object(OverpassClient, '_fetch_elements', return_value=ELEMENTS) as mock_fetch:
+            client.get_pois_around(*CENTER, radius_m=500)
+            pois, metrics = client.get_pois_around(*NEARBY, radius_m=400)
+        mock_fetch.assert_called_once()
+
+        in_radius = [e for e in ELEMENTS if e['id'] != 5]
+        expected_pois, expected_metrics = client._parse_elements(in_radius, *NEARBY, 400)
+        self.assertEqual(
+            {cat: [(p.name, p.distance_m) for p in items] for cat, items in pois.items()},
+            {cat: [(p.name, p.distance_m) for p in items] for cat, items in expected_pois.items()},
+        )
+        self.assertEqual(metrics, expected_metrics)
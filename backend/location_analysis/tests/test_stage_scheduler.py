@@ -0,0 +1,79 @@
+"""
+Testy równoległego uruchamiania etapów analizy.
+"""
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from location_analysis.diagnostics import AnalysisTraceContext
+from location_analysis.services import AnalysisService
+from location_analysis.stage_scheduler import StageScheduler, get_batch_executor, get_executor
+
+
+class TestStageScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.ctx = AnalysisTraceContext()
+        self.stages = StageScheduler(self.ctx, executor=self.executor)
+
+    def tearDown(self):
+        self.executor.shutdown(wait=True)
+
+    def test_stages_run_concurrently(self):
+        started = time.monotonic()
+        self.stages.submit('geo', time.sleep, 0.2)
+        self.stages.submit('air_quality', lambda: time.sleep(0.2) or {'aqi': 12})
+        self.assertEqual(self.stages.result('air_quality'), {'aqi': 12})
+        self.stages.result('geo')
+        self.assertLess(time.monotonic() - started, 0.35)
+
+    def test_duration_recorded_in_summary(self):
+        self.stages.submit('geo', time.sleep, 0.05)
+        self.stages.result('geo')
+        self.assertGreaterEqual(self.stages.duration_ms('geo'), 40)
+        self.assertIn('stage_geo_ms', self.ctx.summary.to_meta())
+
+    def test_exception_reraised_from_result(self):
+        def fail():
+            raise RuntimeError("overpass down")
+        self.stages.submit('geo', fail)
+        with self.assertRaises(RuntimeError):
+            self.stages.result('geo')
+
+    def test_default_when_not_submitted(self):
+        self.assertFalse(self.stages.submitted('air_quality'))
+        self.assertIsNone(self.stages.result('air_quality'))
+
+
+class TestStreamCleanup(TestCase):
+
+    def test_closed_stream_cancels_queued_stages(self):
+        """Rozłączenie klienta: etapy czekające w kolejce puli nie startują."""
+        executor = ThreadPoolExecutor(max_workers=1)
+        gate = threading.Event()
+        executor.submit(gate.wait, 2)  # pula zajęta przez inną analizę
+        service = AnalysisService()
+        try:
+            with patch('location_analysis.stage_scheduler.get_executor', return_value=executor), \
+                 patch.object(service, '_get_pois') as get_pois, \
+                 patch.object(service, '_fetch_air_quality') as fetch_air_quality:
+                stream = service.analyze_location_stream(
+                    lat=52.2297, lon=21.0122, price=None, area_sqm=None, address='Test',
+                )
+                next(stream)
+                stream.close()
+                gate.set()
+                executor.shutdown(wait=True)
+            get_pois.assert_not_called()
+            fetch_air_quality.assert_not_called()
+        finally:
+            gate.set()
+            executor.shutdown(wait=True)
+
+    def test_batch_pool_is_separate(self):
+        self.assertIsNot(get_batch_executor(), get_executor())
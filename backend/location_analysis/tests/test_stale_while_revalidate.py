@@ -0,0 +1,161 @@
+"""
+Testy stale-while-revalidate: soft TTL w cache i odświeżanie w tle.
+"""
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from location_analysis.background_refresh import BackgroundRefresher
+from location_analysis.cache import TTLCache, air_quality_cache, in_refresh_scope, overpass_cache, refresh_scope
+from location_analysis.geo.air_quality import air_quality_cell
+from location_analysis.geo.air_quality.open_meteo import OpenMeteoAirQualityProvider
+from location_analysis.geo.spatial_cache import SpatialElementCache
+from location_analysis.services import AnalysisService
+
+ELEMENT = {'type': 'node', 'id': 1, 'lat': 52.2297, 'lon': 21.0122, 'tags': {'shop': 'bakery'}}
+
+
+def _age(cache: TTLCache, key: str, seconds: float) -> None:
+    """Przesuwa wpis w czasie (soft i hard expiry)."""
+    entry = cache._backend._cache[key]
+    entry.value.fresh_until -= seconds
+    entry.expires_at -= seconds
+
+
+class TestSoftTTL(unittest.TestCase):
+
+    def test_stale_entry_served_until_hard_ttl(self):
+        cache = TTLCache(default_ttl=100, soft_ttl=10)
+        cache.set('k', 'value')
+        self.assertEqual(cache.lookup('k'), ('value', False))
+
+        _age(cache, 'k', 50)
+        self.assertEqual(cache.lookup('k'), ('value', True))
+        self.assertEqual(cache.get('k'), 'value')
+        # Odświeżanie w tle nie może dostać tych samych starych danych
+        with refresh_scope():
+            self.assertIsNone(cache.get('k'))
+        self.assertFalse(in_refresh_scope())
+
+        _age(cache, 'k', 60)
+        self.assertEqual(cache.lookup('k'), (None, False))
+        self.assertEqual(cache.stats()['stale_hits'], 2)
+
+    def test_area_cache_skips_stale_area_only_when_refreshing(self):
+        areas = SpatialElementCache(ttl=100, soft_ttl=10)
+        areas.store(52.2297, 21.0122, 1000, [ELEMENT])
+        next(iter(areas._areas.values())).fresh_until -= 50
+
+        self.assertEqual(len(areas.lookup(52.2297, 21.0122, 500)), 1)
+        with refresh_scope():
+            self.assertIsNone(areas.lookup(52.2297, 21.0122, 500))
+
+
+class TestBackgroundRefresh(unittest.TestCase):
+
+    def setUp(self):
+        overpass_cache.clear()
+
+    def tearDown(self):
+        overpass_cache.clear()
+
+    def test_refresher_dedups_by_key(self):
+        refresher = BackgroundRefresher(max_workers=2)
+        gate = threading.Event()
+        runs = []
+
+        def job():
+            runs.append(in_refresh_scope())
+            gate.wait(1)
+
+        self.assertTrue(refresher.submit('k', job))
+        self.assertFalse(refresher.submit('k', job))
+        gate.set()
+        self.assertTrue(refresher.wait_idle(2))
+        self.assertTrue(refresher.submit('k', lambda: 1 / 0))
+        self.assertTrue(refresher.wait_idle(2))
+
+        self.assertEqual(runs, [True])
+        stats = refresher.stats()
+        self.assertEqual((stats['deduped'], stats['completed'], stats['failed'], stats['pending']), (1, 1, 1, 0))
+
+    def test_stale_pois_returned_immediately_and_refreshed(self):
+        service = AnalysisService()
+        refresher = BackgroundRefresher(max_workers=1)
+        versions = iter(['old', 'new'])
+
+        def get_pois_around(lat, lon, radius, trace_ctx=None, radius_by_category=None):
+            return {'shops': []}, {'version': next(versions)}
+
+        with patch.object(service.overpass_client, 'get_pois_around', side_effect=get_pois_around), \
+             patch('location_analysis.services.cache_refresher', refresher), \
+             patch.object(overpass_cache, '_soft_ttl', 10):
+            _, metrics, cache_used = service._get_pois(52.2297, 21.0122, 1000, True, provider='overpass')
+            self.assertEqual((metrics['version'], cache_used), ('old', False))
+            key = next(iter(overpass_cache._backend._cache))
+            _age(overpass_cache, key, 20)
+
+            started = time.monotonic()
+            _, metrics, cache_used = service._get_pois(52.2297, 21.0122, 1000, True, provider='overpass')
+            self.assertEqual((metrics['version'], cache_used), ('old', True))
+            self.assertLess(time.monotonic() - started, 0.5)
+
+            self.assertTrue(refresher.wait_idle(2))
+            _, metrics, _ = service._get_pois(52.2297, 21.0122, 1000, True, provider='overpass')
+            self.assertEqual(metrics['version'], 'new')
+
+    def test_failed_refresh_keeps_stale_entry(self):
+        service = AnalysisService()
+        refresher = BackgroundRefresher(max_workers=1)
+        results = iter([({'shops': ['poi']}, {'version': 'old'}), service.overpass_client._empty_result(1000)])
+
+        with patch.object(service.overpass_client, 'get_pois_around', side_effect=lambda *a, **kw: next(results)), \
+             patch('location_analysis.services.cache_refresher', refresher), \
+             patch.object(overpass_cache, '_soft_ttl', 10):
+            service._get_pois(52.2297, 21.0122, 1000, True, provider='overpass')
+            key = next(iter(overpass_cache._backend._cache))
+            _age(overpass_cache, key, 20)
+
+            service._get_pois(52.2297, 21.0122, 1000, True, provider='overpass')
+            self.assertTrue(refresher.wait_idle(2))
+            (pois, metrics), stale = overpass_cache.lookup(key)
+            self.assertEqual((pois['shops'], metrics['version'], stale), (['poi'], 'old', True))
+
+    def test_failed_fetch_is_not_cached(self):
+        service = AnalysisService()
+        with patch.object(service.overpass_client, 'get_pois_around', return_value=service.overpass_client._empty_result(1000)):
+            service._get_pois(52.2297, 21.0122, 1000, True, provider='overpass')
+        self.assertFalse(overpass_cache._backend._cache)
+
+
+class TestAirQualityCache(unittest.TestCase):
+
+    def setUp(self):
+        air_quality_cache.clear()
+
+    def tearDown(self):
+        air_quality_cache.clear()
+
+    def test_nearby_points_share_cell_and_stale_entry_refreshes(self):
+        service = AnalysisService()
+        refresher = BackgroundRefresher(max_workers=1)
+        results = iter([{'aqi': 30, 'provider': 'open_meteo'}, {'aqi': 25, 'provider': 'open_meteo'}])
+        cell = air_quality_cell(52.2297, 21.0122, 0.05)
+        self.assertEqual(cell, (52.225, 21.025))
+
+        with patch.object(OpenMeteoAirQualityProvider, 'get_air_quality', side_effect=lambda lat, lon: next(results)) as fetch, \
+             patch('location_analysis.services.cache_refresher', refresher):
+            self.assertEqual(service._fetch_air_quality(52.2297, 21.0122)['aqi'], 30)
+            self.assertEqual(service._fetch_air_quality(52.2310, 21.0140)['aqi'], 30)
+            fetch.assert_called_once_with(*cell)
+
+            _age(air_quality_cache, next(iter(air_quality_cache._backend._cache)), air_quality_cache._soft_ttl + 1)
+            self.assertEqual(service._fetch_air_quality(52.2310, 21.0140)['aqi'], 30)
+            self.assertTrue(refresher.wait_idle(2))
+            self.assertEqual(service._fetch_air_quality(52.2297, 21.0122)['aqi'], 25)
+            self.assertEqual(fetch.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,6 +7,7 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     AnalyzeListingView, 
     AnalyzeLocationView, 
+    AnalyzeBatchView,
     ValidateURLView, 
     HistoryViewSet, 
     ProvidersView, 
@@ -14,6 +15,7 @@ from .views import (
     ReportDetailView,
     RescoreReportView,
     AppConfigView,
+    analyze_location_async,
 )
 
 router = DefaultRouter()
@@ -22,6 +24,8 @@ router.register(r'history', HistoryViewSet, basename='history')
 urlpatterns = [
     path('analyze/', AnalyzeListingView.as_view(), name='analyze'),
     path('analyze-location/', AnalyzeLocationView.as_view(), name='analyze-location'),
+    path('analyze-location-async/', analyze_location_async, name='analyze-location-async'),
+    path('analyze-batch/', AnalyzeBatchView.as_view(), name='analyze-batch'),
     path('validate-url/', ValidateURLView.as_view(), name='validate-url'),
     path('providers/', ProvidersView.as_view(), name='providers'),
     path('profiles/', ProfilesView.as_view(), name='profiles'),
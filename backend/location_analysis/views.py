@@ -1,9 +1,12 @@
 """
 Widoki API dla analizy lokalizacji.
 """
+import json
 import logging
 
-from django.http import StreamingHttpResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from django.shortcuts import get_object_or_404
 from rest_framework import status
 from rest_framework.views import APIView
@@ -12,15 +15,17 @@ from rest_framework.response import Response
 from rest_framework.decorators import action
 
 from .models import LocationAnalysis
+from .report_storage import assemble_report
 from .serializers import (
     AnalyzeListingRequestSerializer,
     AnalyzeLocationRequestSerializer,
+    AnalyzeBatchRequestSerializer,
     AnalysisReportSerializer,
     LocationAnalysisSerializer,
     LocationAnalysisDetailSerializer,
 )
 from .services import analysis_service
-from .rate_limiter import rate_limit
+from .rate_limiter import rate_limit, check_rate_limit, rescore_rate_limiter
 from .providers import ProviderRegistry
 from .scoring.profiles import get_profiles_summary, get_profile
 from .app_config import get_config
@@ -89,6 +94,91 @@ class AnalyzeLocationView(APIView):
         return response
 
 
+class AnalyzeBatchView(APIView):
+    """
+    Scoring wielu lokalizacji w jednym żądaniu (partnerzy).
+    
+    POST /api/analyze-batch/
+    Body: {"items": [{"latitude", "longitude", "profile_key"?, "radius_overrides"?}], "radius"?}
+    Returns: NDJSON stream — wynik każdej pozycji zaraz po policzeniu
+    
+    Całe żądanie liczy się jako jedno wywołanie w rate limiterze.
+    """
+    
+    @rate_limit()
+    def post(self, request):
+        serializer = AnalyzeBatchRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                {'errors': serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        items = serializer.validated_data['items']
+        logger.info(f"Scoring partii: {len(items)} lokalizacji")
+        
+        response = StreamingHttpResponse(
+            analysis_service.analyze_batch_stream(items, radius=serializer.validated_data.get('radius')),
+            content_type='application/x-ndjson'
+        )
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+@csrf_exempt
+@require_POST
+async def analyze_location_async(request):
+    """
+    Asynchroniczna analiza lokalizacji (ten sam kontrakt co AnalyzeLocationView).
+    
+    POST /api/analyze-location-async/
+    Returns: NDJSON stream
+    
+    Zwykły widok Django (DRF APIView jest tylko synchroniczny). Wymaga
+    serwera ASGI (project_config.asgi:application) — pod WSGI Django
+    uruchomi go w wątku i strumień nie będzie przeplatał analiz.
+    """
+    error_message = check_rate_limit(request)
+    if error_message:
+        return JsonResponse({'error': error_message}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+    
+    try:
+        payload = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'errors': {'body': ['Niepoprawny JSON.']}}, status=status.HTTP_400_BAD_REQUEST)
+    
+    serializer = AnalyzeLocationRequestSerializer(data=payload)
+    if not serializer.is_valid():
+        return JsonResponse({'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+    
+    data = serializer.validated_data
+    logger.info(
+        f"Analiza lokalizacji (async stream): ({data['latitude']}, {data['longitude']}) - {data['address']} "
+        f"[profil: {data.get('profile_key') or data.get('user_profile', 'family')}, provider: {data.get('poi_provider', 'overpass')}]"
+    )
+    
+    response = StreamingHttpResponse(
+        analysis_service.analyze_location_stream_async(
+            lat=data['latitude'],
+            lon=data['longitude'],
+            price=data['price'],
+            area_sqm=data['area_sqm'],
+            address=data['address'],
+            radius=data.get('radius', 500),
+            reference_url=data.get('reference_url', None),
+            user_profile=data.get('user_profile', 'family'),
+            profile_key=data.get('profile_key', None),
+            poi_provider=data.get('poi_provider', 'overpass'),
+            radius_overrides=data.get('radius_overrides', None),
+            enable_enrichment=data.get('enable_enrichment', False),
+            enable_fallback=data.get('enable_fallback', True),
+        ),
+        content_type='application/x-ndjson'
+    )
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 class AnalyzeListingView(APIView):
     """
     Endpoint do analizy ogłoszenia przez URL.
@@ -171,7 +261,7 @@ class HistoryViewSet(ReadOnlyModelViewSet):
     def report(self, request, pk=None):
         """Zwraca pełny raport z bazy."""
         instance = self.get_object()
-        return Response(instance.report_data)
+        return Response(assemble_report(instance))
 
 
 class ProvidersView(APIView):
@@ -235,9 +325,9 @@ class ReportDetailView(APIView):
         """Zwraca pełny raport z bazy po public_id."""
         analysis = get_object_or_404(LocationAnalysis, public_id=public_id)
         
-        # Zwróć pełny raport z report_data lub zbuduj z pól
+        # Złóż raport z zapisanych części lub zbuduj z pól
         if analysis.report_data:
-            report = analysis.report_data.copy()
+            report = assemble_report(analysis)
             
             # Dodaj zapisane AI insights (persisted from original analysis)
             if analysis.ai_insights_data:
@@ -249,9 +339,16 @@ class ReportDetailView(APIView):
             if analysis.verdict_data and 'verdict' not in report:
                 report['verdict'] = analysis.verdict_data
             
+            # Po zmianie profilu: wynik aktywnego profilu z profile_results
+            from .rescore_service import rescore_service
+            switched = rescore_service.active_profile_payload(analysis)
+            if switched:
+                generation_params = switched.pop('generation_params')
+                report.update(switched)
+                report['generation_params'] = {**(report.get('generation_params') or {}), **generation_params}
+            
             # Dodaj rescore tracking
             report['rescore_count'] = analysis.rescore_count
-            report['rescore_limit'] = analysis.rescore_limit
             
             return Response(report)
         
@@ -300,13 +397,20 @@ class RescoreReportView(APIView):
     
     POST /api/report/{public_id}/rescore/
     Body: { "profile_key": "urban" }
-    Returns: { scoring, verdict, ai_insights, profile, rescore_count, rescore_limit }
+    Returns: { scoring, verdict, ai_insights, profile, generation_params, rescore_count }
+    
+    Limit per IP z rescore_rate_limiter (RESCORE_RATE_LIMIT_*).
     """
     
+    @rate_limit(rescore_rate_limiter)
     def post(self, request, public_id):
-        from .rescore_service import rescore_service, RescoreLimitExceeded, RescoreDataMissing
+        from .rescore_service import rescore_service, RescoreDataMissing
         
-        analysis = get_object_or_404(LocationAnalysis, public_id=public_id)
+        # report_data/neighborhood_data potrzebne tylko dla raportów bez snapshotu POI (doczytane leniwie)
+        analysis = get_object_or_404(
+            LocationAnalysis.objects.defer('report_data', 'neighborhood_data'),
+            public_id=public_id,
+        )
         
         profile_key = request.data.get('profile_key')
         if not profile_key:
@@ -327,11 +431,6 @@ class RescoreReportView(APIView):
         try:
             result = rescore_service.rescore(analysis, profile_key)
             return Response(result)
-        except RescoreLimitExceeded as e:
-            return Response(
-                {'error': str(e), 'rescore_count': analysis.rescore_count, 'rescore_limit': analysis.rescore_limit},
-                status=status.HTTP_429_TOO_MANY_REQUESTS
-            )
         except RescoreDataMissing as e:
             return Response(
                 {'error': str(e)},
@@ -355,9 +454,23 @@ class AppConfigView(APIView):
     Endpoint do odczytu centralnej konfiguracji aplikacji.
     
     GET /api/config/
-    Zwraca aktualne ustawienia (bez sekretów jak API keys).
+    Zwraca aktualne ustawienia (bez sekretów jak API keys)
+    oraz statystyki cache'y (z odświeżaniem w tle), pul HTTP, single-flight
+    i endpointów Overpass bieżącego procesu.
     """
     
     def get(self, request):
+        from .background_refresh import cache_refresher
+        from .cache import get_cache_stats
+        from .geo.endpoint_health import overpass_endpoint_health
+        from .http_pool import http_pool
+        from .single_flight import get_single_flight_stats
         config = get_config()
-        return Response(config.to_public_dict())
+        return Response({
+            **config.to_public_dict(),
+            'cache_stats': get_cache_stats(),
+            'cache_refresh_stats': cache_refresher.stats(),
+            'http_pool_stats': http_pool.stats(),
+            'single_flight_stats': get_single_flight_stats(),
+            'overpass_endpoint_stats': overpass_endpoint_health.stats(),
+        })
@@ -167,17 +167,28 @@ LOKTIS_CONFIG = {
     # --- Overpass API ---
     'OVERPASS_MODE': os.getenv('OVERPASS_MODE', 'public'),
     'OVERPASS_LOCAL_URL': os.getenv('OVERPASS_LOCAL_URL', 'http://localhost:12345/api/interpreter'),
+    'OSM_INDEX_PATH': os.getenv('OSM_INDEX_PATH', ''),
     'OVERPASS_URL': os.getenv('OVERPASS_URL', 'https://overpass-api.de/api/interpreter'),
     'OVERPASS_FALLBACK_URLS': os.getenv(
         'OVERPASS_FALLBACK_URLS',
         'https://lz4.overpass-api.de/api/interpreter,https://z.overpass-api.de/api/interpreter,https://maps.mail.ru/osm/tools/overpass/api/interpreter'
     ),
     'OVERPASS_TIMEOUT': int(os.getenv('OVERPASS_TIMEOUT', '60')),
+    'OVERPASS_TILES_ENABLED': os.getenv('OVERPASS_TILES_ENABLED', 'false'),
+    'OVERPASS_TILE_SIZE_M': int(os.getenv('OVERPASS_TILE_SIZE_M', '500')),
+    'OVERPASS_STREAM_PARSE': os.getenv('OVERPASS_STREAM_PARSE', 'true'),
+    'OVERPASS_CATEGORY_RADII': os.getenv('OVERPASS_CATEGORY_RADII', 'true'),
+    'OVERPASS_TAG_PROJECTION': os.getenv('OVERPASS_TAG_PROJECTION', 'false'),
+    'OVERPASS_HEDGE_ENABLED': os.getenv('OVERPASS_HEDGE_ENABLED', 'false'),
+    'OVERPASS_CIRCUIT_FAILURES': int(os.getenv('OVERPASS_CIRCUIT_FAILURES', '3')),
+    'OVERPASS_CIRCUIT_COOLDOWN_S': float(os.getenv('OVERPASS_CIRCUIT_COOLDOWN_S', '60')),
 
     # --- Google Places API ---
     'GOOGLE_PLACES_ENABLED': os.getenv('GOOGLE_PLACES_ENABLED', 'true'),
     'GOOGLE_PLACES_API_KEY': os.getenv('GOOGLE_PLACES_API_KEY', ''),
     'GOOGLE_MAX_RETRIES': int(os.getenv('GOOGLE_MAX_RETRIES', '2')),
+    'GOOGLE_MAX_CONCURRENCY': int(os.getenv('GOOGLE_MAX_CONCURRENCY', '4')),
+    'GOOGLE_MAX_QPS': float(os.getenv('GOOGLE_MAX_QPS', '10')),
 
     # --- Domyślne flagi analizy ---
     'DEFAULT_ENRICHMENT': os.getenv('DEFAULT_ENRICHMENT', 'false'),
@@ -195,16 +206,51 @@ LOKTIS_CONFIG = {
     # --- Air Quality ---
     'AIR_QUALITY_PROVIDER': os.getenv('AIR_QUALITY_PROVIDER', 'open_meteo'),
     'AIR_QUALITY_ENABLED': os.getenv('AIR_QUALITY_ENABLED', 'true'),
+    'AIR_QUALITY_CELL_DEG': float(os.getenv('AIR_QUALITY_CELL_DEG', '0.05')),
 
     # --- Rate Limiting ---
     'RATE_LIMIT_PER_MINUTE': int(os.getenv('RATE_LIMIT_PER_MINUTE', '5')),
     'RATE_LIMIT_PER_HOUR': int(os.getenv('RATE_LIMIT_PER_HOUR', '30')),
+    'RESCORE_RATE_LIMIT_PER_MINUTE': int(os.getenv('RESCORE_RATE_LIMIT_PER_MINUTE', '10')),
+    'RESCORE_RATE_LIMIT_PER_HOUR': int(os.getenv('RESCORE_RATE_LIMIT_PER_HOUR', '60')),
+
+    # --- Pipeline ---
+    'PIPELINE_MAX_WORKERS': int(os.getenv('PIPELINE_MAX_WORKERS', '8')),
+
+    # --- Scoring partii ---
+    'BATCH_MAX_ITEMS': int(os.getenv('BATCH_MAX_ITEMS', '500')),
+    'BATCH_CLUSTER_SPAN_M': int(os.getenv('BATCH_CLUSTER_SPAN_M', '1500')),
+    'BATCH_MAX_CONCURRENT_FETCHES': int(os.getenv('BATCH_MAX_CONCURRENT_FETCHES', '2')),
+
+    # --- Ponowne użycie zapisanej analizy w pobliżu ---
+    'NEARBY_REUSE_M': int(os.getenv('NEARBY_REUSE_M', '0')),
+    'NEARBY_REUSE_MAX_AGE': int(os.getenv('NEARBY_REUSE_MAX_AGE', '86400')),
+
+    # --- Wychodzące HTTP (pule połączeń) ---
+    'HTTP_POOL_CONNECTIONS': int(os.getenv('HTTP_POOL_CONNECTIONS', '16')),
+    'HTTP_POOL_MAXSIZE': int(os.getenv('HTTP_POOL_MAXSIZE', '32')),
+    'HTTP_CONNECT_TIMEOUT': float(os.getenv('HTTP_CONNECT_TIMEOUT', '5')),
+    'HTTP_READ_TIMEOUT': float(os.getenv('HTTP_READ_TIMEOUT', '30')),
 
     # --- Cache TTLs (sekundy) ---
     'CACHE_TTL_LISTING': int(os.getenv('CACHE_TTL_LISTING', '3600')),
     'CACHE_TTL_POIS': int(os.getenv('CACHE_TTL_POIS', '604800')),
     'CACHE_TTL_GOOGLE_DETAILS': int(os.getenv('CACHE_TTL_GOOGLE_DETAILS', '604800')),
     'CACHE_TTL_GOOGLE_NEARBY': int(os.getenv('CACHE_TTL_GOOGLE_NEARBY', '259200')),
+    'CACHE_TTL_AIR_QUALITY': int(os.getenv('CACHE_TTL_AIR_QUALITY', '2592000')),
+    'CACHE_SOFT_TTL_POIS': int(os.getenv('CACHE_SOFT_TTL_POIS', '432000')),
+    'CACHE_REFRESH_WORKERS': int(os.getenv('CACHE_REFRESH_WORKERS', '2')),
+    'CACHE_REFRESH_MAX_PENDING': int(os.getenv('CACHE_REFRESH_MAX_PENDING', '256')),
+    'CACHE_SOFT_TTL_AIR_QUALITY': int(os.getenv('CACHE_SOFT_TTL_AIR_QUALITY', '604800')),
+
+    # --- Cache POI (backend) ---
+    'POI_CACHE_BACKEND': os.getenv('POI_CACHE_BACKEND', 'memory'),
+    'POI_CACHE_PATH': os.getenv('POI_CACHE_PATH', ''),
+    'POI_CACHE_MAX_ENTRIES': int(os.getenv('POI_CACHE_MAX_ENTRIES', '20000')),
+    'POI_CACHE_MAX_MB': int(os.getenv('POI_CACHE_MAX_MB', '128')),
+    'POI_AREA_CACHE_MAX_ENTRIES': int(os.getenv('POI_AREA_CACHE_MAX_ENTRIES', '64')),
+    'POI_AREA_CACHE_MAX_MB': int(os.getenv('POI_AREA_CACHE_MAX_MB', '64')),
+    'POI_AREA_CACHE_MARGIN_M': int(os.getenv('POI_AREA_CACHE_MARGIN_M', '150')),
 
     # --- AI Provider ---
     'AI_PROVIDER': os.getenv('AI_PROVIDER', 'ollama'),
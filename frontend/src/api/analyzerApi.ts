@@ -267,7 +267,6 @@ export interface AnalysisReport {
   };
   // Rescore tracking
   rescore_count?: number;
-  rescore_limit?: number;
 }
 
 export interface RescoreResponse {
@@ -288,7 +287,6 @@ export interface RescoreResponse {
     radii: Record<string, number>;
   };
   rescore_count: number;
-  rescore_limit: number;
 }
 
 export interface ValidationResult {